@@ -4,15 +4,18 @@ import time
 import threading
 import logging
 import functools
-from datetime import datetime
+from datetime import datetime, timezone
 import sqlite3
+import queue
+import warnings
 import numpy as np
 from collections import deque
-from typing import Dict, Any, List, Optional, Deque, Tuple
+from itertools import islice
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from dataclasses import dataclass, asdict, field
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from pythonjsonlogger import jsonlogger
-from functools import lru_cache
 
 # Set up structured logging
 logger = logging.getLogger('system_monitor')
@@ -68,15 +71,548 @@ class SystemMetrics:
     network: Dict[str, Any] = field(default_factory=dict)
     processes: Dict[str, Any] = field(default_factory=dict)
 
+def flatten_metrics(data: Any, prefix: str = '') -> Dict[str, float]:
+    """Flatten nested metric dictionaries into ``{'a.b.c': float}`` series.
+
+    Only numeric leaves are kept; lists of numbers are indexed
+    (``cpu.per_cpu.0``) and any other value (strings, lists of process
+    records, addresses) is skipped.
+    """
+    flat: Dict[str, float] = {}
+    if isinstance(data, dict):
+        items = data.items()
+    elif _is_numeric_list(data):
+        items = enumerate(data)
+    else:
+        return flat
+    for key, value in items:
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, (int, float)):
+            flat[name] = float(value)
+        elif isinstance(value, (dict, list, tuple)):
+            flat.update(flatten_metrics(value, name))
+    return flat
+
+
+def _is_numeric_list(value: Any) -> bool:
+    """True for a list or tuple whose items are all numbers."""
+    return isinstance(value, (list, tuple)) and all(isinstance(item, (int, float)) for item in value)
+
+
+def _to_epoch(timestamp: Any) -> float:
+    """Convert an ISO timestamp (or epoch number) to epoch seconds.
+
+    Naive timestamps are UTC, as produced by ``datetime.utcnow()``.
+    """
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def _classify_slope(slope: float) -> str:
+    """Map a per-sample regression slope to a trend label."""
+    if abs(slope) < 0.1:  # Threshold for considering a trend significant
+        return 'stable'
+    return 'increasing' if slope > 0 else 'decreasing'
+
+
+class MetricsWriter:
+    """Write-behind SQLite sink for metric and anomaly rows.
+
+    Producers enqueue ``(sql, rows)`` pairs on a bounded queue and return
+    immediately. A single background thread owns one long-lived connection,
+    groups queued rows into one transaction per batch and commits when either
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed.
+    The connection's statement cache keeps the few INSERT statements prepared.
+    """
+
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-16000',
+        'PRAGMA busy_timeout=30000',
+    )
+
+    def __init__(self, db_path: str, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, block_on_full: bool = False,
+                 put_timeout: float = 1.0):
+        """Start the writer thread.
+
+        Args:
+            db_path: Path to the SQLite database file.
+            max_queue: Maximum number of pending submissions before backpressure.
+            batch_size: Number of rows that triggers an immediate commit.
+            flush_interval: Maximum seconds a row waits before being committed.
+            block_on_full: Block producers (up to ``put_timeout``) instead of
+                dropping submissions when the queue is full.
+            put_timeout: Seconds to wait for queue space when blocking.
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_on_full = block_on_full
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Tuple[Any, ...]]" = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'dropped': 0,
+            'rows_written': 0,
+            'batches': 0,
+            'errors': 0,
+            'max_queue_depth': 0,
+            'last_batch_rows': 0,
+            'last_commit_seconds': 0.0,
+            'total_commit_seconds': 0.0,
+        }
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='MetricsWriter', daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are managed explicitly per batch
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None,
+                               check_same_thread=False, cached_statements=128)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def submit(self, sql: str, rows: List[Tuple[Any, ...]]) -> bool:
+        """Queue rows for insertion; returns False if they were dropped."""
+        if not rows:
+            return True
+        if self._closed:
+            raise DatabaseError("Metrics writer is closed")
+        try:
+            if self.block_on_full:
+                self._queue.put(('rows', sql, rows), timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(('rows', sql, rows))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats['dropped'] += len(rows)
+            logger.warning(f"Metrics writer queue full, dropped {len(rows)} rows")
+            return False
+        with self._stats_lock:
+            self._stats['submitted'] += len(rows)
+            depth = self._queue.qsize()
+            if depth > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = depth
+        return True
+
+    def submit_task(self, task) -> bool:
+        """Run ``task(conn)`` on the writer thread inside its own transaction.
+
+        Used for maintenance (rollups, retention) so it never contends with
+        the writer connection. Pending rows are committed first. Returns
+        False if the task could not be queued within ``put_timeout``.
+        """
+        if self._closed:
+            raise DatabaseError("Metrics writer is closed")
+        if not self._thread.is_alive():
+            logger.warning("Metrics writer thread is not running, task not queued")
+            return False
+        try:
+            self._queue.put(('task', task), timeout=self.put_timeout)
+        except queue.Full:
+            logger.warning("Metrics writer queue full, task not queued")
+            return False
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything queued so far; returns False on timeout."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(('flush', done), timeout=timeout)
+        except queue.Full:
+            return False
+        # Wait in slices so a writer thread that died does not hang the caller
+        while True:
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if done.wait(max(0.0, wait)):
+                return True
+            if not self._thread.is_alive():
+                return done.is_set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush pending rows and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(('stop',), timeout=timeout)
+            except queue.Full:
+                logger.warning(f"Metrics writer queue still full after {timeout}s, it stops once drained")
+                return
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backpressure and throughput counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
+
+    def _run(self) -> None:
+        conn = self._connect()
+        pending: List[Tuple[str, List[Tuple[Any, ...]]]] = []
+        pending_rows = 0
+        waiters: List[threading.Event] = []
+        deadline = None
+        stopping = False
+        try:
+            while not stopping:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is not None:
+                    kind = item[0]
+                    if kind == 'rows':
+                        pending.append((item[1], item[2]))
+                        pending_rows += len(item[2])
+                        if deadline is None:
+                            deadline = time.monotonic() + self.flush_interval
+                    elif kind == 'flush':
+                        waiters.append(item[1])
+                    elif kind == 'task':
+                        if pending:
+                            self._write_batch(conn, pending, pending_rows)
+                            pending, pending_rows, deadline = [], 0, None
+                        self._run_task(conn, item[1])
+                    elif kind == 'stop':
+                        stopping = True
+                # close() may have found the queue full; stop once it drains
+                if self._closed and self._queue.empty():
+                    stopping = True
+
+                due = deadline is not None and time.monotonic() >= deadline
+                if pending and (pending_rows >= self.batch_size or due or waiters or stopping):
+                    self._write_batch(conn, pending, pending_rows)
+                    pending, pending_rows, deadline = [], 0, None
+                if not pending:
+                    deadline = None
+                    for waiter in waiters:
+                        waiter.set()
+                    waiters = []
+        finally:
+            for waiter in waiters:
+                waiter.set()
+            conn.close()
+
+    def _run_task(self, conn: sqlite3.Connection, task) -> None:
+        try:
+            conn.execute('BEGIN')
+            task(conn)
+            conn.execute('COMMIT')
+        except Exception as e:
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+            with self._stats_lock:
+                self._stats['errors'] += 1
+            logger.error(f"Metrics writer task failed: {e}", exc_info=True)
+
+    def _write_batch(self, conn: sqlite3.Connection,
+                     pending: List[Tuple[str, List[Tuple[Any, ...]]]], row_count: int) -> None:
+        started = time.perf_counter()
+        try:
+            conn.execute('BEGIN')
+            for sql, rows in pending:
+                conn.executemany(sql, rows)
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+            with self._stats_lock:
+                self._stats['errors'] += 1
+                self._stats['dropped'] += row_count
+            logger.error(f"Metrics writer failed to commit {row_count} rows: {e}", exc_info=True)
+            return
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats['rows_written'] += row_count
+            self._stats['batches'] += 1
+            self._stats['last_batch_rows'] = row_count
+            self._stats['last_commit_seconds'] = elapsed
+            self._stats['total_commit_seconds'] += elapsed
+
+
+class StreamingAnomalyDetector:
+    """Online, vectorized anomaly scoring for many metric series.
+
+    Every series owns one column in a set of NumPy state arrays:
+
+    * EWMA mean and EWMV variance -> classic z-score
+    * a rolling window -> median / MAD robust z-score
+    * per-slot EWMA mean/variance over a seasonal period (hour of day by
+      default) -> seasonal z-score
+
+    A sample is anomalous when at least two of the three scores exceed the
+    threshold.
+
+    :meth:`update` scores every series in one vectorized pass and then folds
+    the new sample into the state, so the cost per tick depends only on the
+    number of series and the window length, never on history size.
+    """
+
+    def __init__(self, alpha: float = 0.05, window: int = 60, threshold: float = 5.0,
+                 warmup: int = 30, min_deviation: float = 1.0,
+                 seasonal_period: float = 86400.0, seasonal_slots: int = 24,
+                 seasonal_alpha: float = 0.05, seasonal_warmup: int = 10):
+        """Initialize the detector.
+
+        Args:
+            alpha: Smoothing factor of the EWMA/EWMV baseline.
+            window: Number of recent samples used for the median/MAD score.
+            threshold: Absolute z-score two of the scores must exceed.
+            warmup: Samples a series needs before it can be flagged.
+            min_deviation: Minimum absolute distance from the baseline, in the
+                metric's own units, so flat series do not alarm on noise.
+            seasonal_period: Length of the seasonal cycle in seconds.
+            seasonal_slots: Number of slots the cycle is divided into.
+            seasonal_alpha: Smoothing factor of the per-slot baselines.
+            seasonal_warmup: Samples a slot needs before it is scored.
+        """
+        self.alpha = alpha
+        self.window = window
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_deviation = min_deviation
+        self.seasonal_period = seasonal_period
+        self.seasonal_slots = seasonal_slots
+        self.seasonal_alpha = seasonal_alpha
+        self.seasonal_warmup = seasonal_warmup
+        
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._pos = 0
+        self._allocate(16)
+
+    def _allocate(self, capacity: int) -> None:
+        """Grow every state array to ``capacity`` series columns."""
+        old = len(self._names)
+
+        def grow(array: Optional[np.ndarray], shape: Tuple[int, ...], fill: float) -> np.ndarray:
+            fresh = np.full(shape, fill, dtype=np.float64)
+            if array is not None:
+                fresh[..., :old] = array[..., :old]
+            return fresh
+
+        self._capacity = capacity
+        self._count = grow(getattr(self, '_count', None), (capacity,), 0)
+        self._mean = grow(getattr(self, '_mean', None), (capacity,), 0)
+        self._var = grow(getattr(self, '_var', None), (capacity,), 0)
+        self._window = grow(getattr(self, '_window', None), (self.window, capacity), np.nan)
+        slots = (self.seasonal_slots, capacity)
+        self._s_count = grow(getattr(self, '_s_count', None), slots, 0)
+        self._s_mean = grow(getattr(self, '_s_mean', None), slots, 0)
+        self._s_var = grow(getattr(self, '_s_var', None), slots, 0)
+
+    def _columns(self, names: List[str]) -> np.ndarray:
+        """Map series names to state columns, registering new ones."""
+        for name in names:
+            if name not in self._index:
+                if len(self._names) == self._capacity:
+                    self._allocate(self._capacity * 2)
+                self._index[name] = len(self._names)
+                self._names.append(name)
+        return np.fromiter((self._index[name] for name in names), dtype=np.intp, count=len(names))
+
+    @property
+    def series(self) -> List[str]:
+        """Names of every tracked series, in column order."""
+        return list(self._names)
+
+    def update(self, values: Dict[str, float], timestamp: float) -> List[Dict[str, Any]]:
+        """Score one sample of every series, then fold it into the baselines.
+
+        Args:
+            values: Current value per series name; missing series are skipped.
+            timestamp: Sample time in epoch seconds (selects the seasonal slot).
+
+        Returns:
+            One dict per anomalous series with its value, baseline and scores.
+        """
+        names = list(values)
+        columns = self._columns(names)
+        size = len(self._names)
+        x = np.full(size, np.nan)
+        x[columns] = np.fromiter((values[name] for name in names), dtype=np.float64, count=len(names))
+        present = ~np.isnan(x)
+        
+        count = self._count[:size]
+        mean = self._mean[:size]
+        var = self._var[:size]
+        window = self._window[:, :size]
+        slot = int((timestamp % self.seasonal_period) // (self.seasonal_period / self.seasonal_slots))
+        s_count = self._s_count[slot, :size]
+        s_mean = self._s_mean[slot, :size]
+        s_var = self._s_var[slot, :size]
+        
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN window columns
+            z_ewma = (x - mean) / np.sqrt(var)
+            # np.median is much cheaper; only columns still holding NaN
+            # padding (series that have not filled their window) need nanmedian
+            padded = np.isnan(window).any(axis=0)
+            median = self._median(window, padded)
+            mad = self._median(np.abs(window - median), padded)
+            z_robust = 0.6745 * (x - median) / mad
+            z_seasonal = np.where(s_count >= self.seasonal_warmup, (x - s_mean) / np.sqrt(s_var), 0.0)
+        
+        scores = np.stack([z_ewma, z_robust, z_seasonal])
+        scores[~np.isfinite(scores)] = 0.0
+        # Second largest |z|: at least two detectors must agree, which keeps
+        # a single noisy baseline from raising alarms on its own
+        peak = np.sort(np.abs(scores), axis=0)[-2]
+        flagged = (
+            present
+            & (count >= self.warmup)
+            & (peak > self.threshold)
+            & (np.abs(x - mean) >= self.min_deviation)
+        )
+        
+        anomalies = [
+            {
+                'series': self._names[i],
+                'value': float(x[i]),
+                'baseline': float(mean[i]),
+                'z_ewma': float(scores[0, i]),
+                'z_robust': float(scores[1, i]),
+                'z_seasonal': float(scores[2, i]),
+                'score': float(peak[i]),
+            }
+            for i in np.flatnonzero(flagged)
+        ]
+        
+        # Fold the sample into the baselines (first sample seeds the mean)
+        first = present & (count == 0)
+        delta = np.where(present, x - mean, 0.0)
+        mean += np.where(first, delta, self.alpha * delta)
+        var[:] = np.where(present & ~first, (1 - self.alpha) * (var + self.alpha * delta * delta), var)
+        count += present
+        
+        s_first = present & (s_count == 0)
+        s_delta = np.where(present, x - s_mean, 0.0)
+        s_mean += np.where(s_first, s_delta, self.seasonal_alpha * s_delta)
+        s_var[:] = np.where(
+            present & ~s_first,
+            (1 - self.seasonal_alpha) * (s_var + self.seasonal_alpha * s_delta * s_delta),
+            s_var
+        )
+        s_count += present
+        
+        # Missing series keep their old slot rather than gaining NaN padding
+        window[self._pos] = np.where(present, x, window[self._pos])
+        self._pos = (self._pos + 1) % self.window
+        return anomalies
+
+    @staticmethod
+    def _median(window: np.ndarray, padded: np.ndarray) -> np.ndarray:
+        """Column medians, ignoring NaN only in the ``padded`` columns."""
+        if not padded.any():
+            return np.median(window, axis=0)
+        if padded.all():
+            return np.nanmedian(window, axis=0)
+        median = np.empty(window.shape[1])
+        median[~padded] = np.median(window[:, ~padded], axis=0)
+        median[padded] = np.nanmedian(window[:, padded], axis=0)
+        return median
+
+
 class AdvancedSystemMonitor:
     """Advanced system monitoring with caching, error handling, and structured logging."""
     
-    def __init__(self, db_path: str = 'ai-workbench/knowledge/system_metrics.db'):
+    INSERT_METRIC_SQL = (
+        'INSERT INTO metrics (timestamp, metric_type, value, metadata) VALUES (?, ?, ?, ?)'
+    )
+    INSERT_ANOMALY_SQL = (
+        'INSERT INTO anomalies (timestamp, anomaly_type, severity, details) VALUES (?, ?, ?, ?)'
+    )
+    INSERT_POINT_SQL = (
+        'INSERT OR REPLACE INTO metric_points (series_id, ts, value) VALUES (?, ?, ?)'
+    )
+    
+    # Storage modes: legacy JSON rows, typed numeric series, or both
+    STORAGE_MODES = ('json', 'normalized', 'both')
+    
+    # Storage tiers by bucket width in seconds; 0 is the raw metric_points table
+    ROLLUP_TIERS = (60, 3600)
+    DEFAULT_RETENTION = {
+        0: 24 * 3600,            # raw samples: 1 day
+        60: 30 * 24 * 3600,      # 1 minute buckets: 30 days
+        3600: 365 * 24 * 3600,   # 1 hour buckets: 1 year
+    }
+    
+    # Seconds each metric section is reused before it is sampled again. The
+    # process table and socket list are the expensive parts of a collection.
+    DEFAULT_SECTION_TTLS = {
+        'cpu': 1.0,
+        'memory': 1.0,
+        'disk': 1.0,
+        'network': 5.0,
+        'processes': 5.0,
+    }
+    
+    # Flattened series scored by the streaming anomaly detector: utilisation
+    # style gauges; cumulative counters would only ever look like a trend
+    ANOMALY_SERIES_SUFFIXES = ('percent', 'load_avg.0')
+    
+    # Normalized series backing each calculate_trend() metric type
+    TREND_SERIES = {
+        'cpu': 'cpu.usage_percent',
+        'memory': 'memory.virtual.percent',
+    }
+    
+    def __init__(self, db_path: str = 'ai-workbench/knowledge/system_metrics.db',
+                 writer_options: Optional[Dict[str, Any]] = None,
+                 storage_mode: str = 'json',
+                 retention: Optional[Dict[int, float]] = None,
+                 rollup_interval: float = 60.0,
+                 section_ttls: Optional[Dict[str, float]] = None,
+                 detector_options: Optional[Dict[str, Any]] = None):
         """Initialize the system monitor with configuration.
         
         Args:
             db_path: Path to the SQLite database file.
+            writer_options: Keyword arguments for the MetricsWriter
+                (``max_queue``, ``batch_size``, ``flush_interval``, ``block_on_full``).
+            storage_mode: ``'json'`` stores one JSON blob per section in ``metrics``,
+                ``'normalized'`` stores flattened numeric series in ``metric_points``,
+                ``'both'`` writes to both tables.
+            retention: Seconds to keep per tier (``0`` = raw, ``60``, ``3600``);
+                merged over ``DEFAULT_RETENTION``.
+            rollup_interval: Minimum seconds between automatic rollup passes.
+            section_ttls: Seconds each collected section stays cached, merged
+                over ``DEFAULT_SECTION_TTLS``; 0 disables caching for a section.
+            detector_options: Keyword arguments for the StreamingAnomalyDetector.
         """
+        if storage_mode not in self.STORAGE_MODES:
+            raise ValueError(f"storage_mode must be one of {self.STORAGE_MODES}")
+        self.storage_mode = storage_mode
+        self._series_ids: Dict[str, int] = {}
+        self.retention = {**self.DEFAULT_RETENTION, **(retention or {})}
+        self.rollup_interval = rollup_interval
+        self._last_rollup = time.monotonic()
         self.metrics_history = {
             'cpu': deque(maxlen=1000),
             'memory': deque(maxlen=1000),
@@ -94,14 +630,30 @@ class AdvancedSystemMonitor:
         
         self.learning_enabled = True
         self.prediction_model = None
+        self.detector = StreamingAnomalyDetector(**(detector_options or {}))
+        self._detector_lock = threading.Lock()
         self.db_path = db_path
         self._db_lock = threading.RLock()
-        self._last_collection_time = 0
-        self._collection_interval = 60  # seconds
+        self.section_ttls = {**self.DEFAULT_SECTION_TTLS, **(section_ttls or {})}
+        self._section_cache: Dict[str, Tuple[int, Any]] = {}
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix='metrics-sampler')
+        
+        # Prime the delta-based CPU counters so the first non-blocking read
+        # measures a real interval instead of returning 0.0
+        try:
+            psutil.cpu_percent(interval=None)
+            psutil.cpu_percent(interval=None, percpu=True)
+            psutil.cpu_times_percent(interval=None)
+        except Exception as e:
+            logger.warning(f"Could not prime CPU counters: {e}")
+        
+        self._writer: Optional[MetricsWriter] = None
         
         # Initialize database and logging
         try:
             self.setup_database()
+            self._writer = MetricsWriter(db_path, **(writer_options or {}))
             logger.info("System monitor initialized successfully")
         except Exception as e:
             logger.critical(f"Failed to initialize system monitor: {e}", exc_info=True)
@@ -181,6 +733,43 @@ class AdvancedSystemMonitor:
                     ON anomalies(resolved)
                 ''')
                 
+                # Normalized numeric series: one row per (series, timestamp).
+                # WITHOUT ROWID clusters points by (series_id, ts), so the
+                # primary key is a covering index for range scans.
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS metric_series (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS metric_points (
+                        series_id INTEGER NOT NULL,
+                        ts REAL NOT NULL,
+                        value REAL NOT NULL,
+                        PRIMARY KEY (series_id, ts)
+                    ) WITHOUT ROWID
+                ''')
+                # Downsampled tiers: one row per (resolution, series, bucket)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS metric_rollups (
+                        resolution INTEGER NOT NULL,
+                        series_id INTEGER NOT NULL,
+                        bucket_ts REAL NOT NULL,
+                        min REAL NOT NULL,
+                        max REAL NOT NULL,
+                        sum REAL NOT NULL,
+                        count INTEGER NOT NULL,
+                        PRIMARY KEY (resolution, series_id, bucket_ts)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS storage_meta (
+                        key TEXT PRIMARY KEY,
+                        value TEXT
+                    )
+                ''')
+                
                 conn.commit()
                 logger.info("Database tables and indexes created/validated")
                 
@@ -188,18 +777,50 @@ class AdvancedSystemMonitor:
             logger.critical(f"Failed to set up database: {e}", exc_info=True)
             raise DatabaseError("Database setup failed") from e
 
-    @lru_cache(maxsize=128, typed=False)
-    @handle_errors(default={})
+    def _cached_section(self, section: str, collect: Callable[[], Any]) -> Any:
+        """Return ``collect()``, reusing the result for the rest of the current tick.
+
+        Ticks are ``section_ttls[section]`` seconds wide on the monotonic
+        clock, so every caller within a tick shares one snapshot and the
+        next tick always samples fresh data.
+        """
+        ttl = self.section_ttls.get(section, 0)
+        if ttl <= 0:
+            return collect()
+        tick = int(time.monotonic() // ttl)
+        with self._cache_lock:
+            cached = self._section_cache.get(section)
+            if cached is not None and cached[0] == tick:
+                return cached[1]
+        value = collect()
+        with self._cache_lock:
+            self._section_cache[section] = (tick, value)
+        return value
+
+    def invalidate_cache(self) -> None:
+        """Force every section to be sampled again on the next call."""
+        with self._cache_lock:
+            self._section_cache.clear()
+
     def _get_cpu_metrics(self) -> Dict[str, Any]:
-        """Get CPU metrics with caching and error handling."""
+        """Get CPU metrics for the current tick."""
+        return self._cached_section('cpu', self._sample_cpu_metrics)
+
+    @handle_errors(default={})
+    def _sample_cpu_metrics(self) -> Dict[str, Any]:
+        """Sample CPU metrics without blocking.
+
+        ``interval=None`` makes psutil report utilisation since the previous
+        call, so each tick measures the delta since the last snapshot.
+        """
         try:
-            cpu_times = psutil.cpu_times_percent(interval=0.1)
+            cpu_times = psutil.cpu_times_percent(interval=None)
             cpu_freq = psutil.cpu_freq()
             cpu_stats = psutil.cpu_stats()
             
             return {
-                'usage_percent': psutil.cpu_percent(interval=0.1),
-                'per_cpu': psutil.cpu_percent(interval=0.1, percpu=True),
+                'usage_percent': psutil.cpu_percent(interval=None),
+                'per_cpu': psutil.cpu_percent(interval=None, percpu=True),
                 'times': cpu_times._asdict(),
                 'freq': cpu_freq._asdict() if cpu_freq else {},
                 'load_avg': psutil.getloadavg() if hasattr(psutil, 'getloadavg') else [0, 0, 0],
@@ -216,10 +837,13 @@ class AdvancedSystemMonitor:
             logger.error(f"Error collecting CPU metrics: {e}", exc_info=True)
             raise
 
-    @lru_cache(maxsize=64, typed=False)
-    @handle_errors(default={})
     def _get_memory_metrics(self) -> Dict[str, Any]:
-        """Get memory metrics with caching and error handling."""
+        """Get memory metrics for the current tick."""
+        return self._cached_section('memory', self._sample_memory_metrics)
+
+    @handle_errors(default={})
+    def _sample_memory_metrics(self) -> Dict[str, Any]:
+        """Sample memory metrics with error handling."""
         try:
             virtual_mem = psutil.virtual_memory()
             swap_mem = psutil.swap_memory()
@@ -252,15 +876,20 @@ class AdvancedSystemMonitor:
             logger.error(f"Error collecting memory metrics: {e}", exc_info=True)
             raise
 
-    @handle_errors(default={})
     def _get_disk_metrics(self) -> Dict[str, Any]:
-        """Get disk metrics with error handling."""
+        """Get disk metrics for the current tick."""
+        return self._cached_section('disk', self._sample_disk_metrics)
+
+    @handle_errors(default={})
+    def _sample_disk_metrics(self) -> Dict[str, Any]:
+        """Sample disk metrics with error handling."""
         disk_metrics = {}
         try:
+            # One I/O counter snapshot per tick, shared by every partition
+            io_counters = psutil.disk_io_counters(perdisk=False)
             for partition in psutil.disk_partitions(all=False):
                 try:
                     usage = psutil.disk_usage(partition.mountpoint)
-                    io_counters = psutil.disk_io_counters(perdisk=False)
                     
                     disk_metrics[partition.device] = {
                         'mountpoint': partition.mountpoint,
@@ -286,9 +915,13 @@ class AdvancedSystemMonitor:
         
         return disk_metrics
 
-    @handle_errors(default={})
     def _get_network_metrics(self) -> Dict[str, Any]:
-        """Get network metrics with error handling."""
+        """Get network metrics for the current tick."""
+        return self._cached_section('network', self._sample_network_metrics)
+
+    @handle_errors(default={})
+    def _sample_network_metrics(self) -> Dict[str, Any]:
+        """Sample network metrics with error handling."""
         try:
             io_counters = psutil.net_io_counters()
             connections = psutil.net_connections(kind='inet')
@@ -316,24 +949,26 @@ class AdvancedSystemMonitor:
             logger.error(f"Error collecting network metrics: {e}", exc_info=True)
             raise
 
-    @handle_errors(default=[])
     def _get_process_metrics(self) -> List[Dict[str, Any]]:
-        """Get process metrics with error handling and caching."""
+        """Get process metrics for the current tick."""
+        return self._cached_section('processes', self._sample_process_metrics)
+
+    @handle_errors(default=[])
+    def _sample_process_metrics(self) -> List[Dict[str, Any]]:
+        """Sample process metrics with error handling.
+
+        ``process_iter`` fetches the requested attributes in one pass per
+        process and reuses Process objects between calls, so ``cpu_percent``
+        is a delta since the previous tick rather than a blocking sample.
+        """
         try:
             processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent', 'status']):
+            attrs = ['pid', 'name', 'username', 'cpu_percent', 'memory_percent',
+                     'status', 'create_time', 'cmdline']
+            for proc in psutil.process_iter(attrs):
                 try:
-                    with proc.oneshot():  # Minimize system calls
-                        processes.append({
-                            'pid': proc.pid,
-                            'name': proc.name(),
-                            'username': proc.username(),
-                            'cpu_percent': proc.cpu_percent(),
-                            'memory_percent': proc.memory_percent(),
-                            'status': proc.status(),
-                            'create_time': proc.create_time(),
-                            'cmdline': proc.cmdline()
-                        })
+                    info = proc.info
+                    processes.append({key: info.get(key) for key in attrs})
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     continue
                 except Exception as e:
@@ -352,27 +987,21 @@ class AdvancedSystemMonitor:
             Dict containing all collected metrics
         """
         try:
-            # Clear cache if it's time for a fresh collection
-            current_time = time.time()
-            if current_time - getattr(self, '_last_collection_time', 0) > self._collection_interval:
-                self._get_cpu_metrics.cache_clear()
-                self._get_memory_metrics.cache_clear()
-                self._last_collection_time = current_time
+            # Gather every section concurrently on the long-lived sampler pool;
+            # sections still fresh for this tick return their cached snapshot
+            executor = self._executor
+            cpu_future = executor.submit(self._get_cpu_metrics)
+            mem_future = executor.submit(self._get_memory_metrics)
+            disk_future = executor.submit(self._get_disk_metrics)
+            net_future = executor.submit(self._get_network_metrics)
+            proc_future = executor.submit(self._get_process_metrics)
             
-            # Collect all metrics in parallel
-            with ThreadPoolExecutor() as executor:
-                cpu_future = executor.submit(self._get_cpu_metrics)
-                mem_future = executor.submit(self._get_memory_metrics)
-                disk_future = executor.submit(self._get_disk_metrics)
-                net_future = executor.submit(self._get_network_metrics)
-                proc_future = executor.submit(self._get_process_metrics)
-                
-                # Get results with timeout
-                cpu_metrics = cpu_future.result(timeout=5)
-                memory_metrics = mem_future.result(timeout=5)
-                disk_metrics = disk_future.result(timeout=10)
-                network_metrics = net_future.result(timeout=5)
-                processes = proc_future.result(timeout=15)
+            # Get results with timeout
+            cpu_metrics = cpu_future.result(timeout=5)
+            memory_metrics = mem_future.result(timeout=5)
+            disk_metrics = disk_future.result(timeout=10)
+            network_metrics = net_future.result(timeout=5)
+            processes = proc_future.result(timeout=15)
             
             # Process top consumers
             top_cpu = sorted(processes, key=lambda x: x.get('cpu_percent', 0) or 0, reverse=True)[:10]
@@ -420,30 +1049,28 @@ class AdvancedSystemMonitor:
         try:
             history = self.metrics_history.get(metric_type, [])
             if len(history) < 10:
+                # After a restart the in-memory history is empty; the
+                # normalized table can still answer with a SQL regression
+                series = self.TREND_SERIES.get(metric_type)
+                if series and self.storage_mode != 'json':
+                    return self.calculate_series_trend(series)
                 logger.debug(f"Insufficient data points for {metric_type} trend analysis")
                 return 'insufficient_data'
 
-            # Get recent values (last 10 data points)
-            recent_values = list(history)[-10:]
-            
-            # Simple linear regression to determine trend
-            x = np.arange(len(recent_values))
-            y = np.array([v.get('value', 0) for v in recent_values if v])
+            # Last 10 values, read from the right end of the deque without
+            # copying the whole history
+            y = np.fromiter(
+                (v.get('value', 0) for v in islice(reversed(history), 10) if v),
+                dtype=np.float64
+            )[::-1]
             
             if len(y) < 2:
                 return 'insufficient_data'
-                
-            # Calculate slope
-            z = np.polyfit(x[-len(y):], y, 1)
-            slope = z[0]
             
-            # Determine trend based on slope
-            if abs(slope) < 0.1:  # Threshold for considering a trend significant
-                return 'stable'
-            elif slope > 0:
-                return 'increasing'
-            else:
-                return 'decreasing'
+            # Closed-form least-squares slope over x = 0..n-1
+            x = np.arange(len(y), dtype=np.float64)
+            x -= x.mean()
+            return _classify_slope(float(x @ (y - y.mean()) / (x @ x)))
                 
         except Exception as e:
             logger.error(f"Error calculating {metric_type} trend: {e}", exc_info=True)
@@ -520,38 +1147,400 @@ class AdvancedSystemMonitor:
         timestamp = metrics.get('timestamp', datetime.utcnow().isoformat())
         
         try:
-            with self._get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Prepare batch insert for metrics
-                metrics_batch = []
-                
-                # Flatten metrics for storage
-                for metric_type, value in metrics.items():
-                    if metric_type == 'timestamp':
-                        continue
-                        
-                    if isinstance(value, dict):
-                        # For complex metrics, store as JSON
-                        metrics_batch.append((timestamp, metric_type, 0, json.dumps(value)))
-                    elif isinstance(value, (int, float)):
-                        # For simple metrics, store as numeric value
-                        metrics_batch.append((timestamp, metric_type, float(value), None))
-                
-                # Batch insert
-                if metrics_batch:
-                    cursor.executemany("""
-                        INSERT INTO metrics (timestamp, metric_type, value, metadata)
-                        VALUES (?, ?, ?, ?)
-                    """, metrics_batch)
+            if self.storage_mode != 'json':
+                self._store_points(timestamp, metrics)
+            self._maybe_schedule_rollup()
+            if self.storage_mode == 'normalized':
+                return
+            
+            # Prepare batch insert for metrics
+            metrics_batch = []
+            
+            # Flatten metrics for storage
+            for metric_type, value in metrics.items():
+                if metric_type == 'timestamp':
+                    continue
                     
-                    conn.commit()
-                    logger.debug(f"Stored {len(metrics_batch)} metrics in database")
+                if isinstance(value, dict):
+                    # For complex metrics, store as JSON
+                    metrics_batch.append((timestamp, metric_type, 0, json.dumps(value)))
+                elif isinstance(value, (int, float)):
+                    # For simple metrics, store as numeric value
+                    metrics_batch.append((timestamp, metric_type, float(value), None))
+            
+            # Hand the rows to the write-behind sink; commit happens off-thread
+            if metrics_batch:
+                self._writer.submit(self.INSERT_METRIC_SQL, metrics_batch)
+                logger.debug(f"Queued {len(metrics_batch)} metrics for storage")
                     
         except Exception as e:
             logger.error(f"Error storing metrics in database: {e}", exc_info=True)
             raise DatabaseError("Failed to store metrics") from e
 
+    def _store_points(self, timestamp: Any, metrics: Dict[str, Any]) -> None:
+        """Queue one typed (series_id, ts, value) row per numeric leaf."""
+        ts = _to_epoch(timestamp)
+        flat = flatten_metrics({k: v for k, v in metrics.items() if k != 'timestamp'})
+        if not flat:
+            return
+        series_ids = self._resolve_series_ids(flat.keys())
+        self._writer.submit(
+            self.INSERT_POINT_SQL,
+            [(series_ids[name], ts, value) for name, value in flat.items()]
+        )
+
+    def _resolve_series_ids(self, names) -> Dict[str, int]:
+        """Map series names to ids, registering unseen names once."""
+        missing = [name for name in names if name not in self._series_ids]
+        if missing:
+            with self._get_db_connection() as conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO metric_series (name) VALUES (?)',
+                    [(name,) for name in missing]
+                )
+                conn.commit()
+                placeholders = ','.join('?' * len(missing))
+                for row in conn.execute(
+                    f'SELECT id, name FROM metric_series WHERE name IN ({placeholders})', missing
+                ):
+                    self._series_ids[row['name']] = row['id']
+        return self._series_ids
+
+    def list_series(self, prefix: str = '') -> List[str]:
+        """List stored series names, optionally restricted to a prefix."""
+        with self._get_db_connection() as conn:
+            rows = conn.execute(
+                "SELECT name FROM metric_series WHERE name >= ? AND name < ? ORDER BY name",
+                (prefix, prefix + '\uffff')
+            ).fetchall()
+        return [row['name'] for row in rows]
+
+    def query_series(self, name: str, start: Any = None, end: Any = None,
+                     limit: Optional[int] = None) -> List[Tuple[float, float]]:
+        """Get ``(ts, value)`` points of a series within ``[start, end]``.
+
+        Args:
+            name: Flattened series name, e.g. ``'cpu.usage_percent'``.
+            start: Lower bound as ISO string, datetime or epoch seconds.
+            end: Upper bound as ISO string, datetime or epoch seconds.
+            limit: Maximum number of points, oldest first.
+        """
+        sql = (
+            'SELECT p.ts, p.value FROM metric_points p '
+            'JOIN metric_series s ON s.id = p.series_id '
+            'WHERE s.name = ? AND p.ts >= ? AND p.ts <= ? ORDER BY p.ts'
+        )
+        params: List[Any] = [
+            name,
+            _to_epoch(start) if start is not None else float('-inf'),
+            _to_epoch(end) if end is not None else float('inf'),
+        ]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._get_db_connection() as conn:
+            return [(row[0], row[1]) for row in conn.execute(sql, params)]
+
+    def aggregate_series(self, name: str, start: Any = None, end: Any = None) -> Dict[str, Any]:
+        """Get count/min/max/avg of a series within ``[start, end]`` using SQL aggregates."""
+        with self._get_db_connection() as conn:
+            row = conn.execute(
+                'SELECT COUNT(p.value), MIN(p.value), MAX(p.value), AVG(p.value) '
+                'FROM metric_points p JOIN metric_series s ON s.id = p.series_id '
+                'WHERE s.name = ? AND p.ts >= ? AND p.ts <= ?',
+                (
+                    name,
+                    _to_epoch(start) if start is not None else float('-inf'),
+                    _to_epoch(end) if end is not None else float('inf'),
+                )
+            ).fetchone()
+        return {'count': row[0], 'min': row[1], 'max': row[2], 'avg': row[3]}
+
+    def calculate_series_trend(self, name: str, points: int = 10) -> str:
+        """Classify the trend of the last ``points`` samples of a series in SQL.
+
+        The least-squares slope is computed over the sample index, matching
+        the in-memory ``calculate_trend`` regression.
+        """
+        with self._get_db_connection() as conn:
+            row = conn.execute(
+                '''
+                WITH recent AS (
+                    SELECT p.value AS y, ROW_NUMBER() OVER (ORDER BY p.ts) - 1 AS x
+                    FROM (
+                        SELECT ts, value FROM metric_points
+                        WHERE series_id = (SELECT id FROM metric_series WHERE name = ?)
+                        ORDER BY ts DESC LIMIT ?
+                    ) p
+                )
+                SELECT COUNT(*), SUM(x), SUM(y), SUM(x * y), SUM(x * x) FROM recent
+                ''',
+                (name, points)
+            ).fetchone()
+        n, sum_x, sum_y, sum_xy, sum_xx = row
+        if n < 2 or n < points:
+            return 'insufficient_data'
+        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x)
+        return _classify_slope(slope)
+
+    def _maybe_schedule_rollup(self) -> None:
+        """Queue a rollup/retention pass on the writer once per ``rollup_interval``."""
+        now = time.monotonic()
+        if now - self._last_rollup >= self.rollup_interval:
+            self._last_rollup = now
+            self._writer.submit_task(lambda conn: self._rollup(conn, time.time()))
+
+    def run_rollups(self, now: Optional[float] = None) -> None:
+        """Roll up complete buckets and apply retention, waiting for completion."""
+        now = time.time() if now is None else now
+        self._writer.submit_task(lambda conn: self._rollup(conn, now))
+        self._writer.flush()
+
+    def _rollup(self, conn: sqlite3.Connection, now: float) -> None:
+        """Aggregate every tier up to its last complete bucket, then prune.
+
+        Each tier is built from the next finer one (raw -> 1m -> 1h) and a
+        per-tier watermark in ``storage_meta`` ensures buckets are built once.
+        Buckets close ``grace`` seconds late so write-behind rows land first.
+        The raw retention also applies to the legacy ``metrics`` table, which
+        is written in every mode but ``'normalized'``.
+        """
+        grace = 5.0
+        source = 0
+        for resolution in self.ROLLUP_TIERS:
+            key = f'rollup_watermark_{resolution}'
+            row = conn.execute('SELECT value FROM storage_meta WHERE key = ?', (key,)).fetchone()
+            start = float(row[0]) if row else 0.0
+            end = ((now - grace) // resolution) * resolution
+            if end > start:
+                if source == 0:
+                    conn.execute(
+                        '''
+                        INSERT OR REPLACE INTO metric_rollups
+                            (resolution, series_id, bucket_ts, min, max, sum, count)
+                        SELECT ?, series_id, CAST(ts / ? AS INTEGER) * ?,
+                               MIN(value), MAX(value), SUM(value), COUNT(*)
+                        FROM metric_points
+                        WHERE ts >= ? AND ts < ?
+                        GROUP BY series_id, CAST(ts / ? AS INTEGER)
+                        ''',
+                        (resolution, resolution, resolution, start, end, resolution)
+                    )
+                else:
+                    conn.execute(
+                        '''
+                        INSERT OR REPLACE INTO metric_rollups
+                            (resolution, series_id, bucket_ts, min, max, sum, count)
+                        SELECT ?, series_id, CAST(bucket_ts / ? AS INTEGER) * ?,
+                               MIN(min), MAX(max), SUM(sum), SUM(count)
+                        FROM metric_rollups
+                        WHERE resolution = ? AND bucket_ts >= ? AND bucket_ts < ?
+                        GROUP BY series_id, CAST(bucket_ts / ? AS INTEGER)
+                        ''',
+                        (resolution, resolution, resolution, source, start, end, resolution)
+                    )
+                conn.execute(
+                    'INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)',
+                    (key, repr(end))
+                )
+            source = resolution
+        
+        # Retention per tier
+        raw_cutoff = now - self.retention[0]
+        conn.execute('DELETE FROM metric_points WHERE ts < ?', (raw_cutoff,))
+        # Legacy rows hold ISO-8601 UTC strings or epoch numbers
+        conn.execute(
+            '''
+            DELETE FROM metrics
+            WHERE (typeof(timestamp) = 'text' AND timestamp < ?)
+               OR (typeof(timestamp) IN ('integer', 'real') AND timestamp < ?)
+            ''',
+            (datetime.fromtimestamp(raw_cutoff, timezone.utc).replace(tzinfo=None).isoformat(), raw_cutoff)
+        )
+        for resolution in self.ROLLUP_TIERS:
+            conn.execute(
+                'DELETE FROM metric_rollups WHERE resolution = ? AND bucket_ts < ?',
+                (resolution, now - self.retention[resolution])
+            )
+
+    def select_tier(self, start: float, end: float, resolution: Optional[float] = None,
+                    now: Optional[float] = None) -> int:
+        """Pick the coarsest tier that still satisfies range and resolution.
+
+        Args:
+            start: Range start (epoch seconds).
+            end: Range end (epoch seconds).
+            resolution: Coarsest acceptable bucket width in seconds; ``None``
+                selects the finest retained tier.
+            now: Reference time for retention horizons.
+
+        Returns:
+            Tier resolution in seconds (``0`` for raw points).
+        """
+        now = time.time() if now is None else now
+        tiers = (0,) + self.ROLLUP_TIERS
+        retained = [tier for tier in tiers if now - self.retention[tier] <= start]
+        if not retained:
+            # Nothing covers the whole range; the longest-lived tier is closest
+            return tiers[-1]
+        if resolution is None:
+            return min(retained)
+        fine_enough = [tier for tier in retained if tier <= resolution]
+        return max(fine_enough) if fine_enough else min(retained)
+
+    def query_series_range(self, name: str, start: Any, end: Any = None,
+                           resolution: Optional[float] = None,
+                           max_points: Optional[int] = 500) -> Dict[str, Any]:
+        """Get a series over a range from the coarsest adequate storage tier.
+
+        Args:
+            name: Flattened series name.
+            start: Range start as ISO string, datetime or epoch seconds.
+            end: Range end; defaults to now.
+            resolution: Coarsest acceptable bucket width in seconds.
+            max_points: Used when ``resolution`` is not given: the range is
+                split into roughly this many buckets.
+
+        Rollup tiers only contain closed buckets, so the newest partial
+        bucket is missing from coarse results.
+
+        Returns:
+            ``{'resolution': tier, 'points': [{'ts', 'min', 'max', 'avg', 'count'}, ...]}``
+        """
+        start_ts = _to_epoch(start)
+        end_ts = _to_epoch(end) if end is not None else time.time()
+        if resolution is None and max_points:
+            resolution = (end_ts - start_ts) / max_points
+        tier = self.select_tier(start_ts, end_ts, resolution)
+        
+        with self._get_db_connection() as conn:
+            if tier == 0:
+                rows = conn.execute(
+                    'SELECT p.ts, p.value, p.value, p.value, 1 FROM metric_points p '
+                    'JOIN metric_series s ON s.id = p.series_id '
+                    'WHERE s.name = ? AND p.ts >= ? AND p.ts <= ? ORDER BY p.ts',
+                    (name, start_ts, end_ts)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    'SELECT r.bucket_ts, r.min, r.max, r.sum / r.count, r.count '
+                    'FROM metric_rollups r JOIN metric_series s ON s.id = r.series_id '
+                    'WHERE r.resolution = ? AND s.name = ? AND r.bucket_ts >= ? AND r.bucket_ts <= ? '
+                    'ORDER BY r.bucket_ts',
+                    (tier, name, start_ts - tier, end_ts)
+                ).fetchall()
+        
+        return {
+            'resolution': tier,
+            'points': [
+                {'ts': row[0], 'min': row[1], 'max': row[2], 'avg': row[3], 'count': row[4]}
+                for row in rows
+            ]
+        }
+
+    def migrate_legacy_metrics(self, batch_size: int = 1000, delete_legacy: bool = False) -> int:
+        """Copy JSON rows of the legacy ``metrics`` table into typed series.
+
+        Progress is recorded in ``storage_meta`` so the migration can be
+        interrupted and resumed; rows already migrated are skipped.
+
+        Args:
+            batch_size: Legacy rows converted per transaction.
+            delete_legacy: Delete legacy rows once they are migrated.
+
+        Returns:
+            Number of points written.
+        """
+        written = 0
+        with self._get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM storage_meta WHERE key = 'legacy_migrated_id'"
+            ).fetchone()
+            last_id = int(row['value']) if row else 0
+            
+            while True:
+                rows = conn.execute(
+                    'SELECT id, timestamp, metric_type, value, metadata FROM metrics '
+                    'WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                
+                points: List[Tuple[str, float, float]] = []
+                for legacy in rows:
+                    try:
+                        ts = _to_epoch(legacy['timestamp'])
+                    except ValueError:
+                        logger.warning(f"Skipping legacy metric {legacy['id']} with bad timestamp")
+                        continue
+                    if legacy['metadata']:
+                        try:
+                            payload = json.loads(legacy['metadata'])
+                        except ValueError:
+                            continue
+                        flat = flatten_metrics(payload, legacy['metric_type'])
+                    else:
+                        flat = {legacy['metric_type']: float(legacy['value'])}
+                    points.extend((name, ts, value) for name, value in flat.items())
+                
+                series_ids = self._resolve_series_ids({name for name, _, _ in points})
+                last_id = rows[-1]['id']
+                conn.executemany(
+                    self.INSERT_POINT_SQL,
+                    [(series_ids[name], ts, value) for name, ts, value in points]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO storage_meta (key, value) VALUES ('legacy_migrated_id', ?)",
+                    (str(last_id),)
+                )
+                if delete_legacy:
+                    conn.execute('DELETE FROM metrics WHERE id <= ?', (last_id,))
+                conn.commit()
+                written += len(points)
+        
+        logger.info(f"Migrated {written} legacy metric points to normalized storage")
+        return written
+
+    def _anomaly_series(self, metrics: Dict[str, Any]) -> Dict[str, float]:
+        """Select the gauge-style series the streaming detector should score."""
+        flat = flatten_metrics({
+            key: metrics[key] for key in ('cpu', 'memory', 'disk') if key in metrics
+        })
+        return {
+            name: value for name, value in flat.items()
+            if name.endswith(self.ANOMALY_SERIES_SUFFIXES)
+        }
+
+    def _detect_statistical_anomalies(self, timestamp: Any, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run one detector tick and convert flagged series to anomaly records."""
+        values = self._anomaly_series(metrics)
+        if not values:
+            return []
+        try:
+            ts = _to_epoch(timestamp)
+        except ValueError:
+            ts = time.time()
+        with self._detector_lock:
+            flagged = self.detector.update(values, ts)
+        
+        threshold = self.detector.threshold
+        return [
+            {
+                'timestamp': timestamp,
+                'anomaly_type': 'statistical_anomaly',
+                'severity': 'critical' if item['score'] >= 2 * threshold else 'warning',
+                'details': (
+                    f"{item['series']} is {item['value']:.2f} (baseline {item['baseline']:.2f}, "
+                    f"z={item['z_ewma']:.1f}, robust z={item['z_robust']:.1f}, "
+                    f"seasonal z={item['z_seasonal']:.1f})"
+                ),
+                'series': item['series'],
+                'score': item['score'],
+            }
+            for item in flagged
+        ]
+
     @handle_errors()
     def detect_anomalies(self, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -563,10 +1552,18 @@ class AdvancedSystemMonitor:
         Returns:
             List of detected anomalies
         """
+        if not metrics:
+            return []
+        
         anomalies = []
         timestamp = metrics.get('timestamp', datetime.utcnow().isoformat())
         
         try:
+            # Statistical anomalies: deviations from learned baselines that
+            # may never cross the static thresholds below
+            if self.learning_enabled:
+                anomalies.extend(self._detect_statistical_anomalies(timestamp, metrics))
+            
             # CPU anomaly detection
             cpu_usage = metrics.get('cpu', {}).get('usage_percent', 0)
             if cpu_usage > self.anomaly_thresholds['cpu_usage']:
@@ -609,21 +1606,15 @@ class AdvancedSystemMonitor:
             
             # Store anomalies in database
             if anomalies:
-                with self._get_db_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.executemany("""
-                        INSERT INTO anomalies (timestamp, anomaly_type, severity, details)
-                        VALUES (?, ?, ?, ?)
-                    """, [
-                        (
-                            anom['timestamp'],
-                            anom['anomaly_type'],
-                            anom['severity'],
-                            anom['details']
-                        )
-                        for anom in anomalies
-                    ])
-                    conn.commit()
+                self._writer.submit(self.INSERT_ANOMALY_SQL, [
+                    (
+                        anom['timestamp'],
+                        anom['anomaly_type'],
+                        anom['severity'],
+                        anom['details']
+                    )
+                    for anom in anomalies
+                ])
                 
                 logger.warning(f"Detected {len(anomalies)} anomalies")
             
@@ -633,19 +1624,31 @@ class AdvancedSystemMonitor:
             logger.error(f"Error detecting anomalies: {e}", exc_info=True)
             raise
     
+    def flush_writes(self, timeout: Optional[float] = 10.0) -> bool:
+        """Block until every queued metric and anomaly row is committed."""
+        return self._writer.flush(timeout) if self._writer else True
+
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """Get queue depth, drop and commit latency counters of the metrics writer."""
+        return self._writer.get_stats() if self._writer else {}
+
     def cleanup(self) -> None:
         """Clean up resources and ensure proper shutdown."""
         try:
-            # Clear any cached data
-            self._get_cpu_metrics.cache_clear()
-            self._get_memory_metrics.cache_clear()
+            # Clear any cached data and stop the sampler pool
+            if hasattr(self, '_section_cache'):
+                self.invalidate_cache()
+            executor = getattr(self, '_executor', None)
+            if executor is not None:
+                executor.shutdown(wait=False)
             
-            # Close database connection if it exists
-            if hasattr(self, '_db_conn') and self._db_conn:
+            # Drain the write-behind queue and close its connection
+            writer = getattr(self, '_writer', None)
+            if writer is not None:
                 try:
-                    self._db_conn.close()
+                    writer.close()
                 except Exception as e:
-                    logger.error(f"Error closing database connection: {e}")
+                    logger.error(f"Error closing metrics writer: {e}")
             
             logger.info("System monitor shutdown complete")
             
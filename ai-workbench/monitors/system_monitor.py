@@ -0,0 +1,18 @@
+"""
+Importable name for ``system-monitor.py``.
+
+Hyphens are not valid in module names, so this loads the monitor from its
+file and registers it as ``monitors.system_monitor``. Patching attributes of
+this module patches the monitor itself.
+"""
+
+import importlib.util
+import os
+import sys
+
+_spec = importlib.util.spec_from_file_location(
+    __name__, os.path.join(os.path.dirname(__file__), 'system-monitor.py')
+)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
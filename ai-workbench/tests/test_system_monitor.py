@@ -7,20 +7,33 @@ including metric collection, anomaly detection, and database operations.
 
 import unittest
 import time
+import threading
 import json
 import logging
 import sqlite3
 import tempfile
 import os
-from datetime import datetime, timedelta
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, MagicMock, ANY
 
+import numpy as np
+import psutil
+
 # Add parent directory to path to allow importing the module
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from monitors.system_monitor import AdvancedSystemMonitor, SystemMetrics, SystemMonitorError
+from monitors.system_monitor import (
+    AdvancedSystemMonitor, MetricsWriter, StreamingAnomalyDetector, SystemMetrics,
+    SystemMonitorError, flatten_metrics
+)
+
+def as_tuple(values):
+    """Build a psutil-style named tuple (attributes and _asdict) from a dict."""
+    return namedtuple('psutil_result', values)(**values)
+
 
 class TestSystemMonitor(unittest.TestCase):
     """Test cases for the AdvancedSystemMonitor class."""
@@ -34,6 +47,10 @@ class TestSystemMonitor(unittest.TestCase):
         # Patch psutil functions for consistent testing
         self.psutil_patcher = patch('monitors.system_monitor.psutil')
         self.mock_psutil = self.psutil_patcher.start()
+        # Keep the real exception classes so ``except psutil.X`` still works
+        self.mock_psutil.NoSuchProcess = psutil.NoSuchProcess
+        self.mock_psutil.AccessDenied = psutil.AccessDenied
+        self.mock_psutil.ZombieProcess = psutil.ZombieProcess
         
         # Set up mock return values for psutil functions
         self.setup_psutil_mocks()
@@ -57,17 +74,13 @@ class TestSystemMonitor(unittest.TestCase):
     def setup_psutil_mocks(self):
         """Set up mock return values for psutil functions."""
         # Mock CPU metrics
-        cpu_times = MagicMock()
-        cpu_times._asdict.return_value = {'user': 10.5, 'system': 5.2, 'idle': 84.3}
+        cpu_times = as_tuple({'user': 10.5, 'system': 5.2, 'idle': 84.3})
         self.mock_psutil.cpu_times_percent.return_value = cpu_times
         
-        cpu_freq = MagicMock()
-        cpu_freq._asdict.return_value = {'current': 2400.0, 'min': 800.0, 'max': 3200.0}
+        cpu_freq = as_tuple({'current': 2400.0, 'min': 800.0, 'max': 3200.0})
         self.mock_psutil.cpu_freq.return_value = cpu_freq
         
-        cpu_stats = MagicMock()
-        cpu_stats.ctx_switches = 1000
-        cpu_stats.interrupts = 500
+        cpu_stats = as_tuple({'ctx_switches': 1000, 'interrupts': 500, 'soft_interrupts': 0, 'syscalls': 0})
         self.mock_psutil.cpu_stats.return_value = cpu_stats
         
         self.mock_psutil.cpu_percent.side_effect = [25.5, [25.5, 30.1, 20.8, 26.2]]
@@ -75,8 +88,7 @@ class TestSystemMonitor(unittest.TestCase):
         self.mock_psutil.getloadavg.return_value = (1.5, 1.2, 1.0)
         
         # Mock memory metrics
-        vmem = MagicMock()
-        vmem._asdict.return_value = {
+        vmem = as_tuple({
             'total': 16 * 1024**3,  # 16 GB
             'available': 8 * 1024**3,  # 8 GB
             'percent': 50.0,
@@ -88,18 +100,17 @@ class TestSystemMonitor(unittest.TestCase):
             'cached': 3 * 1024**3,
             'shared': 1 * 1024**3,
             'slab': 1 * 1024**3
-        }
+        })
         self.mock_psutil.virtual_memory.return_value = vmem
         
-        swap = MagicMock()
-        swap._asdict.return_value = {
+        swap = as_tuple({
             'total': 8 * 1024**3,  # 8 GB
             'used': 2 * 1024**3,   # 2 GB
             'free': 6 * 1024**3,   # 6 GB
             'percent': 25.0,
             'sin': 0,
             'sout': 0
-        }
+        })
         self.mock_psutil.swap_memory.return_value = swap
         
         # Mock disk metrics
@@ -110,29 +121,26 @@ class TestSystemMonitor(unittest.TestCase):
         partition.opts = 'rw,relatime'
         self.mock_psutil.disk_partitions.return_value = [partition]
         
-        usage = MagicMock()
-        usage._asdict.return_value = {
+        usage = as_tuple({
             'total': 500 * 1024**3,  # 500 GB
             'used': 250 * 1024**3,   # 250 GB
             'free': 250 * 1024**3,   # 250 GB
             'percent': 50.0
-        }
+        })
         self.mock_psutil.disk_usage.return_value = usage
         
-        disk_io = MagicMock()
-        disk_io._asdict.return_value = {
+        disk_io = as_tuple({
             'read_count': 1000,
             'write_count': 500,
             'read_bytes': 1024**3,  # 1 GB
             'write_bytes': 512 * 1024**2,  # 512 MB
             'read_time': 1000,
             'write_time': 500
-        }
+        })
         self.mock_psutil.disk_io_counters.return_value = disk_io
         
         # Mock network metrics
-        net_io = MagicMock()
-        net_io._asdict.return_value = {
+        net_io = as_tuple({
             'bytes_sent': 1024**3,  # 1 GB
             'bytes_recv': 2 * 1024**3,  # 2 GB
             'packets_sent': 1000000,
@@ -141,8 +149,10 @@ class TestSystemMonitor(unittest.TestCase):
             'errout': 0,
             'dropin': 0,
             'dropout': 0
-        }
-        self.mock_psutil.net_io_counters.return_value = net_io
+        })
+        self.mock_psutil.net_io_counters.side_effect = (
+            lambda pernic=False: {'eth0': net_io} if pernic else net_io
+        )
         
         # Mock process metrics
         process = MagicMock()
@@ -175,8 +185,8 @@ class TestSystemMonitor(unittest.TestCase):
         
         # Mock network interfaces
         self.mock_psutil.net_if_addrs.return_value = {
-            'lo': [MagicMock(address='127.0.0.1', netmask='255.0.0.0')],
-            'eth0': [MagicMock(address='192.168.1.100', netmask='255.255.255.0')]
+            'lo': [as_tuple({'family': 2, 'address': '127.0.0.1', 'netmask': '255.0.0.0'})],
+            'eth0': [as_tuple({'family': 2, 'address': '192.168.1.100', 'netmask': '255.255.255.0'})]
         }
 
     def test_initialization(self):
@@ -201,6 +211,23 @@ class TestSystemMonitor(unittest.TestCase):
         self.mock_psutil.cpu_stats.assert_called()
         self.mock_psutil.getloadavg.assert_called()
 
+    def test_cpu_metrics_are_non_blocking_and_cached_per_tick(self):
+        """Test CPU sampling uses delta snapshots and is reused within a tick."""
+        self.monitor.section_ttls['cpu'] = 60.0
+        first = self.monitor._get_cpu_metrics()
+        second = self.monitor._get_cpu_metrics()
+        
+        self.assertIs(first, second)
+        self.assertEqual(self.mock_psutil.cpu_stats.call_count, 1)
+        self.mock_psutil.cpu_percent.assert_any_call(interval=None)
+        self.mock_psutil.cpu_times_percent.assert_called_with(interval=None)
+        
+        # A zero TTL disables caching entirely
+        self.monitor.section_ttls['memory'] = 0
+        self.monitor._get_memory_metrics()
+        self.monitor._get_memory_metrics()
+        self.assertEqual(self.mock_psutil.virtual_memory.call_count, 2)
+
     def test_collect_memory_metrics(self):
         """Test collection of memory metrics."""
         metrics = self.monitor._get_memory_metrics()
@@ -284,11 +311,70 @@ class TestSystemMonitor(unittest.TestCase):
         anomalies = self.monitor.detect_anomalies(metrics)
         self.assertTrue(any(a['anomaly_type'] == 'high_memory_usage' for a in anomalies))
 
+    def test_statistical_anomaly_detection(self):
+        """Test learned-baseline anomalies below the static thresholds."""
+        base = 1_700_000_000
+        for i in range(60):
+            anomalies = self.monitor.detect_anomalies({
+                'timestamp': base + i * 60,
+                'cpu': {'usage_percent': 30.0 + (i % 5)},
+            })
+            self.assertEqual(anomalies, [])
+        
+        anomalies = self.monitor.detect_anomalies({
+            'timestamp': base + 3600,
+            'cpu': {'usage_percent': 60.0},
+        })
+        self.assertEqual([a['anomaly_type'] for a in anomalies], ['statistical_anomaly'])
+        self.assertEqual(anomalies[0]['series'], 'cpu.usage_percent')
+        self.assertEqual(anomalies[0]['severity'], 'critical')
+        
+        self.monitor.flush_writes()
+        with sqlite3.connect(self.db_path) as conn:
+            stored = conn.execute("SELECT anomaly_type FROM anomalies").fetchall()
+        self.assertEqual(stored, [('statistical_anomaly',)])
+
+    def test_streaming_detector_vectorizes_series(self):
+        """Test the detector scores many series per tick and grows on demand."""
+        detector = StreamingAnomalyDetector(warmup=5, window=10)
+        for i in range(40):
+            values = {f'series.{j}': 10.0 + (i + j) % 3 for j in range(20)}
+            self.assertEqual(detector.update(values, i), [])
+        
+        values['series.7'] = 100.0
+        flagged = detector.update(values, 40)
+        self.assertEqual([item['series'] for item in flagged], ['series.7'])
+        self.assertEqual(len(detector.series), 20)
+
+    def test_streaming_detector_missing_series_keep_fast_median(self):
+        """Test that missing samples do not push full series onto the NaN-aware median."""
+        detector = StreamingAnomalyDetector(warmup=5, window=10)
+        for i in range(20):
+            values = {f'series.{j}': 10.0 + (i + j) % 3 for j in range(5)}
+            values['gappy'] = 1.0
+            detector.update(values, i)
+        
+        with patch.object(np, 'nanmedian', wraps=np.nanmedian) as nanmedian:
+            for i in range(20, 40):
+                values = {f'series.{j}': 10.0 + (i + j) % 3 for j in range(5)}
+                if i % 2:
+                    values['gappy'] = 1.0
+                detector.update(values, i)
+            # A new series only pads its own column
+            values['young'] = 1.0
+            values['series.3'] = 100.0
+            flagged = detector.update(values, 40)
+        
+        self.assertEqual([item['series'] for item in flagged], ['series.3'])
+        self.assertEqual(nanmedian.call_count, 2)
+        self.assertEqual([call.args[0].shape[1] for call in nanmedian.call_args_list], [1, 1])
+
     def test_metrics_storage(self):
         """Test that metrics are properly stored in the database."""
         # Collect and store metrics
         metrics = self.monitor.collect_comprehensive_metrics()
         self.monitor.store_metrics_db(metrics)
+        self.assertTrue(self.monitor.flush_writes())
         
         # Verify data was stored in the database
         with sqlite3.connect(self.db_path) as conn:
@@ -342,6 +428,205 @@ class TestSystemMonitor(unittest.TestCase):
         anomalies = self.monitor.detect_anomalies(None)
         self.assertEqual(anomalies, [])
 
+    def test_write_behind_batches_rows(self):
+        """Test that queued rows are committed in batches by the writer thread."""
+        for i in range(50):
+            self.monitor.store_metrics_db({'timestamp': f'2024-01-01T00:00:{i:02d}', 'load': float(i)})
+        self.assertTrue(self.monitor.flush_writes())
+        
+        stats = self.monitor.get_writer_stats()
+        self.assertEqual(stats['rows_written'], 50)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertLess(stats['batches'], 50)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM metrics WHERE metric_type = 'load'").fetchone()[0]
+        self.assertEqual(count, 50)
+
+    def test_writer_drops_when_queue_full(self):
+        """Test that a full queue drops rows instead of blocking collection."""
+        writer = MetricsWriter(self.db_path, max_queue=1, flush_interval=60.0)
+        try:
+            sql = AdvancedSystemMonitor.INSERT_METRIC_SQL
+            rows = [('2024-01-01T00:00:00', 'load', 1.0, None)]
+            # Fill the queue faster than the writer can drain it
+            results = [writer.submit(sql, rows) for _ in range(1000)]
+            self.assertIn(False, results)
+            self.assertGreater(writer.get_stats()['dropped'], 0)
+        finally:
+            writer.close()
+
+    def test_writer_calls_do_not_block_on_stuck_writer(self):
+        """Test that task, flush and close give up when the writer cannot take them."""
+        writer = MetricsWriter(self.db_path, max_queue=1, put_timeout=0.05)
+        release = threading.Event()
+        started = threading.Event()
+        try:
+            self.assertTrue(writer.submit_task(lambda conn: (started.set(), release.wait(5.0))))
+            self.assertTrue(started.wait(5.0))
+            # The writer is busy and its one queue slot is taken
+            self.assertTrue(writer.submit_task(lambda conn: None))
+            self.assertFalse(writer.submit_task(lambda conn: None))
+            
+            begin = time.monotonic()
+            self.assertFalse(writer.flush(timeout=0.1))
+            writer.close(timeout=0.1)
+            self.assertLess(time.monotonic() - begin, 2.0)
+        finally:
+            release.set()
+        writer._thread.join(5.0)
+        self.assertFalse(writer._thread.is_alive())
+
+    def test_writer_task_rejected_after_thread_died(self):
+        """Test that a dead writer thread rejects tasks and flushes return at once."""
+        writer = MetricsWriter(self.db_path)
+        writer._queue.put(('stop',))
+        writer._thread.join(5.0)
+        self.assertFalse(writer.submit_task(lambda conn: None))
+        self.assertTrue(writer.flush())
+        writer.close()
+
+    def test_flatten_metrics(self):
+        """Test flattening nested metrics into numeric series."""
+        flat = flatten_metrics({
+            'cpu': {'usage_percent': 25.5, 'per_cpu': [10.0, 20.0]},
+            'processes': {'total': 3, 'top_cpu': [{'name': 'python', 'pid': 1234, 'create_time': 1.0}]},
+            'network': {'addresses': {'lo': [{'family': 2, 'address': '127.0.0.1'}]}},
+        })
+        self.assertEqual(flat, {
+            'cpu.usage_percent': 25.5,
+            'cpu.per_cpu.0': 10.0,
+            'cpu.per_cpu.1': 20.0,
+            'processes.total': 3.0,
+        })
+
+    def test_naive_timestamps_are_utc(self):
+        """Test utcnow() timestamps are stored at the right epoch in any local zone."""
+        previous_tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/New_York'
+        time.tzset()
+        try:
+            monitor = AdvancedSystemMonitor(db_path=self.db_path, storage_mode='normalized')
+            try:
+                monitor.store_metrics_db({
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'cpu': {'usage_percent': 12.0},
+                })
+                monitor.flush_writes()
+                
+                (ts, _), = monitor.query_series('cpu.usage_percent')
+                self.assertAlmostEqual(ts, time.time(), delta=60)
+                result = monitor.query_series_range('cpu.usage_percent', start=time.time() - 60)
+                self.assertEqual([point['avg'] for point in result['points']], [12.0])
+            finally:
+                monitor.cleanup()
+        finally:
+            if previous_tz is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = previous_tz
+            time.tzset()
+
+    def test_normalized_storage_and_trend(self):
+        """Test typed series storage, SQL aggregates and SQL trend."""
+        monitor = AdvancedSystemMonitor(db_path=self.db_path, storage_mode='normalized')
+        try:
+            for i in range(10):
+                monitor.store_metrics_db({
+                    'timestamp': f'2024-01-01T00:00:{i:02d}',
+                    'cpu': {'usage_percent': float(i * 5)},
+                })
+            monitor.flush_writes()
+            
+            points = monitor.query_series('cpu.usage_percent', start='2024-01-01T00:00:08')
+            self.assertEqual([value for _, value in points], [40.0, 45.0])
+            
+            summary = monitor.aggregate_series('cpu.usage_percent')
+            self.assertEqual(summary['count'], 10)
+            self.assertEqual(summary['max'], 45.0)
+            self.assertEqual(monitor.calculate_trend('cpu'), 'increasing')
+            
+            with sqlite3.connect(self.db_path) as conn:
+                legacy = conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+            self.assertEqual(legacy, 0)
+        finally:
+            monitor.cleanup()
+
+    def test_migrate_legacy_metrics(self):
+        """Test migrating JSON blob rows into typed series, resumably."""
+        self.monitor.store_metrics_db({
+            'timestamp': '2024-01-01T00:00:00',
+            'memory': {'virtual': {'percent': 42.0}},
+        })
+        self.monitor.flush_writes()
+        
+        self.assertEqual(self.monitor.migrate_legacy_metrics(), 1)
+        self.assertEqual(self.monitor.migrate_legacy_metrics(), 0)
+        self.assertEqual(
+            self.monitor.query_series('memory.virtual.percent'),
+            [(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp(), 42.0)]
+        )
+
+    def test_rollup_tiers_and_retention(self):
+        """Test 1m/1h rollups, tier selection and per-tier retention."""
+        monitor = AdvancedSystemMonitor(
+            db_path=self.db_path, storage_mode='normalized', rollup_interval=float('inf')
+        )
+        try:
+            base = 1_700_000_000 - (1_700_000_000 % 3600)
+            for i in range(0, 2 * 3600, 10):
+                monitor.store_metrics_db({'timestamp': base + i, 'cpu': {'usage_percent': float(i % 100)}})
+            monitor.flush_writes()
+            
+            now = base + 2 * 3600 + 30
+            monitor.run_rollups(now=now)
+            with sqlite3.connect(self.db_path) as conn:
+                tiers = dict(conn.execute(
+                    "SELECT resolution, SUM(count) FROM metric_rollups GROUP BY resolution"
+                ).fetchall())
+            self.assertEqual(tiers, {60: 720, 3600: 720})
+            
+            self.assertEqual(monitor.select_tier(base, now, resolution=1, now=now), 0)
+            self.assertEqual(monitor.select_tier(base, now, resolution=600, now=now), 60)
+            self.assertEqual(monitor.select_tier(base, now, resolution=7200, now=now), 3600)
+            
+            # Raw points expire after a day; rollups are kept
+            monitor.run_rollups(now=now + 2 * 86400)
+            with sqlite3.connect(self.db_path) as conn:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM metric_points").fetchone()[0], 0)
+                self.assertGreater(conn.execute("SELECT COUNT(*) FROM metric_rollups").fetchone()[0], 0)
+        finally:
+            monitor.cleanup()
+
+    def test_default_mode_applies_raw_retention(self):
+        """Test that the default JSON storage prunes legacy rows on the rollup schedule."""
+        monitor = AdvancedSystemMonitor(db_path=self.db_path, rollup_interval=float('inf'))
+        try:
+            self.assertEqual(monitor.storage_mode, 'json')
+            now = datetime(2024, 1, 10, tzinfo=timezone.utc).timestamp()
+            monitor.store_metrics_db({'timestamp': '2024-01-08T12:00:00', 'cpu': {'usage_percent': 1.0}})
+            monitor.store_metrics_db({'timestamp': now - 2 * 86400, 'cpu': {'usage_percent': 2.0}})
+            monitor.store_metrics_db({'timestamp': '2024-01-09T12:00:00', 'cpu': {'usage_percent': 3.0}})
+            monitor.store_metrics_db({'timestamp': now - 3600, 'cpu': {'usage_percent': 4.0}})
+            monitor.flush_writes()
+            
+            monitor.run_rollups(now=now)
+            with sqlite3.connect(self.db_path) as conn:
+                kept = [json.loads(row[0])['usage_percent'] for row in conn.execute(
+                    "SELECT metadata FROM metrics ORDER BY id"
+                )]
+            self.assertEqual(kept, [3.0, 4.0])
+            
+            # store_metrics_db schedules the pass itself once the interval is up
+            monitor.rollup_interval = 0
+            with patch('time.time', return_value=now + 2 * 86400):
+                monitor.store_metrics_db({'timestamp': now + 2 * 86400, 'cpu': {'usage_percent': 5.0}})
+                monitor.flush_writes()
+            with sqlite3.connect(self.db_path) as conn:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0], 1)
+        finally:
+            monitor.cleanup()
+
     def test_cleanup(self):
         """Test that resources are properly cleaned up."""
         self.monitor.cleanup()
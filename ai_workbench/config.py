@@ -39,6 +39,8 @@ DEFAULT_CONFIG = {
         "memory_warning": 80.0,  # percentage
         "disk_warning": 85.0,  # percentage
         "temp_warning": 2048,  # MB
+        "stage_queue_size": 8,  # pending samples per pipeline stage
+        "maintenance_interval": 600,  # seconds between metric rollup/retention passes
     },
     "optimization": {
         "auto_optimize": True,
@@ -108,6 +110,8 @@ class MonitoringConfig:
     memory_warning: float = 80.0  # percentage
     disk_warning: float = 85.0  # percentage
     temp_warning: int = 2048  # MB
+    stage_queue_size: int = 8  # pending samples per pipeline stage
+    maintenance_interval: int = 600  # seconds between metric rollup/retention passes
 
 
 @dataclass
@@ -66,6 +66,57 @@ class SystemMetric(Base):
         }
 
 
+class SystemMetricRollup(Base):
+    """Time-bucketed aggregates of SystemMetric rows (downsampling tiers)"""
+    __tablename__ = 'system_metric_rollups'
+    __table_args__ = (
+        UniqueConstraint('resolution', 'bucket_start', name='uq_system_metric_rollup_bucket'),
+    )
+    
+    # Numeric SystemMetric columns that are aggregated per bucket
+    AGGREGATED_COLUMNS = (
+        'cpu_usage', 'memory_usage', 'disk_usage', 'disk_space', 'temp_files_size', 'health_score'
+    )
+    
+    id = Column(Integer, primary_key=True)
+    resolution = Column(Integer, nullable=False)  # Bucket width in seconds
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    
+    cpu_usage_min = Column(Float, nullable=True)
+    cpu_usage_max = Column(Float, nullable=True)
+    cpu_usage_avg = Column(Float, nullable=True)
+    memory_usage_min = Column(Float, nullable=True)
+    memory_usage_max = Column(Float, nullable=True)
+    memory_usage_avg = Column(Float, nullable=True)
+    disk_usage_min = Column(Float, nullable=True)
+    disk_usage_max = Column(Float, nullable=True)
+    disk_usage_avg = Column(Float, nullable=True)
+    disk_space_min = Column(Float, nullable=True)
+    disk_space_max = Column(Float, nullable=True)
+    disk_space_avg = Column(Float, nullable=True)
+    temp_files_size_min = Column(Float, nullable=True)
+    temp_files_size_max = Column(Float, nullable=True)
+    temp_files_size_avg = Column(Float, nullable=True)
+    health_score_min = Column(Float, nullable=True)
+    health_score_max = Column(Float, nullable=True)
+    health_score_avg = Column(Float, nullable=True)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert model to dictionary, using bucket averages as the metric values"""
+        data = {
+            'id': self.id,
+            'timestamp': self.bucket_start.isoformat() if self.bucket_start else None,
+            'resolution': self.resolution,
+            'sample_count': self.sample_count,
+        }
+        for column in self.AGGREGATED_COLUMNS:
+            data[column] = getattr(self, f'{column}_avg')
+            data[f'{column}_min'] = getattr(self, f'{column}_min')
+            data[f'{column}_max'] = getattr(self, f'{column}_max')
+        return data
+
+
 class SystemAction(Base):
     """Tracks actions taken by the AI Workbench"""
     __tablename__ = 'system_actions'
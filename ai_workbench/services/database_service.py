@@ -6,31 +6,107 @@ including saving metrics, recording actions, and managing predictions.
 """
 
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
-from sqlalchemy import create_engine, func, and_, or_
-from sqlalchemy.orm import sessionmaker, Session
+from typing import Dict, List, Optional, Any, Union, Iterable, Iterator, Callable, Tuple
+from sqlalchemy import create_engine, func, and_, or_, insert, literal, select, Boolean, DateTime, Float, Integer
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 # Import models
 from ..models.workbench_models import (
-    SystemMetric, SystemAction, FailurePrediction, OptimizationRule
+    SystemMetric, SystemMetricRollup, SystemAction, FailurePrediction, OptimizationRule
 )
 
 # Import database configuration
 from architecture.db import DatabaseManager, get_db_manager
 
+try:
+    import numpy as np
+except ImportError:  # columnar results are optional
+    np = None
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# (timestamp, id) position of the last row of a page; accepts ISO strings
+KeysetCursor = Tuple[Union[datetime, str], int]
+
+# JSON columns normalized like the models' to_dict()
+_JSON_DEFAULTS = {
+    'metadata': dict,
+    'details': dict,
+    'contributing_factors': dict,
+    'recommended_actions': list,
+}
+
+
+def _format_row(row) -> Dict[str, Any]:
+    """Convert a column-only result row to a to_dict()-style dictionary"""
+    data = dict(row)
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+        elif value is None and key in _JSON_DEFAULTS:
+            data[key] = _JSON_DEFAULTS[key]()
+    return data
+
+
+def _parse_cursor(after: Optional[KeysetCursor]) -> Optional[Tuple[datetime, int]]:
+    """Normalize a keyset cursor, parsing ISO timestamps"""
+    if after is None:
+        return None
+    timestamp, row_id = after
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return timestamp, row_id
+
+
+def keyset_cursor(row: Dict[str, Any], time_key: str = 'timestamp') -> KeysetCursor:
+    """
+    Get the cursor that continues a keyset-paginated read after ``row``
+    
+    Args:
+        row: Last row dictionary of a page
+        time_key: Key holding the row timestamp
+        
+    Returns:
+        (timestamp, id) cursor to pass as ``after``
+    """
+    return row[time_key], row['id']
+
 
 class WorkbenchDatabaseService:
     """Service for handling database operations for the AI Workbench"""
     
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
-        """Initialize the database service"""
+    # Rollup tiers by bucket width in seconds; each is built from the previous
+    # one (raw system_metrics -> 1 minute -> 1 hour)
+    ROLLUP_RESOLUTIONS = (60, 3600)
+    
+    # Rows per multi-row INSERT statement in the bulk API; SQLAlchemy lowers
+    # it further where the dialect's bind parameter limit requires
+    BULK_CHUNK_ROWS = 500
+    
+    # Retention per tier; 0 is the raw system_metrics table
+    DEFAULT_RETENTION = {
+        0: timedelta(days=7),
+        60: timedelta(days=90),
+        3600: timedelta(days=730),
+    }
+    
+    def __init__(self, db_manager: Optional[DatabaseManager] = None,
+                 retention: Optional[Dict[int, timedelta]] = None):
+        """
+        Initialize the database service
+        
+        Args:
+            db_manager: Database manager providing the engine
+            retention: Per-tier retention overrides merged over DEFAULT_RETENTION
+        """
         self.db_manager = db_manager or get_db_manager()
-        self.Session = sessionmaker(bind=self.db_manager.engine)
+        self._session_factory = None
+        self.retention = {**self.DEFAULT_RETENTION, **(retention or {})}
+        self._writers: List['BufferedWriter'] = []
     
     def save_system_metric(self, metric_data: Dict[str, Any]) -> Optional[SystemMetric]:
         """
@@ -65,6 +141,144 @@ class WorkbenchDatabaseService:
         finally:
             session.close()
     
+    @property
+    def Session(self) -> sessionmaker:
+        """Session factory shared with the database manager (created on first use)"""
+        if self._session_factory is None:
+            self._session_factory = self.db_manager.get_session_factory()
+        return self._session_factory
+    
+    @property
+    def engine(self):
+        """Primary engine for writes"""
+        return self.db_manager.get_engine()
+    
+    @property
+    def read_engine(self):
+        """Read-routed engine (replica or read-only pool) for history queries"""
+        return self.db_manager.get_engine(readonly=True)
+    
+    def _insert_many(self, table, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert rows with multi-row INSERT statements in one transaction
+        
+        Args:
+            table: Core table to insert into
+            rows: Column-keyed row dictionaries, all with the same keys
+            
+        Returns:
+            Ids of the new rows in input order (empty if the dialect cannot
+            return them)
+        """
+        if not rows:
+            return []
+        
+        engine = self.engine
+        stmt = insert(table)
+        with engine.begin() as conn:
+            conn = conn.execution_options(insertmanyvalues_page_size=self.BULK_CHUNK_ROWS)
+            if not getattr(engine.dialect, 'insert_returning', False):
+                conn.execute(stmt, rows)
+                return []
+            # RETURNING order is not guaranteed by the database;
+            # sort_by_parameter_order makes SQLAlchemy match ids to rows
+            stmt = stmt.returning(table.c.id, sort_by_parameter_order=True)
+            return list(conn.execute(stmt, rows).scalars())
+    
+    @staticmethod
+    def _metric_row(metric_data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Build a system_metrics row; unknown keys are ignored"""
+        row = {
+            column.name: metric_data.get(column.name)
+            for column in SystemMetric.__table__.columns
+            if column.name not in ('id', 'metadata')
+        }
+        row['timestamp'] = row['timestamp'] or now
+        row['metadata'] = metric_data.get('metadata') or {}
+        return row
+    
+    @staticmethod
+    def _action_row(action_data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Build a system_actions row; unknown keys are ignored"""
+        row = {
+            column.name: action_data.get(column.name)
+            for column in SystemAction.__table__.columns
+            if column.name != 'id'
+        }
+        row['timestamp'] = row['timestamp'] or now
+        row['status'] = row['status'] or 'pending'
+        row['details'] = row['details'] or {}
+        return row
+    
+    def _insert_metrics(self, metrics: Iterable[Dict[str, Any]]) -> List[int]:
+        """Bulk insert metric dictionaries; raises on database errors"""
+        now = datetime.utcnow()
+        return self._insert_many(SystemMetric.__table__, [self._metric_row(data, now) for data in metrics])
+    
+    def _insert_actions(self, actions: Iterable[Dict[str, Any]]) -> List[int]:
+        """Bulk insert action dictionaries; raises on database errors"""
+        now = datetime.utcnow()
+        return self._insert_many(SystemAction.__table__, [self._action_row(data, now) for data in actions])
+    
+    def save_system_metrics_many(self, metrics: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Save many system metrics with a few multi-row INSERT statements
+        
+        Args:
+            metrics: Metric dictionaries (as accepted by save_system_metric)
+            
+        Returns:
+            Ids of the created metrics in input order, or an empty list if
+            the insert failed or the dialect cannot return ids
+        """
+        try:
+            return self._insert_metrics(metrics)
+        except Exception as e:
+            logger.error(f"Error saving system metrics: {e}")
+            return []
+    
+    def record_actions_many(self, actions: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Record many actions with a few multi-row INSERT statements
+        
+        Args:
+            actions: Action dictionaries with the record_action() arguments
+            
+        Returns:
+            Ids of the created actions in input order, or an empty list if
+            the insert failed or the dialect cannot return ids
+        """
+        try:
+            return self._insert_actions(actions)
+        except Exception as e:
+            logger.error(f"Error recording actions: {e}")
+            return []
+    
+    def create_buffered_writer(self, flush_size: int = 1000, flush_interval: float = 1.0,
+                               max_pending: int = 100000, max_attempts: int = 3) -> 'BufferedWriter':
+        """
+        Create a started BufferedWriter that is flushed and stopped by close()
+        
+        Args:
+            flush_size: Pending rows that trigger a flush
+            flush_interval: Maximum seconds rows wait before being flushed
+            max_pending: Pending rows per kind beyond which new rows are dropped
+            max_attempts: Inserts tried per row before it is dropped
+            
+        Returns:
+            The running writer
+        """
+        writer = BufferedWriter(self, flush_size, flush_interval, max_pending, max_attempts)
+        writer.start()
+        self._writers.append(writer)
+        return writer
+    
+    def close(self) -> None:
+        """Flush and stop all buffered writers created by this service"""
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+    
     def record_action(
         self, 
         metric_id: int,
@@ -163,6 +377,195 @@ class WorkbenchDatabaseService:
         finally:
             session.close()
     
+    # Rows fetched per keyset page / server-side cursor batch
+    PAGE_SIZE = 1000
+    
+    @staticmethod
+    def _metric_columns() -> list:
+        """Columns of system_metrics, without the ORM entity"""
+        return list(SystemMetric.__table__.columns)
+    
+    @staticmethod
+    def _rollup_columns(resolution: int) -> list:
+        """Rollup columns labelled like SystemMetricRollup.to_dict()"""
+        table = SystemMetricRollup.__table__
+        columns = [table.c.id, table.c.bucket_start, table.c.resolution, table.c.sample_count]
+        for name in SystemMetricRollup.AGGREGATED_COLUMNS:
+            columns += [
+                table.c[f'{name}_avg'].label(name),
+                table.c[f'{name}_min'],
+                table.c[f'{name}_max'],
+            ]
+        return columns
+    
+    @staticmethod
+    def _raw_rollup_columns() -> list:
+        """system_metrics columns labelled like a one-sample rollup row"""
+        table = SystemMetric.__table__
+        columns = [
+            table.c.id,
+            table.c.timestamp,
+            literal(0, Integer).label('resolution'),
+            literal(1, Integer).label('sample_count'),
+        ]
+        for name in SystemMetricRollup.AGGREGATED_COLUMNS:
+            columns += [
+                table.c[name],
+                table.c[name].label(f'{name}_min'),
+                table.c[name].label(f'{name}_max'),
+            ]
+        return columns
+    
+    def iter_rows(
+        self,
+        columns: list,
+        time_column,
+        id_column,
+        where: Iterable = (),
+        page_size: Optional[int] = None,
+        after: Optional[KeysetCursor] = None,
+        descending: bool = False,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream rows in keyset-paginated pages ordered by (time, id)
+        
+        Every page is a short, column-only SELECT continuing after the last
+        (time, id) seen, so deep pages cost the same as the first one and no
+        ORM objects are created.
+        
+        Args:
+            columns: Columns to select; time and id columns are added if missing
+            time_column: Timestamp column of the keyset
+            id_column: Unique id column breaking timestamp ties
+            where: Filter clauses
+            page_size: Rows per page
+            after: Cursor to continue from (exclusive)
+            descending: Newest first instead of oldest first
+            limit: Maximum number of rows to yield
+            
+        Yields:
+            Row mappings keyed by column name
+        """
+        page_size = page_size or self.PAGE_SIZE
+        columns = list(columns)
+        for column in (time_column, id_column):
+            if not any(column is c for c in columns):
+                columns.append(column)
+        order = (time_column.desc(), id_column.desc()) if descending else (time_column, id_column)
+        where = list(where)
+        after = _parse_cursor(after)
+        remaining = limit
+        
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            stmt = select(*columns).where(*where)
+            if after is not None:
+                timestamp, row_id = after
+                if descending:
+                    stmt = stmt.where(or_(
+                        time_column < timestamp,
+                        and_(time_column == timestamp, id_column < row_id)
+                    ))
+                else:
+                    stmt = stmt.where(or_(
+                        time_column > timestamp,
+                        and_(time_column == timestamp, id_column > row_id)
+                    ))
+            with self.read_engine.connect() as conn:
+                rows = conn.execute(stmt.order_by(*order).limit(size)).all()
+            
+            for row in rows:
+                yield row._mapping
+            if len(rows) < size:
+                return
+            last = rows[-1]._mapping
+            after = (last[time_column], last[id_column])
+            if remaining is not None:
+                remaining -= len(rows)
+    
+    def stream_rows(self, columns: list, where: Iterable = (), order_by: Iterable = (),
+                    yield_per: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a column-only SELECT through one server-side cursor
+        
+        Rows are fetched ``yield_per`` at a time (a true server-side cursor
+        on PostgreSQL/MySQL), holding the connection until the iterator is
+        exhausted or closed. Prefer iter_rows() for slow consumers.
+        
+        Args:
+            columns: Columns to select
+            where: Filter clauses
+            order_by: Ordering clauses
+            yield_per: Rows buffered per fetch
+            
+        Yields:
+            Row mappings keyed by column name
+        """
+        stmt = select(*columns).where(*where).order_by(*order_by)
+        with self.read_engine.connect() as conn:
+            result = conn.execution_options(yield_per=yield_per or self.PAGE_SIZE).execute(stmt)
+            for partition in result.partitions():
+                for row in partition:
+                    yield row._mapping
+    
+    def to_columns(self, rows: Iterable[Dict[str, Any]], columns: list,
+                   page_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Convert streamed rows into NumPy arrays, one per column
+        
+        Rows are converted a page at a time, so only one page of Python
+        objects is alive at once. DateTime columns become datetime64[us],
+        numeric and boolean columns float64 (NULL -> NaN), id columns int64
+        and anything else an object array.
+        
+        Args:
+            rows: Row mappings (e.g. from iter_rows())
+            columns: The selected columns, used for names and dtypes
+            page_size: Rows converted per step
+            
+        Returns:
+            Dict mapping column names to arrays of equal length
+        """
+        if np is None:
+            raise ImportError("numpy is required for columnar results")
+        
+        dtypes = {}
+        for column in columns:
+            column_type = getattr(column, 'type', None)
+            if column.key == 'id' or column.key.endswith('_id') or column.key == 'sample_count':
+                dtypes[column.key] = np.int64
+            elif isinstance(column_type, DateTime):
+                dtypes[column.key] = 'datetime64[us]'
+            elif isinstance(column_type, (Float, Integer, Boolean)):
+                dtypes[column.key] = np.float64
+            else:
+                dtypes[column.key] = object
+        
+        chunks: Dict[str, list] = {name: [] for name in dtypes}
+        page: list = []
+        
+        def convert() -> None:
+            for name, dtype in dtypes.items():
+                values = [row[name] for row in page]
+                if dtype is np.int64 and None in values:
+                    dtype = np.float64
+                chunks[name].append(np.array(values, dtype=dtype))
+            page.clear()
+        
+        page_size = page_size or self.PAGE_SIZE
+        for row in rows:
+            page.append(row)
+            if len(page) >= page_size:
+                convert()
+        if page:
+            convert()
+        
+        return {
+            name: np.concatenate(parts) if parts else np.array([], dtype=dtypes[name])
+            for name, parts in chunks.items()
+        }
+    
     def get_recent_metrics(self, limit: int = 100) -> List[Dict]:
         """
         Get recent system metrics
@@ -173,63 +576,84 @@ class WorkbenchDatabaseService:
         Returns:
             List of metric dictionaries
         """
-        session = self.Session()
+        table = SystemMetric.__table__
         try:
-            metrics = session.query(SystemMetric)\
-                .order_by(SystemMetric.timestamp.desc())\
-                .limit(limit)\
-                .all()
-            return [m.to_dict() for m in metrics]
+            return [
+                _format_row(row) for row in self.iter_rows(
+                    self._metric_columns(), table.c.timestamp, table.c.id,
+                    descending=True, limit=limit
+                )
+            ]
         except Exception as e:
             logger.error(f"Error getting recent metrics: {e}")
             return []
-        finally:
-            session.close()
     
-    def get_actions_by_status(self, status: str = None) -> List[Dict]:
+    def get_actions_by_status(self, status: str = None, limit: Optional[int] = 1000,
+                              after: Optional[KeysetCursor] = None) -> List[Dict]:
         """
-        Get system actions, optionally filtered by status
+        Get system actions, optionally filtered by status, newest first
         
         Args:
             status: Optional status to filter by
+            limit: Maximum number of actions to return (None for all)
+            after: keyset_cursor() of the last action of the previous page
             
         Returns:
             List of action dictionaries
         """
-        session = self.Session()
         try:
-            query = session.query(SystemAction)
-            
-            if status:
-                query = query.filter(SystemAction.status == status)
-                
-            actions = query.order_by(SystemAction.timestamp.desc()).all()
-            return [a.to_dict() for a in actions]
+            return list(self.iter_actions(status, limit=limit, after=after))
         except Exception as e:
             logger.error(f"Error getting actions: {e}")
             return []
-        finally:
-            session.close()
     
-    def get_active_predictions(self) -> List[Dict]:
+    def iter_actions(self, status: str = None, page_size: Optional[int] = None,
+                     after: Optional[KeysetCursor] = None,
+                     limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream system actions newest first in keyset-paginated pages
+        
+        Args:
+            status: Optional status to filter by
+            page_size: Rows fetched per query
+            after: Cursor to continue from
+            limit: Maximum number of actions to yield
+            
+        Yields:
+            Action dictionaries
+        """
+        table = SystemAction.__table__
+        where = [table.c.status == status] if status else []
+        for row in self.iter_rows(
+            list(table.columns), table.c.timestamp, table.c.id, where,
+            page_size=page_size, after=after, descending=True, limit=limit
+        ):
+            yield _format_row(row)
+    
+    def get_active_predictions(self, limit: Optional[int] = 1000,
+                               after: Optional[KeysetCursor] = None) -> List[Dict]:
         """
         Get active failure predictions (not yet resolved)
         
+        Args:
+            limit: Maximum number of predictions to return (None for all)
+            after: keyset_cursor() of the last prediction of the previous page
+            
         Returns:
             List of active prediction dictionaries
         """
-        session = self.Session()
+        table = FailurePrediction.__table__
         try:
-            predictions = session.query(FailurePrediction)\
-                .filter(FailurePrediction.resolved == False)\
-                .order_by(FailurePrediction.timestamp.desc())\
-                .all()
-            return [p.to_dict() for p in predictions]
+            return [
+                _format_row(row) for row in self.iter_rows(
+                    list(table.columns), table.c.timestamp, table.c.id,
+                    [table.c.resolved == False],
+                    descending=True, after=after, limit=limit
+                )
+            ]
         except Exception as e:
             logger.error(f"Error getting active predictions: {e}")
             return []
-        finally:
-            session.close()
     
     def get_optimization_rules(self, enabled_only: bool = True) -> List[Dict]:
         """
@@ -333,6 +757,482 @@ class WorkbenchDatabaseService:
         finally:
             session.close()
 
+    
+    def rollup_metrics(self, now: Optional[datetime] = None) -> Dict[int, int]:
+        """
+        Aggregate closed time buckets into the rollup tiers
+        
+        Each tier resumes from its newest existing bucket, so rows are only
+        aggregated once. Source rows are streamed with column-only selects.
+        
+        Args:
+            now: Reference time; buckets ending after it are left open
+            
+        Returns:
+            Number of buckets written per resolution
+        """
+        now = now or datetime.utcnow()
+        written = {}
+        session = self.Session()
+        try:
+            source = 0
+            for resolution in self.ROLLUP_RESOLUTIONS:
+                written[resolution] = self._rollup_tier(session, source, resolution, now)
+                source = resolution
+            session.commit()
+            return written
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error rolling up metrics: {e}")
+            return written
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _bucket_start(timestamp: datetime, resolution: int) -> datetime:
+        """Floor a timestamp to the start of its bucket"""
+        epoch = datetime(1970, 1, 1)
+        seconds = int((timestamp - epoch).total_seconds())
+        return epoch + timedelta(seconds=seconds - seconds % resolution)
+    
+    def _rollup_tier(self, session, source: int, resolution: int, now: datetime) -> int:
+        """Aggregate one tier from its source tier; returns buckets written"""
+        columns = SystemMetricRollup.AGGREGATED_COLUMNS
+        end = self._bucket_start(now, resolution)
+        
+        last = session.query(func.max(SystemMetricRollup.bucket_start))\
+            .filter(SystemMetricRollup.resolution == resolution)\
+            .scalar()
+        start = last + timedelta(seconds=resolution) if last else None
+        
+        if source == 0:
+            selected = [SystemMetric.timestamp] + [getattr(SystemMetric, c) for c in columns]
+            query = session.query(*selected).filter(SystemMetric.timestamp < end)
+            if start is not None:
+                query = query.filter(SystemMetric.timestamp >= start)
+            query = query.order_by(SystemMetric.timestamp)
+        else:
+            selected = [SystemMetricRollup.bucket_start, SystemMetricRollup.sample_count]
+            for column in columns:
+                selected += [
+                    getattr(SystemMetricRollup, f'{column}_min'),
+                    getattr(SystemMetricRollup, f'{column}_max'),
+                    getattr(SystemMetricRollup, f'{column}_avg'),
+                ]
+            query = session.query(*selected)\
+                .filter(SystemMetricRollup.resolution == source)\
+                .filter(SystemMetricRollup.bucket_start < end)
+            if start is not None:
+                query = query.filter(SystemMetricRollup.bucket_start >= start)
+            query = query.order_by(SystemMetricRollup.bucket_start)
+        
+        # bucket -> [sample_count, {column: [min, max, weighted_sum, weight]}]
+        buckets: Dict[datetime, list] = {}
+        for row in query.yield_per(1000):
+            bucket = self._bucket_start(row[0], resolution)
+            entry = buckets.get(bucket)
+            if entry is None:
+                entry = buckets[bucket] = [0, {c: [None, None, 0.0, 0] for c in columns}]
+            if source == 0:
+                weight = 1
+                values = {c: (v, v, v) for c, v in zip(columns, row[1:])}
+            else:
+                weight = row[1]
+                values = {c: row[2 + 3 * i:5 + 3 * i] for i, c in enumerate(columns)}
+            entry[0] += weight
+            for column, (low, high, avg) in values.items():
+                if avg is None:
+                    continue
+                agg = entry[1][column]
+                agg[0] = low if agg[0] is None else min(agg[0], low)
+                agg[1] = high if agg[1] is None else max(agg[1], high)
+                agg[2] += avg * weight
+                agg[3] += weight
+        
+        rows = []
+        for bucket, (count, aggregates) in buckets.items():
+            row = {'resolution': resolution, 'bucket_start': bucket, 'sample_count': count}
+            for column, (low, high, total, weight) in aggregates.items():
+                row[f'{column}_min'] = low
+                row[f'{column}_max'] = high
+                row[f'{column}_avg'] = total / weight if weight else None
+            rows.append(row)
+        if rows:
+            session.execute(insert(SystemMetricRollup), rows)
+        return len(rows)
+    
+    def apply_retention(self, now: Optional[datetime] = None) -> Dict[int, int]:
+        """
+        Delete rows older than each tier's retention
+        
+        Raw metrics still referenced by actions or predictions are kept.
+        
+        Returns:
+            Number of rows deleted per tier (0 = raw metrics)
+        """
+        now = now or datetime.utcnow()
+        deleted = {}
+        session = self.Session()
+        try:
+            deleted[0] = session.query(SystemMetric)\
+                .filter(SystemMetric.timestamp < now - self.retention[0])\
+                .filter(~SystemMetric.actions.any(), ~SystemMetric.predictions.any())\
+                .delete(synchronize_session=False)
+            for resolution in self.ROLLUP_RESOLUTIONS:
+                deleted[resolution] = session.query(SystemMetricRollup)\
+                    .filter(SystemMetricRollup.resolution == resolution)\
+                    .filter(SystemMetricRollup.bucket_start < now - self.retention[resolution])\
+                    .delete(synchronize_session=False)
+            session.commit()
+            return deleted
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error applying metric retention: {e}")
+            return deleted
+        finally:
+            session.close()
+    
+    def maintain_metrics(self, now: Optional[datetime] = None) -> Dict[str, Dict[int, int]]:
+        """Run a rollup pass followed by retention; call periodically"""
+        return {
+            'rolled_up': self.rollup_metrics(now),
+            'deleted': self.apply_retention(now),
+        }
+    
+    def select_tier(self, start: datetime, resolution: Optional[float] = None,
+                    now: Optional[datetime] = None) -> int:
+        """
+        Pick the coarsest tier that covers ``start`` and is no coarser than ``resolution``
+        
+        Args:
+            start: Oldest timestamp the caller needs
+            resolution: Coarsest acceptable bucket width in seconds; None picks
+                the finest tier that still covers the range
+            now: Reference time for retention horizons
+            
+        Returns:
+            Tier resolution in seconds (0 = raw metrics)
+        """
+        now = now or datetime.utcnow()
+        tiers = (0,) + self.ROLLUP_RESOLUTIONS
+        retained = [tier for tier in tiers if now - self.retention[tier] <= start]
+        if not retained:
+            return tiers[-1]
+        if resolution is None:
+            return min(retained)
+        fine_enough = [tier for tier in retained if tier <= resolution]
+        return max(fine_enough) if fine_enough else min(retained)
+    
+    def _history_query(self, hours: float, resolution: Optional[float],
+                       max_points: Optional[int]) -> List[Tuple[list, Any, Any, list]]:
+        """
+        Plan a history read; returns (columns, time, id, where) parts, oldest first
+        
+        Rollup tiers only hold buckets closed by the last maintenance pass,
+        so the range after the newest bucket of the chosen tier (all of it
+        for an empty tier) is read from the raw metrics, labelled like
+        one-sample rollup rows.
+        """
+        now = datetime.utcnow()
+        start = now - timedelta(hours=hours)
+        if resolution is None and max_points:
+            resolution = hours * 3600 / max_points
+        tier = self.select_tier(start, resolution, now)
+        raw = SystemMetric.__table__
+        
+        if tier == 0:
+            return [(self._metric_columns(), raw.c.timestamp, raw.c.id, [raw.c.timestamp >= start])]
+        
+        table = SystemMetricRollup.__table__
+        first = self._bucket_start(start, tier)
+        with self.read_engine.connect() as conn:
+            newest = conn.execute(
+                select(func.max(table.c.bucket_start)).where(table.c.resolution == tier)
+            ).scalar()
+        
+        parts = []
+        raw_start = start
+        if newest is not None and newest >= first:
+            where = [table.c.resolution == tier, table.c.bucket_start >= first]
+            parts.append((self._rollup_columns(tier), table.c.bucket_start, table.c.id, where))
+            raw_start = max(start, newest + timedelta(seconds=tier))
+        parts.append((self._raw_rollup_columns(), raw.c.timestamp, raw.c.id, [raw.c.timestamp >= raw_start]))
+        return parts
+    
+    def iter_metrics_history(self, hours: float = 24, resolution: Optional[float] = None,
+                             max_points: Optional[int] = 500,
+                             page_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream metric history oldest first from the coarsest adequate tier
+        
+        Args:
+            hours: How far back to read
+            resolution: Coarsest acceptable bucket width in seconds
+            max_points: Used when ``resolution`` is not given to derive one
+            page_size: Rows fetched per keyset page
+            
+        Yields:
+            Metric dictionaries (see get_metrics_history())
+        """
+        for columns, time_column, id_column, where in self._history_query(hours, resolution, max_points):
+            for row in self.iter_rows(columns, time_column, id_column, where, page_size=page_size):
+                data = _format_row(row)
+                if 'bucket_start' in data:
+                    data['timestamp'] = data.pop('bucket_start')
+                yield data
+    
+    def get_metrics_history(self, hours: float = 24, resolution: Optional[float] = None,
+                            max_points: Optional[int] = 500,
+                            as_columns: bool = False) -> Union[List[Dict], Dict[str, Any]]:
+        """
+        Get metric history for the last ``hours`` from the coarsest adequate tier
+        
+        Args:
+            hours: How far back to read
+            resolution: Coarsest acceptable bucket width in seconds
+            max_points: Used when ``resolution`` is not given to derive one
+            as_columns: Return a dict of NumPy arrays (one per column, the
+                time column named ``timestamp``) instead of row dictionaries
+            
+        Returns:
+            List of metric dictionaries, oldest first; rollup rows carry
+            bucket averages plus ``*_min``/``*_max`` and ``sample_count``.
+            Raw samples newer than the newest rollup bucket follow as rows
+            with ``resolution`` 0 and a ``sample_count`` of 1. With
+            ``as_columns`` a dict of equally long arrays instead.
+        """
+        try:
+            if not as_columns:
+                return list(self.iter_metrics_history(hours, resolution, max_points))
+            
+            parts = []
+            for columns, time_column, id_column, where in self._history_query(hours, resolution, max_points):
+                part = self.to_columns(self.iter_rows(columns, time_column, id_column, where), columns)
+                if 'bucket_start' in part:
+                    part['timestamp'] = part.pop('bucket_start')
+                parts.append(part)
+            if len(parts) == 1:
+                return parts[0]
+            return {name: np.concatenate([part[name] for part in parts]) for name in parts[-1]}
+        except ImportError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting metrics history: {e}")
+            return {} if as_columns else []
+
+class BufferedWriter:
+    """
+    Write buffer that batches metrics and actions into bulk inserts
+    
+    add_metric()/add_action() only append to an in-memory buffer. A
+    background thread flushes the buffers through the bulk API whenever
+    ``flush_size`` rows are pending or ``flush_interval`` seconds have
+    passed, so ingesting 10k metrics takes a handful of statements.
+    
+    A batch that fails to insert is put back in front of the buffer and
+    retried on the next flush; rows that failed ``max_attempts`` times are
+    dropped and their callbacks receive None.
+    """
+    
+    def __init__(self, service: WorkbenchDatabaseService, flush_size: int = 1000,
+                 flush_interval: float = 1.0, max_pending: int = 100000,
+                 max_attempts: int = 3):
+        """
+        Initialize the writer
+        
+        Args:
+            service: Database service providing the bulk API
+            flush_size: Pending rows that trigger a flush
+            flush_interval: Maximum seconds rows wait before being flushed
+            max_pending: Pending rows per kind beyond which new rows are dropped
+            max_attempts: Inserts tried per row before it is dropped
+        """
+        self.service = service
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        # Pending (data, callback, failed attempts) per kind
+        self._metrics: List[Tuple[Dict[str, Any], Optional[Callable[[Optional[int]], None]], int]] = []
+        self._actions: List[Tuple[Dict[str, Any], Optional[Callable[[Optional[int]], None]], int]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._closed = False
+        self.stats = {'metrics': 0, 'actions': 0, 'flushes': 0, 'dropped': 0, 'errors': 0, 'retries': 0}
+    
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._running or self._closed:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="WorkbenchBufferedWriter", daemon=True)
+        self._thread.start()
+    
+    def _add(self, buffer: List, data: Dict[str, Any],
+             callback: Optional[Callable[[Optional[int]], None]]) -> bool:
+        with self._cond:
+            if self._closed or len(buffer) >= self.max_pending:
+                self.stats['dropped'] += 1
+                return False
+            buffer.append((data, callback, 0))
+            if len(self._metrics) + len(self._actions) >= self.flush_size:
+                self._cond.notify()
+            return True
+    
+    def add_metric(self, metric_data: Dict[str, Any],
+                   callback: Optional[Callable[[Optional[int]], None]] = None) -> bool:
+        """
+        Buffer a system metric
+        
+        Args:
+            metric_data: Metric dictionary
+            callback: Called with the new row id (None if unavailable or the
+                      row was dropped) after the flush
+            
+        Returns:
+            True if buffered, False if dropped because the buffer is full or
+            the writer is closed
+        """
+        return self._add(self._metrics, metric_data, callback)
+    
+    def add_action(self, action_data: Dict[str, Any],
+                   callback: Optional[Callable[[Optional[int]], None]] = None) -> bool:
+        """
+        Buffer an action
+        
+        Args:
+            action_data: Action dictionary with the record_action() arguments
+            callback: Called with the new row id (None if unavailable or the
+                      row was dropped) after the flush
+            
+        Returns:
+            True if buffered, False if dropped because the buffer is full or
+            the writer is closed
+        """
+        return self._add(self._actions, action_data, callback)
+    
+    def _run(self) -> None:
+        """Background loop flushing on size or interval"""
+        while True:
+            with self._cond:
+                if self._running and len(self._metrics) + len(self._actions) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                running = self._running
+            self.flush()
+            if not running:
+                self._drop_pending()
+                return
+    
+    def flush(self) -> int:
+        """
+        Write all pending rows now
+        
+        Metrics are written before actions so actions can reference metric
+        ids handed out by metric callbacks.
+        
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._cond:
+                metrics, self._metrics = self._metrics, []
+                actions, self._actions = self._actions, []
+            
+            written = 0
+            for kind, items, insert_many in (
+                ('metrics', metrics, self.service._insert_metrics),
+                ('actions', actions, self.service._insert_actions),
+            ):
+                if not items:
+                    continue
+                try:
+                    ids = insert_many([data for data, _, _ in items])
+                except Exception as e:
+                    logger.error(f"Error flushing {len(items)} buffered {kind}: {e}")
+                    self._retry(kind, items)
+                    continue
+                with self._cond:
+                    self.stats[kind] += len(items)
+                    self.stats['flushes'] += 1
+                written += len(items)
+                self._notify([
+                    (callback, ids[index] if index < len(ids) else None)
+                    for index, (_, callback, _) in enumerate(items)
+                ])
+            return written
+    
+    def _retry(self, kind: str, items: List) -> None:
+        """Put a failed batch back in front of its buffer, dropping exhausted rows"""
+        retry, failed = [], []
+        for data, callback, attempts in items:
+            if attempts + 1 < self.max_attempts:
+                retry.append((data, callback, attempts + 1))
+            else:
+                failed.append((callback, None))
+        with self._cond:
+            buffer = self._metrics if kind == 'metrics' else self._actions
+            buffer[:0] = retry
+            self.stats['errors'] += 1
+            self.stats['retries'] += len(retry)
+            self.stats['dropped'] += len(failed)
+        if failed:
+            logger.error(f"Dropped {len(failed)} buffered {kind} after {self.max_attempts} failed attempts")
+        self._notify(failed)
+    
+    @staticmethod
+    def _notify(results: List[Tuple[Optional[Callable[[Optional[int]], None]], Optional[int]]]) -> None:
+        """Invoke row callbacks with their ids"""
+        for callback, row_id in results:
+            if callback is None:
+                continue
+            try:
+                callback(row_id)
+            except Exception as e:
+                logger.error(f"Error in buffered writer callback: {e}", exc_info=True)
+    
+    @property
+    def pending(self) -> int:
+        """Rows waiting to be flushed"""
+        with self._cond:
+            return len(self._metrics) + len(self._actions)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get a consistent copy of the write counters plus the pending row count"""
+        with self._cond:
+            return {**self.stats, 'pending': len(self._metrics) + len(self._actions)}
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Flush pending rows and stop the background thread
+        
+        Rows added afterwards are rejected. Rows that still cannot be
+        written are dropped and their callbacks receive None.
+        
+        Args:
+            timeout: Seconds to wait for the final flush
+        """
+        with self._cond:
+            self._closed = True
+            self._running = False
+            self._cond.notify()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        else:
+            self.flush()
+            self._drop_pending()
+    
+    def _drop_pending(self) -> None:
+        """Drop rows still pending after the final flush"""
+        with self._cond:
+            leftover = self._metrics + self._actions
+            self._metrics, self._actions = [], []
+            self.stats['dropped'] += len(leftover)
+        if leftover:
+            logger.error(f"Dropped {len(leftover)} buffered rows that could not be written before close")
+        self._notify([(callback, None) for _, callback, _ in leftover])
+
 
 # Create a singleton instance
 db_service = WorkbenchDatabaseService()
@@ -0,0 +1,425 @@
+"""
+Optimization Rule Engine for AI Workbench
+
+This module compiles OptimizationRule conditions into plain Python
+predicates and evaluates the whole rule set against a metrics snapshot.
+
+Conditions are JSON documents built from these forms:
+
+    {"metric": "cpu_usage", "op": ">", "value": 80}      # single comparison
+    {"all": [<condition>, ...]}                           # logical AND
+    {"any": [<condition>, ...]}                           # logical OR
+    {"not": <condition>}                                  # negation
+    [<condition>, ...]                                    # shorthand for "all"
+    {"cpu_usage": {">": 80}, "memory_usage": {"<": 50}}   # shorthand for "all"
+    {"os": "windows"}                                     # shorthand for "=="
+
+Metric names are dotted paths into the snapshot ("disks.0.percent_used").
+A comparison against a missing or non-comparable metric is False.
+Conditions are never passed to ``eval``; unknown operators are rejected
+when the rule is compiled.
+"""
+
+import logging
+import operator
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Callable, FrozenSet, Iterable, Tuple
+
+from sqlalchemy import event
+
+from ..models.workbench_models import OptimizationRule
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Resolved metric values keyed by dotted path
+Values = Dict[str, Any]
+Predicate = Callable[[Values], bool]
+
+_MISSING = object()
+
+
+class RuleCompileError(ValueError):
+    """Raised when a rule condition cannot be compiled"""
+
+
+def _in(left: Any, right: Any) -> bool:
+    return left in right
+
+
+def _not_in(left: Any, right: Any) -> bool:
+    return left not in right
+
+
+def _between(left: Any, right: Any) -> bool:
+    low, high = right
+    return low <= left <= high
+
+
+def _contains(left: Any, right: Any) -> bool:
+    return right in left
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': _in,
+    'not_in': _not_in,
+    'between': _between,
+    'contains': _contains,
+}
+
+# Spelled-out aliases accepted in rule definitions
+OPERATOR_ALIASES = {
+    'gt': '>',
+    'gte': '>=',
+    'ge': '>=',
+    'lt': '<',
+    'lte': '<=',
+    'le': '<=',
+    'eq': '==',
+    '=': '==',
+    'ne': '!=',
+}
+
+# Bumped whenever an OptimizationRule row is written through the ORM
+_rules_version = 0
+_version_lock = threading.Lock()
+
+
+def get_rules_version() -> int:
+    """Get the current optimization rules version"""
+    return _rules_version
+
+
+def bump_rules_version() -> int:
+    """
+    Mark the optimization rules as changed
+
+    Returns:
+        int: The new rules version
+    """
+    global _rules_version
+    with _version_lock:
+        _rules_version += 1
+        return _rules_version
+
+
+@event.listens_for(OptimizationRule, 'after_insert')
+@event.listens_for(OptimizationRule, 'after_update')
+@event.listens_for(OptimizationRule, 'after_delete')
+def _on_rule_changed(mapper, connection, target) -> None:
+    """Invalidate compiled rule sets when a rule row changes"""
+    bump_rules_version()
+
+
+def resolve_metric(metrics: Dict[str, Any], path: str) -> Any:
+    """
+    Resolve a dotted metric path in a nested metrics snapshot
+
+    Args:
+        metrics: Metrics snapshot (nested dicts and lists)
+        path: Dotted path such as "disks.0.percent_used"
+
+    Returns:
+        The resolved value, or a sentinel if the path does not exist
+    """
+    if path in metrics:
+        return metrics[path]
+
+    value: Any = metrics
+    for part in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, (list, tuple)) and part.lstrip('-').isdigit():
+            index = int(part)
+            value = value[index] if -len(value) <= index < len(value) else _MISSING
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+@dataclass
+class CompiledRule:
+    """An optimization rule with its condition compiled to a predicate"""
+    id: Optional[int]
+    name: str
+    priority: int
+    predicate: Predicate
+    keys: FrozenSet[str]
+    rule: Dict[str, Any] = field(repr=False)
+
+
+class RuleCompiler:
+    """Compiles JSON rule conditions into predicates over resolved values"""
+
+    def compile(self, conditions: Any) -> Tuple[Predicate, FrozenSet[str]]:
+        """
+        Compile a condition document
+
+        Args:
+            conditions: Condition document (see module docstring)
+
+        Returns:
+            Tuple of (predicate, metric paths the predicate reads)
+
+        Raises:
+            RuleCompileError: If the document is malformed
+        """
+        if not conditions:
+            raise RuleCompileError("Rule has no conditions")
+        keys: set = set()
+        predicate = self._compile(conditions, keys)
+        return predicate, frozenset(keys)
+
+    def _compile(self, node: Any, keys: set) -> Predicate:
+        if isinstance(node, list):
+            return self._all([self._compile(child, keys) for child in node])
+
+        if not isinstance(node, dict):
+            raise RuleCompileError(f"Invalid condition: {node!r}")
+
+        if 'metric' in node:
+            return self._comparison(node.get('metric'), node.get('op', '=='), node.get('value'), keys)
+
+        if len(node) == 1:
+            (key, child), = node.items()
+            if key == 'all':
+                return self._all([self._compile(c, keys) for c in self._as_list(child)])
+            if key == 'any':
+                return self._any([self._compile(c, keys) for c in self._as_list(child)])
+            if key == 'not':
+                inner = self._compile(child, keys)
+                return lambda values: not inner(values)
+
+        # Mapping shorthand: {"metric": {"op": value, ...} | value, ...}
+        predicates = []
+        for metric, spec in node.items():
+            if isinstance(spec, dict):
+                for op, value in spec.items():
+                    predicates.append(self._comparison(metric, op, value, keys))
+            else:
+                predicates.append(self._comparison(metric, '==', spec, keys))
+        return self._all(predicates)
+
+    @staticmethod
+    def _as_list(node: Any) -> List[Any]:
+        if not isinstance(node, list):
+            raise RuleCompileError(f"Expected a list of conditions, got {node!r}")
+        return node
+
+    @staticmethod
+    def _all(predicates: List[Predicate]) -> Predicate:
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda values: all(p(values) for p in predicates)
+
+    @staticmethod
+    def _any(predicates: List[Predicate]) -> Predicate:
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda values: any(p(values) for p in predicates)
+
+    @staticmethod
+    def _comparison(metric: Any, op: Any, operand: Any, keys: set) -> Predicate:
+        if not isinstance(metric, str) or not metric:
+            raise RuleCompileError(f"Invalid metric name: {metric!r}")
+
+        op = OPERATOR_ALIASES.get(op, op)
+        compare = OPERATORS.get(op)
+        if compare is None:
+            raise RuleCompileError(f"Unknown operator {op!r} for metric {metric!r}")
+        if op == 'between' and (not isinstance(operand, (list, tuple)) or len(operand) != 2):
+            raise RuleCompileError(f"'between' needs a [low, high] pair for metric {metric!r}")
+        if op in ('in', 'not_in') and isinstance(operand, list):
+            try:
+                operand = frozenset(operand)
+            except TypeError:
+                pass
+
+        keys.add(metric)
+
+        def predicate(values: Values) -> bool:
+            value = values.get(metric, _MISSING)
+            if value is _MISSING or value is None:
+                return False
+            try:
+                return bool(compare(value, operand))
+            except TypeError:
+                return False
+
+        return predicate
+
+
+class RuleEngine:
+    """
+    Cached, incremental evaluator for the optimization rule set
+
+    The rule set is loaded and compiled once and kept until the rules
+    version changes. Each snapshot resolves every referenced metric path
+    once; only rules that read a changed value are re-evaluated, the rest
+    reuse their previous result.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Any]], max_age: Optional[float] = None):
+        """
+        Initialize the rule engine
+
+        Args:
+            loader: Callable returning the active rules (dicts or OptimizationRule rows)
+            max_age: Optional seconds after which the rules are reloaded even
+                     without a version change (for rules edited by other processes)
+        """
+        self._loader = loader
+        self.max_age = max_age
+        self._compiler = RuleCompiler()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._rules: List[CompiledRule] = []
+        self._index: Dict[str, List[int]] = {}
+        self._values: Values = {}
+        self._results: List[bool] = []
+        self._matched: set = set()
+        self.compile_errors = 0
+
+    @property
+    def rules(self) -> List[CompiledRule]:
+        """Compiled rules in evaluation (priority) order"""
+        self._ensure_loaded()
+        return list(self._rules)
+
+    def invalidate(self) -> None:
+        """Force the rule set to be reloaded on the next evaluation"""
+        with self._lock:
+            self._version = None
+
+    def compile_rule(self, rule: Any, quiet: bool = False) -> Optional[CompiledRule]:
+        """
+        Compile a single rule
+
+        Args:
+            rule: Rule dictionary or OptimizationRule instance
+            quiet: Log invalid conditions at DEBUG instead of ERROR
+
+        Returns:
+            The compiled rule, or None if its conditions are invalid
+        """
+        data = rule.to_dict() if hasattr(rule, 'to_dict') else dict(rule)
+        try:
+            predicate, keys = self._compiler.compile(data.get('conditions') or {})
+        except RuleCompileError as e:
+            logger.log(
+                logging.DEBUG if quiet else logging.ERROR,
+                f"Invalid conditions in optimization rule {data.get('name')!r}: {e}"
+            )
+            return None
+        return CompiledRule(
+            id=data.get('id'),
+            name=data.get('name', ''),
+            priority=data.get('priority') or 0,
+            predicate=predicate,
+            keys=keys,
+            rule=data
+        )
+
+    def _ensure_loaded(self) -> None:
+        version = get_rules_version()
+        expired = self.max_age is not None and time.monotonic() - self._loaded_at > self.max_age
+        if version == self._version and not expired:
+            return
+
+        rules = []
+        errors = 0
+        # Periodic reloads of the same version already reported invalid rules
+        quiet = version == self._version
+        for rule in self._loader():
+            compiled = self.compile_rule(rule, quiet=quiet)
+            if compiled is None:
+                errors += 1
+            else:
+                rules.append(compiled)
+        rules.sort(key=lambda r: (-r.priority, r.name))
+
+        index: Dict[str, List[int]] = {}
+        for position, compiled in enumerate(rules):
+            for key in compiled.keys:
+                index.setdefault(key, []).append(position)
+
+        self._rules = rules
+        self._index = index
+        self._values = {}
+        self._results = [False] * len(rules)
+        self._matched = set()
+        self.compile_errors = errors
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+        logger.debug(f"Compiled {len(rules)} optimization rules ({errors} invalid)")
+
+    def _set_result(self, position: int, matched: bool) -> None:
+        self._results[position] = matched
+        if matched:
+            self._matched.add(position)
+        else:
+            self._matched.discard(position)
+
+    @staticmethod
+    def _evaluate(compiled: CompiledRule, values: Values) -> bool:
+        try:
+            return compiled.predicate(values)
+        except Exception as e:
+            logger.error(f"Error evaluating optimization rule {compiled.name!r}: {e}")
+            return False
+
+    def evaluate(self, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Evaluate all active rules against a metrics snapshot
+
+        Args:
+            metrics: Current system metrics
+
+        Returns:
+            List of matching rule dictionaries in priority order
+        """
+        with self._lock:
+            self._ensure_loaded()
+
+            # Resolve every referenced metric once and find what changed
+            dirty = set()
+            previous = self._values
+            values: Values = {}
+            for key, positions in self._index.items():
+                value = resolve_metric(metrics, key)
+                values[key] = value
+                if key not in previous or previous[key] != value:
+                    dirty.update(positions)
+            self._values = values
+
+            rules = self._rules
+            for position in dirty:
+                self._set_result(position, self._evaluate(rules[position], values))
+
+            return [rules[i].rule for i in sorted(self._matched)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get rule engine statistics
+
+        Returns:
+            Dict with rule, key and compile error counts
+        """
+        return {
+            'version': self._version,
+            'rules': len(self._rules),
+            'indexed_keys': len(self._index),
+            'compile_errors': self.compile_errors,
+        }
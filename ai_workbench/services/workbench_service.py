@@ -6,14 +6,16 @@ including system monitoring, health checks, and optimizations.
 """
 
 import time
+import queue
 import threading
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, List, Callable, Tuple
 
 # Import database service and models
 from .database_service import WorkbenchDatabaseService
-from ..models.workbench_models import SystemMetric, SystemAction, FailurePrediction, OptimizationRule
+from .rule_engine import RuleEngine, resolve_metric
+from ..models.workbench_models import SystemAction, FailurePrediction
 from ..utils import system_utils
 from ..config import config
 
@@ -21,13 +23,195 @@ from ..config import config
 logger = logging.getLogger(__name__)
 
 
+class LatencyStats:
+    """Running latency summary (count, last, average and max seconds)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float) -> None:
+        """
+        Record one observation
+        
+        Args:
+            seconds: Observed duration in seconds
+        """
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Convert the summary to a dictionary"""
+        return {
+            'count': self.count,
+            'last': self.last,
+            'avg': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+        }
+
+
+class PipelineStage:
+    """
+    One stage of the monitoring pipeline
+    
+    Samples are handed over through a bounded queue and processed by a
+    dedicated worker thread, so a slow stage only ever delays itself. When
+    the queue is full the oldest pending sample is discarded: a stage that
+    cannot keep up should work on fresh data rather than a growing backlog.
+    Stages whose samples must not be lost silently pass ``on_drop``.
+    """
+    
+    def __init__(self, name: str, handler: Callable[[Dict[str, Any]], None], maxsize: int = 8,
+                 on_drop: Optional[Callable[[Dict[str, Any], int], None]] = None):
+        """
+        Initialize the stage
+        
+        Args:
+            name: Stage name used for the thread name and in stats
+            handler: Callable processing one metrics sample
+            maxsize: Maximum number of pending samples
+            on_drop: Called with each discarded sample and the total number
+                     of drops so far
+        """
+        self.name = name
+        self.handler = handler
+        self.on_drop = on_drop
+        self._queue: "queue.Queue[Tuple[float, Dict[str, Any]]]" = queue.Queue(maxsize=max(1, maxsize))
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.latency = LatencyStats()
+        self.queue_wait = LatencyStats()
+    
+    def start(self) -> None:
+        """Start the worker thread"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"AIWorkbenchStage-{self.name}",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def submit(self, metrics: Dict[str, Any]) -> bool:
+        """
+        Queue a sample without blocking
+        
+        Args:
+            metrics: Metrics sample to process
+            
+        Returns:
+            bool: True if queued without displacing an older sample
+        """
+        item = (time.monotonic(), metrics)
+        discarded = []
+        with self._lock:
+            self.submitted += 1
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+            
+            # Displace the oldest pending sample
+            try:
+                discarded.append(self._queue.get_nowait()[1])
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                discarded.append(metrics)
+            self.dropped += len(discarded)
+            dropped = self.dropped
+        
+        if self.on_drop is not None:
+            for sample in discarded:
+                self.on_drop(sample, dropped)
+        return False
+    
+    def _run(self) -> None:
+        """Worker loop; drains pending samples before exiting on stop"""
+        while True:
+            try:
+                enqueued, metrics = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    return
+                continue
+            
+            started = time.monotonic()
+            failed = False
+            try:
+                self.handler(metrics)
+            except Exception as e:
+                failed = True
+                logger.error(f"Error in {self.name} stage: {e}", exc_info=True)
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    if failed:
+                        self.errors += 1
+                    self.queue_wait.record(started - enqueued)
+                    self.latency.record(finished - started)
+    
+    def stop(self) -> None:
+        """Ask the worker to exit once pending samples are processed"""
+        self._stop_event.set()
+    
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for the worker thread to exit
+        
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+        """
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get stage statistics
+        
+        Returns:
+            Dict with counters, backlog, queue wait and handler latency
+        """
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'backlog': self._queue.qsize(),
+                'queue_wait': self.queue_wait.to_dict(),
+                'latency': self.latency.to_dict(),
+            }
+
+
 class AIWorkbenchService:
     """
     Main service class for the AI Workbench
     
     Handles system monitoring, health checks, and optimizations.
+    
+    Metrics are collected on a fixed-rate monotonic schedule and fanned out
+    to independent pipeline stages (persistence, health checks, optimization
+    rules and predictive analysis), each running on its own worker thread.
+    Stored metrics are rolled up and expired by a maintenance stage on a
+    slower schedule.
     """
     
+    # Seconds before optimization rules are reloaded even without a local
+    # version bump, so edits made by other processes are picked up
+    RULES_MAX_AGE = 60.0
+    
     def __init__(self, monitoring_interval: int = 300):
         """
         Initialize the AI Workbench service
@@ -38,7 +222,14 @@ class AIWorkbenchService:
         self.monitoring_interval = monitoring_interval
         self._running = False
         self._monitor_thread = None
+        self._stop_event = threading.Event()
+        self._stages: Dict[str, PipelineStage] = {}
+        self._collect_latency = LatencyStats()
+        self._ticks = 0
+        self._missed_ticks = 0
+        self._next_maintenance = 0.0
         self._db_service = WorkbenchDatabaseService()
+        self._rule_engine = RuleEngine(self._db_service.get_optimization_rules, max_age=self.RULES_MAX_AGE)
         self._callbacks = {
             'on_metric': [],
             'on_action': [],
@@ -97,6 +288,12 @@ class AIWorkbenchService:
             return False
             
         self._running = True
+        self._stop_event.clear()
+        self._next_maintenance = time.monotonic()
+        self._stages = self._create_stages()
+        for stage in self._stages.values():
+            stage.start()
+        
         self._monitor_thread = threading.Thread(
             target=self._monitor_loop,
             name="AIWorkbenchMonitor",
@@ -113,59 +310,121 @@ class AIWorkbenchService:
             return
             
         self._running = False
+        self._stop_event.set()
         
         if self._monitor_thread and self._monitor_thread.is_alive():
             self._monitor_thread.join(timeout=5)
         
+        # Stop all stages first so they drain in parallel, sharing one deadline
+        for stage in self._stages.values():
+            stage.stop()
+        deadline = time.monotonic() + 5
+        for stage in self._stages.values():
+            stage.join(timeout=max(0.0, deadline - time.monotonic()))
+        
         logger.info("Stopped AI Workbench monitoring")
     
+    def _create_stages(self) -> Dict[str, PipelineStage]:
+        """
+        Create the pipeline stages fed by each collected sample
+        
+        Returns:
+            Dict mapping stage names to (not yet started) stages
+        """
+        maxsize = config.monitoring.stage_queue_size
+        handlers = {
+            'persist': self._persist_metrics,
+            'health': self._run_health_stage,
+            'optimize': self._run_optimizations,
+            'predict': self._run_predictive_analysis,
+            'maintain': self._maintain_metrics,
+        }
+        drop_handlers = {'persist': self._report_persist_drop}
+        return {
+            name: PipelineStage(name, handler, maxsize=maxsize, on_drop=drop_handlers.get(name))
+            for name, handler in handlers.items()
+        }
+    
     def _monitor_loop(self) -> None:
-        """Main monitoring loop"""
+        """
+        Main monitoring loop
+        
+        Ticks are scheduled on a fixed grid of the monotonic clock, so the
+        time spent collecting does not accumulate as drift. When a cycle
+        overruns, the missed ticks are skipped instead of run back to back.
+        """
         logger.info("Starting monitoring loop")
         
         try:
+            next_tick = time.monotonic()
             while self._running:
-                cycle_start = time.time()
+                self._run_cycle()
                 
-                try:
-                    # Collect and process system metrics
-                    metrics = self._collect_metrics()
-                    self._process_metrics(metrics)
-                    
-                    # Run health checks
-                    self._run_health_checks(metrics)
-                    
-                    # Run optimizations if enabled
-                    if config.optimization.auto_optimize:
-                        self._run_optimizations(metrics)
-                    
-                    # Run predictive analysis if enabled
-                    if config.predictive_analysis.enabled:
-                        self._run_predictive_analysis(metrics)
-                    
-                except Exception as e:
-                    logger.error(f"Error in monitoring cycle: {e}", exc_info=True)
-                    self._trigger_callbacks('on_error', {
-                        'timestamp': datetime.utcnow(),
-                        'error': str(e),
-                        'context': 'monitoring_cycle'
-                    })
-                
-                # Calculate sleep time to maintain the monitoring interval
-                cycle_time = time.time() - cycle_start
-                sleep_time = max(0, self.monitoring_interval - cycle_time)
+                next_tick += self.monitoring_interval
+                now = time.monotonic()
+                if now > next_tick:
+                    missed = int((now - next_tick) // self.monitoring_interval) + 1
+                    self._missed_ticks += missed
+                    next_tick += missed * self.monitoring_interval
+                    logger.warning(f"Monitoring cycle overran; skipped {missed} tick(s)")
                 
-                # Sleep in small chunks to allow for graceful shutdown
-                for _ in range(int(sleep_time)):
-                    if not self._running:
-                        break
-                    time.sleep(1)
+                # Wakes up immediately on stop_monitoring()
+                if self._stop_event.wait(next_tick - time.monotonic()):
+                    break
                 
         except Exception as e:
             logger.critical(f"Fatal error in monitoring loop: {e}", exc_info=True)
             self._running = False
             raise
     
+    def _run_cycle(self) -> None:
+        """Collect one sample and hand it to the pipeline stages"""
+        started = time.monotonic()
+        try:
+            metrics = self._collect_metrics()
+        except Exception as e:
+            logger.error(f"Error in monitoring cycle: {e}", exc_info=True)
+            self._trigger_callbacks('on_error', {
+                'timestamp': datetime.utcnow(),
+                'error': str(e),
+                'context': 'monitoring_cycle'
+            })
+            return
+        finally:
+            self._collect_latency.record(time.monotonic() - started)
+            self._ticks += 1
+        
+        self._stages['persist'].submit(metrics)
+        self._stages['health'].submit(metrics)
+        
+        # Run optimizations if enabled
+        if config.optimization.auto_optimize:
+            self._stages['optimize'].submit(metrics)
+        
+        # Run predictive analysis if enabled
+        if config.predictive_analysis.enabled:
+            self._stages['predict'].submit(metrics)
+        
+        # Roll up and expire stored metrics on their own, slower schedule
+        if started >= self._next_maintenance:
+            self._next_maintenance = started + config.monitoring.maintenance_interval
+            self._stages['maintain'].submit(metrics)
+    
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduling and per-stage latency statistics
+        
+        Returns:
+            Dict with tick counters, collection latency and stage statistics
+        """
+        return {
+            'interval': self.monitoring_interval,
+            'ticks': self._ticks,
+            'missed_ticks': self._missed_ticks,
+            'collect': self._collect_latency.to_dict(),
+            'stages': {name: stage.get_stats() for name, stage in self._stages.items()},
+        }
+    
     def _collect_metrics(self) -> Dict[str, Any]:
         """
         Collect system metrics
@@ -176,26 +435,117 @@ class AIWorkbenchService:
         logger.debug("Collecting system metrics")
         
         try:
-            # Get system metrics
-            metrics = system_utils.get_system_metrics()
+            return system_utils.get_system_metrics()
             
-            # Save to database
-            metric = SystemMetric(**metrics)
-            self._db_service.save_metric(metric)
+        except Exception as e:
+            logger.error(f"Error collecting metrics: {e}", exc_info=True)
+            self._trigger_callbacks('on_error', {
+                'timestamp': datetime.utcnow(),
+                'error': str(e),
+                'context': 'collect_metrics'
+            })
+            raise
+    
+    def _persist_metrics(self, metrics: Dict[str, Any]) -> None:
+        """
+        Save collected metrics to the database
+        
+        Args:
+            metrics: Dictionary of collected metrics
+        """
+        try:
+            metric = self._db_service.save_system_metric(self._metric_record(metrics))
+            if metric is None:
+                raise RuntimeError("Database rejected the metric sample")
             
             # Trigger callbacks
             self._trigger_callbacks('on_metric', metric.to_dict())
             
-            return metrics
-            
         except Exception as e:
-            logger.error(f"Error collecting metrics: {e}", exc_info=True)
+            logger.error(f"Error saving metrics: {e}", exc_info=True)
             self._trigger_callbacks('on_error', {
                 'timestamp': datetime.utcnow(),
                 'error': str(e),
-                'context': 'collect_metrics'
+                'context': 'persist_metrics'
             })
-            raise
+    
+    @staticmethod
+    def _metric_record(metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Map a collected sample onto the system_metrics columns
+        
+        Flat keys (``cpu_usage``, ...) are used as they are; otherwise the
+        values are taken from the nested sections of get_system_metrics().
+        Without a reported health score, it is 100 minus the highest usage
+        percentage.
+        
+        Args:
+            metrics: Dictionary of collected metrics
+            
+        Returns:
+            Dictionary accepted by save_system_metric()
+        """
+        cpu = metrics.get('cpu') or {}
+        memory = metrics.get('memory') or {}
+        disk = metrics.get('disk') or {}
+        record = {
+            'cpu_usage': metrics.get('cpu_usage', cpu.get('percent')),
+            'memory_usage': metrics.get('memory_usage', memory.get('percent')),
+            'disk_usage': metrics.get('disk_usage', disk.get('percent')),
+            'disk_space': metrics.get('disk_space'),
+            'temp_files_size': metrics.get('temp_files_size'),
+        }
+        if record['disk_space'] is None and disk.get('free') is not None:
+            record['disk_space'] = disk['free'] / 1024 ** 3
+        
+        health_score = metrics.get('health_score')
+        if health_score is None:
+            usages = [record[key] for key in ('cpu_usage', 'memory_usage', 'disk_usage') if record[key] is not None]
+            health_score = 100.0 - max(usages, default=0.0)
+        record['health_score'] = health_score
+        
+        timestamp = metrics.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if timestamp is not None:
+            record['timestamp'] = timestamp
+        return record
+    
+    def _report_persist_drop(self, metrics: Dict[str, Any], dropped: int) -> None:
+        """
+        Report a sample the persist stage discarded before storing it
+        
+        Args:
+            metrics: The discarded sample
+            dropped: Samples discarded by the stage so far
+        """
+        logger.warning(f"Persist stage is falling behind; dropped {dropped} sample(s) so far")
+        self._trigger_callbacks('on_error', {
+            'timestamp': datetime.utcnow(),
+            'error': f"Metric sample from {metrics.get('timestamp')} dropped before storage",
+            'context': 'persist_metrics',
+            'dropped': dropped
+        })
+    
+    def _maintain_metrics(self, metrics: Dict[str, Any]) -> None:
+        """
+        Roll up closed metric buckets and delete rows past their retention
+        
+        Args:
+            metrics: Sample that triggered the pass (unused)
+        """
+        result = self._db_service.maintain_metrics()
+        logger.debug(f"Metric maintenance: {result}")
+    
+    def _run_health_stage(self, metrics: Dict[str, Any]) -> None:
+        """
+        Process metrics and run health checks for one sample
+        
+        Args:
+            metrics: Dictionary of collected metrics
+        """
+        self._process_metrics(metrics)
+        self._run_health_checks(metrics)
     
     def _process_metrics(self, metrics: Dict[str, Any]) -> None:
         """
@@ -259,13 +609,9 @@ class AIWorkbenchService:
         logger.debug("Running optimizations")
         
         try:
-            # Get active optimization rules
-            rules = self._db_service.get_active_optimization_rules()
-            
-            for rule in rules:
-                # Check if rule conditions are met
-                if self._evaluate_rule_conditions(rule, metrics):
-                    self._apply_optimization_rule(rule, metrics)
+            # Compiled rules are cached until the rules table changes
+            for rule in self._rule_engine.evaluate(metrics):
+                self._apply_optimization_rule(rule, metrics)
                     
         except Exception as e:
             logger.error(f"Error in optimizations: {e}", exc_info=True)
@@ -301,26 +647,28 @@ class AIWorkbenchService:
                 'context': 'predictive_analysis'
             })
     
-    def _evaluate_rule_conditions(self, rule: OptimizationRule, metrics: Dict[str, Any]) -> bool:
+    def _evaluate_rule_conditions(self, rule: Any, metrics: Dict[str, Any]) -> bool:
         """
         Evaluate if optimization rule conditions are met
         
         Args:
-            rule: Optimization rule to evaluate
+            rule: Optimization rule (or rule dictionary) to evaluate
             metrics: Current system metrics
             
         Returns:
             bool: True if conditions are met, False otherwise
         """
-        # TODO: Implement rule condition evaluation
-        return False
+        compiled = self._rule_engine.compile_rule(rule)
+        if compiled is None:
+            return False
+        return compiled.predicate({key: resolve_metric(metrics, key) for key in compiled.keys})
     
-    def _apply_optimization_rule(self, rule: OptimizationRule, metrics: Dict[str, Any]) -> None:
+    def _apply_optimization_rule(self, rule: Dict[str, Any], metrics: Dict[str, Any]) -> None:
         """
         Apply an optimization rule
         
         Args:
-            rule: Optimization rule to apply
+            rule: Dictionary of the optimization rule to apply
             metrics: Current system metrics
         """
         # TODO: Implement rule application
@@ -59,7 +59,8 @@ def setup_logger(
     max_bytes: int = 10 * 1024 * 1024,  # 10MB
     backup_count: int = 5,
     log_format: Optional[str] = None,
-    date_format: Optional[str] = None
+    date_format: Optional[str] = None,
+    structured_log_dir: Optional[Union[str, Path]] = None
 ) -> logging.Logger:
     """
     Set up a logger with console and optional file handlers
@@ -73,6 +74,8 @@ def setup_logger(
         backup_count: Number of backup log files to keep
         log_format: Custom log format string
         date_format: Custom date format string
+        structured_log_dir: Directory for indexed NDJSON log segments that can
+            be queried with core.log_store.LogStore (if None, not written)
         
     Returns:
         Configured logger instance
@@ -118,6 +121,11 @@ def setup_logger(
         file_handler.setFormatter(file_formatter)
         logger.addHandler(file_handler)
     
+    # Add structured log segments if a directory is specified
+    if structured_log_dir:
+        from core.log_store import StructuredLogHandler
+        logger.addHandler(StructuredLogHandler(structured_log_dir))
+    
     return logger
 
 
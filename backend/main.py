@@ -2,22 +2,32 @@
 MEGA OPRYXX Backend API
 FastAPI-based backend for the MEGA OPRYXX system
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import uvicorn
 import json
 import asyncio
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import psutil
 import platform
 import os
+import sys
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.streaming import MetricStream, StreamSubscriber
+
 # Configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variables
 ALGORITHM = "HS256"
@@ -33,8 +43,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
+# Compress larger responses (task lists) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -74,27 +88,409 @@ fake_users_db = {
     }
 }
 
+class TaskStore:
+    """
+    In-memory task store (replace with real database in production)
+
+    Every change bumps ``version``, which is the list ETag, so conditional
+    list requests are answered without serializing anything.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, Dict] = {}
+        self.revisions: Dict[str, int] = {}
+        self.version = 0
+        self.last_modified = time.time()
+
+    def _touch(self, task_id: str):
+        self.version += 1
+        self.revisions[task_id] = self.version
+        self.last_modified = time.time()
+
+    @property
+    def etag(self) -> str:
+        return f'W/"tasks-{self.version}"'
+
+    def task_etag(self, task_id: str) -> str:
+        return f'W/"task-{task_id}-{self.revisions[task_id]}"'
+
+    def list(self, status: Optional[str] = None, ids: Optional[List[str]] = None) -> List[Dict]:
+        if ids is not None:
+            tasks = [self.tasks[task_id] for task_id in ids if task_id in self.tasks]
+        else:
+            tasks = list(self.tasks.values())
+        if status:
+            tasks = [task for task in tasks if task.get("status") == status]
+        return tasks
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        return self.tasks.get(task_id)
+
+    def create(self, data: Dict) -> Dict:
+        task_id = str(data.get("id") or uuid.uuid4().hex)
+        if task_id in self.tasks:
+            raise KeyError(task_id)
+        now = datetime.utcnow().isoformat()
+        task = {**data, "id": task_id, "created_at": data.get("created_at", now), "updated_at": now}
+        self.tasks[task_id] = task
+        self._touch(task_id)
+        return task
+
+    def update(self, task_id: str, data: Dict) -> Optional[Dict]:
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        task.update({**data, "id": task_id, "updated_at": datetime.utcnow().isoformat()})
+        self._touch(task_id)
+        return task
+
+    def delete(self, task_id: str) -> bool:
+        if self.tasks.pop(task_id, None) is None:
+            return False
+        self.revisions.pop(task_id, None)
+        self.version += 1
+        self.last_modified = time.time()
+        return True
+
+task_store = TaskStore()
+
+# Conditional requests
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Whether the client's cached copy is current (If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def conditional_response(
+    request: Request,
+    etag: str,
+    render,
+    last_modified: Optional[float] = None
+) -> Response:
+    """
+    Answer with 304 when the client's copy is current, else render the body
+
+    Args:
+        request: Incoming request carrying the conditional headers
+        etag: Current (weak) ETag of the resource
+        render: Callable returning the JSON body as str or bytes; only
+            called when a full response is needed
+        last_modified: Modification time of the resource, if known
+
+    Returns:
+        A 304 or 200 response carrying ETag and validation headers
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=render(), media_type="application/json", headers=headers)
+
 # WebSocket Manager
+class ClientConnection:
+    """A connected client with its own bounded send queue"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """
+    Fan-out broadcaster for WebSocket clients
+
+    Every client gets a bounded queue drained by its own sender task, so a
+    broadcast never waits on the network. When a client's queue is full the
+    oldest pending message is dropped in favour of the newest one; a client
+    whose send takes longer than ``send_timeout`` is disconnected.
+    """
+
+    def __init__(self, queue_size: int = 8, send_timeout: float = 5.0):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.messages = 0
+        self.dropped_messages = 0
+        self.dropped_clients = 0
 
-    async def connect(self, websocket: WebSocket):
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def connect(self, websocket: WebSocket, initial_message: Optional[str] = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.queue_size)
+        if initial_message is not None:
+            client.queue.put_nowait(initial_message)
+        client.sender = asyncio.create_task(self._sender(client))
+        self.clients[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if client and client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
+        """Queue an already serialized message for every client"""
+        self.messages += 1
+        for client in list(self.clients.values()):
+            self._enqueue(client, message)
+
+    def _enqueue(self, client: ClientConnection, message: str):
+        if client.queue.full():
+            # Newer status supersedes older; drop the oldest pending message
+            client.queue.get_nowait()
+            client.dropped += 1
+            self.dropped_messages += 1
+        client.queue.put_nowait(message)
+
+    async def _sender(self, client: ClientConnection):
+        try:
+            while True:
+                message = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+                client.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._drop(client, e)
+
+    async def _drop(self, client, error: Exception):
+        logging.error(f"Dropping slow or failed WebSocket client: {error}")
+        self.dropped_clients += 1
+        self.disconnect(client.websocket)
+        try:
+            await client.websocket.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        """Disconnect every client and wait for the sender tasks to finish"""
+        senders = [client.sender for client in self.clients.values() if client.sender]
+        for websocket in list(self.clients):
+            self.disconnect(websocket)
+        await asyncio.gather(*senders, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            'clients': len(self.clients),
+            'messages': self.messages,
+            'dropped_messages': self.dropped_messages,
+            'dropped_clients': self.dropped_clients,
+            'queued': sum(client.queue.qsize() for client in self.clients.values())
+        }
+
+class StreamConnection:
+    """A client of the delta stream; changes are pulled, not queued"""
+
+    def __init__(self, websocket: WebSocket, subscriber: StreamSubscriber):
+        self.websocket = websocket
+        self.subscriber = subscriber
+        self.wake = asyncio.Event()
+        self.sender: Optional[asyncio.Task] = None
+        self.sent = 0
+
+class StreamManager(ConnectionManager):
+    """
+    Delta stream fan-out over a shared MetricStream
+
+    ``notify`` only wakes the sender tasks; each sender then asks its
+    subscriber for the update since the last message it sent. A slow or
+    rate-limited client therefore receives one coalesced delta rather
+    than a backlog, and clients that are in step share one encoded
+    message per change.
+    """
+
+    def __init__(self, stream: MetricStream, send_timeout: float = 5.0):
+        super().__init__(send_timeout=send_timeout)
+        self.stream = stream
+
+    async def connect(self, websocket: WebSocket, subscriber: StreamSubscriber):
+        await websocket.accept()
+        client = StreamConnection(websocket, subscriber)
+        client.sender = asyncio.create_task(self._sender(client))
+        self.clients[websocket] = client
+        # Send the keyframe straight away
+        client.wake.set()
+
+    def notify(self, websocket: Optional[WebSocket] = None):
+        """Wake one client, or all of them, to check for changes"""
+        if websocket is not None:
+            client = self.clients.get(websocket)
+            if client:
+                client.wake.set()
+            return
+        self.messages += 1
+        for client in self.clients.values():
+            client.wake.set()
+
+    async def _sender(self, client: StreamConnection):
+        try:
+            while True:
+                await client.wake.wait()
+                delay = client.subscriber.delay()
+                if delay:
+                    await asyncio.sleep(delay)
+                # Changes published from here on wake the sender again
+                client.wake.clear()
+                message = client.subscriber.poll()
+                if message is None:
+                    continue
+                if isinstance(message, bytes):
+                    send = client.websocket.send_bytes(message)
+                else:
+                    send = client.websocket.send_text(message)
+                await asyncio.wait_for(send, self.send_timeout)
+                client.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._drop(client, e)
+
+    def get_stats(self) -> Dict:
+        subscribers = [client.subscriber for client in self.clients.values()]
+        return {
+            'clients': len(self.clients),
+            'notifications': self.messages,
+            'dropped_clients': self.dropped_clients,
+            'messages': sum(subscriber.messages for subscriber in subscribers),
+            'keyframes': sum(subscriber.keyframes for subscriber in subscribers),
+            'bytes': sum(subscriber.bytes for subscriber in subscribers),
+            'stream': self.stream.get_stats()
+        }
+
+manager = ConnectionManager()
+stream_manager = StreamManager(MetricStream(precision=1))
+
+# System status sampling
+def status_groups(status: SystemStatus) -> Dict[str, Dict]:
+    """Split a status snapshot into the metric groups clients subscribe to"""
+    return {
+        'cpu': {'percent': status.cpu_percent},
+        'memory': {'percent': status.memory_percent},
+        'disk': {'percent': status.disk_percent},
+        'system': {'boot_time': status.boot_time, 'users': status.users}
+    }
+
+def collect_system_status() -> SystemStatus:
+    """Read system metrics; blocking, so call it off the event loop"""
+    # interval=None compares against the previous call instead of sleeping
+    cpu_percent = psutil.cpu_percent(interval=None)
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    boot_time = datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
+
+    # Get logged in users
+    users = [user.name for user in psutil.users()]
+
+    return SystemStatus(
+        cpu_percent=cpu_percent,
+        memory_percent=memory.percent,
+        disk_percent=disk.percent,
+        boot_time=boot_time,
+        users=users
+    )
+
+class StatusSampler:
+    """
+    Single background task that samples system status once per tick
+
+    The snapshot is collected in a worker thread, serialized once and
+    handed to the connection manager, so the cost of a tick does not
+    depend on the number of connected clients.
+    """
+
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        interval: float = 1.0,
+        stream_manager: Optional[StreamManager] = None
+    ):
+        self.manager = connection_manager
+        self.stream_manager = stream_manager
+        self.interval = interval
+        self.latest: Optional[SystemStatus] = None
+        self.latest_message: Optional[str] = None
+        self.latest_etag: Optional[str] = None
+        self.latest_time: Optional[float] = None
+        self.ticks = 0
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            # Prime cpu_percent so the first tick has a reference point
+            psutil.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
             try:
-                await connection.send_text(message)
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sample(self) -> SystemStatus:
+        """Collect one snapshot off the event loop and publish it"""
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, collect_system_status)
+        self.latest = snapshot
+        self.latest_message = json.dumps(snapshot.dict())
+        self.latest_etag = f'W/"{hashlib.blake2b(self.latest_message.encode(), digest_size=8).hexdigest()}"'
+        self.latest_time = time.time()
+        self.ticks += 1
+        await self.manager.broadcast(self.latest_message)
+        if self.stream_manager and self.stream_manager.stream.publish(status_groups(snapshot)):
+            self.stream_manager.notify()
+        return snapshot
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            try:
+                await self.sample()
             except Exception as e:
-                logging.error(f"Error broadcasting message: {e}")
-                self.active_connections.remove(connection)
+                self.errors += 1
+                logging.error(f"Error sampling system status: {e}")
+            # Fixed-rate schedule; skip ticks rather than bunching them up
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
 
-manager = ConnectionManager()
+sampler = StatusSampler(manager, stream_manager=stream_manager)
 
 # Authentication functions
 def verify_password(plain_password, hashed_password):
@@ -166,41 +562,136 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/system/status")
-async def get_system_status():
+@app.on_event("startup")
+async def start_status_sampler():
+    sampler.start()
+
+@app.on_event("shutdown")
+async def stop_status_sampler():
+    await sampler.stop()
+    await manager.close()
+    await stream_manager.close()
+
+@app.get("/system/status", response_model=SystemStatus)
+async def get_system_status(request: Request):
     """Get current system status"""
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        boot_time = datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Get logged in users
-        users = [user.name for user in psutil.users()]
-        
-        return SystemStatus(
-            cpu_percent=cpu_percent,
-            memory_percent=memory.percent,
-            disk_percent=disk.percent,
-            boot_time=boot_time,
-            users=users
+        if not sampler.running or sampler.latest is None:
+            await sampler.sample()
+        # Serialized and hashed once per sampler tick
+        return conditional_response(
+            request, sampler.latest_etag, lambda: sampler.latest_message, sampler.latest_time
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Task endpoints
+@app.get("/tasks")
+async def list_tasks(request: Request, status: Optional[str] = None, ids: Optional[str] = None):
+    """List tasks, optionally filtered by status or a comma-separated list of ids"""
+    id_list = [task_id for task_id in ids.split(",") if task_id] if ids is not None else None
+    return conditional_response(
+        request,
+        task_store.etag,
+        lambda: json.dumps(task_store.list(status, id_list), default=str),
+        task_store.last_modified
+    )
+
+@app.get("/tasks/{task_id}")
+async def get_task(request: Request, task_id: str):
+    task = task_store.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return conditional_response(
+        request, task_store.task_etag(task_id), lambda: json.dumps(task, default=str)
+    )
+
+@app.post("/tasks", status_code=status.HTTP_201_CREATED)
+async def create_task(task: Dict):
+    try:
+        return task_store.create(task)
+    except KeyError:
+        raise HTTPException(status_code=409, detail="Task already exists")
+
+@app.put("/tasks/{task_id}")
+async def update_task(task_id: str, updates: Dict):
+    task = task_store.update(task_id, updates)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@app.delete("/tasks/{task_id}")
+async def delete_task(task_id: str):
+    if not task_store.delete(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"deleted": task_id}
+
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws/status")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    # Updates are pushed by the sampler; the latest snapshot goes out first
+    await manager.connect(websocket, sampler.latest_message)
     try:
         while True:
-            # Send system status every second
-            status = await get_system_status()
-            await websocket.send_json(status.dict())
-            await asyncio.sleep(1)
+            await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
+# Delta-encoded stream: keyframe first, then only changed fields
+@app.websocket("/ws/stream")
+async def stream_endpoint(
+    websocket: WebSocket,
+    groups: Optional[str] = None,
+    encoding: str = "json",
+    min_interval: float = 0.0
+):
+    """
+    Subscription-filtered metric stream
+
+    Query parameters select comma-separated ``groups`` (cpu, memory, disk,
+    system), the ``encoding`` (json or msgpack) and a per-client
+    ``min_interval`` in seconds. Clients may send
+    ``{"action": "subscribe", "groups": [...]}`` or ``{"action": "resync"}``.
+    """
+    try:
+        subscriber = StreamSubscriber(
+            stream_manager.stream,
+            groups=groups.split(",") if groups else None,
+            encoding=encoding,
+            min_interval=max(0.0, min_interval)
+        )
+    except ValueError as e:
+        logging.error(f"Rejecting stream client: {e}")
+        await websocket.close(code=1008)
+        return
+
+    await stream_manager.connect(websocket, subscriber)
+    try:
+        while True:
+            try:
+                request = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            action = request.get("action") if isinstance(request, dict) else None
+            if action == "subscribe":
+                subscriber.subscribe(request.get("groups"))
+            elif action == "resync":
+                subscriber.resync()
+            else:
+                continue
+            stream_manager.notify(websocket)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_manager.disconnect(websocket)
+
+@app.get("/ws/stream/stats")
+async def get_stream_stats():
+    """Fan-out and encoding statistics for the status streams"""
+    return {"status": manager.get_stats(), "stream": stream_manager.get_stats()}
+
 # Run the server
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
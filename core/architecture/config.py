@@ -42,6 +42,10 @@ class DatabaseConfig:
     max_overflow: int = 10
     pool_timeout: int = 30
     pool_recycle: int = 1800
+    # Read-only replica URLs; reads are spread round-robin across them
+    read_replicas: List[str] = field(default_factory=list)
+    # SQLite PRAGMA overrides applied on every new connection
+    sqlite_pragmas: Dict[str, Union[str, int]] = field(default_factory=dict)
     
     @property
     def url(self) -> str:
@@ -3,12 +3,16 @@ Database Module
 Handles database connections and session management
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, StaticPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import itertools
 import logging
+import threading
+import time
 
 from .config import ConfigManager
 from models.base import Base
@@ -19,38 +23,460 @@ logger = logging.getLogger("OPRYXX.Database")
 # Global session factory
 SessionLocal = None
 
+# PRAGMAs applied to every new SQLite connection. WAL lets readers run
+# concurrently with the single writer; NORMAL sync is durable in WAL mode
+# except for the last transactions on power loss.
+DEFAULT_SQLITE_PRAGMAS: Dict[str, Any] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,  # KiB
+}
+
+# PRAGMAs that a read-only connection cannot (or need not) set
+_SQLITE_WRITE_PRAGMAS = ('journal_mode', 'synchronous')
+
+# Checkout wait histogram bounds in seconds
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    """Connection pool health counters for one engine"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(POOL_WAIT_BUCKETS)
+    
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        """Record how long a checkout waited for a connection"""
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+            if timed_out:
+                self.timeouts += 1
+            for i, bound in enumerate(POOL_WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+    
+    def increment(self, counter: str) -> None:
+        """Increment one of the event counters"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def snapshot(self, pool: Any = None) -> Dict[str, Any]:
+        """
+        Get a consistent copy of the counters plus the pool's current state
+        
+        Args:
+            pool: The engine's pool, for size and checked-out gauges
+        """
+        with self._lock:
+            data = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_count': self.wait_count,
+                'wait_total': self.wait_total,
+                'wait_avg': self.wait_total / self.wait_count if self.wait_count else 0.0,
+                'wait_max': self.wait_max,
+                'wait_buckets': list(itertools.accumulate(self.wait_buckets)),
+            }
+        
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            data.update({
+                'size': pool.size(),
+                'checked_out': checked_out,
+                'overflow': pool.overflow(),
+                'capacity': capacity,
+                'saturation': checked_out / capacity if capacity else 0.0,
+            })
+        else:
+            data.update({'size': 1, 'checked_out': 0, 'overflow': 0, 'capacity': 1, 'saturation': 0.0})
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waits for a connection"""
+    
+    stats: Optional[PoolStats] = None
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - started)
+        return connection
+    
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def _is_sqlite_memory(url) -> bool:
+    database = url.database or ''
+    return database in ('', ':memory:') or 'mode=memory' in database or url.query.get('mode') == 'memory'
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of engines keyed by URL and role
+    
+    Every URL gets one engine (and so one pool) per role, with pool
+    settings chosen for its dialect, SQLite PRAGMAs applied on connect and
+    pool health counters attached. Reads can be routed to replicas, or for
+    SQLite files to a separate read-only pool that does not compete with
+    writers for connections.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._engines: Dict[Tuple[str, str], Engine] = {}
+        self._stats: Dict[str, Tuple[PoolStats, Engine]] = {}
+        self._replicas: Dict[str, List[Engine]] = {}
+        self._round_robin: Dict[str, Iterator[Engine]] = {}
+        self._collector = None
+    
+    @staticmethod
+    def engine_options(url: str, readonly: bool = False, pool_size: int = 5,
+                       max_overflow: int = 10, pool_timeout: int = 30,
+                       pool_recycle: int = 1800) -> Dict[str, Any]:
+        """
+        Get create_engine() pool options suited to the URL's dialect
+        
+        Args:
+            url: Database URL
+            readonly: Whether the engine only serves reads
+            pool_size: Persistent connections for server databases
+            max_overflow: Extra connections allowed under load
+            pool_timeout: Seconds a checkout waits before failing
+            pool_recycle: Seconds after which server connections are replaced
+        """
+        parsed = make_url(url)
+        if parsed.get_backend_name() == 'sqlite':
+            if _is_sqlite_memory(parsed):
+                # One shared connection, or every checkout sees a new empty database
+                return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+            # Connections are cheap and local: no recycling or pre-ping needed.
+            # Writers serialize on the database lock, so a large pool only adds waiting.
+            return {
+                'poolclass': InstrumentedQueuePool,
+                'pool_size': pool_size if readonly else min(pool_size, 5),
+                'max_overflow': max_overflow if readonly else 0,
+                'pool_timeout': pool_timeout,
+                'connect_args': {'check_same_thread': False},
+            }
+        
+        return {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': pool_timeout,
+            'pool_recycle': pool_recycle,
+            'pool_pre_ping': True,
+        }
+    
+    @staticmethod
+    def _readonly_sqlite_url(url: str) -> str:
+        """Rewrite a SQLite file URL to open the database read-only"""
+        parsed = make_url(url)
+        database = parsed.database
+        if not database.startswith('file:'):
+            database = f'file:{database}'
+        separator = '&' if '?' in database else '?'
+        return f'sqlite:///{database}{separator}mode=ro&uri=true'
+    
+    def _install_listeners(self, engine: Engine, stats: PoolStats,
+                           pragmas: Optional[Dict[str, Any]]) -> None:
+        if pragmas:
+            statements = [f'PRAGMA {key}={value}' for key, value in pragmas.items()]
+            
+            @event.listens_for(engine, 'connect')
+            def apply_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                try:
+                    for statement in statements:
+                        cursor.execute(statement)
+                finally:
+                    cursor.close()
+        
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            stats.increment('connects')
+        
+        @event.listens_for(engine, 'checkout')
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            stats.increment('checkouts')
+        
+        @event.listens_for(engine, 'checkin')
+        def on_checkin(dbapi_connection, connection_record):
+            stats.increment('checkins')
+        
+        @event.listens_for(engine, 'invalidate')
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            stats.increment('invalidations')
+    
+    def get_engine(self, url: str, readonly: bool = False, echo: bool = False,
+                   pragmas: Optional[Dict[str, Any]] = None, name: Optional[str] = None,
+                   **pool_options: Any) -> Engine:
+        """
+        Get the shared engine for a URL, creating it on first use
+        
+        Args:
+            url: Database URL
+            readonly: Open a separate read-only engine (SQLite files only;
+                      other dialects should use replicas)
+            echo: Log SQL statements
+            pragmas: SQLite PRAGMA overrides merged over DEFAULT_SQLITE_PRAGMAS
+            name: Label used in pool statistics and metrics
+            **pool_options: pool_size, max_overflow, pool_timeout, pool_recycle
+        
+        Returns:
+            The engine
+        """
+        role = 'read' if readonly else 'primary'
+        key = (url, role)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                return engine
+            
+            parsed = make_url(url)
+            is_sqlite = parsed.get_backend_name() == 'sqlite'
+            target = url
+            sqlite_pragmas = None
+            if is_sqlite:
+                sqlite_pragmas = {**DEFAULT_SQLITE_PRAGMAS, **(pragmas or {})}
+                if _is_sqlite_memory(parsed):
+                    sqlite_pragmas.pop('journal_mode', None)
+                if readonly and not _is_sqlite_memory(parsed):
+                    target = self._readonly_sqlite_url(url)
+                    for pragma in _SQLITE_WRITE_PRAGMAS:
+                        sqlite_pragmas.pop(pragma, None)
+                    sqlite_pragmas['query_only'] = 'ON'
+            
+            options = self.engine_options(url, readonly=readonly, **pool_options)
+            engine = create_engine(target, echo=echo, **options)
+            
+            label = name or f"{role}:{parsed.render_as_string(hide_password=True)}"
+            stats = PoolStats(label)
+            if isinstance(engine.pool, InstrumentedQueuePool):
+                engine.pool.stats = stats
+            self._install_listeners(engine, stats, sqlite_pragmas)
+            
+            self._engines[key] = engine
+            self._stats[label] = (stats, engine)
+            logger.debug(f"Created {role} engine {label} ({type(engine.pool).__name__})")
+            return engine
+    
+    def register_replicas(self, url: str, replica_urls: List[str], **options: Any) -> List[Engine]:
+        """
+        Register read replicas for a primary URL
+        
+        Args:
+            url: Primary database URL
+            replica_urls: Replica URLs, used round-robin by get_read_engine()
+            **options: get_engine() options for the replica engines
+        
+        Returns:
+            The replica engines
+        """
+        with self._lock:
+            engines = [
+                self.get_engine(replica, name=f"replica{i}:{make_url(replica).render_as_string(hide_password=True)}",
+                                **options)
+                for i, replica in enumerate(replica_urls)
+            ]
+            self._replicas[url] = engines
+            self._round_robin[url] = itertools.cycle(engines) if engines else None
+            return engines
+    
+    def get_read_engine(self, url: str, **options: Any) -> Engine:
+        """
+        Get an engine for read-only work against a primary URL
+        
+        Replicas are used round-robin when registered. SQLite files get a
+        dedicated read-only engine (WAL readers do not block the writer);
+        anything else falls back to the primary engine.
+        
+        Args:
+            url: Primary database URL
+            **options: get_engine() options used if an engine is created
+        """
+        with self._lock:
+            replicas = self._round_robin.get(url)
+            if replicas is not None:
+                return next(replicas)
+        
+        parsed = make_url(url)
+        if parsed.get_backend_name() == 'sqlite' and not _is_sqlite_memory(parsed):
+            return self.get_engine(url, readonly=True, **options)
+        return self.get_engine(url, **options)
+    
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get pool health statistics for every registered engine
+        
+        Returns:
+            Dict mapping engine labels to counters, checkout wait times,
+            checked-out connections and saturation (checked out / capacity)
+        """
+        with self._lock:
+            items = list(self._stats.items())
+        return {label: stats.snapshot(engine.pool) for label, (stats, engine) in items}
+    
+    def enable_prometheus_metrics(self, registry: Optional[Any] = None) -> None:
+        """
+        Export pool statistics through a scrape-time Prometheus collector
+        
+        Args:
+            registry: Collector registry; defaults to the global registry
+        """
+        import prometheus_client
+        
+        with self._lock:
+            if self._collector is None:
+                self._collector = PoolCollector(self)
+                (registry or prometheus_client.REGISTRY).register(self._collector)
+    
+    def dispose_all(self) -> None:
+        """Dispose every registered engine's pool"""
+        with self._lock:
+            engines = list(self._engines.values())
+        for engine in engines:
+            engine.dispose()
+
+
+class PoolCollector:
+    """Prometheus collector reading EngineRegistry pool statistics at scrape time"""
+    
+    def __init__(self, registry: EngineRegistry):
+        self._registry = registry
+    
+    def describe(self):
+        return iter(())
+    
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+        
+        labels = ['engine']
+        gauges = {
+            'checked_out': GaugeMetricFamily(
+                'opryxx_db_pool_checked_out', 'Connections currently checked out', labels=labels),
+            'capacity': GaugeMetricFamily(
+                'opryxx_db_pool_capacity', 'Maximum connections (size + overflow)', labels=labels),
+            'saturation': GaugeMetricFamily(
+                'opryxx_db_pool_saturation', 'Checked-out connections as a fraction of capacity', labels=labels),
+        }
+        counters = {
+            'connects': CounterMetricFamily(
+                'opryxx_db_pool_connects', 'New DBAPI connections opened', labels=labels),
+            'checkouts': CounterMetricFamily(
+                'opryxx_db_pool_checkouts', 'Connection checkouts', labels=labels),
+            'timeouts': CounterMetricFamily(
+                'opryxx_db_pool_timeouts', 'Checkouts that timed out waiting for a connection', labels=labels),
+            'invalidations': CounterMetricFamily(
+                'opryxx_db_pool_invalidations', 'Connections invalidated', labels=labels),
+        }
+        wait = HistogramMetricFamily(
+            'opryxx_db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection',
+            labels=labels,
+        )
+        
+        for label, stats in self._registry.pool_stats().items():
+            for key, family in gauges.items():
+                family.add_metric([label], stats[key])
+            for key, family in counters.items():
+                family.add_metric([label], stats[key])
+            buckets = [(repr(bound), count) for bound, count in zip(POOL_WAIT_BUCKETS, stats['wait_buckets'])]
+            buckets.append(('+Inf', stats['wait_count']))
+            wait.add_metric([label], buckets, stats['wait_total'])
+        
+        yield from gauges.values()
+        yield from counters.values()
+        yield wait
+
+
+# Global engine registry
+engine_registry = EngineRegistry()
+
+
 class DatabaseManager:
     """Handles database connections and session management"""
     
-    def __init__(self, config_manager: Optional[ConfigManager] = None):
+    def __init__(self, config_manager: Optional[ConfigManager] = None,
+                 registry: Optional[EngineRegistry] = None):
         """Initialize database manager with configuration"""
         self.config_manager = config_manager or ConfigManager()
+        self.registry = registry or engine_registry
         self.engine = None
+        self.read_engine = None
+        self.session_factory = None
+        self.read_session_factory = None
         self.SessionLocal = None
-        
-    def init_db(self) -> bool:
-        """Initialize database connection and create tables"""
-        try:
-            db_config = self.config_manager.config.database
+        self._init_lock = threading.Lock()
+    
+    def init_engine(self) -> Engine:
+        """Create (or reuse) the engines and session factories; no tables are created"""
+        with self._init_lock:
+            if self.engine is not None:
+                return self.engine
             
-            # Create database URL
+            db_config = self.config_manager.config.database
             db_url = db_config.url
+            options = {
+                'echo': db_config.echo,
+                'pragmas': getattr(db_config, 'sqlite_pragmas', None),
+                'pool_size': db_config.pool_size,
+                'max_overflow': db_config.max_overflow,
+                'pool_timeout': db_config.pool_timeout,
+                'pool_recycle': db_config.pool_recycle,
+            }
+            
+            engine = self.registry.get_engine(db_url, **options)
+            replicas = getattr(db_config, 'read_replicas', None)
+            if replicas:
+                self.registry.register_replicas(db_url, replicas, **options)
+            self.read_engine = self.registry.get_read_engine(db_url, **options)
             
-            # Create engine
-            self.engine = create_engine(
-                db_url,
-                echo=db_config.echo,
-                pool_size=db_config.pool_size,
-                max_overflow=db_config.max_overflow,
-                pool_timeout=db_config.pool_timeout,
-                pool_recycle=db_config.pool_recycle
-            )
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            self.read_session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.read_engine)
+            self.SessionLocal = scoped_session(self.session_factory)
             
-            # Create session factory
             global SessionLocal
-            SessionLocal = scoped_session(
-                sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            )
+            SessionLocal = self.SessionLocal
+            
+            self.engine = engine
+            return engine
+    
+    def init_db(self) -> bool:
+        """Initialize database connection and create tables"""
+        try:
+            self.init_engine()
             
             # Import models to ensure they are registered with SQLAlchemy
             from models import todo  # noqa: F401
@@ -58,18 +484,28 @@ class DatabaseManager:
             # Create tables
             Base.metadata.create_all(bind=self.engine)
             
-            logger.info(f"Database initialized at {db_url}")
+            logger.info(f"Database initialized at {self.engine.url.render_as_string(hide_password=True)}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}", exc_info=True)
             raise
     
+    def get_engine(self, readonly: bool = False) -> Engine:
+        """Get the primary engine, or the read-routed engine if ``readonly``"""
+        self.init_engine()
+        return self.read_engine if readonly else self.engine
+    
+    def get_session_factory(self, readonly: bool = False) -> sessionmaker:
+        """Get the shared session factory, or the read-routed one if ``readonly``"""
+        self.init_engine()
+        return self.read_session_factory if readonly else self.session_factory
+    
     def get_session(self):
         """Get a new database session"""
         if SessionLocal is None:
             self.init_db()
-            
+        
         db = SessionLocal()
         try:
             yield db
@@ -80,10 +516,27 @@ class DatabaseManager:
         finally:
             db.close()
     
+    def get_read_session(self):
+        """Get a new session bound to the read-routed engine"""
+        db = self.get_session_factory(readonly=True)()
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Database error: {e}", exc_info=True)
+            raise
+        finally:
+            db.close()
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get pool health statistics for all registered engines"""
+        return self.registry.pool_stats()
+    
     def close(self):
         """Close all database connections"""
+        for engine in {id(e): e for e in (self.engine, self.read_engine) if e is not None}.values():
+            engine.dispose()
         if self.engine:
-            self.engine.dispose()
             logger.info("Database connections closed")
 
 # Global instance
@@ -1,44 +1,638 @@
-""
+"""
 Advanced caching system with support for multiple backends and cache invalidation strategies.
 """
+import hashlib
+import heapq
+import logging
+import pickle
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypeVar, cast
+
+# Type variable for generic function wrapping
+F = TypeVar('F', bound=Callable[..., Any])
+
+# Default time-to-live in seconds
+DEFAULT_TIMEOUT = 300
+
+# Default in-memory budget
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MISSING = object()
+
+
+class CacheEntry(NamedTuple):
+    """
+    A cached value with its freshness window.
+
+    The entry is fresh until ``fresh_until`` and may still be served as stale
+    (while it is refreshed) until ``expires_at``. Both are wall-clock
+    timestamps so entries keep their meaning when shared between processes;
+    ``None`` means never.
+    """
+    value: Any
+    fresh_until: Optional[float]
+    expires_at: Optional[float]
+
+    def is_fresh(self, now: float) -> bool:
+        return self.fresh_until is None or now < self.fresh_until
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+def make_entry(value: Any, timeout: Optional[float], stale_timeout: float = 0) -> CacheEntry:
+    """
+    Build a cache entry.
+
+    Args:
+        value: Value to cache
+        timeout: Seconds the value is fresh, or None to never expire
+        stale_timeout: Extra seconds the value may be served stale while it
+            is recomputed in the background
+    """
+    if timeout is None:
+        return CacheEntry(value, None, None)
+    now = time.time()
+    return CacheEntry(value, now + timeout, now + timeout + max(stale_timeout, 0))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Estimate the memory held by a value in bytes.
+
+    Containers are followed three levels deep; this is an estimate for
+    budgeting, not an exact accounting.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 3:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _depth + 1) + estimate_size(item, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class CacheBackend(ABC):
     """Abstract base class for cache backends."""
-        """Get a value from the cache."""
-        """Set a value in the cache."""
+
+    @abstractmethod
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Get the entry for a key, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set_entry(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
         """Delete a value from the cache."""
+
+    @abstractmethod
+    def clear(self) -> None:
         """Clear all items from the cache."""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a fresh value from the cache."""
+        entry = self.get_entry(key)
+        if entry is None or not entry.is_fresh(time.time()):
+            return default
+        return entry.value
+
+    def set(self, key: str, value: Any, timeout: Optional[float] = DEFAULT_TIMEOUT, stale_timeout: float = 0) -> None:
+        """Set a value in the cache."""
+        self.set_entry(key, make_entry(value, timeout, stale_timeout))
+
+    def has_key(self, key: str) -> bool:
         """Check if a key exists in the cache."""
-    """In-memory cache backend using a dictionary."""
-    """Redis cache backend."""
-    """Cache manager that supports multiple backends and namespacing."""
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics."""
+        return {}
+
+
+class _Slot:
+    """Mutable in-memory entry; kept small since there is one per key."""
+
+    __slots__ = ('entry', 'size')
+
+    def __init__(self, entry: CacheEntry, size: int):
+        self.entry = entry
+        self.size = size
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-memory cache backend with LRU eviction, TTL expiry and a size budget.
+
+    Entries live in an OrderedDict in recency order, so lookups, inserts and
+    LRU evictions are O(1). Expiry times are kept in a heap and expired
+    entries are purged as new ones are written, so dead entries do not hold
+    on to the budget until they happen to be read.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        sizeof: Callable[[Any], int] = estimate_size
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries, or None for no limit
+            max_bytes: Maximum estimated size of all values, or None for no limit
+            sizeof: Function estimating the size of a value in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: 'OrderedDict[str, _Slot]' = OrderedDict()
+        self._expiry: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            slot = self._data.get(key)
+            if slot is None:
+                return None
+            if slot.entry.is_expired(time.time()):
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return slot.entry
+
+    def set_entry(self, key: str, entry: CacheEntry) -> None:
+        size = self._sizeof(entry.value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.rejected += 1
+                return
+            self._data[key] = _Slot(entry, size)
+            self._bytes += size
+            if entry.expires_at is not None:
+                heapq.heappush(self._expiry, (entry.expires_at, key))
+            self._purge_expired()
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._data.pop(key).size
+
+    def _purge_expired(self) -> None:
+        expiry = self._expiry
+        now = time.time()
+        while expiry and expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(expiry)
+            slot = self._data.get(key)
+            # The key may have been rewritten since this heap item was pushed
+            if slot is not None and slot.entry.expires_at == expires_at:
+                self._remove(key)
+                self.expirations += 1
+        # Overwrites leave outdated heap items behind; rebuild when they dominate
+        if len(expiry) > 2 * len(self._data) + 64:
+            self._expiry = [
+                (slot.entry.expires_at, key) for key, slot in self._data.items()
+                if slot.entry.expires_at is not None
+            ]
+            heapq.heapify(self._expiry)
+
+    def _evict(self) -> None:
+        data = self._data
+        while data and (
+            (self.max_entries is not None and len(data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, slot = data.popitem(last=False)
+            self._bytes -= slot.size
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'rejected': self.rejected,
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis cache backend.
+
+    Entries are pickled together with their freshness window and stored
+    with a Redis TTL covering the stale period, so expired keys are removed
+    by Redis itself. Any client with the redis-py ``get``/``set``/``delete``/
+    ``scan_iter`` interface can be passed in.
+    """
+
+    def __init__(self, client: Any = None, url: str = 'redis://localhost:6379/0', prefix: str = 'cache:'):
+        """
+        Args:
+            client: Redis client; created from ``url`` if omitted
+            url: Redis connection URL
+            prefix: Prefix for all keys written by this backend
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        data = self.client.get(self._key(key))
+        if data is None:
+            return None
+        entry = CacheEntry(*pickle.loads(data))
+        if entry.is_expired(time.time()):
+            return None
+        return entry
+
+    def set_entry(self, key: str, entry: CacheEntry) -> None:
+        data = pickle.dumps(tuple(entry), protocol=pickle.HIGHEST_PROTOCOL)
+        if entry.expires_at is None:
+            self.client.set(self._key(key), data)
+            return
+        ttl_ms = int((entry.expires_at - time.time()) * 1000)
+        if ttl_ms <= 0:
+            self.client.delete(self._key(key))
+            return
+        self.client.set(self._key(key), data, px=ttl_ms)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class TieredCacheBackend(CacheBackend):
+    """
+    Two-tier cache: a local L1 backend in front of a shared L2 backend.
+
+    Reads try L1 first and fill it from L2 on an L1 miss; writes and deletes
+    go to both tiers. L1 copies live at most ``l1_timeout`` seconds, which
+    bounds how long another process' write or delete can go unnoticed.
+    """
+
+    def __init__(self, l1: CacheBackend, l2: CacheBackend, l1_timeout: Optional[float] = 30):
+        """
+        Args:
+            l1: Local (in-process) backend
+            l2: Shared backend, e.g. Redis
+            l1_timeout: Maximum lifetime of L1 copies in seconds
+        """
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_timeout = l1_timeout
+        self.l1_hits = 0
+        self.l2_hits = 0
+
+    def _local(self, entry: CacheEntry) -> CacheEntry:
+        if self.l1_timeout is None:
+            return entry
+        limit = time.time() + self.l1_timeout
+        if entry.expires_at is not None and entry.expires_at <= limit:
+            return entry
+        fresh_until = limit if entry.fresh_until is None else min(entry.fresh_until, limit)
+        return CacheEntry(entry.value, fresh_until, limit)
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self.l1.get_entry(key)
+        if entry is not None:
+            self.l1_hits += 1
+            return entry
+        entry = self.l2.get_entry(key)
+        if entry is not None:
+            self.l2_hits += 1
+            self.l1.set_entry(key, self._local(entry))
+        return entry
+
+    def set_entry(self, key: str, entry: CacheEntry) -> None:
+        self.l2.set_entry(key, entry)
+        self.l1.set_entry(key, self._local(entry))
+
+    def delete(self, key: str) -> None:
+        self.l2.delete(key)
+        self.l1.delete(key)
+
+    def clear(self) -> None:
+        self.l2.clear()
+        self.l1.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'l1_hits': self.l1_hits,
+            'l2_hits': self.l2_hits,
+            'l1': self.l1.get_stats(),
+            'l2': self.l2.get_stats(),
+        }
+
+
+class _Flight:
+    """A computation in progress that concurrent callers wait on."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class CacheManager:
+    """
+    Cache manager that supports multiple backends and namespacing.
+
+    ``get_or_set`` coalesces concurrent misses for a key so the value is
+    computed once per process, and with a ``stale_timeout`` serves the
+    expired value while a single background refresh runs.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, namespace: str = '', refresh_workers: int = 2):
+        """
+        Args:
+            backend: Cache backend; an in-memory LRU backend by default
+            namespace: Prefix for all keys of this manager
+            refresh_workers: Threads used for stale-while-revalidate refreshes
+        """
+        self._backend = backend if backend is not None else MemoryCacheBackend()
+        self.namespace = namespace
+        self.refresh_workers = refresh_workers
+        self._logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._refresh_pool: Optional[ThreadPoolExecutor] = None
+        self.reset_stats()
+
+    @property
+    def backend(self) -> CacheBackend:
         """Get the current cache backend."""
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: CacheBackend) -> None:
         """Set the cache backend."""
+        self._backend = backend
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def get(self, key: str, default: Any = None) -> Any:
         """Get a value from the cache."""
+        try:
+            entry = self._backend.get_entry(self._key(key))
+        except Exception as e:
+            self.errors += 1
             self._logger.error(f"Cache get failed for key {key}: {e}")
             return default
-    
-    def set(self, key: str, value: Any, timeout: Optional[int] = DEFAULT_TIMEOUT) -> None:
-        """Set a value in the cache."""
+        if entry is None or not entry.is_fresh(time.time()):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry.value
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        stale_timeout: float = 0,
+        ttl: Optional[float] = None
+    ) -> None:
+        """
+        Set a value in the cache.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            timeout: Seconds the value is fresh, or None to never expire
+            stale_timeout: Extra seconds the value may be served stale by get_or_set
+            ttl: Alias for ``timeout``
+        """
+        if ttl is not None:
+            timeout = ttl
+        try:
+            self._backend.set_entry(self._key(key), make_entry(value, timeout, stale_timeout))
+            self.sets += 1
+        except Exception as e:
+            self.errors += 1
             self._logger.error(f"Cache set failed for key {key}: {e}")
-    
+
     def delete(self, key: str) -> None:
         """Delete a value from the cache."""
+        try:
+            self._backend.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
             self._logger.error(f"Cache delete failed for key {key}: {e}")
-    
+
     def clear(self) -> None:
         """Clear all items from the cache."""
+        try:
+            self._backend.clear()
+        except Exception as e:
+            self.errors += 1
             self._logger.error(f"Cache clear failed: {e}")
-    
+
     def has_key(self, key: str) -> bool:
         """Check if a key exists in the cache."""
+        try:
+            entry = self._backend.get_entry(self._key(key))
+            return entry is not None and entry.is_fresh(time.time())
+        except Exception as e:
+            self.errors += 1
             self._logger.error(f"Cache has_key failed for key {key}: {e}")
             return False
-    
-    def get_or_set(self, key: str, default: Any, timeout: Optional[int] = DEFAULT_TIMEOUT) -> Any:
+
+    def get_or_set(
+        self,
+        key: str,
+        default: Any,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        stale_timeout: float = 0
+    ) -> Any:
         """
+        Get a value from the cache, computing and storing it on a miss.
+
+        Concurrent misses for the same key wait for a single computation.
+        A value past ``timeout`` but within ``stale_timeout`` is returned
+        immediately while one background refresh replaces it.
+
+        Args:
+            key: Cache key
+            default: Value to store, or a callable computing it
+            timeout: Seconds the value is fresh, or None to never expire
+            stale_timeout: Extra seconds a stale value may be served
+
+        Returns:
+            The cached or computed value
         """
+        full_key = self._key(key)
+        try:
+            entry = self._backend.get_entry(full_key)
+        except Exception as e:
+            self.errors += 1
+            self._logger.error(f"Cache get failed for key {key}: {e}")
+            entry = None
+
+        if entry is not None:
+            if entry.is_fresh(time.time()):
+                self.hits += 1
+                return entry.value
+            self.stale_hits += 1
+            self._refresh(full_key, default, timeout, stale_timeout)
+            return entry.value
+
+        self.misses += 1
+        return self._load(full_key, default, timeout, stale_timeout)
+
+    def _compute(self, full_key: str, default: Any, timeout: Optional[float], stale_timeout: float) -> Any:
+        value = default() if callable(default) else default
+        self.loads += 1
+        try:
+            self._backend.set_entry(full_key, make_entry(value, timeout, stale_timeout))
+            self.sets += 1
+        except Exception as e:
+            self.errors += 1
+            self._logger.error(f"Cache set failed for key {full_key}: {e}")
+        return value
+
+    def _load(self, full_key: str, default: Any, timeout: Optional[float], stale_timeout: float) -> Any:
+        with self._lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._compute(full_key, default, timeout, stale_timeout)
+            return flight.value
+        except BaseException as e:
+            self.load_errors += 1
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[full_key]
+            flight.done.set()
+
+    def _refresh(self, full_key: str, default: Any, timeout: Optional[float], stale_timeout: float) -> None:
+        with self._lock:
+            if full_key in self._flights:
+                return
+            self._flights[full_key] = flight = _Flight()
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers, thread_name_prefix='cache-refresh'
+                )
+            pool = self._refresh_pool
+
+        def run() -> None:
+            try:
+                flight.value = self._compute(full_key, default, timeout, stale_timeout)
+                self.refreshes += 1
+            except Exception as e:
+                self.load_errors += 1
+                flight.error = e
+                self._logger.error(f"Cache refresh failed for key {full_key}: {e}")
+            finally:
+                with self._lock:
+                    del self._flights[full_key]
+                flight.done.set()
+
+        pool.submit(run)
+
+    def get_stats(self) -> Dict[str, Any]:
         """
+        Get cache statistics.
+
+        Returns:
+            Dict with hit/miss/load counters, the hit ratio and backend statistics
         """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            'sets': self.sets,
+            'loads': self.loads,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'load_errors': self.load_errors,
+            'errors': self.errors,
+            'backend': self._backend.get_stats(),
+        }
+
+    def reset_stats(self) -> None:
+        """Reset the manager's counters."""
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.load_errors = 0
+        self.errors = 0
+
+    def close(self) -> None:
+        """Stop the background refresh threads."""
+        with self._lock:
+            pool, self._refresh_pool = self._refresh_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    @staticmethod
+    def make_key(func: Callable[..., Any], args: Iterable[Any], kwargs: Dict[str, Any]) -> str:
         """Generate a cache key from function and arguments."""
+        key_parts = [func.__module__, '.', func.__qualname__, repr(tuple(args)), repr(sorted(kwargs.items()))]
         key_str = "".join(str(part) for part in key_parts)
         return hashlib.md5(key_str.encode('utf-8')).hexdigest()
 
@@ -49,9 +643,59 @@ cache = CacheManager()
 # Shortcut functions
 def get_cache() -> CacheManager:
     """Get the default cache instance."""
+    return cache
+
+
+def set_cache_backend(backend: CacheBackend) -> None:
     """
+    Replace the backend of the default cache.
+
+    Args:
+        backend: New cache backend
     """
+    cache.backend = backend
+
+
+def clear_cache() -> None:
     """Clear the default cache."""
+    cache.clear()
+
+
+def delete_cache(key: str) -> None:
     """Delete a key from the default cache."""
+    cache.delete(key)
+
+
+def cached(
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    stale_timeout: float = 0,
+    cache_manager: Optional[CacheManager] = None
+) -> Callable[[F], F]:
+    """
+    Decorator caching a function's results by its arguments.
+
+    Concurrent calls with the same arguments compute the result once. The
+    wrapper has an ``invalidate(*args, **kwargs)`` method removing the entry
+    for those arguments.
+
+    Args:
+        timeout: Seconds a result is fresh, or None to never expire
+        stale_timeout: Extra seconds a stale result is served while refreshed
+        cache_manager: Cache to use; the default cache if omitted
     """
-    """
\ No newline at end of file
+    def decorator(func: F) -> F:
+        def manager() -> CacheManager:
+            return cache_manager if cache_manager is not None else cache
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = CacheManager.make_key(func, args, kwargs)
+            return manager().get_or_set(key, lambda: func(*args, **kwargs), timeout, stale_timeout)
+
+        def invalidate(*args: Any, **kwargs: Any) -> None:
+            manager().delete(CacheManager.make_key(func, args, kwargs))
+
+        wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+        return cast(F, wrapper)
+
+    return decorator
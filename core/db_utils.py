@@ -1,16 +1,21 @@
-""
+"""
 Database utilities for query optimization and performance monitoring.
 """
+import functools
+import heapq
 import logging
+import random
+import re
 import time
 from contextlib import contextmanager
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union, cast
+from typing import Any, Callable, Dict, List, Optional, TypeVar, cast
 
 from sqlalchemy import event, exc, orm
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from core.performance import LogHistogram
 # from core.performance import PerformanceMonitor, monitor_performance
 # from core.caching import CacheManager, cached
 # from config.performance import performance_config
@@ -31,66 +36,228 @@ logger = logging.getLogger(__name__)
 # Initialize cache
 # cache = CacheManager()
 
+# Name that absorbs new fingerprints once the cardinality cap is reached
+OVERFLOW_FINGERPRINT = "__other__"
+
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_SQL_PARAM = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_SQL_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SQL_ROWS = re.compile(r"\b(values)\s*\(\?\+\)(?:\s*,\s*\(\?\+\))*", re.I)
+_SQL_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint_sql(statement: str) -> str:
+    """
+    Normalize a SQL statement to its shape.
+
+    Literals and bind parameters become ``?``, ``IN``/``VALUES`` lists of
+    any length collapse to one form, comments and whitespace are dropped
+    and the text is lower-cased, so one fingerprint covers every execution
+    of the same query. Results are cached: drivers see the same compiled
+    statement strings over and over.
+    """
+    text = _SQL_COMMENT.sub(' ', statement)
+    text = _SQL_STRING.sub('?', text)
+    text = _SQL_PARAM.sub('?', text)
+    text = _SQL_NUMBER.sub('?', text)
+    text = _SQL_LIST.sub('(?+)', text)
+    text = _SQL_ROWS.sub(r'\1 (?+)', text)
+    return _SQL_SPACE.sub(' ', text).strip().lower()
+
+
+class FingerprintStats:
+    """Streaming aggregates for one query fingerprint."""
+
+    __slots__ = ('fingerprint', 'example', 'count', 'total_time', 'min_time', 'max_time', 'rows', 'sketch')
+
+    def __init__(self, fingerprint: str, example: str):
+        self.fingerprint = fingerprint
+        self.example = example
+        self.count = 0
+        self.total_time = 0.0
+        self.min_time = float('inf')
+        self.max_time = 0.0
+        self.rows = 0
+        self.sketch = LogHistogram()
+
+    def update(self, duration: float, rows: Optional[int]) -> None:
+        self.count += 1
+        self.total_time += duration
+        if duration < self.min_time:
+            self.min_time = duration
+        if duration > self.max_time:
+            self.max_time = duration
+        if rows is not None and rows > 0:
+            self.rows += rows
+        self.sketch.add(duration)
+
+    def to_dict(self, scale: float = 1.0) -> Dict[str, Any]:
+        """Convert to a dictionary; counts and totals are multiplied by ``scale``."""
+        return {
+            'fingerprint': self.fingerprint,
+            'example': self.example,
+            'count': self.count * scale,
+            'total_time': self.total_time * scale,
+            'avg_time': self.total_time / self.count if self.count else 0.0,
+            'min_time': self.min_time if self.count else 0.0,
+            'max_time': self.max_time,
+            'p95_time': self.sketch.quantile(0.95),
+            'rows': self.rows * scale,
+        }
+
+
 class QueryProfiler:
-    """Database query profiler and optimizer."""
+    """
+    Database query profiler and optimizer.
+
+    Memory is bounded regardless of traffic: queries are aggregated per
+    fingerprint (normalized statement shape) with a p95 sketch, and only a
+    fixed-size reservoir sample of slow queries is kept verbatim. With
+    ``sample_rate`` below 1 only that fraction of queries is fingerprinted;
+    per-fingerprint counts and totals are scaled back up in reports, while
+    overall totals and slow-query capture stay exact.
+    """
+    
+    REPORT_KEYS = ('total_time', 'count', 'avg_time', 'max_time', 'p95_time', 'rows')
     
-    def __init__(self):
-        self.queries: List[Dict[str, Any]] = []
-        self.slow_queries: List[Dict[str, Any]] = []
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        slow_query_threshold: float = 1.0,
+        slow_sample_size: int = 100,
+        max_fingerprints: int = 1000,
+        max_parameter_length: int = 200
+    ):
+        """
+        Args:
+            sample_rate: Fraction (0-1] of queries aggregated per fingerprint
+            slow_query_threshold: Duration in seconds from which a query is slow
+            slow_sample_size: Slow queries kept in the reservoir sample
+            max_fingerprints: Distinct fingerprints tracked before folding
+                new ones into ``__other__``
+            max_parameter_length: Characters of the parameter repr kept with
+                a slow query sample
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.sample_rate = sample_rate
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_sample_size = slow_sample_size
+        self.max_fingerprints = max_fingerprints
+        self.max_parameter_length = max_parameter_length
         self._enabled = True
         self._lock = threading.Lock()
+        self._random = random.Random()
+        self.reset_stats()
     
     def record_query(
         self, 
         statement: str, 
         parameters: Optional[Dict[str, Any]] = None,
         duration: float = 0.0,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        rows: Optional[int] = None
     ) -> None:
         """Record a database query."""
         if not self._enabled:
             return
-            
-        query_info = {
-            'statement': statement,
-            'parameters': parameters or {},
-            'duration': duration,
-            'timestamp': time.time(),
-            'context': context or {}
-        }
+        
+        slow = duration >= self.slow_query_threshold
+        sampled = self.sample_rate >= 1.0 or self._random.random() < self.sample_rate
+        fingerprint = fingerprint_sql(statement) if sampled or slow else None
         
         with self._lock:
-            self.queries.append(query_info)
+            self.total_queries += 1
+            self.total_time += duration
             
-            # Track slow queries
-            SLOW_QUERY_THRESHOLD = 1.0  # Default threshold
-            if duration >= SLOW_QUERY_THRESHOLD:
-                self.slow_queries.append(query_info)
-                logger.warning(
-                    f"Slow query ({duration:.3f}s): {statement}",
-                    extra={'query_info': query_info}
-                )
+            if sampled:
+                stats = self._fingerprints.get(fingerprint)
+                if stats is None:
+                    if len(self._fingerprints) >= self.max_fingerprints:
+                        self.overflow_count += 1
+                        fingerprint = OVERFLOW_FINGERPRINT
+                        stats = self._fingerprints.get(fingerprint)
+                    if stats is None:
+                        stats = self._fingerprints[fingerprint] = FingerprintStats(fingerprint, statement)
+                stats.update(duration, rows)
+            
+            if not slow:
+                return
+            
+            # Reservoir sampling (Algorithm R) keeps a uniform sample of slow queries
+            self.slow_query_count += 1
+            if len(self._slow_samples) < self.slow_sample_size:
+                slot = len(self._slow_samples)
+                self._slow_samples.append(None)
+            else:
+                slot = self._random.randrange(self.slow_query_count)
+                if slot >= self.slow_sample_size:
+                    slot = None
+            if slot is not None:
+                self._slow_samples[slot] = {
+                    'fingerprint': fingerprint,
+                    'statement': statement,
+                    'parameters': repr(parameters)[:self.max_parameter_length] if parameters else '',
+                    'duration': duration,
+                    'rows': rows,
+                    'timestamp': time.time(),
+                    'context': context or {}
+                }
+        
+        logger.warning(f"Slow query ({duration:.3f}s): {statement}")
+    
+    @property
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Reservoir sample of slow queries, slowest first."""
+        with self._lock:
+            samples = list(self._slow_samples)
+        return sorted(samples, key=lambda q: q['duration'], reverse=True)
     
     def get_query_stats(self) -> Dict[str, Any]:
         """Get query statistics."""
         with self._lock:
-            total_queries = len(self.queries)
-            total_time = sum(q['duration'] for q in self.queries) if self.queries else 0
-            avg_time = total_time / total_queries if total_queries > 0 else 0
-            
             return {
-                'total_queries': total_queries,
-                'slow_queries': len(self.slow_queries),
-                'total_time': total_time,
-                'avg_time': avg_time,
-                'slow_query_threshold': 1.0
+                'total_queries': self.total_queries,
+                'slow_queries': self.slow_query_count,
+                'total_time': self.total_time,
+                'avg_time': self.total_time / self.total_queries if self.total_queries else 0,
+                'slow_query_threshold': self.slow_query_threshold,
+                'fingerprints': len(self._fingerprints),
+                'fingerprint_overflow': self.overflow_count,
+                'sample_rate': self.sample_rate
             }
     
+    def top_n(self, n: int = 10, by: str = 'total_time') -> List[Dict[str, Any]]:
+        """
+        Get the heaviest query fingerprints.
+        
+        Args:
+            n: Number of fingerprints to return
+            by: Ranking key: total_time, count, avg_time, max_time, p95_time or rows
+            
+        Returns:
+            Fingerprint reports, largest first; count, total_time and rows
+            are estimates scaled by 1 / sample_rate
+        """
+        if by not in self.REPORT_KEYS:
+            raise ValueError(f"Unknown ranking key {by!r}; expected one of {', '.join(self.REPORT_KEYS)}")
+        scale = 1.0 / self.sample_rate
+        with self._lock:
+            reports = [stats.to_dict(scale) for stats in self._fingerprints.values()]
+        return heapq.nlargest(n, reports, key=lambda report: report[by])
+    
     def reset_stats(self) -> None:
         """Reset query statistics."""
         with self._lock:
-            self.queries.clear()
-            self.slow_queries.clear()
+            self._fingerprints: Dict[str, FingerprintStats] = {}
+            self._slow_samples: List[Dict[str, Any]] = []
+            self.total_queries = 0
+            self.total_time = 0.0
+            self.slow_query_count = 0
+            self.overflow_count = 0
     
     def enable(self) -> None:
         """Enable query profiling."""
@@ -111,29 +278,25 @@ class DatabaseManager:
         self._setup_event_listeners()
     
     def _setup_event_listeners(self) -> None:
-        """Set up SQLAlchemy event listeners."""
-        @event.listens_for(Engine, 'before_cursor_execute')
+        """Set up SQLAlchemy event listeners on this manager's engine only."""
+        @event.listens_for(self.engine, 'before_cursor_execute')
         def before_cursor_execute(
             conn, cursor, statement, parameters, context, executemany
         ):
-            conn.info.setdefault('query_start_time', []).append(time.time())
-            conn.info.setdefault('query_context', []).append({
-                'statement': statement,
-                'parameters': parameters
-            })
+            conn.info.setdefault('query_start_time', []).append(time.perf_counter())
         
-        @event.listens_for(Engine, 'after_cursor_execute')
+        @event.listens_for(self.engine, 'after_cursor_execute')
         def after_cursor_execute(
             conn, cursor, statement, parameters, context, executemany, *args
         ):
-            total_time = time.time() - conn.info['query_start_time'].pop()
-            query_context = conn.info['query_context'].pop()
+            total_time = time.perf_counter() - conn.info['query_start_time'].pop()
             
             self.profiler.record_query(
                 statement=statement,
                 parameters=parameters,
                 duration=total_time,
-                context=query_context
+                context={'executemany': executemany},
+                rows=cursor.rowcount
             )
     
     @contextmanager
@@ -207,7 +370,7 @@ def with_retry(
     backoff_factor: float = 0.5,
     exceptions: tuple = (exc.OperationalError, exc.TimeoutError)
 ):
-    ""
+    """
     Decorator for retrying database operations.
     
     Args:
@@ -260,7 +423,7 @@ def query_to_string(statement, bind=None):
     
     try:
         return compiler.process(statement)
-    except Exception as e:
+    except Exception:
         return str(statement)
 
 
@@ -0,0 +1,497 @@
+"""
+Structured log segments with a sidecar index and a query API.
+
+Records are appended to segment files as NDJSON lines (or msgpack objects)
+and every record gets a fixed-size entry in a sidecar ``.idx`` file:
+
+    timestamp (float64) | offset (uint64) | length (uint32) | logger id (uint32) | level (uint8)
+
+Logger names are interned in ``loggers.txt`` (line number = id). Queries
+memory-map the index, binary-search it by time, filter on level and logger
+without touching the data, and decode only the matching records from the
+memory-mapped segment.
+
+Index timestamps are clamped to be non-decreasing within a segment (records
+from several threads can arrive slightly out of order), so a time range
+query may include records up to that skew outside the requested bounds.
+"""
+import bisect
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+INDEX_ENTRY = struct.Struct('<dQIIB')
+
+FORMATS = ('ndjson', 'msgpack')
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{6})\.(ndjson|msgpack)$')
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def _encoder(fmt: str):
+    if fmt == 'ndjson':
+        return lambda record: json.dumps(record, default=str, separators=(',', ':')).encode('utf-8') + b'\n'
+    if msgpack is None:
+        raise ValueError("The msgpack log format requires the msgpack package")
+    return lambda record: msgpack.packb(record, default=str)
+
+
+def _decoder(fmt: str):
+    if fmt == 'ndjson':
+        return json.loads
+    if msgpack is None:
+        raise ValueError("The msgpack log format requires the msgpack package")
+    return msgpack.unpackb
+
+
+def record_to_dict(record: logging.LogRecord) -> Dict[str, Any]:
+    """Convert a log record to the structured form stored in segments."""
+    data = {
+        'ts': record.created,
+        'level': record.levelname,
+        'logger': record.name,
+        'msg': record.getMessage(),
+        'module': record.module,
+        'line': record.lineno,
+        'thread': record.threadName,
+    }
+    if record.exc_info:
+        data['exc'] = logging.Formatter().formatException(record.exc_info)
+    elif record.exc_text:
+        data['exc'] = record.exc_text
+    extra = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+    if extra:
+        data['extra'] = extra
+    return data
+
+
+class _LoggerNames:
+    """Append-only logger name table shared by the writer and readers."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._size = -1
+
+    def refresh(self) -> None:
+        """Reload the table if the file grew."""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size == self._size:
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.names = f.read().splitlines()
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self._size = size
+
+    def intern(self, name: str) -> int:
+        """Get the id of a logger name, appending it if new (writer only)."""
+        logger_id = self.ids.get(name)
+        if logger_id is None:
+            logger_id = len(self.names)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(name.replace('\n', ' ') + '\n')
+            self.names.append(name)
+            self.ids[name] = logger_id
+            self._size = self.path.stat().st_size
+        return logger_id
+
+
+class _SegmentWriter:
+    """
+    Open segment and logger name table for one directory.
+
+    Handlers writing to the same directory share one writer, so they hand
+    out logger ids from one table and append to the same segment instead of
+    interning and rolling over independently. The files are closed when the
+    last handler releases the writer.
+    """
+
+    _writers: Dict[Path, '_SegmentWriter'] = {}
+    _writers_lock = threading.Lock()
+
+    @classmethod
+    def acquire(
+        cls,
+        directory: Path,
+        fmt: str,
+        segment_bytes: int,
+        max_segments: Optional[int]
+    ) -> '_SegmentWriter':
+        """Get the writer for a directory, opening it if no handler uses it yet."""
+        key = directory.resolve()
+        with cls._writers_lock:
+            writer = cls._writers.get(key)
+            if writer is None:
+                writer = cls._writers[key] = cls(key, fmt, segment_bytes, max_segments)
+            elif writer.fmt != fmt:
+                raise ValueError(f"{directory} is already written as {writer.fmt!r}, not {fmt!r}")
+            writer.users += 1
+            return writer
+
+    def __init__(self, directory: Path, fmt: str, segment_bytes: int, max_segments: Optional[int]):
+        self.directory = directory
+        self.fmt = fmt
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.users = 0
+        self.lock = threading.Lock()
+        self.names = _LoggerNames(directory / 'loggers.txt')
+        self.names.refresh()
+        self.data = None
+        self.index = None
+        self.unflushed = 0
+        self._open_segment(self._next_sequence())
+
+    def release(self) -> None:
+        """Drop one handler's reference, closing the files after the last one."""
+        with self._writers_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            self._writers.pop(self.directory, None)
+        with self.lock:
+            self._close_segment()
+
+    def _next_sequence(self) -> int:
+        sequences = [int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(self.directory)) if m]
+        return max(sequences, default=0) + 1
+
+    def _open_segment(self, sequence: int) -> None:
+        self.sequence = sequence
+        base = self.directory / f"segment-{sequence:06d}"
+        self.data = open(f"{base}.{self.fmt}", 'ab')
+        self.index = open(f"{base}.idx", 'ab')
+        self._offset = self.data.tell()
+        self._last_ts = 0.0
+
+    def _close_segment(self) -> None:
+        for f in (self.data, self.index):
+            if f is not None:
+                f.flush()
+                f.close()
+        self.data = self.index = None
+
+    def _rollover(self) -> None:
+        self._close_segment()
+        self._open_segment(self.sequence + 1)
+        if self.max_segments:
+            for segment in list_segments(self.directory)[:-self.max_segments]:
+                segment.delete()
+
+    def append(self, payload: bytes, created: float, name: str, levelno: int) -> int:
+        """Write one encoded record; returns the number of unflushed records."""
+        with self.lock:
+            # Keep index timestamps sorted for binary search
+            ts = max(created, self._last_ts)
+            self._last_ts = ts
+            logger_id = self.names.intern(name)
+
+            self.data.write(payload)
+            self.index.write(INDEX_ENTRY.pack(ts, self._offset, len(payload), logger_id, min(levelno, 255)))
+            self._offset += len(payload)
+            self.unflushed += 1
+
+            if self._offset >= self.segment_bytes:
+                self._rollover()
+                self.unflushed = 0
+            return self.unflushed
+
+    def flush(self) -> None:
+        with self.lock:
+            # Data first: readers only follow index entries that are on disk
+            if self.data is not None:
+                self.data.flush()
+                self.index.flush()
+            self.unflushed = 0
+
+
+class StructuredLogHandler(logging.Handler):
+    """
+    Logging handler writing indexed, structured log segments.
+
+    Segments roll over at ``segment_bytes``; the oldest are deleted beyond
+    ``max_segments``. Data and index are flushed every ``flush_every``
+    records, on records at ``flush_level`` or above, and on ``flush()``.
+
+    Handlers in one process that point at the same directory share its open
+    segment and logger names; the segment settings of the first one apply.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        fmt: str = 'ndjson',
+        segment_bytes: int = 64 * 1024 * 1024,
+        max_segments: Optional[int] = None,
+        flush_every: int = 64,
+        flush_level: int = logging.ERROR,
+        level: int = logging.NOTSET
+    ):
+        """
+        Args:
+            directory: Directory holding the segments
+            fmt: 'ndjson' or 'msgpack'
+            segment_bytes: Segment size that triggers a rollover
+            max_segments: Segments to keep, or None to keep all
+            flush_every: Records between flushes
+            flush_level: Records at or above this level are flushed at once
+            level: Handler level
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown log format {fmt!r}; expected one of {FORMATS}")
+        super().__init__(level)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self._encode = _encoder(fmt)
+        self.flush_every = flush_every
+        self.flush_level = flush_level
+        self._writer: Optional[_SegmentWriter] = _SegmentWriter.acquire(
+            self.directory, fmt, segment_bytes, max_segments
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            payload = self._encode(record_to_dict(record))
+            unflushed = self._writer.append(payload, record.created, record.name, record.levelno)
+            if unflushed >= self.flush_every or record.levelno >= self.flush_level:
+                self._writer.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._writer is not None:
+                self._writer.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self._writer is not None:
+                self._writer.release()
+                self._writer = None
+        finally:
+            self.release()
+        super().close()
+
+
+class Segment:
+    """Read-only view of one segment and its index."""
+
+    def __init__(self, data_path: Path, sequence: int, fmt: str):
+        self.data_path = data_path
+        self.index_path = data_path.with_suffix('.idx')
+        self.sequence = sequence
+        self.fmt = fmt
+
+    def __repr__(self) -> str:
+        return f"Segment({self.data_path.name})"
+
+    def delete(self) -> None:
+        for path in (self.data_path, self.index_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _map(self, path: Path) -> Optional[mmap.mmap]:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return None
+            return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    def scan(
+        self,
+        start: Optional[float],
+        end: Optional[float],
+        min_level: int,
+        logger_ids: Optional[Set[int]]
+    ) -> Iterator[bytes]:
+        """Yield the raw payloads of matching records in time order."""
+        try:
+            index = self._map(self.index_path)
+        except FileNotFoundError:
+            return
+        if index is None:
+            return
+        data = None
+        try:
+            # Ignore a trailing partial entry from a concurrent writer
+            count = len(index) // INDEX_ENTRY.size
+            timestamps = _TimestampView(index, count)
+            lo = 0 if start is None else bisect.bisect_left(timestamps, start)
+            hi = count if end is None else bisect.bisect_right(timestamps, end)
+            if lo >= hi:
+                return
+            data = self._map(self.data_path)
+            if data is None:
+                return
+            entries = memoryview(index)[lo * INDEX_ENTRY.size:hi * INDEX_ENTRY.size]
+            try:
+                for _, offset, length, logger_id, level in INDEX_ENTRY.iter_unpack(entries):
+                    if level < min_level or (logger_ids is not None and logger_id not in logger_ids):
+                        continue
+                    if offset + length > len(data):
+                        break
+                    yield data[offset:offset + length]
+            finally:
+                entries.release()
+        finally:
+            if data is not None:
+                data.close()
+            index.close()
+
+    def time_range(self) -> Optional[tuple]:
+        """First and last index timestamps, or None if the segment is empty."""
+        try:
+            index = self._map(self.index_path)
+        except FileNotFoundError:
+            return None
+        if index is None:
+            return None
+        try:
+            count = len(index) // INDEX_ENTRY.size
+            if count == 0:
+                return None
+            first = INDEX_ENTRY.unpack_from(index, 0)[0]
+            last = INDEX_ENTRY.unpack_from(index, (count - 1) * INDEX_ENTRY.size)[0]
+            return first, last
+        finally:
+            index.close()
+
+
+class _TimestampView(Sequence):
+    """Sequence of index timestamps for bisect, read lazily from the mmap."""
+
+    def __init__(self, index: mmap.mmap, count: int):
+        self._index = index
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, position: int) -> float:
+        return INDEX_ENTRY.unpack_from(self._index, position * INDEX_ENTRY.size)[0]
+
+
+def list_segments(directory: Union[str, Path]) -> List[Segment]:
+    """List the segments in a directory, oldest first."""
+    directory = Path(directory)
+    segments = []
+    for name in os.listdir(directory):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            segments.append(Segment(directory / name, int(match.group(1)), match.group(2)))
+    return sorted(segments, key=lambda s: s.sequence)
+
+
+class LogStore:
+    """
+    Query interface over a directory of structured log segments.
+
+    Example:
+        store = LogStore('logs/structured')
+        for record in store.query(level='ERROR', logger='opryxx.recovery',
+                                  start=t1, end=t2):
+            print(record['msg'])
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self._names = _LoggerNames(self.directory / 'loggers.txt')
+
+    def _logger_ids(self, logger: Union[str, Sequence[str], None]) -> Optional[Set[int]]:
+        if logger is None:
+            return None
+        self._names.refresh()
+        prefixes = [logger] if isinstance(logger, str) else list(logger)
+        # A logger name also matches its children ("a.b" matches "a.b.c")
+        return {
+            logger_id for name, logger_id in self._names.ids.items()
+            if any(name == p or name.startswith(p + '.') for p in prefixes)
+        }
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        level: Union[int, str, None] = None,
+        logger: Union[str, Sequence[str], None] = None,
+        contains: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Find records, oldest first.
+
+        Args:
+            start: Earliest timestamp (epoch seconds)
+            end: Latest timestamp (epoch seconds)
+            level: Minimum level, as a number or name
+            logger: Logger name(s); children of a name match too
+            contains: Substring the message must contain
+            limit: Maximum number of records
+
+        Returns:
+            Iterator of record dicts (ts, level, logger, msg, ...)
+        """
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        min_level = level if isinstance(level, int) else 0
+        logger_ids = self._logger_ids(logger)
+        if logger_ids is not None and not logger_ids:
+            return
+        # NDJSON payloads can be pre-filtered on raw bytes when the text encodes to itself
+        needle = None
+        if contains and contains.isascii() and json.dumps(contains)[1:-1] == contains:
+            needle = contains.encode('ascii')
+
+        found = 0
+        for segment in list_segments(self.directory):
+            bounds = segment.time_range()
+            if bounds is None:
+                continue
+            # Segments are written in time order; skip those outside the range
+            if (start is not None and bounds[1] < start) or (end is not None and bounds[0] > end):
+                continue
+            decode = _decoder(segment.fmt)
+            raw_needle = needle if segment.fmt == 'ndjson' else None
+            for payload in segment.scan(start, end, min_level, logger_ids):
+                if raw_needle is not None and raw_needle not in payload:
+                    continue
+                record = decode(payload)
+                if contains and contains not in record.get('msg', ''):
+                    continue
+                yield record
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+
+    def count(self, **filters: Any) -> int:
+        """Count records matching ``query`` filters."""
+        return sum(1 for _ in self.query(**filters))
+
+    def loggers(self) -> List[str]:
+        """Names of all loggers that have written to the store."""
+        self._names.refresh()
+        return list(self._names.names)
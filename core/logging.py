@@ -10,16 +10,19 @@ This module provides a centralized logging system with support for:
 - Log compression for archived logs
 - Structured logging with additional context
 - Thread-safe operations
+- Non-blocking mode: records go through a bounded queue to a background
+  listener thread, and compression/cleanup run on a maintenance thread
 """
 import logging
 import os
 import sys
 import gzip
+import queue
 import shutil
 import time
 import threading
 from datetime import datetime, timedelta
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 from pathlib import Path
 from typing import Any, Dict, Optional, Union, List, Callable
 
@@ -39,6 +42,181 @@ SECURITY_FORMAT = (
     '%(asctime)s - SECURITY - %(levelname)s - %(event)s - %(details)s'
 )
 
+# Queue overflow policies for BoundedQueueHandler
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler with a bounded queue and an explicit overflow policy.
+    
+    ``drop_newest`` discards the incoming record, ``drop_oldest`` discards
+    the oldest queued record, and ``block`` waits up to ``block_timeout``
+    seconds before dropping. Dropped records are counted, never raised.
+    """
+    
+    def __init__(self, maxsize: int = 10000, policy: str = 'drop_newest', block_timeout: float = 0.1):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; expected one of {OVERFLOW_POLICIES}")
+        super().__init__(queue.Queue(maxsize))
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.enqueued = 0
+        self.dropped = 0
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue a record without blocking longer than the policy allows."""
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+            self.enqueued += 1
+            return
+        except queue.Full:
+            pass
+        
+        if self.policy == 'drop_oldest':
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+                self.queue.put_nowait(record)
+                self.enqueued += 1
+                return
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        return {
+            'policy': self.policy,
+            'maxsize': self.queue.maxsize,
+            'backlog': self.queue.qsize(),
+            'enqueued': self.enqueued,
+            'dropped': self.dropped
+        }
+
+
+class HandlerStats:
+    """Latency and error counters for one handler."""
+    
+    __slots__ = ('records', 'errors', 'total_time', 'max_time')
+    
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'records': self.records,
+            'errors': self.errors,
+            'avg_time': self.total_time / self.records if self.records else 0.0,
+            'max_time': self.max_time
+        }
+
+
+class InstrumentedQueueListener(QueueListener):
+    """Queue listener that times every handler it dispatches to."""
+    
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.stats: Dict[logging.Handler, HandlerStats] = {handler: HandlerStats() for handler in handlers}
+        for handler, stats in self.stats.items():
+            self._count_errors(handler, stats)
+    
+    @staticmethod
+    def _count_errors(handler: logging.Handler, stats: HandlerStats) -> None:
+        # Handlers catch their own emit failures and report them through
+        # handleError, so that is where errors have to be counted
+        handle_error = handler.handleError
+        
+        def counting_handle_error(record: logging.LogRecord) -> None:
+            stats.errors += 1
+            handle_error(record)
+        
+        handler.handleError = counting_handle_error
+    
+    def handle(self, record: logging.LogRecord) -> None:
+        """Dispatch a record to the handlers, recording their latency."""
+        record = self.prepare(record)
+        for handler in self.handlers:
+            if record.levelno < handler.level:
+                continue
+            stats = self.stats[handler]
+            start = time.perf_counter()
+            handler.handle(record)
+            elapsed = time.perf_counter() - start
+            stats.records += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+    
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full; wait for the listener to make room
+        self.queue.put(self._sentinel)
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-handler statistics keyed by handler name."""
+        return {
+            handler.get_name() or f"{type(handler).__name__}-{index}": stats.to_dict()
+            for index, (handler, stats) in enumerate(self.stats.items())
+        }
+
+
+class LogMaintenanceWorker:
+    """Background thread running log compression and retention cleanup."""
+    
+    def __init__(self, rotator: 'LogRotator'):
+        self.rotator = rotator
+        self._tasks: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+    
+    def submit(self, func: Callable[..., Any], *args: Any) -> None:
+        """Run ``func(*args)`` on the worker thread."""
+        self._ensure_started()
+        self._tasks.put((func, args))
+    
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+                self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            func, args = task
+            try:
+                func(*args)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                sys.stderr.write(f"Log maintenance task failed: {e}\n")
+    
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Finish queued tasks and stop the worker thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._tasks.put(None)
+            thread.join(timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker statistics."""
+        return {
+            'pending': self._tasks.qsize(),
+            'completed': self.completed,
+            'failed': self.failed
+        }
+
+
 class LogRotator:
     """Handles log rotation and retention policies."""
     
@@ -66,29 +244,62 @@ class LogRotator:
         self.compress = compress
         self.cleanup_interval = 86400  # Run cleanup daily (in seconds)
         self.last_cleanup = 0
+        self.worker = LogMaintenanceWorker(self)
         
         # Ensure log directory exists
         self.log_dir.mkdir(parents=True, exist_ok=True)
     
     def should_rollover(self, record: logging.LogRecord) -> bool:
         """Determine if a rollover should occur."""
-        # Check if we should run cleanup
+        # Schedule cleanup on the maintenance worker; never glob inside a logging call
         current_time = time.time()
         if current_time - self.last_cleanup > self.cleanup_interval:
-            self.cleanup_old_logs()
             self.last_cleanup = current_time
+            self.worker.submit(self.cleanup_old_logs)
             
         # Default rotation logic (handled by RotatingFileHandler)
         return False
     
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Handler filter hook: check the cleanup schedule, never reject records."""
+        self.should_rollover(record)
+        return True
+    
+    def create_file_handler(self, filename: Union[str, Path], max_bytes: int, backup_count: int) -> RotatingFileHandler:
+        """Create a size-rotated file handler managed by this rotator.
+        
+        With compression enabled, rotated files are gzipped on the maintenance
+        worker. Retention cleanup is scheduled from the handler's records.
+        """
+        handler_class = CompressingRotatingFileHandler if self.compress else RotatingFileHandler
+        kwargs = {'rotator': self} if self.compress else {}
+        handler = handler_class(
+            filename=str(filename),
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8',
+            **kwargs
+        )
+        handler.addFilter(self)
+        return handler
+    
+    def archive(self, pending: Path, base_filename: Path, backup_count: int) -> None:
+        """Shift the compressed backups and gzip a rotated file as backup 1."""
+        for index in range(backup_count - 1, 0, -1):
+            source = Path(f"{base_filename}.{index}.gz")
+            if source.exists():
+                os.replace(source, f"{base_filename}.{index + 1}.gz")
+        self.compress_file(pending, Path(f"{base_filename}.1.gz"))
+    
     def get_rotated_files(self, base_filename: str) -> List[Path]:
         """Get a list of rotated log files for the given base filename."""
         pattern = f"{base_filename}*"
         return sorted(self.log_dir.glob(pattern), key=os.path.getmtime, reverse=True)
     
-    def compress_file(self, source: Path) -> None:
+    def compress_file(self, source: Path, compressed_path: Optional[Path] = None) -> None:
         """Compress a log file using gzip."""
-        compressed_path = source.with_suffix(f"{source.suffix}.gz")
+        if compressed_path is None:
+            compressed_path = source.with_suffix(f"{source.suffix}.gz")
         
         with open(source, 'rb') as f_in:
             with gzip.open(compressed_path, 'wb') as f_out:
@@ -121,6 +332,32 @@ class LogRotator:
                 logging.getLogger(__name__).error(f"Error cleaning up log file {log_file}: {e}")
 
 
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that compresses backups in the background.
+    
+    A rollover only renames the active file aside; shifting the ``.N.gz``
+    backups and gzipping run in order on the rotator's maintenance worker,
+    so the thread writing the record never waits on compression.
+    """
+    
+    def __init__(self, filename: str, rotator: LogRotator, **kwargs):
+        self.rotator = rotator
+        super().__init__(filename, **kwargs)
+    
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.backupCount > 0 and os.path.exists(self.baseFilename):
+            pending = Path(f"{self.baseFilename}.{time.time_ns()}.pending")
+            os.replace(self.baseFilename, pending)
+            self.rotator.worker.submit(
+                self.rotator.archive, pending, Path(self.baseFilename), self.backupCount
+            )
+        if not self.delay:
+            self.stream = self._open()
+
+
 class Logger:
     """Advanced logger with performance and security logging capabilities."""
     
@@ -159,6 +396,11 @@ class Logger:
         enable_file: bool = True,
         log_format: str = None,
         error_log_file: str = None,
+        async_logging: bool = False,
+        queue_size: int = 10000,
+        overflow_policy: str = 'drop_newest',
+        structured_log_dir: Optional[str] = None,
+        structured_format: str = 'ndjson',
         **kwargs
     ) -> None:
         """Initialize the logger with enhanced rotation and retention.
@@ -175,6 +417,14 @@ class Logger:
             enable_file: Whether to enable file logging
             log_format: Custom log format string
             error_log_file: Separate file for error logs (optional)
+            async_logging: Hand records to a background thread through a
+                bounded queue instead of writing them on the calling thread
+            queue_size: Maximum queued records in async mode
+            overflow_policy: What to do when the queue is full:
+                'drop_newest', 'drop_oldest' or 'block' (briefly, then drop)
+            structured_log_dir: Also write indexed NDJSON/msgpack segments
+                here, queryable with core.log_store.LogStore (optional)
+            structured_format: Segment format, 'ndjson' or 'msgpack'
         """
         # Only initialize once
         if hasattr(self, '_initialized') and self._initialized:
@@ -187,6 +437,10 @@ class Logger:
         self.backup_count = backup_count
         self.retention_days = retention_days
         self.compress_logs = compress_logs
+        self.async_logging = async_logging
+        self.queue_handler: Optional[BoundedQueueHandler] = None
+        self.listener: Optional[InstrumentedQueueListener] = None
+        self._sink_handlers: List[logging.Handler] = []
         
         # Create log directory if it doesn't exist
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -205,14 +459,6 @@ class Logger:
         self.performance_formatter = logging.Formatter(PERFORMANCE_FORMAT)
         self.security_formatter = logging.Formatter(SECURITY_FORMAT)
         
-        # Add console handler if enabled
-        if enable_console:
-            self._add_console_handler()
-        
-        # Add file handlers if enabled
-        if enable_file:
-            self._add_file_handlers(error_log_file)
-        
         # Initialize log rotator
         self.rotator = LogRotator(
             log_dir=log_dir,
@@ -222,6 +468,21 @@ class Logger:
             compress=compress_logs
         )
         
+        # Add console handler if enabled
+        if enable_console:
+            self._add_console_handler()
+        
+        # Add file handlers if enabled
+        if enable_file:
+            self._add_file_handlers(error_log_file)
+        
+        # Add structured, indexed log segments if requested
+        if structured_log_dir:
+            self._add_structured_handler(structured_log_dir, structured_format)
+        
+        if async_logging:
+            self._start_queue(queue_size, overflow_policy)
+        
         self._initialized = True
         
         # Log initialization
@@ -237,7 +498,8 @@ class Logger:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(self.formatter)
         console_handler.setLevel(self.log_level)
-        self.logger.addHandler(console_handler)
+        console_handler.set_name('console')
+        self._add_handler(console_handler)
     
     def _add_file_handlers(self, error_log_file: str = None) -> None:
         """Add file handlers to the logger with rotation and compression."""
@@ -245,27 +507,64 @@ class Logger:
         log_file = self.log_dir / f"{self.name}.log"
         
         # Create a rotating file handler with size-based rotation
-        file_handler = RotatingFileHandler(
-            filename=str(log_file),
-            maxBytes=self.max_size_mb * 1024 * 1024,  # Convert MB to bytes
-            backupCount=self.backup_count,
-            encoding='utf-8',
+        file_handler = self.rotator.create_file_handler(
+            log_file,
+            max_bytes=self.max_size_mb * 1024 * 1024,  # Convert MB to bytes
+            backup_count=self.backup_count
         )
         file_handler.setFormatter(self.formatter)
         file_handler.setLevel(self.log_level)
-        self.logger.addHandler(file_handler)
+        file_handler.set_name('file')
+        self._add_handler(file_handler)
         
         # Add error log handler if specified
         if error_log_file:
-            error_handler = RotatingFileHandler(
-                filename=str(self.log_dir / error_log_file),
-                maxBytes=self.max_size_mb * 1024 * 1024,
-                backupCount=self.backup_count,
-                encoding='utf-8',
+            error_handler = self.rotator.create_file_handler(
+                self.log_dir / error_log_file,
+                max_bytes=self.max_size_mb * 1024 * 1024,
+                backup_count=self.backup_count
             )
             error_handler.setFormatter(self.formatter)
             error_handler.setLevel(logging.ERROR)  # Only log ERROR and above
-            self.logger.addHandler(error_handler)
+            error_handler.set_name('error_file')
+            self._add_handler(error_handler)
+    
+    def _add_structured_handler(self, directory: str, fmt: str) -> None:
+        """Add a handler writing indexed, structured log segments."""
+        from core.log_store import StructuredLogHandler
+        
+        structured_handler = StructuredLogHandler(directory, fmt=fmt, level=self.log_level)
+        structured_handler.set_name('structured')
+        self._add_handler(structured_handler)
+    
+    def _add_handler(self, handler: logging.Handler) -> None:
+        """Attach a handler to the logger, or to the queue listener in async mode."""
+        if self.async_logging:
+            self._sink_handlers.append(handler)
+        else:
+            self.logger.addHandler(handler)
+    
+    def _start_queue(self, queue_size: int, overflow_policy: str) -> None:
+        """Route records through a bounded queue to a background listener."""
+        self.queue_handler = BoundedQueueHandler(maxsize=queue_size, policy=overflow_policy)
+        self.queue_handler.setLevel(self.log_level)
+        self.listener = InstrumentedQueueListener(self.queue_handler.queue, *self._sink_handlers)
+        self.listener.start()
+        self.logger.addHandler(self.queue_handler)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get logging pipeline statistics.
+        
+        Returns:
+            Dict with queue counters (async mode), per-handler latency and
+            error counters (async mode) and maintenance worker counters
+        """
+        return {
+            'async': self.async_logging,
+            'queue': self.queue_handler.get_stats() if self.queue_handler else None,
+            'handlers': self.listener.get_stats() if self.listener else {},
+            'maintenance': self.rotator.worker.get_stats()
+        }
     
     def _log_with_extra(self, level: int, msg: str, **kwargs) -> None:
         """Log a message with additional context.
@@ -359,6 +658,20 @@ class Logger:
     
     def shutdown(self) -> None:
         """Shut down the logger and clean up resources."""
+        # Drain the queue before closing the handlers behind it
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        for handler in self._sink_handlers:
+            try:
+                handler.close()
+            except Exception as e:
+                sys.stderr.write(f"Error closing log handler: {e}\n")
+        self._sink_handlers = []
+        self.queue_handler = None
+        if hasattr(self, 'rotator'):
+            self.rotator.worker.stop()
+        
         # Remove all handlers
         for handler in self.logger.handlers[:]:
             try:
@@ -377,10 +690,15 @@ class Logger:
     
     def rotate_logs(self) -> None:
         """Manually trigger log rotation."""
-        for handler in self.logger.handlers:
+        for handler in self.logger.handlers + self._sink_handlers:
             if isinstance(handler, (RotatingFileHandler, TimedRotatingFileHandler)):
                 try:
-                    handler.doRollover()
+                    # The listener thread may be writing to the handler in async mode
+                    handler.acquire()
+                    try:
+                        handler.doRollover()
+                    finally:
+                        handler.release()
                     self.info("Log rotation completed")
                 except Exception as e:
                     self.error(f"Error rotating logs: {e}")
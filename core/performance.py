@@ -1,54 +1,256 @@
-""
+"""
 Performance monitoring and optimization utilities.
 """
 import time
+import math
 import functools
 import logging
-from collections import defaultdict, deque
+import threading
+import weakref
+from collections import deque
 from dataclasses import dataclass, field
-from datetime import datetime
-from statistics import mean, median, stdev
 from threading import Lock
-from typing import Any, Callable, Dict, List, Optional, TypeVar, cast
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar, cast
 
-from prometheus_client import start_http_server, Counter, Gauge, Histogram, Summary
+import prometheus_client
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
 
 # Type variable for generic function wrapping
 F = TypeVar('F', bound=Callable[..., Any])
 
+# Default Prometheus histogram buckets for function durations (seconds)
+DEFAULT_DURATION_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Name that absorbs new metric names once the cardinality cap is reached
+OVERFLOW_METRIC_NAME = "__other__"
+
+class LogHistogram:
+    """
+    Mergeable quantile sketch with logarithmically sized buckets.
+
+    Values are counted in buckets whose bounds grow geometrically, so every
+    quantile estimate is within ``relative_accuracy`` of the true value and
+    memory depends on the dynamic range of the data, not on the call volume.
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "buckets", "zero_count", "count")
+
+    # Values at or below this are treated as zero (sub-nanosecond timings)
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Count one observation."""
+        self.count += 1
+        if value <= self.MIN_VALUE:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Fold another sketch with the same accuracy into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        buckets = self.buckets
+        for index, count in list(other.buckets.items()):
+            buckets[index] = buckets.get(index, 0) + count
+
+    def cumulative_counts(self, bounds: Sequence[float]) -> List[int]:
+        """
+        Count observations at or below each of the ascending ``bounds``.
+
+        A sketch bucket straddling a bound is counted below it, so counts are
+        accurate to within ``relative_accuracy`` of the bound.
+        """
+        ordered = sorted(self.buckets.items())
+        counts = []
+        position, running = 0, self.zero_count
+        for bound in bounds:
+            if bound > self.MIN_VALUE:
+                limit = math.ceil(math.log(bound) / self._log_gamma)
+                while position < len(ordered) and ordered[position][0] <= limit:
+                    running += ordered[position][1]
+                    position += 1
+            counts.append(running)
+        return counts
+
+    def bucket_value(self, index: int) -> float:
+        """Representative value of a bucket (minimizes the relative error)."""
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q``-quantile (0-1); returns 0.0 when empty."""
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.buckets))
+
+
 @dataclass
 class PerformanceStats:
-    """Performance statistics for a single function or operation."""
+    """
+    Streaming performance statistics for a single function or operation.
+
+    Mean and variance are maintained with Welford's algorithm and quantiles
+    with a LogHistogram, so updates are O(1) and instances can be merged.
+    """
     call_count: int = 0
     total_time: float = 0.0
     min_time: float = float('inf')
     max_time: float = 0.0
     last_call_time: Optional[float] = None
     call_history: deque[float] = field(default_factory=lambda: deque(maxlen=100))
+    mean_time: float = 0.0
+    m2: float = 0.0
+    sketch: LogHistogram = field(default_factory=LogHistogram)
     
     def update(self, execution_time: float) -> None:
         """Update statistics with a new execution time."""
         self.call_count += 1
         self.total_time += execution_time
-        self.min_time = min(self.min_time, execution_time)
-        self.max_time = max(self.max_time, execution_time)
+        if execution_time < self.min_time:
+            self.min_time = execution_time
+        if execution_time > self.max_time:
+            self.max_time = execution_time
         self.last_call_time = time.time()
         self.call_history.append(execution_time)
+        
+        # Welford running variance
+        delta = execution_time - self.mean_time
+        self.mean_time += delta / self.call_count
+        self.m2 += delta * (execution_time - self.mean_time)
+        self.sketch.add(execution_time)
+    
+    def merge(self, other: "PerformanceStats") -> None:
+        """Fold another set of statistics into this one."""
+        if other.call_count == 0:
+            return
+        count = self.call_count + other.call_count
+        delta = other.mean_time - self.mean_time
+        self.m2 += other.m2 + delta * delta * self.call_count * other.call_count / count
+        self.mean_time += delta * other.call_count / count
+        self.call_count = count
+        self.total_time += other.total_time
+        self.min_time = min(self.min_time, other.min_time)
+        self.max_time = max(self.max_time, other.max_time)
+        if other.last_call_time is not None:
+            self.last_call_time = max(self.last_call_time or 0.0, other.last_call_time)
+        self.call_history.extend(list(other.call_history))
+        self.sketch.merge(other.sketch)
     
     @property
     def avg_time(self) -> float:
         """Calculate average execution time."""
         return self.total_time / self.call_count if self.call_count > 0 else 0.0
     
+    def percentile(self, q: float) -> float:
+        """
+        Get the ``q``-th percentile (0-100) of execution times.
+        
+        Exact while every call is still in ``call_history``, otherwise
+        estimated from the sketch.
+        """
+        if self.call_count == 0:
+            return 0.0
+        if self.call_count <= len(self.call_history):
+            ordered = sorted(self.call_history)
+            position = (len(ordered) - 1) * q / 100
+            lower = int(position)
+            upper = min(lower + 1, len(ordered) - 1)
+            return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+        return min(max(self.sketch.quantile(q / 100), self.min_time), self.max_time)
+    
     @property
     def median_time(self) -> float:
         """Calculate median execution time."""
-        return median(self.call_history) if self.call_history else 0.0
+        return self.percentile(50)
     
     @property
     def std_dev(self) -> float:
         """Calculate standard deviation of execution times."""
-        return stdev(self.call_history) if len(self.call_history) > 1 else 0.0
+        return math.sqrt(self.m2 / self.call_count) if self.call_count > 1 else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the statistics as a plain dictionary."""
+        return {
+            'call_count': self.call_count,
+            'total_time': self.total_time,
+            'min_time': self.min_time,
+            'max_time': self.max_time,
+            'last_call_time': self.last_call_time,
+            'avg_time': self.avg_time,
+            'median_time': self.median_time,
+            'std_dev': self.std_dev,
+            'p95_time': self.percentile(95),
+            'p99_time': self.percentile(99),
+        }
+
+
+class PerformanceCollector:
+    """
+    Prometheus collector that reads PerformanceMonitor statistics at scrape time.
+
+    Nothing is recorded into Prometheus objects on the hot path; every scrape
+    merges the monitor's shards and renders one histogram series per
+    monitored function name.
+    """
+
+    def __init__(self, monitor: "PerformanceMonitor"):
+        self._monitor = monitor
+
+    def describe(self) -> Iterator[Any]:
+        # Describing without collecting keeps registration free of side effects
+        return iter(())
+
+    def collect(self) -> Iterator[Any]:
+        durations = HistogramMetricFamily(
+            'opryxx_function_duration_seconds',
+            'Execution time of monitored functions',
+            labels=['function'],
+        )
+        quantiles = GaugeMetricFamily(
+            'opryxx_function_duration_quantile_seconds',
+            'Execution time quantiles of monitored functions',
+            labels=['function', 'quantile'],
+        )
+        for name, stats in self._monitor.snapshot().items():
+            bounds = self._monitor.get_histogram_buckets(name)
+            cumulative = stats.sketch.cumulative_counts(bounds)
+            buckets = [(repr(float(bound)), count) for bound, count in zip(bounds, cumulative)]
+            buckets.append(('+Inf', stats.call_count))
+            durations.add_metric([name], buckets, stats.total_time)
+            for q in (50, 95, 99):
+                quantiles.add_metric([name, str(q / 100)], stats.percentile(q))
+        yield durations
+        yield quantiles
+        
+        overflow = CounterMetricFamily(
+            'opryxx_function_names_overflow',
+            'Calls to metric names folded into __other__ by the cardinality cap',
+        )
+        overflow.add_metric([], self._monitor.overflow_count)
+        yield overflow
 
 
 class PerformanceMonitor:
@@ -68,16 +270,26 @@ class PerformanceMonitor:
         if self._initialized:
             return
             
-        self._stats: Dict[str, PerformanceStats] = defaultdict(PerformanceStats)
+        # Each thread records into its own shard; shards are merged on read
+        self._local = threading.local()
+        self._shards: Dict[str, List[Tuple[weakref.ref, PerformanceStats]]] = {}
+        self._retired: Dict[str, PerformanceStats] = {}
+        self._generation = 0
         self._lock = Lock()
         self._enabled = True
         self._logger = logging.getLogger(__name__)
         self._metrics_enabled = False
         self._prometheus_port = 9090
+        self._collector: Optional[PerformanceCollector] = None
+        self._default_buckets = DEFAULT_DURATION_BUCKETS
+        self._buckets_by_name: Dict[str, Tuple[float, ...]] = {}
+        # Distinct names with their own statistics, counted against the cap
+        self._names: set = set()
+        self.max_tracked_names = 1000
         self._initialized = True
     
     def monitor(self, name: Optional[str] = None) -> Callable[[F], F]:
-        ""
+        """
         Decorator to monitor function execution time.
         
         Args:
@@ -109,17 +321,80 @@ class PerformanceMonitor:
         """Record a performance metric."""
         if not self._enabled:
             return
-            
-        with self._lock:
-            self._stats[name].update(execution_time)
         
-        if self._metrics_enabled:
-            self._update_prometheus_metrics(name, execution_time)
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.generation = self._generation
+            local.shards = {}
+        stats = local.shards.get(name)
+        if stats is None:
+            stats = self._register_shard(name, local.shards)
+        stats.update(execution_time)
+    
+    def _register_shard(self, name: str, shards: Dict[str, PerformanceStats]) -> PerformanceStats:
+        """
+        Find or create the calling thread's shard for ``name``.
+        
+        Once ``max_tracked_names`` distinct names exist, new names record into
+        the thread's single ``__other__`` shard and are not remembered, so
+        dynamic names cannot grow memory without bound.
+        """
+        if name not in self._names and len(self._names) >= self.max_tracked_names:
+            return self._overflow_shard(shards)
+        with self._lock:
+            if name not in self._names:
+                if len(self._names) >= self.max_tracked_names:
+                    return self._overflow_shard(shards)
+                self._names.add(name)
+            stats = PerformanceStats()
+            self._shards.setdefault(name, []).append((weakref.ref(threading.current_thread()), stats))
+        shards[name] = stats
+        return stats
+    
+    def _overflow_shard(self, shards: Dict[str, PerformanceStats]) -> PerformanceStats:
+        """Get the calling thread's shared ``__other__`` shard."""
+        stats = shards.get(OVERFLOW_METRIC_NAME)
+        if stats is None:
+            stats = PerformanceStats()
+            with self._lock:
+                self._shards.setdefault(OVERFLOW_METRIC_NAME, []).append(
+                    (weakref.ref(threading.current_thread()), stats)
+                )
+            shards[OVERFLOW_METRIC_NAME] = stats
+        return stats
     
-    def _update_prometheus_metrics(self, name: str, execution_time: float) -> None:
-        """Update Prometheus metrics."""
-        # This would be implemented with actual Prometheus client calls
-        pass
+    @property
+    def overflow_count(self) -> int:
+        """Number of calls recorded under ``__other__`` by the cardinality cap."""
+        with self._lock:
+            stats = self._merged_stats(OVERFLOW_METRIC_NAME)
+        return stats.call_count if stats else 0
+    
+    def _merged_stats(self, name: str) -> Optional[PerformanceStats]:
+        """
+        Merge all shards of ``name`` into a fresh snapshot.
+        
+        Must be called with ``self._lock`` held. Shards of finished threads
+        are folded into a retired total so the shard list stays bounded.
+        """
+        if name not in self._shards and name not in self._retired:
+            return None
+        
+        merged = PerformanceStats()
+        retired = self._retired.get(name)
+        if retired is not None:
+            merged.merge(retired)
+        
+        live = []
+        for thread_ref, shard in self._shards.get(name, ()):
+            merged.merge(shard)
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                self._retired.setdefault(name, PerformanceStats()).merge(shard)
+            else:
+                live.append((thread_ref, shard))
+        self._shards[name] = live
+        return merged
     
     def enable(self) -> None:
         """Enable performance monitoring."""
@@ -129,29 +404,77 @@ class PerformanceMonitor:
         """Disable performance monitoring."""
         self._enabled = False
     
+    def snapshot(self) -> Dict[str, PerformanceStats]:
+        """Get merged statistics objects for every monitored name."""
+        with self._lock:
+            names = set(self._shards) | set(self._retired)
+            return {name: self._merged_stats(name) for name in names}
+    
     def get_stats(self, name: Optional[str] = None) -> Dict[str, Any]:
         """Get performance statistics."""
         with self._lock:
             if name:
-                stats = self._stats.get(name)
-                return vars(stats) if stats else {}
-            return {k: vars(v) for k, v in self._stats.items()}
+                stats = self._merged_stats(name)
+                return stats.to_dict() if stats else {}
+            names = set(self._shards) | set(self._retired)
+            return {key: self._merged_stats(key).to_dict() for key in names}
     
     def reset_stats(self, name: Optional[str] = None) -> None:
         """Reset performance statistics."""
         with self._lock:
-            if name and name in self._stats:
-                self._stats[name] = PerformanceStats()
-            elif name is None:
-                self._stats.clear()
+            if name is None:
+                self._shards.clear()
+                self._retired.clear()
+                self._names.clear()
+            elif name in self._shards or name in self._retired:
+                self._shards[name] = []
+                self._retired[name] = PerformanceStats()
+            # Invalidate every thread's cached shards
+            self._generation += 1
+    
+    def set_histogram_buckets(self, buckets: Sequence[float], name: Optional[str] = None) -> None:
+        """
+        Configure Prometheus histogram bucket bounds.
+        
+        Args:
+            buckets: Upper bounds in seconds; sorted and de-duplicated
+            name: Monitored function name to override; ``None`` sets the default
+        """
+        bounds = tuple(sorted(set(float(b) for b in buckets)))
+        if not bounds:
+            raise ValueError("At least one bucket bound is required")
+        if name is None:
+            self._default_buckets = bounds
+        else:
+            self._buckets_by_name[name] = bounds
     
-    def enable_prometheus_metrics(self, port: int = 9090) -> None:
-        """Enable Prometheus metrics endpoint."""
+    def get_histogram_buckets(self, name: str) -> Tuple[float, ...]:
+        """Get the histogram bucket bounds used for ``name``."""
+        return self._buckets_by_name.get(name, self._default_buckets)
+    
+    def enable_prometheus_metrics(self, port: int = 9090,
+                                  registry: Optional[Any] = None) -> None:
+        """
+        Enable Prometheus metrics endpoint.
+        
+        Registers a PerformanceCollector that reads the aggregated statistics
+        at scrape time, then starts the HTTP exporter.
+        
+        Args:
+            port: Port for the metrics HTTP server
+            registry: Collector registry; defaults to the global registry
+        """
         if self._metrics_enabled:
             return
             
         try:
-            start_http_server(port)
+            if self._collector is None:
+                self._collector = PerformanceCollector(self)
+                (registry or prometheus_client.REGISTRY).register(self._collector)
+            if registry is None:
+                prometheus_client.start_http_server(port)
+            else:
+                prometheus_client.start_http_server(port, registry=registry)
             self._prometheus_port = port
             self._metrics_enabled = True
             self._logger.info(f"Prometheus metrics server started on port {port}")
@@ -171,7 +494,9 @@ class PerformanceMonitor:
         bottlenecks = []
         
         with self._lock:
-            for name, stats in self._stats.items():
+            names = set(self._shards) | set(self._retired)
+            for name in names:
+                stats = self._merged_stats(name)
                 if stats.avg_time >= threshold:
                     bottlenecks.append({
                         'name': name,
@@ -181,6 +506,7 @@ class PerformanceMonitor:
                         'min_time': stats.min_time,
                         'max_time': stats.max_time,
                         'median_time': stats.median_time,
+                        'p95_time': stats.percentile(95),
                         'std_dev': stats.std_dev
                     })
         
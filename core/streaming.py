@@ -0,0 +1,293 @@
+"""
+Delta-encoded metric streams for real-time dashboards.
+
+A ``MetricStream`` holds the latest value of every metric, grouped by name
+(``{'cpu': {'percent': 12.5}, 'memory': {...}}``). Each publish that changes
+something bumps a sequence number and records only the changed fields.
+Subscribers choose the groups they want and receive:
+
+    keyframe  {"type": "keyframe", "seq": 7, "ts": ..., "data": {group: {field: value}}}
+    delta     {"type": "delta", "seq": 9, "base": 7, "ts": ..., "data": {...}, "removed": {group: [field]}}
+
+A delta applies on top of the state at ``base``. Changes published while a
+subscriber is rate limited are coalesced into its next delta; a subscriber
+that falls further behind than the delta history gets a fresh keyframe.
+Encoded messages are cached per (base, groups, encoding), so subscribers
+that are in step share one serialization per change.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+ENCODINGS = ('json', 'msgpack')
+
+Message = Union[str, bytes]
+
+
+def _encoder(encoding: str):
+    if encoding == 'json':
+        return lambda message: json.dumps(message, default=str, separators=(',', ':'))
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown stream encoding: {encoding}")
+    if msgpack is None:
+        raise ValueError("The msgpack stream encoding requires the msgpack package")
+    return lambda message: msgpack.packb(message, default=str)
+
+
+class MetricStream:
+    """
+    Latest metric values plus a bounded history of per-publish deltas
+
+    Groups missing from a published snapshot are left unchanged, so a
+    producer may publish one group at a time; fields missing from a
+    published group are reported as removed.
+    """
+
+    def __init__(self, history: int = 64, precision: Optional[int] = None):
+        self.history = history
+        self.precision = precision
+        self.seq = 0
+        self.timestamp: Optional[float] = None
+        self._state: Dict[str, Dict[str, Any]] = {}
+        # (seq, changed fields, removed fields); sequence numbers are contiguous
+        self._deltas: deque = deque(maxlen=history)
+        self._encoded: Dict[Tuple, Message] = {}
+        self._encoders: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.publishes = 0
+        self.changes = 0
+        self.encodes = 0
+        self.encode_hits = 0
+
+    @property
+    def groups(self) -> list:
+        return list(self._state)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of the current state"""
+        with self._lock:
+            return {group: dict(fields) for group, fields in self._state.items()}
+
+    def publish(self, snapshot: Dict[str, Dict[str, Any]], timestamp: Optional[float] = None) -> bool:
+        """
+        Record a new snapshot
+
+        Args:
+            snapshot: Mapping of group name to a mapping of field values
+            timestamp: Sample time, defaults to now
+
+        Returns:
+            True if any field changed
+        """
+        with self._lock:
+            self.publishes += 1
+            self.timestamp = time.time() if timestamp is None else timestamp
+            changed: Dict[str, Dict[str, Any]] = {}
+            removed: Dict[str, list] = {}
+
+            for group, fields in snapshot.items():
+                fields = self._normalize(fields)
+                current = self._state.setdefault(group, {})
+                diff = {key: value for key, value in fields.items() if key not in current or current[key] != value}
+                gone = [key for key in current if key not in fields]
+                if diff:
+                    changed[group] = diff
+                    current.update(diff)
+                if gone:
+                    removed[group] = gone
+                    for key in gone:
+                        del current[key]
+
+            if not changed and not removed:
+                return False
+
+            self.seq += 1
+            self.changes += 1
+            self._deltas.append((self.seq, changed, removed))
+            # Cached messages are only valid for the sequence they were built at
+            self._encoded.clear()
+            return True
+
+    def _normalize(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        if self.precision is None:
+            return fields
+        # Rounding keeps sub-precision jitter from producing deltas
+        return {
+            key: round(value, self.precision) if isinstance(value, float) else value
+            for key, value in fields.items()
+        }
+
+    def message(
+        self,
+        base: Optional[int],
+        groups: Optional[FrozenSet[str]] = None,
+        encoding: str = 'json'
+    ) -> Tuple[int, Optional[str], Optional[Message]]:
+        """
+        Encoded update for a subscriber that has seen the state at ``base``
+
+        Args:
+            base: Last sequence number the subscriber has applied, or None
+                if it has no state yet
+            groups: Groups the subscriber wants; None for all
+            encoding: One of ENCODINGS
+
+        Returns:
+            The sequence number the subscriber is at afterwards, the message
+            type and the message to send (None when nothing it subscribes
+            to changed)
+        """
+        with self._lock:
+            if base is not None and base > self.seq:
+                base = None
+            if base == self.seq or (base is None and not self.seq):
+                return self.seq, None, None
+            if base is None or self.seq - base > len(self._deltas):
+                message = self._cached(('keyframe', None, groups, encoding), self._keyframe, groups)
+                return self.seq, 'keyframe', message
+            message = self._cached(('delta', base, groups, encoding), self._delta, base, groups)
+            return self.seq, 'delta' if message is not None else None, message
+
+    def _cached(self, key: Tuple, build, *args) -> Optional[Message]:
+        if key in self._encoded:
+            self.encode_hits += 1
+            return self._encoded[key]
+        message = build(*args)
+        if message is not None:
+            encoding = key[-1]
+            encoder = self._encoders.get(encoding)
+            if encoder is None:
+                encoder = self._encoders[encoding] = _encoder(encoding)
+            message = encoder(message)
+            self.encodes += 1
+        self._encoded[key] = message
+        return message
+
+    def _keyframe(self, groups: Optional[FrozenSet[str]]) -> Dict:
+        return {
+            'type': 'keyframe',
+            'seq': self.seq,
+            'ts': self.timestamp,
+            'data': {
+                group: dict(fields) for group, fields in self._state.items()
+                if groups is None or group in groups
+            }
+        }
+
+    def _delta(self, base: int, groups: Optional[FrozenSet[str]]) -> Optional[Dict]:
+        data: Dict[str, Dict[str, Any]] = {}
+        removed: Dict[str, set] = {}
+        for index in range(len(self._deltas) - (self.seq - base), len(self._deltas)):
+            _, changed, gone = self._deltas[index]
+            for group, fields in changed.items():
+                if groups is None or group in groups:
+                    data.setdefault(group, {}).update(fields)
+                    if group in removed:
+                        removed[group].difference_update(fields)
+            for group, keys in gone.items():
+                if groups is None or group in groups:
+                    removed.setdefault(group, set()).update(keys)
+                    for key in keys:
+                        data.get(group, {}).pop(key, None)
+
+        data = {group: fields for group, fields in data.items() if fields}
+        removed = {group: sorted(keys) for group, keys in removed.items() if keys}
+        if not data and not removed:
+            return None
+
+        message = {'type': 'delta', 'seq': self.seq, 'base': base, 'ts': self.timestamp, 'data': data}
+        if removed:
+            message['removed'] = removed
+        return message
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'seq': self.seq,
+            'groups': len(self._state),
+            'publishes': self.publishes,
+            'changes': self.changes,
+            'encodes': self.encodes,
+            'encode_hits': self.encode_hits
+        }
+
+
+class StreamSubscriber:
+    """
+    One client's position in a MetricStream
+
+    ``poll`` returns the next message to send, or None. With a
+    ``min_interval`` polls inside the interval return None and the changes
+    are coalesced into the next delta instead of being queued.
+    """
+
+    def __init__(
+        self,
+        stream: MetricStream,
+        groups: Optional[Iterable[str]] = None,
+        encoding: str = 'json',
+        min_interval: float = 0.0,
+        clock=time.monotonic
+    ):
+        _encoder(encoding)
+        self.stream = stream
+        self.groups: Optional[FrozenSet[str]] = frozenset(groups) if groups else None
+        self.encoding = encoding
+        self.min_interval = min_interval
+        self.clock = clock
+        self.base: Optional[int] = None
+        self.last_sent: Optional[float] = None
+        self.messages = 0
+        self.keyframes = 0
+        self.bytes = 0
+
+    def subscribe(self, groups: Optional[Iterable[str]]) -> None:
+        """Change the subscribed groups; the next message is a keyframe"""
+        self.groups = frozenset(groups) if groups else None
+        self.base = None
+
+    def resync(self) -> None:
+        """Send a keyframe next, e.g. after the client lost its state"""
+        self.base = None
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Seconds until the rate limit allows another message"""
+        if self.last_sent is None or not self.min_interval:
+            return 0.0
+        now = self.clock() if now is None else now
+        return max(0.0, self.last_sent + self.min_interval - now)
+
+    def poll(self, now: Optional[float] = None) -> Optional[Message]:
+        """Next message for this subscriber, or None if there is nothing to send yet"""
+        now = self.clock() if now is None else now
+        if self.delay(now):
+            return None
+        seq, kind, message = self.stream.message(self.base, self.groups, self.encoding)
+        if message is None:
+            # Stay without state until there is something to send as a keyframe
+            if self.base is not None:
+                self.base = seq
+            return None
+        self.base = seq
+        self.last_sent = now
+        self.messages += 1
+        self.keyframes += kind == 'keyframe'
+        self.bytes += len(message)
+        return message
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'groups': sorted(self.groups) if self.groups is not None else None,
+            'encoding': self.encoding,
+            'seq': self.base,
+            'messages': self.messages,
+            'keyframes': self.keyframes,
+            'bytes': self.bytes
+        }
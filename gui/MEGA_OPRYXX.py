@@ -6,11 +6,13 @@ Full-stack implementation with modern UI and real-time monitoring
 
 import os
 import sys
+import copy
 import json
 import threading
 import subprocess
 import time
 import asyncio
+from collections import OrderedDict
 import websockets
 import requests
 from datetime import datetime, timedelta
@@ -155,7 +157,8 @@ class MegaTask:
         if 'updated_at' in data:
             task.updated_at = datetime.fromisoformat(data['updated_at'])
         task.progress = data.get('progress', 0)
-        task.details = data.get('details', {})
+        # Copied: the raw data may be a cached API response body
+        task.details = copy.deepcopy(data.get('details', {}))
         return task
     
     def update_status(self, status: Union[str, TaskStatus], message: str = None) -> None:
@@ -211,13 +214,91 @@ class MegaTask:
         """Get task duration"""
         return self.updated_at - self.created_at
 
+class HTTPCache:
+    """
+    Validator cache for conditional GETs
+    
+    Keeps the last body, ETag and Last-Modified per URL (bounded LRU) and
+    tracks in-flight requests so identical concurrent GETs share one
+    round trip.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'not_modified': 0, 'coalesced': 0, 'bytes': 0}
+    
+    def validators(self, key: str) -> Dict[str, str]:
+        """Conditional request headers for a cached URL"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return {}
+            self.entries.move_to_end(key)
+            headers = {}
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+            return headers
+    
+    def cached_body(self, key: str) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry['body'] if entry else None
+    
+    def store(self, key: str, response: requests.Response, body: Any) -> None:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self.lock:
+            if not etag and not last_modified:
+                self.entries.pop(key, None)
+                return
+            self.entries[key] = {'etag': etag, 'last_modified': last_modified, 'body': body}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def discard(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def join_or_lead(self, key: str) -> Tuple[bool, Dict[str, Any]]:
+        """Register interest in a GET; the first caller (leader) performs it"""
+        with self.lock:
+            flight = self.in_flight.get(key)
+            if flight is not None:
+                self.stats['coalesced'] += 1
+                return False, flight
+            flight = {'done': threading.Event(), 'result': None}
+            self.in_flight[key] = flight
+            return True, flight
+    
+    def finish(self, key: str, flight: Dict[str, Any], result: Any) -> None:
+        with self.lock:
+            self.in_flight.pop(key, None)
+        flight['result'] = result
+        flight['done'].set()
+    
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
 class APIClient:
     """Handles all API communications with the backend"""
     
+    # Ids per batched get_tasks request, keeps URLs short
+    TASK_BATCH_SIZE = 100
+    
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url
         self.ws_url = WS_URL
         self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'gzip'
+        self.cache = HTTPCache()
         self.token = None
         self.ws = None
         self.ws_connected = False
@@ -259,13 +340,59 @@ class APIClient:
             self._trigger_callback('on_error', f"Login failed: {e}")
             return False
     
+    def _cached_get(self, path: str, params: Dict = None) -> Any:
+        """
+        GET with conditional revalidation and in-flight deduplication
+        
+        Args:
+            path: URL path relative to the base URL
+            params: Query parameters
+        
+        Returns:
+            The decoded JSON body, the cached body on 304 Not Modified
+        
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        url = f"{self.base_url}{path}"
+        key = requests.Request('GET', url, params=params).prepare().url
+        leader, flight = self.cache.join_or_lead(key)
+        if not leader:
+            flight['done'].wait()
+            if isinstance(flight['result'], Exception):
+                raise flight['result']
+            return flight['result']
+        
+        result = None
+        try:
+            response = self.session.get(url, params=params, headers=self.cache.validators(key))
+            self.cache.stats['requests'] += 1
+            if response.status_code == 304:
+                self.cache.stats['not_modified'] += 1
+                result = self.cache.cached_body(key)
+                if result is None:
+                    # Lost the cached body (evicted); fetch unconditionally
+                    self.cache.discard(key)
+                    response = self.session.get(url, params=params)
+            if result is None:
+                if response.status_code == 404:
+                    self.cache.discard(key)
+                response.raise_for_status()
+                self.cache.stats['bytes'] += len(response.content)
+                result = response.json()
+                self.cache.store(key, response, result)
+            return result
+        except (requests.RequestException, ValueError) as e:
+            result = e
+            raise
+        finally:
+            self.cache.finish(key, flight, result)
+    
     def get_system_status(self) -> Optional[Dict]:
         """Get current system status"""
         try:
-            response = self.session.get(f"{self.base_url}/system/status")
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._cached_get("/system/status")
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Failed to get system status: {e}")
             return None
     
@@ -285,13 +412,24 @@ class APIClient:
     def get_task(self, task_id: str) -> Optional[Dict]:
         """Get task by ID"""
         try:
-            response = self.session.get(f"{self.base_url}/tasks/{task_id}")
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._cached_get(f"/tasks/{task_id}")
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Failed to get task {task_id}: {e}")
             return None
     
+    def get_tasks(self, task_ids: List[str]) -> List[Dict]:
+        """Get several tasks by ID in batched requests; missing ids are skipped"""
+        task_ids = sorted(set(task_ids))
+        tasks = []
+        try:
+            for start in range(0, len(task_ids), self.TASK_BATCH_SIZE):
+                batch = task_ids[start:start + self.TASK_BATCH_SIZE]
+                tasks.extend(self._cached_get("/tasks", {'ids': ','.join(batch)}))
+            return tasks
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Failed to get tasks: {e}")
+            return []
+    
     def update_task(self, task_id: str, updates: Dict) -> bool:
         """Update an existing task"""
         try:
@@ -315,22 +453,17 @@ class APIClient:
             logger.error(f"Failed to delete task {task_id}: {e}")
             return False
     
-    def list_tasks(self, status: str = None) -> List[Dict]:
-        """List all tasks, optionally filtered by status"""
+    def list_tasks(self, status: str = None) -> Optional[List[Dict]]:
+        """List all tasks, optionally filtered by status; None if the request failed"""
         try:
             params = {}
             if status:
                 params['status'] = status
                 
-            response = self.session.get(
-                f"{self.base_url}/tasks",
-                params=params
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._cached_get("/tasks", params)
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Failed to list tasks: {e}")
-            return []
+            return None
     
     def execute_recovery(self, recovery_type: str, options: Dict = None) -> bool:
         """Execute a recovery operation"""
@@ -627,10 +760,18 @@ class TaskCard(ttk.Frame):
     
     def update_display(self):
         """Update the display with current task data"""
+        self.title_label.config(text=self.task.title)
+        self.type_label.config(text=f"Type: {self.task.type.title()}")
+        self.priority_label.config(text=f"Priority: {self.task.priority.title()}")
         self.progress['value'] = self.task.progress
         self.status_label.config(text=self.task.status.upper())
         self.status_label.config(style=f'Status.{self.task.status.upper()}.TLabel')
     
+    def set_task(self, task: MegaTask):
+        """Rebind the card to another task (cards are reused while scrolling)"""
+        self.task = task
+        self.update_display()
+    
     def on_view_details(self):
         """Handle view details action"""
         if self.on_action:
@@ -647,6 +788,255 @@ class TaskCard(ttk.Frame):
             self.on_action('delete', self.task)
 
 
+@dataclass
+class TaskListDiff:
+    """Changes between two task list fetches"""
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    reordered: bool = False
+    
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed or self.reordered)
+
+
+class TaskListModel:
+    """
+    Ordered task view model that diffs successive API fetches
+    
+    Only tasks whose raw data changed are rebuilt as MegaTask objects, and
+    the returned TaskListDiff tells the view which rows to touch.
+    """
+    
+    def __init__(self):
+        self.order: List[str] = []
+        self.tasks: Dict[str, MegaTask] = {}
+        self._raw: Dict[str, Dict] = {}
+    
+    def __len__(self) -> int:
+        return len(self.order)
+    
+    def task_at(self, index: int) -> MegaTask:
+        return self.tasks[self.order[index]]
+    
+    def ordered(self) -> List[MegaTask]:
+        return [self.tasks[task_id] for task_id in self.order]
+    
+    def apply(self, tasks_data: List[Dict]) -> TaskListDiff:
+        """Replace the list with a new fetch and return what changed"""
+        diff = TaskListDiff()
+        order = []
+        raw = {}
+        
+        for index, data in enumerate(tasks_data):
+            if not isinstance(data, dict):
+                logger.error(f"Skipping malformed task at #{index}: {data!r}")
+                continue
+            task_id = str(data.get('id') or f"#{index}")
+            if task_id in raw:
+                continue
+            order.append(task_id)
+            raw[task_id] = data
+            
+            previous = self._raw.get(task_id)
+            if previous == data:
+                continue
+            try:
+                self.tasks[task_id] = MegaTask.from_dict(data)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Skipping malformed task {task_id}: {e}")
+                order.pop()
+                del raw[task_id]
+                continue
+            (diff.added if previous is None else diff.updated).append(task_id)
+        
+        diff.removed = [task_id for task_id in self.order if task_id not in raw]
+        for task_id in diff.removed:
+            self.tasks.pop(task_id, None)
+        
+        diff.reordered = bool(diff.added or diff.removed) or order != self.order
+        self.order = order
+        self._raw = raw
+        return diff
+
+
+class VirtualTaskList(ttk.Frame):
+    """
+    Scrollable task list that only creates cards for the visible rows
+    
+    Rows have a fixed height; cards scrolled out of view are hidden and
+    reused for rows scrolled into view, so the widget count depends on the
+    window height rather than the number of tasks.
+    """
+    
+    def __init__(self, parent, model: TaskListModel, on_action: Callable = None,
+                 row_height: int = 170, overscan: int = 2, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.model = model
+        self.on_action = on_action
+        self.row_height = row_height
+        self.overscan = overscan
+        self.theme = SystemTheme.DARK
+        
+        self.canvas = tk.Canvas(self, bg=self.theme['bg'], highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scroll)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+        
+        # Visible task id -> (card, canvas window item); hidden cards for reuse
+        self.visible: Dict[str, Tuple[TaskCard, int]] = {}
+        self.spare: List[Tuple[TaskCard, int]] = []
+        self._width = 1
+        
+        self.canvas.bind('<Configure>', self._on_configure)
+        self.canvas.bind('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self._scroll_units(-1))
+        self.canvas.bind('<Button-5>', lambda e: self._scroll_units(1))
+    
+    def apply(self, diff: TaskListDiff):
+        """Bring the rendered rows up to date with the model"""
+        if diff.reordered:
+            self._update_scrollregion()
+            self.render(refresh=set(diff.updated))
+            return
+        for task_id in diff.updated:
+            if task_id in self.visible:
+                self.visible[task_id][0].set_task(self.model.tasks[task_id])
+    
+    def render(self, refresh: Optional[set] = None):
+        """Place cards for the rows inside the viewport"""
+        refresh = refresh or set()
+        height = max(self.canvas.winfo_height(), 1)
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.row_height) - self.overscan)
+        last = min(len(self.model), int((top + height) // self.row_height) + 1 + self.overscan)
+        wanted = {self.model.order[index]: index for index in range(first, last)}
+        
+        for task_id in [task_id for task_id in self.visible if task_id not in wanted]:
+            card, item = self.visible.pop(task_id)
+            self.canvas.itemconfigure(item, state='hidden')
+            self.spare.append((card, item))
+        
+        for task_id, index in wanted.items():
+            task = self.model.tasks[task_id]
+            entry = self.visible.get(task_id)
+            if entry is None:
+                entry = self._acquire(task)
+                self.visible[task_id] = entry
+            elif task_id in refresh:
+                entry[0].set_task(task)
+            self.canvas.coords(entry[1], 0, index * self.row_height)
+    
+    def _acquire(self, task: MegaTask) -> Tuple[TaskCard, int]:
+        if self.spare:
+            card, item = self.spare.pop()
+            card.set_task(task)
+            self.canvas.itemconfigure(item, state='normal')
+            return card, item
+        card = TaskCard(self.canvas, task, on_action=self.on_action)
+        item = self.canvas.create_window(
+            0, 0, window=card, anchor='nw',
+            width=self._width, height=self.row_height - 10
+        )
+        card.bind('<MouseWheel>', self._on_mousewheel)
+        return card, item
+    
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self._width, len(self.model) * self.row_height))
+    
+    def _on_configure(self, event):
+        self._width = max(event.width, 1)
+        for card, item in list(self.visible.values()) + self.spare:
+            self.canvas.itemconfigure(item, width=self._width)
+        self._update_scrollregion()
+        self.render()
+    
+    def _on_scroll(self, *args):
+        self.canvas.yview(*args)
+        self.render()
+    
+    def _scroll_units(self, units: int):
+        self.canvas.yview_scroll(units, 'units')
+        self.render()
+    
+    def _on_mousewheel(self, event):
+        self._scroll_units(-1 if event.delta > 0 else 1)
+
+
+class APIPoller:
+    """
+    Polls the backend on a worker thread
+    
+    Results are handed to the Tk thread with ``root.after`` so slow API
+    calls never block the UI. Status is fetched every ``interval``
+    seconds, the task list every ``task_interval`` seconds or on request.
+    """
+    
+    def __init__(self, root: tk.Tk, api: APIClient, on_status: Callable, on_tasks: Callable,
+                 interval: float = 1.0, task_interval: float = 5.0):
+        self.root = root
+        self.api = api
+        self.on_status = on_status
+        self.on_tasks = on_tasks
+        self.interval = interval
+        self.task_interval = task_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._tasks_requested = True
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='APIPoller', daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+    
+    def poll_now(self):
+        """Fetch status without waiting for the next interval"""
+        self._wake.set()
+    
+    def request_tasks(self):
+        """Fetch the task list on the next poll, which starts immediately"""
+        self._tasks_requested = True
+        self._wake.set()
+    
+    def _run(self):
+        next_tasks = 0.0
+        while not self._stop.is_set():
+            status = self.api.get_system_status()
+            if status:
+                self._deliver(self.on_status, status)
+            
+            if self._tasks_requested or time.monotonic() >= next_tasks:
+                self._tasks_requested = False
+                tasks = self.api.list_tasks()
+                # A failed fetch must not be shown as an empty list
+                if tasks is not None:
+                    self._deliver(self.on_tasks, tasks)
+                next_tasks = time.monotonic() + self.task_interval
+            
+            self._wake.wait(self.interval)
+            self._wake.clear()
+    
+    def _deliver(self, callback: Callable, result: Any):
+        if self._stop.is_set():
+            return
+        try:
+            self.root.after(0, callback, result)
+        except (RuntimeError, tk.TclError):
+            # The main loop has gone away
+            self._stop.set()
+
+
 class SystemHealthWidget(ttk.Frame):
     """Widget for displaying system health metrics"""
     
@@ -755,11 +1145,22 @@ class MegaGUI:
         
         # Initialize UI state
         self.tasks = []
+        self.task_model = TaskListModel()
         self.current_tab = None
         self.update_interval = 1000  # ms
         
+        # API calls run on a worker thread; results come back via root.after
+        self.poller = APIPoller(
+            self.root,
+            self.mega_system.api,
+            on_status=self.update_system_status,
+            on_tasks=self.apply_tasks,
+            interval=self.update_interval / 1000
+        )
+        
         # Initialize UI components that might be accessed early
         self.tasks_container = None
+        self.task_list = None
         self.no_tasks_label = None
         
         # Setup GUI
@@ -768,8 +1169,11 @@ class MegaGUI:
         # Start background updates
         self.schedule_updates()
         
-        # Connect to WebSocket for real-time updates
-        self.mega_system.api.register_callback('on_status_update', self.update_system_status)
+        # Connect to WebSocket for real-time updates (delivered on the Tk thread)
+        self.mega_system.api.register_callback(
+            'on_status_update',
+            lambda status_data: self.root.after(0, self.update_system_status, status_data)
+        )
         
         # Load initial data if UI is ready
         if hasattr(self, 'notebook'):
@@ -992,6 +1396,13 @@ class MegaGUI:
             style='Hint.TLabel'
         )
         self.no_tasks_label.pack(pady=20)
+        
+        # Virtualized list, shown once there are tasks
+        self.task_list = VirtualTaskList(
+            self.tasks_container,
+            self.task_model,
+            on_action=self.on_task_action
+        )
     
     def create_optimization_tab(self):
         """Create the system optimization tab"""
@@ -1033,32 +1444,29 @@ class MegaGUI:
         ).pack(pady=20)
     
     def refresh_tasks(self):
-        """Refresh the tasks list"""
-        # Clear existing tasks
-        for widget in self.tasks_container.winfo_children():
-            if widget != self.no_tasks_label:
-                widget.destroy()
+        """Refresh the tasks list (fetched on the poller thread)"""
+        self.poller.request_tasks()
+    
+    def apply_tasks(self, tasks_data: List[Dict]):
+        """Apply a task list fetch on the Tk thread, touching only changed rows"""
+        was_empty = not len(self.task_model)
+        diff = self.task_model.apply(tasks_data)
+        if not diff.changed:
+            return
+        self.tasks = self.task_model.ordered()
         
-        # Load tasks from API
-        tasks_data = self.mega_system.api.list_tasks()
-        self.tasks = [MegaTask.from_dict(task) for task in tasks_data]
+        if self.task_list is None:
+            return
         
         # Show no tasks message if empty
         if not self.tasks:
+            self.task_list.pack_forget()
             self.no_tasks_label.pack(pady=20)
-            return
+        elif was_empty:
+            self.no_tasks_label.pack_forget()
+            self.task_list.pack(fill='both', expand=True)
         
-        # Hide no tasks message
-        self.no_tasks_label.pack_forget()
-        
-        # Add task cards
-        for task in self.tasks:
-            card = TaskCard(
-                self.tasks_container,
-                task,
-                on_action=self.on_task_action
-            )
-            card.pack(fill='x', padx=5, pady=5)
+        self.task_list.apply(diff)
     
     def update_system_status(self, status_data):
         """Update system status display"""
@@ -1102,16 +1510,12 @@ class MegaGUI:
         self.activities_list.yview_moveto(1.0)
     
     def schedule_updates(self):
-        """Schedule periodic UI updates"""
-        self.update_ui()
-        self.root.after(self.update_interval, self.schedule_updates)
+        """Start periodic background polling"""
+        self.poller.start()
     
     def update_ui(self):
-        """Update UI elements"""
-        # Update system status
-        status = self.mega_system.api.get_system_status()
-        if status:
-            self.update_system_status(status)
+        """Request a status update without waiting for the next poll"""
+        self.poller.poll_now()
     
     # Event Handlers
     def on_add_task(self, task: Optional[MegaTask] = None):
@@ -1399,7 +1803,10 @@ class MegaGUI:
     
     def run(self):
         """Start the application"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.poller.stop()
     
     def setup_styles(self):
         """Configure modern ttk styles and theme"""
@@ -2034,7 +2441,10 @@ class MegaGUI:
         self.fix_btn.pack(pady=(10, 0))
     
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.poller.stop()
 
 def main():
     """Launch MEGA OPRYXX"""
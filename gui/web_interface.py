@@ -15,6 +15,7 @@ from core.memory_optimizer import memory_optimizer, OptimizationLevel
 from core.enhanced_gpu_ops import enhanced_gpu_ops
 from core.resilience_system import resilience_manager
 from core.gpu_acceleration import is_gpu_available, get_compute_device
+from core.streaming import MetricStream, StreamSubscriber
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'opryxx_secret_key'
@@ -23,6 +24,10 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 class WebInterface:
     def __init__(self):
         self.monitoring_active = False
+        # Per-client stream positions keyed by Socket.IO session id
+        self.metric_stream = MetricStream(precision=1)
+        self.subscribers = {}
+        self.subscribers_lock = threading.Lock()
         self.setup_routes()
         self.start_background_tasks()
     
@@ -94,8 +99,35 @@ class WebInterface:
         def handle_connect():
             emit('status', {'message': 'Connected to OPRYXX System'})
         
+        @socketio.on('disconnect')
+        def handle_disconnect():
+            with self.subscribers_lock:
+                self.subscribers.pop(request.sid, None)
+        
+        @socketio.on('subscribe')
+        def handle_subscribe(options=None):
+            # {"groups": [...], "encoding": "json"|"msgpack", "min_interval": seconds}
+            options = options or {}
+            try:
+                subscriber = StreamSubscriber(
+                    self.metric_stream,
+                    groups=options.get('groups'),
+                    encoding=options.get('encoding', 'json'),
+                    min_interval=max(0.0, float(options.get('min_interval', 0)))
+                )
+            except (TypeError, ValueError) as e:
+                emit('status', {'message': f'Subscription rejected: {e}'})
+                return
+            with self.subscribers_lock:
+                self.subscribers[request.sid] = subscriber
+            self.send_real_time_update()
+        
         @socketio.on('request_update')
         def handle_update_request():
+            with self.subscribers_lock:
+                subscriber = self.subscribers.get(request.sid)
+                if subscriber:
+                    subscriber.resync()
             self.send_real_time_update()
     
     def start_background_tasks(self):
@@ -113,18 +145,34 @@ class WebInterface:
             metrics = performance_monitor.get_metrics()
             mem_metrics = memory_optimizer.get_memory_metrics()
             
-            data = {
-                'cpu_usage': metrics.cpu_usage,
-                'memory_usage': metrics.memory_usage,
-                'performance_score': metrics.score,
-                'memory_available': mem_metrics.available_mb,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            socketio.emit('metrics_update', data)
+            self.metric_stream.publish({
+                'performance': {
+                    'cpu_usage': metrics.cpu_usage,
+                    'memory_usage': metrics.memory_usage,
+                    'performance_score': metrics.score
+                },
+                'memory': {
+                    'memory_available': mem_metrics.available_mb
+                }
+            })
+            self.flush_stream()
         except Exception as e:
             print(f"Error sending update: {e}")
     
+    def flush_stream(self):
+        """Send each subscriber the keyframe or coalesced delta it is due"""
+        # Runs on every tick so rate-limited clients get pending changes
+        # even when nothing new was published
+        with self.subscribers_lock:
+            pending = []
+            for sid, subscriber in self.subscribers.items():
+                message = subscriber.poll()
+                if message is not None:
+                    pending.append((sid, message))
+        
+        for sid, message in pending:
+            socketio.emit('metrics_stream', message, to=sid)
+    
     def run(self, host='127.0.0.1', port=5000, debug=False):
         socketio.run(app, host=host, port=port, debug=debug)
 
@@ -235,11 +283,45 @@ dashboard_html = '''
             }
         });
 
+        // Stream state: a keyframe replaces it, a delta patches it
+        let streamState = {};
+        let streamSeq = null;
+
         socket.on('connect', function() {
             logMessage('Connected to OPRYXX System');
+            streamSeq = null;
+            socket.emit('subscribe', {groups: ['performance', 'memory']});
+        });
+
+        socket.on('metrics_stream', function(raw) {
+            const message = JSON.parse(raw);
+            if (message.type === 'keyframe') {
+                streamState = message.data;
+            } else if (streamSeq === null || message.base !== streamSeq) {
+                socket.emit('request_update');
+                return;
+            } else {
+                Object.entries(message.data).forEach(([group, fields]) => {
+                    streamState[group] = Object.assign(streamState[group] || {}, fields);
+                });
+                Object.entries(message.removed || {}).forEach(([group, fields]) => {
+                    fields.forEach(field => delete (streamState[group] || {})[field]);
+                });
+            }
+            streamSeq = message.seq;
+
+            const performance = streamState.performance || {};
+            const memory = streamState.memory || {};
+            renderMetrics({
+                cpu_usage: performance.cpu_usage || 0,
+                memory_usage: performance.memory_usage || 0,
+                performance_score: performance.performance_score || 0,
+                memory_available: memory.memory_available || 0,
+                timestamp: message.ts * 1000
+            });
         });
 
-        socket.on('metrics_update', function(data) {
+        function renderMetrics(data) {
             document.getElementById('cpu-usage').textContent = data.cpu_usage.toFixed(1) + '%';
             document.getElementById('memory-usage').textContent = data.memory_usage.toFixed(1) + '%';
             document.getElementById('perf-score').textContent = data.performance_score.toFixed(1);
@@ -258,7 +340,7 @@ dashboard_html = '''
             }
             
             chart.update('none');
-        });
+        }
 
         function startMonitoring() {
             fetch('/api/start_monitoring', {method: 'POST'})
@@ -0,0 +1,49 @@
+"""Add system metric rollup tiers.
+
+Revision ID: 0002_system_metric_rollups
+Revises: 0001_initial
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_system_metric_rollups'
+down_revision = '0001_initial'
+branch_labels = None
+depends_on = None
+
+# Numeric system_metrics columns aggregated per bucket
+AGGREGATED_COLUMNS = (
+    'cpu_usage', 'memory_usage', 'disk_usage', 'disk_space', 'temp_files_size', 'health_score'
+)
+
+
+def upgrade() -> None:
+    # Create system_metric_rollups table (1 minute / 1 hour downsampling tiers)
+    columns = [
+        sa.Column('id', sa.Integer, nullable=False, primary_key=True),
+        sa.Column('resolution', sa.Integer, nullable=False),
+        sa.Column('bucket_start', sa.DateTime, nullable=False),
+        sa.Column('sample_count', sa.Integer, nullable=False),
+    ]
+    for name in AGGREGATED_COLUMNS:
+        columns += [
+            sa.Column(f'{name}_min', sa.Float, nullable=True),
+            sa.Column(f'{name}_max', sa.Float, nullable=True),
+            sa.Column(f'{name}_avg', sa.Float, nullable=True),
+        ]
+    op.create_table(
+        'system_metric_rollups',
+        *columns,
+        sa.UniqueConstraint('resolution', 'bucket_start', name='uq_system_metric_rollup_bucket')
+    )
+
+    # Create index for range scans by bucket
+    op.create_index('ix_system_metric_rollups_bucket_start', 'system_metric_rollups', ['bucket_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_system_metric_rollups_bucket_start', table_name='system_metric_rollups')
+    op.drop_table('system_metric_rollups')
@@ -134,8 +134,8 @@ class TodoSubtask(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    # Relationships
-    todo = relationship("Todo", back_populates="subtasks")
+    # Relationships (Todo.subtasks holds child todos, not these rows)
+    todo = relationship("Todo")
     
     def __repr__(self):
         return f"<TodoSubtask(id='{self.id}', title='{self.title}')>"
@@ -14,6 +14,11 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    from setup_log_analyzer import SetupLogAnalyzer
+except ImportError:
+    from recovery.setup_log_analyzer import SetupLogAnalyzer
+
 class BootDiagnostics:
     """
     Comprehensive boot diagnostics and analysis
@@ -520,29 +525,29 @@ class BootDiagnostics:
         
         return stage_info
     
-    def _analyze_setup_logs(self) -> Dict:
+    def _analyze_setup_logs(self, log_files: Optional[List[str]] = None) -> Dict:
         """Analyze Windows Setup logs"""
         logs = {}
         
-        log_files = [
-            'C:\\Windows\\Panther\\setupact.log',
-            'C:\\Windows\\Panther\\setuperr.log',
-            'C:\\Windows\\Panther\\UnattendGC\\setupact.log'
-        ]
+        if log_files is None:
+            log_files = [
+                'C:\\Windows\\Panther\\setupact.log',
+                'C:\\Windows\\Panther\\setuperr.log',
+                'C:\\Windows\\Panther\\UnattendGC\\setupact.log'
+            ]
         
+        analyzer = SetupLogAnalyzer()
         for log_file in log_files:
             if os.path.exists(log_file):
+                # Keep the parent folder in the key so both setupact.log files are reported
+                name = os.path.basename(log_file)
+                if name in logs:
+                    name = f"{os.path.basename(os.path.dirname(log_file))}/{name}"
                 try:
-                    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        logs[os.path.basename(log_file)] = {
-                            'size': len(content),
-                            'last_lines': content.split('\n')[-10:],  # Last 10 lines
-                            'error_count': content.lower().count('error'),
-                            'warning_count': content.lower().count('warning')
-                        }
-                except:
-                    logs[os.path.basename(log_file)] = {'error': 'Could not read log'}
+                    logs[name] = analyzer.analyze(log_file)
+                except Exception as e:
+                    self.logger.error(f"Could not analyze setup log {log_file}: {e}")
+                    logs[name] = {'error': 'Could not read log'}
         
         return logs
     
@@ -579,6 +584,13 @@ class BootDiagnostics:
         stage = install_data.get('installation_stage', {}).get('stage', 'unknown')
         failure_analysis['failure_stage'] = stage
         
+        # Error codes found in the setup logs, most frequent first
+        codes = {}
+        for log in install_data.get('setup_logs', {}).values():
+            for entry in log.get('error_codes', []):
+                codes[entry['code']] = codes.get(entry['code'], 0) + entry['count']
+        failure_analysis['error_codes'] = sorted(codes, key=codes.get, reverse=True)[:10]
+        
         if stage == 'oobe_stage':
             failure_analysis['recommended_actions'].append('Complete OOBE setup')
         elif stage == 'setup_active':
@@ -0,0 +1,298 @@
+"""
+Setup Log Analyzer for OPRYXX
+
+Streaming analysis of Windows Setup (Panther) logs such as setupact.log
+and setuperr.log, which can grow to hundreds of MB on failed installs.
+Files are memory-mapped and scanned in newline-aligned chunks (copied
+out of the map one chunk at a time) with one compiled multi-pattern
+regex; the tail is read by seeking backwards from the end. Memory use is
+bounded by the chunk size and the sample limits, not by the log size.
+"""
+
+import codecs
+import mmap
+import os
+import re
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# One pass over the lower-cased chunk finds error/warning mentions, error
+# codes and phase markers; literal alternatives keep the regex engine fast
+SCAN_PATTERN = re.compile(rb'error|warning|0x[0-9a-f]{8}\b|phase\b')
+
+# Known setup phases, looked for after a "phase" marker on the same line
+PHASE_NAME_PATTERN = re.compile(
+    rb'[^\r\n]{0,80}?\b(downlevel|safe\s?os|pre-?first\s?boot|(?:setup)?first\s?boot|'
+    rb'(?:setup)?second\s?boot|oobe|finalize|rollback)\b'
+)
+
+# "2024-05-01 10:22:33, Error                 SP     message"
+LINE_PATTERN = re.compile(
+    rb'(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\s*'
+    rb'(?P<severity>Info|Warning|Error|Fatal Error|Perf)?'
+)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# HRESULTs that carry no information
+IGNORED_CODES = frozenset({'0x00000000'})
+
+
+class SetupLogAnalyzer:
+    """
+    Bounded-memory analyzer for Windows Setup logs
+
+    ``analyze`` returns counts, timestamps, error codes with first/last
+    occurrence, setup phase transitions, the last error lines and the
+    last lines of the file.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 8 * 1024 * 1024,
+        tail_lines: int = 10,
+        max_error_codes: int = 100,
+        max_phases: int = 100,
+        max_error_lines: int = 20,
+        max_line_length: int = 500
+    ):
+        self.chunk_size = chunk_size
+        self.tail_lines = tail_lines
+        self.max_error_codes = max_error_codes
+        self.max_phases = max_phases
+        self.max_error_lines = max_error_lines
+        self.max_line_length = max_line_length
+
+    def analyze(self, path: str) -> Dict:
+        """Analyze one setup log"""
+        size = os.path.getsize(path)
+        encoding = self._detect_encoding(path)
+        state = _ScanState(self)
+
+        if size and encoding == 'utf-8':
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for start, end in self._chunks(mm, size):
+                        state.scan(mm[start:end])
+        elif size:
+            for buffer in self._transcoded_chunks(path, encoding):
+                state.scan(buffer)
+
+        result = state.result()
+        result.update({
+            'path': str(path),
+            'size': size,
+            'encoding': encoding,
+            'last_lines': self.tail(path, self.tail_lines, encoding)
+        })
+        return result
+
+    def _chunks(self, mm: mmap.mmap, size: int) -> Iterator[Tuple[int, int]]:
+        """Newline-aligned [start, end) ranges so no line spans two chunks"""
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', min(start + self.chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            yield start, end
+            start = end
+
+    def _transcoded_chunks(self, path: str, encoding: str) -> Iterator[bytes]:
+        """UTF-8 re-encoded, line-aligned chunks of a UTF-16 log"""
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        pending = ''
+        with open(path, 'rb') as f:
+            while True:
+                raw = f.read(self.chunk_size)
+                text = pending + decoder.decode(raw, final=not raw)
+                if not raw:
+                    if text:
+                        yield text.encode('utf-8')
+                    return
+                cut = text.rfind('\n') + 1
+                pending = text[cut:]
+                if cut:
+                    yield text[:cut].encode('utf-8')
+
+    @staticmethod
+    def _detect_encoding(path: str) -> str:
+        with open(path, 'rb') as f:
+            head = f.read(2)
+        if head == codecs.BOM_UTF16_LE:
+            return 'utf-16'
+        if head == codecs.BOM_UTF16_BE:
+            return 'utf-16'
+        return 'utf-8'
+
+    def tail(self, path: str, lines: int = 10, encoding: str = 'utf-8', block_size: int = 64 * 1024) -> List[str]:
+        """Last lines of a file, read by seeking backwards from the end"""
+        if lines <= 0:
+            return []
+        unit = 2 if encoding.startswith('utf-16') else 1
+        newline = '\n'.encode('utf-16-le' if unit == 2 else 'utf-8')
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            data = b''
+            position = size
+            while position > 0 and data.count(newline) <= lines:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+            if position == 0 and unit == 2 and data[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+                data = data[2:]
+        if unit == 2:
+            data = data[len(data) % 2:]
+            text = data.decode('utf-16-le', errors='replace')
+        else:
+            text = data.decode('utf-8', errors='replace')
+        return [line.rstrip('\r') for line in text.split('\n')][-lines:]
+
+
+class _ScanState:
+    """Aggregates collected while scanning one log"""
+
+    def __init__(self, analyzer: SetupLogAnalyzer):
+        self.analyzer = analyzer
+        self.error_count = 0
+        self.warning_count = 0
+        self.line_count = 0
+        self.error_line_count = 0
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        self.error_codes: Dict[str, Dict] = {}
+        self.dropped_error_codes = 0
+        self.phases: List[Dict] = []
+        self.error_lines: deque = deque(maxlen=analyzer.max_error_lines)
+        self._last_error_line = -1
+
+    def scan(self, chunk: bytes) -> None:
+        """Scan a chunk that starts and ends on line boundaries"""
+        self.line_count += chunk.count(b'\n')
+        if chunk and not chunk.endswith(b'\n'):
+            self.line_count += 1
+        self._scan_timestamps(chunk)
+
+        lowered = chunk.lower()
+        for match in SCAN_PATTERN.finditer(lowered):
+            kind = lowered[match.start()]
+            if kind == 0x65:  # "e"rror
+                self.error_count += 1
+                self._record_error_line(chunk, match.start())
+            elif kind == 0x77:  # "w"arning
+                self.warning_count += 1
+            elif match.start() and lowered[match.start() - 1:match.start()].isalnum():
+                continue  # "0x..." or "phase" inside a longer word
+            elif kind == 0x30:  # "0x" code
+                self._record_code(chunk, match)
+            else:
+                phase = PHASE_NAME_PATTERN.match(lowered, match.end())
+                if phase:
+                    self._record_phase(chunk, match, phase.group(1))
+        # Line positions are per chunk
+        self._last_error_line = -1
+
+    def _scan_timestamps(self, chunk: bytes) -> None:
+        # Only lines near the chunk edges are parsed (at most 64 KB each way)
+        if self.first_timestamp is None:
+            position = 0
+            while position < min(len(chunk), 64 * 1024):
+                line_end = self._line_end(chunk, position)
+                parsed = LINE_PATTERN.match(chunk, position, line_end)
+                if parsed:
+                    self.first_timestamp = self._timestamp(parsed)
+                    break
+                position = line_end + 1
+
+        line_end = len(chunk) - 1 if chunk.endswith(b'\n') else len(chunk)
+        while line_end > 0 and len(chunk) - line_end < 64 * 1024:
+            line_start = chunk.rfind(b'\n', 0, line_end) + 1
+            parsed = LINE_PATTERN.match(chunk, line_start, line_end)
+            if parsed:
+                self.last_timestamp = self._timestamp(parsed)
+                return
+            line_end = line_start - 1
+
+    @staticmethod
+    def _line_end(chunk: bytes, position: int) -> int:
+        newline = chunk.find(b'\n', position)
+        return len(chunk) if newline == -1 else newline
+
+    def _line(self, chunk: bytes, position: int) -> Tuple[int, bytes]:
+        line_start = chunk.rfind(b'\n', 0, position) + 1
+        line_end = min(self._line_end(chunk, position), line_start + self.analyzer.max_line_length)
+        return line_start, chunk[line_start:line_end]
+
+    @staticmethod
+    def _timestamp(parsed) -> Optional[str]:
+        try:
+            return datetime.strptime(parsed.group('timestamp').decode('ascii'), TIMESTAMP_FORMAT).isoformat()
+        except ValueError:
+            return None
+
+    def _parse_line(self, line: bytes) -> Tuple[Optional[str], Optional[str], str]:
+        parsed = LINE_PATTERN.match(line)
+        text = line.decode('utf-8', errors='replace').rstrip('\r')
+        if not parsed:
+            return None, None, text
+        severity = parsed.group('severity')
+        return self._timestamp(parsed), severity.decode('ascii') if severity else None, text
+
+    def _record_error_line(self, chunk: bytes, position: int) -> None:
+        line_start, line = self._line(chunk, position)
+        # Count each line once even if it mentions "error" several times
+        if line_start == self._last_error_line:
+            return
+        self._last_error_line = line_start
+        self.error_line_count += 1
+        timestamp, severity, text = self._parse_line(line)
+        self.error_lines.append({'timestamp': timestamp, 'severity': severity, 'line': text})
+
+    def _record_code(self, chunk: bytes, match) -> None:
+        code = match.group().decode('ascii').lower()
+        if code in IGNORED_CODES:
+            return
+        entry = self.error_codes.get(code)
+        if entry is None and len(self.error_codes) >= self.analyzer.max_error_codes:
+            self.dropped_error_codes += 1
+            return
+        _, line = self._line(chunk, match.start())
+        timestamp, _, text = self._parse_line(line)
+        if entry is None:
+            self.error_codes[code] = {
+                'code': code,
+                'count': 1,
+                'first_seen': timestamp,
+                'last_seen': timestamp,
+                'sample': text
+            }
+        else:
+            entry['count'] += 1
+            if timestamp:
+                entry['last_seen'] = timestamp
+
+    def _record_phase(self, chunk: bytes, match, phase_name: bytes) -> None:
+        if len(self.phases) >= self.analyzer.max_phases:
+            return
+        name = re.sub(rb'[\s-]', b'', phase_name).decode('ascii')
+        _, line = self._line(chunk, match.start())
+        timestamp, _, text = self._parse_line(line)
+        if self.phases and self.phases[-1]['phase'] == name:
+            return
+        self.phases.append({'phase': name, 'timestamp': timestamp, 'line': text})
+
+    def result(self) -> Dict:
+        codes = sorted(self.error_codes.values(), key=lambda c: c['count'], reverse=True)
+        return {
+            'line_count': self.line_count,
+            'error_count': self.error_count,
+            'warning_count': self.warning_count,
+            'error_line_count': self.error_line_count,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'error_codes': codes,
+            'dropped_error_codes': self.dropped_error_codes,
+            'phases': self.phases,
+            'last_phase': self.phases[-1]['phase'] if self.phases else None,
+            'last_errors': list(self.error_lines)
+        }
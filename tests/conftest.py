@@ -9,6 +9,9 @@ from typing import Generator, Any, Dict
 
 # Add project root to Python path
 sys.path.insert(0, str(Path(__file__).parent.parent))
+# core/ provides the top-level ``architecture`` package used by ai_workbench;
+# appended so core/logging.py etc. never shadow the standard library
+sys.path.append(str(Path(__file__).parent.parent / 'core'))
 
 # Import core components for testing
 from core.config import ConfigManager
@@ -0,0 +1,185 @@
+"""
+Tests for the async result cache, key provider and SecureConfig in utils.async_utils.
+"""
+import asyncio
+
+import pytest
+
+from utils.async_utils import (
+    AsyncFileIO,
+    AsyncTTLCache,
+    KeyProvider,
+    SecureConfig,
+    async_cache,
+    get_async_cache,
+    make_cache_key
+)
+
+
+class TestAsyncTTLCache:
+    """Test AsyncTTLCache eviction, expiry and request coalescing."""
+
+    def test_structural_keys(self):
+        """Equal arguments give equal keys, including unhashable ones."""
+        assert make_cache_key((1, 'a'), {'x': 2}) == make_cache_key((1, 'a'), {'x': 2})
+        assert make_cache_key(([1, 2],), {'d': {'k': 1}}) == make_cache_key(([1, 2],), {'d': {'k': 1}})
+        assert make_cache_key((1,), {}) != make_cache_key((), {'a': 1})
+
+    @pytest.mark.asyncio
+    async def test_lru_and_ttl(self):
+        """Entries are evicted by recency and expire after their TTL."""
+        cache = AsyncTTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+
+        cache.set('short', 'x', ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert cache.sweep() == 1
+        assert cache.get_stats()['evictions'] == 2
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_background_sweep(self):
+        """The sweep task removes expired entries and stops when empty."""
+        cache = AsyncTTLCache(ttl=0.01, sweep_interval=0.02)
+        cache.set('a', 1)
+        await asyncio.sleep(0.05)
+        assert len(cache) == 0
+        assert cache._sweeper.done()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Concurrent misses await a single computation."""
+        calls = []
+
+        @async_cache(ttl=60)
+        async def fetch(item_id, options=None):
+            calls.append(item_id)
+            await asyncio.sleep(0.01)
+            return {'id': item_id}
+
+        results = await asyncio.gather(*(fetch(1, options=[1]) for _ in range(10)))
+        assert results == [{'id': 1}] * 10
+        assert calls == [1]
+        assert await fetch(1, options=[1]) == {'id': 1}
+        assert fetch.cache.get_stats()['coalesced'] == 9
+        assert get_async_cache(f"{__name__}.{fetch.__qualname__}") is fetch.cache
+
+        assert fetch.invalidate(1, options=[1])
+        await fetch(1, options=[1])
+        assert calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self):
+        """A failing call propagates to all waiters and is retried next time."""
+        attempts = []
+
+        @async_cache(ttl=60)
+        async def flaky():
+            attempts.append(1)
+            await asyncio.sleep(0)
+            if len(attempts) == 1:
+                raise ValueError("boom")
+            return 'ok'
+
+        results = await asyncio.gather(flaky(), flaky(), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert await flaky() == 'ok'
+
+
+class TestKeyProvider:
+    """Test lazy key loading."""
+
+    def test_key_created_on_first_use(self, tmp_path):
+        """No key file is touched until something is encrypted."""
+        key_path = tmp_path / 'keys' / 'encryption.key'
+        provider = KeyProvider(key_path)
+        assert not key_path.exists()
+
+        token = provider.encrypt('secret')
+        assert key_path.exists()
+        assert provider.cipher is provider.cipher
+        assert KeyProvider(key_path).decrypt(token) == 'secret'
+
+    def test_key_path_from_environment(self, tmp_path, monkeypatch):
+        """The key location can be set through the environment."""
+        monkeypatch.setenv('OPRYXX_ENCRYPTION_KEY_PATH', str(tmp_path / 'env.key'))
+        assert KeyProvider().key_path == tmp_path / 'env.key'
+
+
+class TestSecureConfig:
+    """Test debounced, atomic, change-only saves."""
+
+    @pytest.mark.asyncio
+    async def test_saves_are_debounced(self, tmp_path):
+        """A burst of save() calls results in a single write."""
+        config = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'), save_delay=0.02)
+        for i in range(50):
+            config.set(f'key_{i}', i)
+            await config.save()
+        assert config.writes == 0
+
+        await asyncio.sleep(0.05)
+        assert config.writes == 1
+        assert not (tmp_path / 'config.enc.tmp').exists()
+
+        reloaded = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'))
+        await reloaded.load()
+        assert reloaded.get('key_49') == 49
+
+    @pytest.mark.asyncio
+    async def test_unchanged_data_is_not_rewritten(self, tmp_path):
+        """Saving unchanged data skips encryption and the write."""
+        config = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'))
+        config.set('a', 1)
+        assert await config.flush()
+        config.set('a', 1)
+        assert not await config.flush()
+
+        reloaded = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'))
+        await reloaded.load()
+        await reloaded.save(wait=True)
+        assert reloaded.writes == 0 and reloaded.skipped_writes == 1
+
+    @pytest.mark.asyncio
+    async def test_save_during_slow_write_is_persisted(self, tmp_path, monkeypatch):
+        """A save() while the debounced write is in progress gets its own write."""
+        config = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'), save_delay=0.01)
+        writing, release = asyncio.Event(), asyncio.Event()
+        write_file = AsyncFileIO.write_file
+
+        async def slow_write(file_path, content, binary=False):
+            writing.set()
+            await release.wait()
+            await write_file(file_path, content, binary=binary)
+
+        monkeypatch.setattr(AsyncFileIO, 'write_file', staticmethod(slow_write))
+        config.set('a', 1)
+        await config.save()
+        await asyncio.wait_for(writing.wait(), 1.0)
+
+        config.set('b', 2)
+        await config.save()
+        writing.clear()
+        release.set()
+        await asyncio.wait_for(writing.wait(), 1.0)
+        await asyncio.wait_for(config._pending, 1.0)
+        assert config.writes == 2
+
+        reloaded = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'))
+        await reloaded.load()
+        assert reloaded.get('a') == 1 and reloaded.get('b') == 2
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_save(self, tmp_path):
+        """close() writes changes still waiting for the debounce window."""
+        config = SecureConfig(tmp_path / 'config.enc', KeyProvider(tmp_path / 'k.key'), save_delay=60)
+        config.set('a', 1)
+        await config.save()
+        await config.close()
+        assert config.writes == 1
+
@@ -0,0 +1,178 @@
+"""
+Tests for the shared status sampler and WebSocket fan-out in backend.main.
+"""
+import asyncio
+import json
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from backend.main import ConnectionManager, StatusSampler, StreamManager, TaskStore, app
+import backend.main as backend_main
+from core.streaming import MetricStream, StreamSubscriber
+
+
+class FakeWebSocket:
+    """Records sent messages; ``delay`` simulates a slow consumer."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.accepted = False
+        self.closed = False
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_text(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestConnectionManager:
+    """Test per-client queues and slow-consumer handling."""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_all_clients(self):
+        """Every client receives every message, initial message first."""
+        manager = ConnectionManager()
+        clients = [FakeWebSocket() for _ in range(3)]
+        for websocket in clients:
+            await manager.connect(websocket, initial_message='hello')
+        await manager.broadcast('tick')
+        await asyncio.sleep(0.01)
+
+        assert all(ws.accepted and ws.sent == ['hello', 'tick'] for ws in clients)
+        assert manager.get_stats()['clients'] == 3
+        await manager.close()
+        assert manager.get_stats()['clients'] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_client_drops_oldest_without_blocking(self):
+        """A slow client loses stale messages but never delays the broadcast."""
+        manager = ConnectionManager(queue_size=2)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.05)
+        await manager.connect(fast)
+        await manager.connect(slow)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for i in range(10):
+            await manager.broadcast(str(i))
+            await asyncio.sleep(0.001)
+        assert loop.time() - started < 0.2
+
+        await asyncio.sleep(0.2)
+        assert fast.sent == [str(i) for i in range(10)]
+        assert slow.sent[-1] == '9' and len(slow.sent) < 10
+        assert manager.get_stats()['dropped_messages'] > 0
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_stalled_client_is_disconnected(self):
+        """A client whose send exceeds the timeout is dropped and closed."""
+        manager = ConnectionManager(send_timeout=0.02)
+        stalled = FakeWebSocket(delay=1)
+        await manager.connect(stalled)
+        await manager.broadcast('tick')
+        await asyncio.sleep(0.05)
+
+        assert stalled.closed
+        assert manager.get_stats() == {
+            'clients': 0, 'messages': 1, 'dropped_messages': 0, 'dropped_clients': 1, 'queued': 0
+        }
+
+
+class TestStatusSampler:
+    """Test the single background sampler."""
+
+    @pytest.mark.asyncio
+    async def test_one_serialized_snapshot_per_tick(self):
+        """Each tick produces one JSON message shared by all clients."""
+        manager = ConnectionManager()
+        sampler = StatusSampler(manager, interval=0.02)
+        clients = [FakeWebSocket() for _ in range(5)]
+        for websocket in clients:
+            await manager.connect(websocket)
+
+        sampler.start()
+        await asyncio.sleep(0.1)
+        await sampler.stop()
+        await asyncio.sleep(0.01)
+
+        assert sampler.ticks >= 2
+        assert manager.get_stats()['messages'] == sampler.ticks
+        assert clients[0].sent[-1] is clients[4].sent[-1]
+        assert set(json.loads(sampler.latest_message)) >= {'cpu_percent', 'memory_percent', 'users'}
+        await manager.close()
+
+
+class TestStreamManager:
+    """Test the delta stream fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_slow_client_receives_coalesced_delta(self):
+        """A slow client gets one delta covering everything it missed."""
+        stream_manager = StreamManager(MetricStream())
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.05)
+        await stream_manager.connect(fast, StreamSubscriber(stream_manager.stream))
+        await stream_manager.connect(slow, StreamSubscriber(stream_manager.stream, groups=['cpu']))
+
+        for i in range(10):
+            stream_manager.stream.publish({'cpu': {'percent': float(i)}, 'disk': {'percent': 1.0}})
+            stream_manager.notify()
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.15)
+
+        assert len(fast.sent) == 10
+        assert len(slow.sent) < 5
+        last = json.loads(slow.sent[-1])
+        assert last['seq'] == 10 and last['data'] == {'cpu': {'percent': 9.0}}
+        assert stream_manager.get_stats()['stream']['seq'] == 10
+        await stream_manager.close()
+
+
+class TestConditionalRequests:
+    """Test ETag and Last-Modified handling on the task and status endpoints."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(backend_main, 'task_store', TaskStore())
+        return TestClient(app)
+
+    def test_task_list_revalidation(self, client):
+        """An unchanged list answers 304; any change produces a new ETag."""
+        client.post('/tasks', json={'id': 'a', 'title': 'first'})
+        response = client.get('/tasks')
+        etag = response.headers['etag']
+        assert response.status_code == 200 and len(response.json()) == 1
+
+        cached = client.get('/tasks', headers={'If-None-Match': etag})
+        assert cached.status_code == 304 and cached.content == b''
+
+        client.put('/tasks/a', json={'progress': 10})
+        changed = client.get('/tasks', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.headers['etag'] != etag
+
+    def test_batched_ids_and_single_task(self, client):
+        """Tasks can be fetched by id list; single tasks have their own ETag."""
+        for task_id in 'abc':
+            client.post('/tasks', json={'id': task_id})
+        assert [t['id'] for t in client.get('/tasks', params={'ids': 'c,a,zz'}).json()] == ['c', 'a']
+
+        etag = client.get('/tasks/b').headers['etag']
+        client.put('/tasks/a', json={'title': 'other task changed'})
+        assert client.get('/tasks/b', headers={'If-None-Match': etag}).status_code == 304
+        assert client.get('/tasks/missing').status_code == 404
+
+    def test_status_etag(self, client):
+        """The status ETag is computed per sample and honoured."""
+        response = client.get('/system/status')
+        assert response.status_code == 200 and 'cpu_percent' in response.json()
+        assert backend_main.sampler.latest_etag == response.headers['etag']
+        assert response.headers['last-modified']
@@ -0,0 +1,196 @@
+"""
+Tests for the caching subsystem in core.caching.
+"""
+import fnmatch
+import threading
+import time
+
+import pytest
+
+from core.caching import (
+    CacheManager,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    TieredCacheBackend,
+    cached
+)
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for a redis-py client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.time() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        self.data[key] = (value, time.time() + px / 1000 if px else None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+
+class TestMemoryCacheBackend:
+    """Test LRU, TTL and size-budget eviction."""
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first."""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        assert backend.get('a') == 1
+        backend.set('c', 3)
+
+        assert backend.get('b') is None
+        assert backend.get('a') == 1 and backend.get('c') == 3
+        assert backend.get_stats()['evictions'] == 1
+
+    def test_ttl_expiry(self):
+        """Entries expire after their timeout and are purged on write."""
+        backend = MemoryCacheBackend()
+        backend.set('short', 'x', timeout=0.05)
+        backend.set('forever', 'y', timeout=None)
+        time.sleep(0.06)
+        backend.set('other', 'z')
+
+        assert len(backend) == 2
+        assert backend.get('short') is None
+        assert backend.get('forever') == 'y'
+        assert backend.get_stats()['expirations'] == 1
+
+    def test_byte_budget(self):
+        """Entries are evicted to stay within the byte budget."""
+        backend = MemoryCacheBackend(max_entries=None, max_bytes=100, sizeof=len)
+        backend.set('a', 'x' * 40)
+        backend.set('b', 'x' * 40)
+        backend.set('c', 'x' * 40)
+        backend.set('huge', 'x' * 200)
+
+        stats = backend.get_stats()
+        assert backend.get('a') is None and backend.get('c') is not None
+        assert stats['bytes'] == 80
+        assert stats['rejected'] == 1
+
+
+class TestCacheManager:
+    """Test the cache manager and decorator."""
+
+    def test_set_get_and_stats(self):
+        """Values round-trip through the namespace and are counted."""
+        cache = CacheManager(namespace='test')
+        cache.set('key', {'a': 1}, ttl=60)
+        assert cache.get('key') == {'a': 1}
+        assert cache.get('missing', 'default') == 'default'
+        assert cache.has_key('key')
+
+        stats = cache.get_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        assert cache.backend.get_entry('test:key') is not None
+
+    def test_concurrent_misses_compute_once(self):
+        """N concurrent misses for a key run the loader once."""
+        cache = CacheManager()
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return 42
+
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(cache.get_or_set('slow', load))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [42] * 8
+        assert len(calls) == 1
+        assert cache.get_stats()['coalesced'] == 7
+
+    def test_loader_errors_propagate_to_waiters(self):
+        """A failed load raises in every caller and caches nothing."""
+        cache = CacheManager()
+        with pytest.raises(ZeroDivisionError):
+            cache.get_or_set('bad', lambda: 1 / 0)
+        assert not cache.has_key('bad')
+
+    def test_stale_while_revalidate(self):
+        """A stale value is served while one background refresh runs."""
+        cache = CacheManager()
+        values = iter(['old', 'new'])
+        cache.get_or_set('k', lambda: next(values), timeout=0.05, stale_timeout=5)
+        time.sleep(0.06)
+
+        assert cache.get_or_set('k', lambda: next(values), timeout=0.05, stale_timeout=5) == 'old'
+        cache.close()
+        assert cache.get('k') == 'new'
+        assert cache.get_stats()['stale_hits'] == 1
+        assert cache.get_stats()['refreshes'] == 1
+
+    def test_cached_decorator(self):
+        """Results are cached per argument and can be invalidated."""
+        cache = CacheManager()
+        calls = []
+
+        @cached(timeout=60, cache_manager=cache)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        assert [square(2), square(2), square(3)] == [4, 4, 9]
+        assert calls == [2, 3]
+        square.invalidate(2)
+        assert square(2) == 4
+        assert calls == [2, 3, 2]
+
+
+class TestTieredCache:
+    """Test the Redis-backed L2 and the L1/L2 tiering."""
+
+    def test_redis_backend(self):
+        """Entries are stored under the prefix with a Redis TTL."""
+        client = FakeRedis()
+        backend = RedisCacheBackend(client=client, prefix='app:')
+        backend.set('a', [1, 2], timeout=60)
+        assert backend.get('a') == [1, 2]
+        assert list(client.data) == ['app:a']
+        assert client.data['app:a'][1] is not None
+
+        backend.clear()
+        assert client.data == {}
+
+    def test_l1_filled_from_l2(self):
+        """An L1 miss is served from L2 and cached locally."""
+        l2 = RedisCacheBackend(client=FakeRedis())
+        writer = CacheManager(TieredCacheBackend(MemoryCacheBackend(), l2))
+        reader_backend = TieredCacheBackend(MemoryCacheBackend(), l2)
+        reader = CacheManager(reader_backend)
+
+        writer.set('shared', 'value')
+        assert reader.get('shared') == 'value'
+        assert reader.get('shared') == 'value'
+        assert reader_backend.get_stats()['l2_hits'] == 1
+        assert reader_backend.get_stats()['l1_hits'] == 1
+
+        writer.delete('shared')
+        assert reader_backend.l2.get('shared') is None
@@ -12,6 +12,7 @@ from sqlalchemy.orm import sessionmaker
 from core.db_utils import (
     DatabaseManager,
     QueryProfiler,
+    fingerprint_sql,
     with_retry,
     query_to_string,
     setup_database_events
@@ -105,6 +106,59 @@ class TestQueryProfiler:
         stats = profiler.get_query_stats()
         assert stats['total_queries'] == 0
         assert stats['slow_queries'] == 0
+        assert profiler.top_n() == []
+    
+    def test_fingerprint_sql(self):
+        """Test normalizing statements to their shape."""
+        assert fingerprint_sql("SELECT * FROM t WHERE id = 5 AND name = 'x'") == \
+            fingerprint_sql("select *  from t\nwhere id = :id and name = %(name)s -- lookup")
+        assert fingerprint_sql("SELECT a FROM t WHERE id IN (1, 2, 3)") == \
+            fingerprint_sql("SELECT a FROM t WHERE id IN (?)")
+        assert fingerprint_sql("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)") == \
+            fingerprint_sql("INSERT INTO t (a, b) VALUES (1, 'x')")
+        assert fingerprint_sql("SELECT t1.col2 FROM t1") == "select t1.col2 from t1"
+    
+    def test_top_n(self):
+        """Test aggregating queries per fingerprint."""
+        profiler = QueryProfiler()
+        for i in range(10):
+            profiler.record_query(f"SELECT * FROM a WHERE id = {i}", None, 0.01, rows=1)
+        profiler.record_query("SELECT * FROM b", None, 0.5, rows=100)
+        
+        by_time = profiler.top_n(by='total_time')
+        assert [q['fingerprint'] for q in by_time] == ["select * from b", "select * from a where id = ?"]
+        assert profiler.top_n(1, by='count')[0]['count'] == 10
+        assert profiler.top_n(1, by='rows')[0]['rows'] == 100
+        assert profiler.top_n(1, by='p95_time')[0]['p95_time'] == pytest.approx(0.5, rel=0.02)
+        with pytest.raises(ValueError):
+            profiler.top_n(by='nope')
+    
+    def test_memory_is_bounded(self):
+        """Test that fingerprints and slow query samples are capped."""
+        profiler = QueryProfiler(slow_query_threshold=0.1, slow_sample_size=5, max_fingerprints=3)
+        for i in range(50):
+            profiler.record_query(f"SELECT * FROM t{i}", {'blob': 'x' * 1000}, 0.2)
+        
+        stats = profiler.get_query_stats()
+        assert stats['slow_queries'] == 50
+        assert stats['fingerprints'] == 4
+        assert len(profiler.slow_queries) == 5
+        assert all(len(q['parameters']) <= 200 for q in profiler.slow_queries)
+        assert profiler.top_n(1, by='count')[0]['fingerprint'] == '__other__'
+    
+    def test_sampling(self):
+        """Test that sampled aggregates are scaled and slow queries always kept."""
+        profiler = QueryProfiler(sample_rate=0.25, slow_query_threshold=1.0)
+        profiler._random.seed(1)
+        for _ in range(4000):
+            profiler.record_query("SELECT 1", None, 0.001)
+        profiler.record_query("SELECT pg_sleep(2)", None, 2.0)
+        
+        stats = profiler.get_query_stats()
+        assert stats['total_queries'] == 4001
+        assert stats['slow_queries'] == 1
+        assert len(profiler.slow_queries) == 1
+        assert profiler.top_n(1, by='count')[0]['count'] == pytest.approx(4000, rel=0.1)
 
 
 class TestDatabaseManager:
@@ -0,0 +1,82 @@
+"""
+Tests for the engine registry and pool instrumentation in core.architecture.db.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+
+from core.architecture.db import EngineRegistry, InstrumentedQueuePool
+
+
+@pytest.fixture
+def registry():
+    registry = EngineRegistry()
+    yield registry
+    registry.dispose_all()
+
+
+class TestEngineRegistry:
+    """Test dialect-aware engines, read routing and pool statistics."""
+
+    def test_engines_are_shared_per_url(self, registry, tmp_path):
+        """The same URL and role always yields the same engine."""
+        url = f"sqlite:///{tmp_path / 'shared.db'}"
+        assert registry.get_engine(url) is registry.get_engine(url)
+        assert isinstance(registry.get_engine(url).pool, InstrumentedQueuePool)
+        assert isinstance(registry.get_engine('sqlite://').pool, StaticPool)
+
+    def test_sqlite_pragmas_applied_on_connect(self, registry, tmp_path):
+        """New SQLite connections run in WAL mode with the pragma profile."""
+        engine = registry.get_engine(f"sqlite:///{tmp_path / 'wal.db'}", pragmas={'busy_timeout': 1234})
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+            assert conn.execute(text('PRAGMA foreign_keys')).scalar() == 1
+
+    def test_read_engine_is_read_only(self, registry, tmp_path):
+        """SQLite reads are routed to a separate read-only pool."""
+        url = f"sqlite:///{tmp_path / 'routed.db'}"
+        with registry.get_engine(url).begin() as conn:
+            conn.execute(text('CREATE TABLE t (a INTEGER)'))
+            conn.execute(text('INSERT INTO t VALUES (1)'))
+
+        reader = registry.get_read_engine(url)
+        assert reader is not registry.get_engine(url)
+        with reader.connect() as conn:
+            assert conn.execute(text('SELECT COUNT(*) FROM t')).scalar() == 1
+            with pytest.raises(Exception):
+                conn.execute(text('INSERT INTO t VALUES (2)'))
+
+    def test_replicas_used_round_robin(self, registry, tmp_path):
+        """Registered replicas are handed out in turn."""
+        primary = f"sqlite:///{tmp_path / 'primary.db'}"
+        replicas = registry.register_replicas(
+            primary, [f"sqlite:///{tmp_path / 'r1.db'}", f"sqlite:///{tmp_path / 'r2.db'}"]
+        )
+        assert [registry.get_read_engine(primary) for _ in range(3)] == [replicas[0], replicas[1], replicas[0]]
+
+    def test_pool_stats_record_contention(self, registry, tmp_path):
+        """Checkout waits and saturation are visible when the pool is exhausted."""
+        url = f"sqlite:///{tmp_path / 'contended.db'}"
+        engine = registry.get_engine(url, pool_size=1, name='contended')
+
+        def hold():
+            with engine.connect():
+                time.sleep(0.1)
+
+        threads = [threading.Thread(target=hold) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.02)
+        assert registry.pool_stats()['contended']['saturation'] == 1.0
+        for thread in threads:
+            thread.join()
+
+        stats = registry.pool_stats()['contended']
+        assert stats['checkouts'] == 3
+        assert stats['connects'] == 1
+        assert stats['wait_max'] >= 0.05
+        assert stats['wait_buckets'][-1] == stats['wait_count'] == 3
@@ -0,0 +1,115 @@
+"""
+Tests for the structured log segments and query API in core.log_store.
+"""
+import logging
+
+import pytest
+
+from core.log_store import INDEX_ENTRY, LogStore, StructuredLogHandler, list_segments
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.handlers = [handler]
+    return logger
+
+
+def _emit(handler, name, level, msg, created, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    record.created = created
+    record.__dict__.update(extra)
+    handler.handle(record)
+
+
+@pytest.fixture(params=['ndjson', 'msgpack'])
+def fmt(request):
+    if request.param == 'msgpack':
+        pytest.importorskip('msgpack')
+    return request.param
+
+
+class TestLogStore:
+    """Test writing indexed segments and querying them."""
+
+    def test_query_by_time_level_and_logger(self, tmp_path, fmt):
+        """Queries combine time range, minimum level and logger prefix."""
+        handler = StructuredLogHandler(tmp_path, fmt=fmt)
+        for i in range(100):
+            _emit(handler, 'opryxx.recovery' if i % 2 else 'opryxx.monitor',
+                  logging.ERROR if i % 10 == 1 else logging.INFO, f"event {i}", 1000.0 + i)
+        handler.close()
+
+        store = LogStore(tmp_path)
+        errors = list(store.query(start=1020, end=1060, level='ERROR', logger='opryxx.recovery'))
+        assert [r['msg'] for r in errors] == ['event 21', 'event 31', 'event 41', 'event 51']
+        assert store.count(logger='opryxx') == 100
+        assert store.count(logger='other') == 0
+        assert [r['msg'] for r in store.query(contains='event 9', limit=2)] == ['event 9', 'event 90']
+
+    def test_segments_roll_over_and_are_pruned(self, tmp_path):
+        """Segments roll at the size limit and old ones are removed."""
+        handler = StructuredLogHandler(tmp_path, segment_bytes=2000, max_segments=3)
+        for i in range(200):
+            _emit(handler, 'app', logging.INFO, f"message {i:04d}", 1000.0 + i)
+        handler.close()
+
+        segments = list_segments(tmp_path)
+        assert len(segments) == 3
+        records = list(LogStore(tmp_path).query())
+        assert records[-1]['msg'] == 'message 0199'
+        assert [r['ts'] for r in records] == sorted(r['ts'] for r in records)
+
+        # Only the matching time slice is read
+        assert [r['msg'] for r in LogStore(tmp_path).query(start=1199, end=1199)] == ['message 0199']
+
+    def test_extra_fields_and_partial_index(self, tmp_path):
+        """Extra record fields are kept; a torn index entry is ignored."""
+        handler = StructuredLogHandler(tmp_path)
+        _emit(handler, 'app', logging.WARNING, "disk slow", 1000.0, device='sda', latency_ms=42)
+        handler.flush()
+        with open(handler._writer.index.name, 'ab') as f:
+            f.write(b'\0' * (INDEX_ENTRY.size // 2))
+
+        [record] = LogStore(tmp_path).query()
+        assert record['extra'] == {'device': 'sda', 'latency_ms': 42}
+        handler.close()
+
+    def test_handler_with_logging_module(self, tmp_path):
+        """The handler works as a regular logging handler."""
+        handler = StructuredLogHandler(tmp_path)
+        logger = _logger('test.log_store', handler)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+        handler.close()
+
+        [record] = LogStore(tmp_path).query(level=logging.ERROR)
+        assert record['logger'] == 'test.log_store'
+        assert 'ValueError: boom' in record['exc']
+
+    def test_handlers_sharing_a_directory(self, tmp_path):
+        """Loggers set up separately on one directory keep their records apart."""
+        from ai_workbench.utils.logging_utils import setup_logger
+
+        loggers = [
+            setup_logger(name, console=False, structured_log_dir=tmp_path)
+            for name in ('svc.a', 'svc.b')
+        ]
+        # Spans several segments so both handlers roll over the shared one
+        loggers[0].handlers[0]._writer.segment_bytes = 2000
+        for i in range(60):
+            for logger in loggers:
+                logger.info(f"{logger.name} {i}")
+        for logger in loggers:
+            for handler in logger.handlers[:]:
+                handler.close()
+                logger.removeHandler(handler)
+
+        store = LogStore(tmp_path)
+        assert store.loggers() == ['svc.a', 'svc.b']
+        assert len(list_segments(tmp_path)) > 1
+        for name in ('svc.a', 'svc.b'):
+            assert [r['msg'] for r in store.query(logger=name)] == [f"{name} {i}" for i in range(60)]
@@ -1,14 +1,17 @@
 """
 Tests for the logging system.
 """
+import gzip
+import io
 import logging
 import os
+import queue
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 import pytest
 
-from core.logging import Logger
+from core.logging import BoundedQueueHandler, InstrumentedQueueListener, Logger, LogRotator
 
 class TestLogger:
     """Test suite for Logger class."""
@@ -143,3 +146,77 @@ class TestLogger:
             
         # Logger should be shut down after context
         assert len(logger.logger.handlers) == 0
+
+
+class TestAsyncLogging:
+    """Test suite for the queue-backed logging pipeline."""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_logger(self):
+        """Shut down the shared logger so each test configures its own."""
+        if Logger._instance is not None:
+            Logger._instance.shutdown()
+        yield
+        if Logger._instance is not None:
+            Logger._instance.shutdown()
+    
+    def test_records_written_by_listener(self, tmp_path):
+        """Records reach the file handler through the background listener."""
+        logger = Logger(log_dir=str(tmp_path), enable_console=False, async_logging=True)
+        assert logger.logger.handlers == [logger.queue_handler]
+        
+        for i in range(100):
+            logger.info(f"message {i}")
+        stats = logger.get_stats()
+        logger.shutdown()
+        
+        content = (tmp_path / "opryxx.log").read_text(encoding='utf-8')
+        assert "message 99" in content
+        assert stats['queue']['dropped'] == 0
+    
+    def test_per_handler_latency(self, monkeypatch):
+        """The listener records latency and errors per handler."""
+        monkeypatch.setattr(logging, 'raiseExceptions', False)
+        log_queue = queue.Queue()
+        good = logging.NullHandler()
+        good.set_name('good')
+        bad = logging.StreamHandler(io.StringIO())
+        bad.set_name('bad')
+        bad.stream.write = MagicMock(side_effect=OSError("disk full"))
+        
+        listener = InstrumentedQueueListener(log_queue, good, bad)
+        for _ in range(3):
+            listener.handle(logging.makeLogRecord({'msg': 'x', 'levelno': logging.INFO}))
+        
+        stats = listener.get_stats()
+        assert stats['good']['records'] == 3 and stats['good']['errors'] == 0
+        assert stats['bad']['errors'] == 3
+        assert stats['good']['max_time'] >= stats['good']['avg_time']
+    
+    @pytest.mark.parametrize('policy, kept', [
+        ('drop_newest', ['a', 'b']),
+        ('drop_oldest', ['b', 'c']),
+        ('block', ['a', 'b']),
+    ])
+    def test_overflow_policy(self, policy, kept):
+        """A full queue drops records according to the policy without blocking."""
+        handler = BoundedQueueHandler(maxsize=2, policy=policy, block_timeout=0.01)
+        for msg in 'abc':
+            handler.emit(logging.makeLogRecord({'msg': msg}))
+        
+        assert [handler.queue.get_nowait().msg for _ in range(2)] == kept
+        assert handler.get_stats()['dropped'] == 1
+    
+    def test_rotated_files_compressed_in_background(self, tmp_path):
+        """Rollover renames the file and gzips it on the maintenance worker."""
+        rotator = LogRotator(str(tmp_path), retention_days=0)
+        handler = rotator.create_file_handler(tmp_path / "app.log", max_bytes=100, backup_count=2)
+        
+        for _ in range(4):
+            handler.emit(logging.makeLogRecord({'msg': 'x' * 80}))
+        handler.close()
+        rotator.worker.stop()
+        
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['app.log', 'app.log.1.gz', 'app.log.2.gz']
+        with gzip.open(tmp_path / "app.log.1.gz", 'rt') as f:
+            assert f.read().strip() == 'x' * 80
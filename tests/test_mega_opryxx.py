@@ -0,0 +1,318 @@
+"""
+Tests for the task list model, API poller and conditional GETs in gui.MEGA_OPRYXX.
+"""
+import importlib
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+# Imported by gui.MEGA_OPRYXX at module level
+pytest.importorskip('tkinter')
+pytest.importorskip('websockets')
+pytest.importorskip('PIL')
+pytest.importorskip('psutil')
+requests = pytest.importorskip('requests')
+
+
+@pytest.fixture(scope='module')
+def mega(tmp_path_factory):
+    """Import the GUI module; it opens mega_opryxx.log in the working directory."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('mega'))
+    try:
+        return importlib.import_module('gui.MEGA_OPRYXX')
+    finally:
+        os.chdir(cwd)
+
+
+def _task(task_id, **fields):
+    data = {'id': task_id, 'title': f"Task {task_id}", 'type': 'todo', 'priority': 'medium'}
+    data.update(fields)
+    return data
+
+
+class TestTaskListModel:
+    """Test diffing successive task list fetches."""
+
+    def test_added_then_unchanged(self, mega):
+        """A first fetch adds every row; the same fetch again changes nothing."""
+        model = mega.TaskListModel()
+        diff = model.apply([_task('a'), _task('b')])
+        assert diff.added == ['a', 'b'] and diff.reordered
+        assert [task.title for task in model.ordered()] == ['Task a', 'Task b']
+
+        first = model.tasks['a']
+        diff = model.apply([_task('a'), _task('b')])
+        assert not diff.changed
+        assert model.tasks['a'] is first
+
+    def test_updated_rows_only_rebuilt(self, mega):
+        """Only rows whose data changed are rebuilt and reported."""
+        model = mega.TaskListModel()
+        model.apply([_task('a'), _task('b')])
+        unchanged = model.tasks['a']
+
+        diff = model.apply([_task('a'), _task('b', status='running', progress=40)])
+        assert diff.updated == ['b'] and not diff.added and not diff.removed
+        assert not diff.reordered
+        assert model.tasks['a'] is unchanged
+        assert model.tasks['b'].status == 'running' and model.tasks['b'].progress == 40
+
+    def test_removed(self, mega):
+        """Rows missing from a fetch are removed from the model."""
+        model = mega.TaskListModel()
+        model.apply([_task('a'), _task('b'), _task('c')])
+
+        diff = model.apply([_task('a'), _task('c')])
+        assert diff.removed == ['b'] and diff.reordered
+        assert 'b' not in model.tasks
+        assert model.order == ['a', 'c']
+
+    def test_reordered(self, mega):
+        """A new order is reported without rebuilding the tasks."""
+        model = mega.TaskListModel()
+        model.apply([_task('a'), _task('b')])
+
+        diff = model.apply([_task('b'), _task('a')])
+        assert diff.reordered and not (diff.added or diff.updated or diff.removed)
+        assert model.order == ['b', 'a']
+        assert model.task_at(0).id == 'b'
+
+    def test_duplicate_ids_keep_first(self, mega):
+        """A repeated id is only listed once, with its first data."""
+        model = mega.TaskListModel()
+        diff = model.apply([_task('a'), _task('a', title='Again'), _task('b')])
+        assert diff.added == ['a', 'b']
+        assert model.order == ['a', 'b']
+        assert model.tasks['a'].title == 'Task a'
+
+    def test_malformed_rows_skipped(self, mega):
+        """Rows that cannot be parsed are skipped; the rest still apply."""
+        model = mega.TaskListModel()
+        model.apply([_task('a'), _task('b')])
+
+        diff = model.apply([
+            _task('a'),
+            _task('b', created_at='not a date'),
+            None,
+            'garbage',
+            _task('c'),
+        ])
+        assert diff.added == ['c']
+        assert diff.removed == ['b']
+        assert model.order == ['a', 'c']
+
+    def test_rows_without_id(self, mega):
+        """Rows without an id are keyed by position."""
+        model = mega.TaskListModel()
+        diff = model.apply([{'title': 'untitled'}])
+        assert diff.added == ['#0']
+        assert model.task_at(0).title == 'untitled'
+
+
+class _Root:
+    """Stand-in for tk.Tk that runs ``after`` callbacks immediately."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def after(self, delay, callback, *args):
+        if self.error is not None:
+            raise self.error
+        self.calls.append((callback, args))
+        callback(*args)
+
+
+class TestAPIPoller:
+    """Test delivering poll results to the Tk thread."""
+
+    def _poll(self, mega, root, api, polls=2):
+        """Run the poller until the status has been fetched ``polls`` times."""
+        done = threading.Event()
+        fetches = []
+
+        def get_system_status():
+            fetches.append(1)
+            if len(fetches) >= polls:
+                done.set()
+            return {'cpu': 10}
+
+        api.get_system_status.side_effect = get_system_status
+        on_status, on_tasks = MagicMock(), MagicMock()
+        poller = mega.APIPoller(root, api, on_status, on_tasks, interval=0.01, task_interval=0.0)
+        poller.start()
+        try:
+            assert done.wait(2.0)
+        finally:
+            poller.stop()
+        return on_status, on_tasks
+
+    def test_delivers_through_root_after(self, mega):
+        """Status and task list results are handed over with root.after."""
+        root = _Root()
+        api = MagicMock()
+        api.list_tasks.return_value = [_task('a')]
+
+        on_status, on_tasks = self._poll(mega, root, api)
+        on_status.assert_called_with({'cpu': 10})
+        on_tasks.assert_called_with([_task('a')])
+        assert {callback for callback, _ in root.calls} == {on_status, on_tasks}
+
+    def test_failed_task_fetch_not_delivered(self, mega):
+        """A failed task list fetch leaves the shown list alone."""
+        root = _Root()
+        api = MagicMock()
+        api.list_tasks.return_value = None
+
+        on_status, on_tasks = self._poll(mega, root, api)
+        assert on_status.called
+        assert api.list_tasks.called
+        on_tasks.assert_not_called()
+
+    def test_stops_when_main_loop_gone(self, mega):
+        """The poller stops once root.after fails."""
+        root = _Root(error=RuntimeError("main thread is not in main loop"))
+        api = MagicMock()
+        api.get_system_status.return_value = {'cpu': 10}
+        api.list_tasks.return_value = []
+
+        poller = mega.APIPoller(root, api, MagicMock(), MagicMock(), interval=0.01)
+        poller.start()
+        thread = poller._thread
+        thread.join(2.0)
+        assert not thread.is_alive()
+        assert api.get_system_status.call_count == 1
+
+
+def _response(status, body=None, etag=None):
+    response = requests.Response()
+    response.status_code = status
+    response.url = 'http://backend/'
+    response._content = json.dumps(body).encode('utf-8') if body is not None else b''
+    if etag:
+        response.headers['ETag'] = etag
+    return response
+
+
+class _Backend:
+    """Stub for APIClient.session answering GETs with ETag revalidation."""
+
+    def __init__(self, body=None, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.calls = []
+        self.on_conditional = None
+
+    def get(self, url, params=None, headers=None):
+        headers = dict(headers or {})
+        self.calls.append((url, params, headers))
+        if headers.get('If-None-Match') == self.etag:
+            if self.on_conditional:
+                self.on_conditional()
+            return _response(304)
+        return _response(200, self.body, self.etag)
+
+
+@pytest.fixture
+def client(mega):
+    client = mega.APIClient('http://backend')
+    client.session = _Backend({'cpu': 10})
+    return client
+
+
+class TestConditionalGets:
+    """Test the client's validator cache and in-flight deduplication."""
+
+    def test_not_modified_returns_cached_body(self, client):
+        """A 304 answers from the cache; only the first GET transfers a body."""
+        first = client.get_system_status()
+        second = client.get_system_status()
+
+        assert first == second == {'cpu': 10}
+        assert [headers for _, _, headers in client.session.calls] == [{}, {'If-None-Match': '"v1"'}]
+        assert client.cache.stats['requests'] == 2
+        assert client.cache.stats['not_modified'] == 1
+
+    def test_not_modified_for_evicted_entry_refetches(self, client):
+        """A 304 for an entry evicted meanwhile is retried without validators."""
+        client.get_system_status()
+        client.session.on_conditional = client.cache.clear
+
+        assert client.get_system_status() == {'cpu': 10}
+        assert [headers for _, _, headers in client.session.calls] == [{}, {'If-None-Match': '"v1"'}, {}]
+
+    def test_concurrent_gets_share_one_request(self, client):
+        """Identical GETs in flight together make one round trip."""
+        release = threading.Event()
+        get = client.session.get
+
+        def slow_get(*args, **kwargs):
+            release.wait(5.0)
+            return get(*args, **kwargs)
+
+        client.session.get = slow_get
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get_system_status())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5.0
+        while client.cache.stats['coalesced'] < 4 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5.0)
+
+        assert results == [{'cpu': 10}] * 5
+        assert len(client.session.calls) == 1
+        assert client.cache.stats['coalesced'] == 4
+        assert client.cache.in_flight == {}
+
+    def test_concurrent_gets_share_errors(self, client):
+        """Followers of a failed GET get its error, not a result of their own."""
+        release = threading.Event()
+        calls = []
+
+        def failing_get(*args, **kwargs):
+            calls.append(1)
+            release.wait(5.0)
+            raise requests.ConnectionError("backend down")
+
+        client.session.get = failing_get
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.list_tasks())) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5.0
+        while client.cache.stats['coalesced'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5.0)
+
+        assert results == [None] * 3
+        assert len(calls) == 1
+
+        # The failure is not cached
+        client.session = _Backend([_task('a')])
+        assert client.list_tasks() == [_task('a')]
+
+    def test_get_tasks_batches_ids(self, client):
+        """get_tasks() asks for at most TASK_BATCH_SIZE distinct ids per request."""
+        def get(url, params=None, headers=None):
+            client.session.calls.append((url, params, headers))
+            return _response(200, [_task(task_id) for task_id in params['ids'].split(',')])
+
+        client.session.get = get
+        task_ids = [f"t{i:03d}" for i in range(250)] * 2
+
+        tasks = client.get_tasks(task_ids)
+        batches = [params['ids'].split(',') for _, params, _ in client.session.calls]
+        assert [len(batch) for batch in batches] == [100, 100, 50]
+        assert sum(batches, []) == sorted(set(task_ids))
+        assert [task['id'] for task in tasks] == sorted(set(task_ids))
+        assert all(url == 'http://backend/tasks' for url, _, _ in client.session.calls)
@@ -0,0 +1,139 @@
+"""
+Tests for the CognitiveCore journal in utils.memory_service.
+"""
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('grpc')
+cognitive_core_pb2 = pytest.importorskip('cognitive_core_pb2')
+
+from utils import memory_service
+from utils.memory_service import (
+    CognitiveCoreJournal,
+    PersistentCognitionServicer,
+    load_cognitive_core
+)
+
+
+def record_request(conversation_id, *contents):
+    messages = [cognitive_core_pb2.ConversationMessage(sender='user', content=c) for c in contents]
+    return cognitive_core_pb2.RecordRequest(conversation_id=conversation_id, messages=messages)
+
+
+def make_servicer(path, **kwargs):
+    return PersistentCognitionServicer(journal=CognitiveCoreJournal(str(path), **kwargs))
+
+
+def reload(path):
+    journal = CognitiveCoreJournal(str(path))
+    core = journal.load()
+    journal.close()
+    return core
+
+
+class TestCognitiveCoreJournal:
+    """Test journaling, replay, compaction and crash recovery."""
+
+    def test_rpcs_append_deltas_and_replay(self, tmp_path):
+        """Each RPC appends a small record; a restart replays them."""
+        path = tmp_path / 'core.pb'
+        servicer = make_servicer(path)
+        servicer.RecordConversation(record_request('c1', 'hello', 'there'), None)
+        size = servicer.journal.journal_bytes
+        servicer.RecordConversation(record_request('c1', 'again'), None)
+        # The second record only carries the new message
+        assert servicer.journal.journal_bytes - size < size
+        servicer.RecordConversation(record_request('c2', 'other'), None)
+        servicer.ActivateAwareness(SimpleNamespace(client_id='t', activation_trigger='test'), None)
+
+        assert not path.exists()
+        assert servicer.journal.journal_records == 4
+        expected = servicer.cognitive_core.SerializeToString()
+
+        core = reload(path)
+        assert core.SerializeToString() == expected
+        assert list(core.conversational_memory.conversations[0].key_moments) == [
+            'user: hello', 'user: there', 'user: again'
+        ]
+        assert core.awareness_matrix.awareness_level == 1
+
+    def test_compaction_writes_snapshot_and_drops_journal(self, tmp_path):
+        """Past the threshold a snapshot is written and old journals are removed."""
+        path = tmp_path / 'core.pb'
+        servicer = make_servicer(path, compact_records=3)
+        for i in range(7):
+            servicer.RecordConversation(record_request(f'c{i % 2}', f'm{i}'), None)
+        servicer.journal.flush()
+
+        assert servicer.journal.snapshots == 2
+        assert load_cognitive_core(str(path)).conversational_memory.conversations
+        journals = sorted(name for name in os.listdir(tmp_path) if name.endswith('.journal'))
+        assert journals == [os.path.basename(servicer.journal.journal_path(servicer.journal.generation))]
+        assert reload(path).SerializeToString() == servicer.cognitive_core.SerializeToString()
+
+    def test_compaction_queued_behind_running_snapshot(self, tmp_path, monkeypatch):
+        """A compaction requested during a snapshot runs after it; a third waits for the next threshold."""
+        started, release = threading.Event(), threading.Event()
+        write = memory_service.write_file_atomic
+
+        def slow_write(filepath, data):
+            started.set()
+            release.wait(5.0)
+            write(filepath, data)
+
+        monkeypatch.setattr(memory_service, 'write_file_atomic', slow_write)
+        journal = CognitiveCoreJournal(str(tmp_path / 'core.pb'))
+        core = journal.load()
+        journal.record_replace(core)
+        assert journal.compact(core)
+        assert started.wait(5.0)
+
+        journal.record_replace(core)
+        assert journal.compact(core)
+        journal.record_replace(core)
+        assert not journal.compact(core)
+
+        release.set()
+        journal.flush()
+        assert journal.get_stats()['snapshots'] == 2
+        journals = sorted(name for name in os.listdir(tmp_path) if name.endswith('.journal'))
+        assert journals == [os.path.basename(journal.journal_path(journal.generation))]
+        assert journal.journal_records == 1
+        journal.close()
+
+    def test_replaying_folded_journal_is_harmless(self, tmp_path):
+        """A crash between snapshot and journal removal replays to the same state."""
+        path = tmp_path / 'core.pb'
+        servicer = make_servicer(path)
+        for i in range(3):
+            servicer.RecordConversation(record_request('c1', f'm{i}'), None)
+        journal_file = servicer.journal.journal_path(servicer.journal.generation)
+        journal_bytes = open(journal_file, 'rb').read()
+        servicer.close()
+
+        # Restore the journal as if it had not been deleted after the snapshot
+        with open(journal_file, 'wb') as f:
+            f.write(journal_bytes)
+        core = reload(path)
+        assert list(core.conversational_memory.conversations[0].key_moments) == ['user: m0', 'user: m1', 'user: m2']
+
+    def test_torn_record_is_truncated(self, tmp_path):
+        """A partially written last record is dropped without losing earlier ones."""
+        path = tmp_path / 'core.pb'
+        servicer = make_servicer(path)
+        servicer.RecordConversation(record_request('c1', 'kept'), None)
+        servicer.RecordConversation(record_request('c1', 'torn'), None)
+        journal_file = servicer.journal.journal_path(servicer.journal.generation)
+        servicer.journal._file.close()
+        with open(journal_file, 'r+b') as f:
+            f.truncate(os.path.getsize(journal_file) - 3)
+
+        journal = CognitiveCoreJournal(str(path))
+        core = journal.load()
+        journal.close()
+        assert journal.replayed_records == 1
+        assert list(core.conversational_memory.conversations[0].key_moments) == ['user: kept']
+        assert reload(path).conversational_memory.conversations[0].key_moments == ['user: kept']
@@ -6,7 +6,21 @@ import pytest
 import threading
 from unittest.mock import patch, MagicMock
 
-from core.performance import PerformanceMonitor, PerformanceStats, monitor_performance
+from core.performance import (
+    LogHistogram, PerformanceMonitor, PerformanceStats, monitor_performance, performance_monitor
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_performance_monitor():
+    """Give every test a clean, enabled PerformanceMonitor singleton."""
+    monitor = PerformanceMonitor()
+    monitor.enable()
+    monitor.reset_stats()
+    yield monitor
+    monitor.enable()
+    monitor.reset_stats()
+
 
 class TestPerformanceStats:
     """Test performance statistics collection."""
@@ -87,6 +101,64 @@ class TestPerformanceStats:
         
         # Standard deviation of [1, 3, 5, 7, 9] is ~2.828
         assert stats.std_dev == pytest.approx(2.828, abs=0.001)
+    
+    def test_merge(self):
+        """Test merging statistics from several shards."""
+        left, right, combined = PerformanceStats(), PerformanceStats(), PerformanceStats()
+        for value in (1, 2, 3):
+            left.update(value)
+            combined.update(value)
+        for value in (10, 20):
+            right.update(value)
+            combined.update(value)
+        
+        left.merge(right)
+        assert left.call_count == 5
+        assert left.total_time == combined.total_time
+        assert left.min_time == 1
+        assert left.max_time == 20
+        assert left.std_dev == pytest.approx(combined.std_dev)
+    
+    def test_percentiles_beyond_history(self):
+        """Test quantiles estimated by the sketch once history overflows."""
+        stats = PerformanceStats()
+        for i in range(1, 1001):
+            stats.update(i / 1000)
+        
+        assert stats.percentile(50) == pytest.approx(0.5, rel=0.02)
+        assert stats.percentile(99) == pytest.approx(0.99, rel=0.02)
+
+
+class TestLogHistogram:
+    """Test the mergeable quantile sketch."""
+    
+    def test_relative_accuracy(self):
+        """Test that quantile estimates stay within the configured error."""
+        sketch = LogHistogram(relative_accuracy=0.01)
+        for i in range(1, 10001):
+            sketch.add(i)
+        
+        assert sketch.count == 10000
+        assert sketch.quantile(0.5) == pytest.approx(5000, rel=0.011)
+        assert sketch.quantile(0.95) == pytest.approx(9500, rel=0.011)
+    
+    def test_merge(self):
+        """Test merging two sketches."""
+        first, second = LogHistogram(), LogHistogram()
+        for i in range(1, 501):
+            first.add(i)
+        for i in range(501, 1001):
+            second.add(i)
+        second.add(0.0)
+        
+        first.merge(second)
+        assert first.count == 1001
+        assert first.zero_count == 1
+        assert first.quantile(0.5) == pytest.approx(500, rel=0.011)
+    
+    def test_empty(self):
+        """Test an empty sketch."""
+        assert LogHistogram().quantile(0.5) == 0.0
 
 
 class TestPerformanceMonitor:
@@ -232,3 +304,77 @@ def test_enable_prometheus_metrics(mock_start_server):
     # Verify server was started
     mock_start_server.assert_called_once_with(9090)
     assert monitor._metrics_enabled is True
+
+
+def test_prometheus_collector_reads_stats_at_scrape_time():
+    """Test the scrape-time collector renders histograms per function."""
+    from core.performance import PerformanceCollector
+    
+    monitor = PerformanceMonitor()
+    monitor.enable()
+    monitor.reset_stats()
+    monitor.set_histogram_buckets([0.1, 1.0], name="collector_test")
+    for value in (0.05, 0.5, 2.0):
+        monitor.record_metric("collector_test", value)
+    
+    families = {family.name: family for family in PerformanceCollector(monitor).collect()}
+    samples = {
+        (sample.name, sample.labels.get("le")): sample.value
+        for sample in families["opryxx_function_duration_seconds"].samples
+        if sample.labels["function"] == "collector_test"
+    }
+    assert samples[("opryxx_function_duration_seconds_bucket", "0.1")] == 1
+    assert samples[("opryxx_function_duration_seconds_bucket", "1.0")] == 2
+    assert samples[("opryxx_function_duration_seconds_bucket", "+Inf")] == 3
+    assert samples[("opryxx_function_duration_seconds_count", None)] == 3
+    assert samples[("opryxx_function_duration_seconds_sum", None)] == pytest.approx(2.55)
+
+
+def test_metric_name_cardinality_cap():
+    """Test that new names beyond the cap are folded into __other__."""
+    from core.performance import OVERFLOW_METRIC_NAME
+    
+    monitor = PerformanceMonitor()
+    monitor.enable()
+    monitor.reset_stats()
+    previous_cap, monitor.max_tracked_names = monitor.max_tracked_names, 2
+    try:
+        for i in range(5):
+            monitor.record_metric(f"dynamic_{i}", 0.01)
+        
+        stats = monitor.get_stats()
+        assert set(stats) == {"dynamic_0", "dynamic_1", OVERFLOW_METRIC_NAME}
+        assert stats[OVERFLOW_METRIC_NAME]["call_count"] == 3
+    finally:
+        monitor.max_tracked_names = previous_cap
+        monitor.reset_stats()
+
+
+def test_metric_name_cardinality_cap_bounds_memory():
+    """Test that overflowing names share one shard per thread and are not remembered."""
+    from core.performance import OVERFLOW_METRIC_NAME
+    
+    monitor = PerformanceMonitor()
+    previous_cap, monitor.max_tracked_names = monitor.max_tracked_names, 10
+    try:
+        shard_counts = []
+        
+        def worker(offset):
+            for i in range(5000):
+                monitor.record_metric(f"request_{offset}_{i}", 0.001)
+            shard_counts.append(len(monitor._local.shards))
+        
+        worker(0)
+        thread = threading.Thread(target=worker, args=(1,))
+        thread.start()
+        thread.join()
+        
+        # Tracked names plus the shared overflow shard in each thread
+        assert shard_counts == [11, 1]
+        assert len(monitor._names) == 10
+        assert set(monitor._shards) == {f"request_0_{i}" for i in range(10)} | {OVERFLOW_METRIC_NAME}
+        assert len(monitor._shards[OVERFLOW_METRIC_NAME]) == 2
+        assert monitor.overflow_count == 9990
+        assert monitor.get_stats(OVERFLOW_METRIC_NAME)["call_count"] == 9990
+    finally:
+        monitor.max_tracked_names = previous_cap
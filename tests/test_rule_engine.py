@@ -0,0 +1,121 @@
+"""
+Tests for the compiled optimization rule engine.
+"""
+import logging
+
+import pytest
+
+from ai_workbench.services import rule_engine
+from ai_workbench.services.rule_engine import (
+    RuleCompileError, RuleCompiler, RuleEngine, bump_rules_version, resolve_metric
+)
+
+
+def _rule(rule_id, name, conditions, priority=0):
+    return {'id': rule_id, 'name': name, 'conditions': conditions, 'priority': priority, 'actions': []}
+
+
+class TestRuleCompiler:
+    """Test compiling condition documents into predicates."""
+
+    def test_nested_conditions(self):
+        """all/any/not, dotted paths and aliases compile to one predicate."""
+        predicate, keys = RuleCompiler().compile({'all': [
+            {'metric': 'cpu_usage', 'op': 'gt', 'value': 50},
+            {'any': [
+                {'metric': 'disks.0.percent_used', 'op': '>=', 'value': 90},
+                {'not': {'os': 'linux'}},
+            ]},
+        ]})
+        assert keys == {'cpu_usage', 'disks.0.percent_used', 'os'}
+
+        metrics = {'cpu_usage': 85, 'os': 'linux', 'disks': [{'percent_used': 95}]}
+        values = {key: resolve_metric(metrics, key) for key in keys}
+        assert predicate(values)
+        values['disks.0.percent_used'] = 10
+        assert not predicate(values)
+
+    def test_missing_metric_is_false(self):
+        """Comparisons on missing or incomparable values never match."""
+        predicate, _ = RuleCompiler().compile({'memory_usage': {'between': [10, 20]}})
+        assert not predicate({})
+        assert not predicate({'memory_usage': 'n/a'})
+        assert predicate({'memory_usage': 15})
+
+    @pytest.mark.parametrize('conditions', [
+        {}, {'cpu_usage': {'~': 1}}, {'metric': 'x', 'op': 'between', 'value': 3}, 'cpu_usage > 5',
+    ])
+    def test_invalid_conditions_rejected(self, conditions):
+        """Malformed documents and unknown operators fail at compile time."""
+        with pytest.raises(RuleCompileError):
+            RuleCompiler().compile(conditions)
+
+
+class TestRuleEngine:
+    """Test cached, incremental rule evaluation."""
+
+    def test_evaluates_in_priority_order_and_caches(self):
+        """Rules load once, match in priority order and skip invalid ones."""
+        loads = []
+        rules = [
+            _rule(1, 'cpu', {'cpu_usage': {'>': 80}}, priority=1),
+            _rule(2, 'busy', {'cpu_usage': {'>': 50}}, priority=5),
+            _rule(3, 'bad', {'cpu_usage': {'~': 1}}),
+        ]
+        engine = RuleEngine(lambda: loads.append(1) or rules)
+
+        assert [r['name'] for r in engine.evaluate({'cpu_usage': 85})] == ['busy', 'cpu']
+        assert [r['name'] for r in engine.evaluate({'cpu_usage': 60})] == ['busy']
+        assert engine.evaluate({'cpu_usage': 10}) == []
+        assert len(loads) == 1
+        assert engine.get_stats()['compile_errors'] == 1
+
+    def test_reloads_only_on_version_change(self):
+        """A rules version bump recompiles; otherwise the cache is reused."""
+        rules = [_rule(1, 'cpu', {'cpu_usage': {'>': 80}})]
+        engine = RuleEngine(lambda: list(rules))
+        engine.evaluate({'cpu_usage': 10})
+
+        rules.append(_rule(2, 'low', {'cpu_usage': {'<': 20}}))
+        assert engine.evaluate({'cpu_usage': 10}) == []
+
+        bump_rules_version()
+        assert [r['name'] for r in engine.evaluate({'cpu_usage': 10})] == ['low']
+
+    def test_invalid_rule_logged_once_per_version(self, caplog, monkeypatch):
+        """Reloads on max_age do not repeat the error for an unchanged rule set."""
+        clock = [0.0]
+        monkeypatch.setattr(rule_engine.time, 'monotonic', lambda: clock[0])
+        engine = RuleEngine(lambda: [_rule(1, 'bad', {'cpu_usage': {'~': 1}})], max_age=60)
+
+        def errors():
+            return [r for r in caplog.records if r.levelno == logging.ERROR and "'bad'" in r.getMessage()]
+
+        with caplog.at_level(logging.DEBUG, logger=rule_engine.__name__):
+            engine.evaluate({'cpu_usage': 10})
+            for _ in range(3):
+                clock[0] += 61
+                engine.evaluate({'cpu_usage': 10})
+            assert len(errors()) == 1
+            assert engine.get_stats()['compile_errors'] == 1
+
+            bump_rules_version()
+            engine.evaluate({'cpu_usage': 10})
+            assert len(errors()) == 2
+
+    def test_only_rules_on_changed_keys_are_reevaluated(self):
+        """Rules whose inputs did not change keep their previous result."""
+        calls = []
+        engine = RuleEngine(lambda: [
+            _rule(1, 'cpu', {'cpu_usage': {'>': 80}}),
+            _rule(2, 'mem', {'memory_usage': {'>': 80}}),
+        ])
+        engine.evaluate({'cpu_usage': 90, 'memory_usage': 10})
+
+        for compiled in engine.rules:
+            predicate = compiled.predicate
+            compiled.predicate = lambda values, p=predicate, n=compiled.name: calls.append(n) or p(values)
+
+        matched = engine.evaluate({'cpu_usage': 95, 'memory_usage': 10})
+        assert calls == ['cpu']
+        assert [r['name'] for r in matched] == ['cpu']
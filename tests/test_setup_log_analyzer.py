@@ -0,0 +1,100 @@
+"""
+Tests for the streaming Windows Setup log analyzer.
+"""
+import pytest
+
+from recovery.boot_diagnostics import BootDiagnostics
+from recovery.setup_log_analyzer import SetupLogAnalyzer
+
+SETUPACT = """\
+2024-05-01 10:00:00, Info                  SP     Setup phase change: [Downlevel]
+2024-05-01 10:00:05, Info                  MOUPG  Copying files
+2024-05-01 10:05:00, Warning               SP     Driver package not signed
+2024-05-01 10:10:00, Info                  SP     Setup phase change: [SafeOS]
+2024-05-01 10:12:00, Error                 SP     Operation failed: Apply image. Error: 0x80070070[gle=0x00000070]
+2024-05-01 10:12:01, Error                 SP     CSetupPlatform::Execute: Error 0x80070070, rollback
+2024-05-01 10:15:00, Info                  SP     Setup phase change: [Rollback]
+2024-05-01 10:20:00, Fatal Error           MOUPG  Installation failed with 0xC1900101
+"""
+
+
+@pytest.fixture
+def setupact(tmp_path):
+    path = tmp_path / 'setupact.log'
+    path.write_text(SETUPACT, encoding='utf-8')
+    return path
+
+
+class TestSetupLogAnalyzer:
+    """Test SetupLogAnalyzer on fixture logs."""
+
+    def test_structured_results(self, setupact):
+        """Counts, timestamps, codes and phases are extracted."""
+        result = SetupLogAnalyzer().analyze(str(setupact))
+
+        assert result['line_count'] == 8
+        assert result['error_count'] == SETUPACT.lower().count('error')
+        assert result['warning_count'] == 1
+        assert result['first_timestamp'] == '2024-05-01T10:00:00'
+        assert result['last_timestamp'] == '2024-05-01T10:20:00'
+        assert [p['phase'] for p in result['phases']] == ['downlevel', 'safeos', 'rollback']
+        assert result['phases'][1]['timestamp'] == '2024-05-01T10:10:00'
+
+        codes = {c['code']: c for c in result['error_codes']}
+        assert codes['0x80070070']['count'] == 2
+        assert codes['0x80070070']['first_seen'] == '2024-05-01T10:12:00'
+        assert codes['0x80070070']['last_seen'] == '2024-05-01T10:12:01'
+        assert result['error_codes'][0]['code'] == '0x80070070'
+        assert result['last_errors'][-1]['severity'] == 'Fatal Error'
+        assert result['last_lines'][-2].endswith('0xC1900101')
+        assert result['last_lines'] == SETUPACT.split('\n')[-10:]
+
+    def test_small_chunks_match_single_pass(self, setupact):
+        """Chunk boundaries do not change the result."""
+        whole = SetupLogAnalyzer().analyze(str(setupact))
+        chunked = SetupLogAnalyzer(chunk_size=64).analyze(str(setupact))
+        assert chunked == whole
+
+    def test_large_log_bounded_samples(self, tmp_path):
+        """Samples stay bounded however many matches a log has."""
+        path = tmp_path / 'big.log'
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(20000):
+                f.write(f"2024-05-01 10:00:00, Error SP failed with 0x8{i:07x}\n")
+        result = SetupLogAnalyzer(chunk_size=4096, max_error_codes=10, max_error_lines=5).analyze(str(path))
+
+        assert result['error_count'] == 20000
+        assert len(result['error_codes']) == 10
+        assert result['dropped_error_codes'] == 19990
+        assert len(result['last_errors']) == 5
+        assert result['last_lines'][-2] == f"2024-05-01 10:00:00, Error SP failed with 0x8{19999:07x}"
+
+    def test_tail_reads_backwards(self, tmp_path):
+        """The tail reader returns the last lines of large and UTF-16 files."""
+        path = tmp_path / 'tail.log'
+        path.write_text(''.join(f"line {i}\n" for i in range(100000)), encoding='utf-8')
+        assert SetupLogAnalyzer().tail(str(path), 3, block_size=1024) == ['line 99998', 'line 99999', '']
+
+        utf16 = tmp_path / 'setupapi.log'
+        utf16.write_text("first\r\n2024-05-01 10:00:00, Error x 0x80004005\r\nlast\r\n", encoding='utf-16')
+        result = SetupLogAnalyzer(tail_lines=2).analyze(str(utf16))
+        assert result['encoding'] == 'utf-16'
+        assert result['error_codes'][0]['code'] == '0x80004005'
+        assert result['last_lines'] == ['last', '']
+
+    def test_empty_log(self, tmp_path):
+        """An empty log yields an empty analysis."""
+        path = tmp_path / 'empty.log'
+        path.touch()
+        result = SetupLogAnalyzer().analyze(str(path))
+        assert result['line_count'] == 0 and result['last_lines'] == ['']
+
+
+def test_boot_diagnostics_uses_analyzer(setupact, tmp_path):
+    """BootDiagnostics reports setup logs and their error codes."""
+    diagnostics = BootDiagnostics(log_dir=str(tmp_path / 'diag'))
+    logs = diagnostics._analyze_setup_logs([str(setupact)])
+    assert logs['setupact.log']['error_codes'][0]['code'] == '0x80070070'
+
+    diagnostics.diagnostic_data = {'installation_status': {'setup_logs': logs}}
+    assert diagnostics._analyze_failure_patterns()['error_codes'][0] == '0x80070070'
@@ -0,0 +1,127 @@
+"""
+Tests for the delta-encoded metric stream in core.streaming.
+"""
+import json
+
+import pytest
+
+from core.streaming import MetricStream, StreamSubscriber
+
+
+def apply(state, message):
+    """Client-side application of a keyframe or delta."""
+    if message['type'] == 'keyframe':
+        return {group: dict(fields) for group, fields in message['data'].items()}
+    for group, fields in message['data'].items():
+        state.setdefault(group, {}).update(fields)
+    for group, fields in message.get('removed', {}).items():
+        for field in fields:
+            state.get(group, {}).pop(field, None)
+    return state
+
+
+class TestMetricStream:
+    """Test keyframes, deltas and subscription filtering."""
+
+    def test_keyframe_then_deltas(self):
+        """A new subscriber gets a keyframe, then only changed fields."""
+        stream = MetricStream()
+        subscriber = StreamSubscriber(stream)
+        assert subscriber.poll() is None
+
+        stream.publish({'cpu': {'percent': 10.0}, 'memory': {'percent': 50.0, 'free': 100}})
+        keyframe = json.loads(subscriber.poll())
+        assert keyframe['type'] == 'keyframe' and keyframe['seq'] == 1
+        assert keyframe['data'] == {'cpu': {'percent': 10.0}, 'memory': {'percent': 50.0, 'free': 100}}
+
+        stream.publish({'cpu': {'percent': 10.0}, 'memory': {'percent': 55.0}})
+        delta = json.loads(subscriber.poll())
+        assert delta['type'] == 'delta' and delta['base'] == 1 and delta['seq'] == 2
+        assert delta['data'] == {'memory': {'percent': 55.0}}
+        assert delta['removed'] == {'memory': ['free']}
+
+    def test_unchanged_publish_sends_nothing(self):
+        """Publishing identical (or sub-precision) values produces no message."""
+        stream = MetricStream(precision=1)
+        subscriber = StreamSubscriber(stream)
+        stream.publish({'cpu': {'percent': 10.01}})
+        subscriber.poll()
+
+        assert not stream.publish({'cpu': {'percent': 10.04}})
+        assert subscriber.poll() is None
+        assert stream.seq == 1
+
+    def test_subscription_filter(self):
+        """Subscribers only see their groups and skip unrelated changes."""
+        stream = MetricStream()
+        subscriber = StreamSubscriber(stream, groups=['cpu'])
+        stream.publish({'cpu': {'percent': 1.0}, 'disk': {'percent': 2.0}})
+        assert json.loads(subscriber.poll())['data'] == {'cpu': {'percent': 1.0}}
+
+        stream.publish({'disk': {'percent': 3.0}})
+        assert subscriber.poll() is None
+        assert subscriber.base == stream.seq
+
+        subscriber.subscribe(['disk'])
+        assert json.loads(subscriber.poll())['data'] == {'disk': {'percent': 3.0}}
+
+    def test_rate_limit_coalesces_changes(self):
+        """Changes during the interval arrive as one delta that rebuilds the state."""
+        now = [0.0]
+        stream = MetricStream()
+        subscriber = StreamSubscriber(stream, min_interval=5, clock=lambda: now[0])
+        mirror = StreamSubscriber(stream)
+        stream.publish({'cpu': {'percent': 1.0, 'load': 0.5}})
+        state = apply({}, json.loads(subscriber.poll()))
+
+        for i in range(4):
+            now[0] += 1
+            stream.publish({'cpu': {'percent': float(i)}})
+            assert subscriber.poll() is None
+
+        now[0] += 1
+        delta = json.loads(subscriber.poll())
+        assert delta['base'] == 1 and delta['seq'] == 5
+        assert apply(state, delta) == apply({}, json.loads(mirror.poll())) == stream.snapshot()
+        assert subscriber.messages == 2
+
+    def test_subscriber_behind_history_gets_keyframe(self):
+        """A subscriber older than the delta history is resynchronized."""
+        stream = MetricStream(history=2)
+        subscriber = StreamSubscriber(stream)
+        stream.publish({'cpu': {'percent': 0.0}})
+        subscriber.poll()
+        for i in range(1, 4):
+            stream.publish({'cpu': {'percent': float(i)}})
+
+        message = json.loads(subscriber.poll())
+        assert message['type'] == 'keyframe'
+        assert subscriber.keyframes == 2
+
+    def test_encoded_once_for_subscribers_in_step(self):
+        """Subscribers at the same position share one encoded message."""
+        stream = MetricStream()
+        subscribers = [StreamSubscriber(stream) for _ in range(10)]
+        stream.publish({'cpu': {'percent': 1.0}})
+        messages = [subscriber.poll() for subscriber in subscribers]
+        stream.publish({'cpu': {'percent': 2.0}})
+        messages += [subscriber.poll() for subscriber in subscribers]
+
+        assert stream.get_stats()['encodes'] == 2
+        assert stream.get_stats()['encode_hits'] == 18
+        assert messages[10] is messages[19]
+
+    def test_msgpack_encoding(self):
+        """Binary subscribers receive msgpack-encoded messages."""
+        msgpack = pytest.importorskip('msgpack')
+        stream = MetricStream()
+        subscriber = StreamSubscriber(stream, encoding='msgpack')
+        stream.publish({'cpu': {'percent': 1.0}})
+        message = subscriber.poll()
+
+        assert isinstance(message, bytes)
+        assert msgpack.unpackb(message)['data'] == {'cpu': {'percent': 1.0}}
+
+    def test_unknown_encoding_rejected(self):
+        with pytest.raises(ValueError):
+            StreamSubscriber(MetricStream(), encoding='xml')
@@ -0,0 +1,76 @@
+"""
+Tests for the columnar metrics ring buffer in utils.performance.
+"""
+import numpy as np
+import pytest
+
+from utils.performance import METRIC_FIELDS, MetricsRingBuffer, PerformanceMonitor
+
+
+def _row(value: float):
+    return [value] * len(METRIC_FIELDS)
+
+
+class TestMetricsRingBuffer:
+    """Test MetricsRingBuffer storage and windowed aggregates."""
+
+    def test_append_and_wraparound(self):
+        """Only the last ``capacity`` samples are retained, oldest first."""
+        buffer = MetricsRingBuffer(capacity=4)
+        for i in range(10):
+            buffer.append(float(i), _row(i))
+
+        timestamps, values = buffer.view()
+        assert len(buffer) == 4
+        assert timestamps.tolist() == [6.0, 7.0, 8.0, 9.0]
+        assert values[:, 0].tolist() == [6.0, 7.0, 8.0, 9.0]
+
+    def test_view_is_zero_copy_and_read_only(self):
+        """Window views alias the internal storage and cannot be written."""
+        buffer = MetricsRingBuffer(capacity=8)
+        for i in range(12):
+            buffer.append(float(i), _row(i))
+
+        _, values = buffer.view()
+        assert np.shares_memory(values, buffer._values)
+        with pytest.raises(ValueError):
+            values[0, 0] = 1.0
+
+    def test_time_window(self):
+        """Window queries only include samples newer than ``now - window``."""
+        buffer = MetricsRingBuffer(capacity=16)
+        for i in range(10):
+            buffer.append(100.0 + i, _row(i))
+
+        column = buffer.column("cpu_percent", window_seconds=3, now=109.0)
+        assert column.tolist() == [6.0, 7.0, 8.0, 9.0]
+        assert buffer.mean(window_seconds=3, now=109.0)["cpu_percent"] == 7.5
+        assert buffer.max(window_seconds=3, now=109.0)["memory_percent"] == 9.0
+        assert buffer.percentile(50, window_seconds=3, now=109.0)["cpu_percent"] == 7.5
+        assert buffer.mean(window_seconds=1, now=500.0) == {}
+
+    def test_latest_round_trips_to_system_metrics(self):
+        """The latest row converts back to a SystemMetrics instance."""
+        buffer = MetricsRingBuffer(capacity=2)
+        assert buffer.latest() is None
+
+        buffer.append(5.0, _row(3))
+        metrics = buffer.to_metrics(*buffer.latest())
+        assert metrics.timestamp == 5.0
+        assert metrics.cpu_percent == 3.0
+        assert metrics.process_threads == 3
+        assert isinstance(metrics.process_threads, int)
+
+
+def test_monitor_get_stats_uses_ring_buffer():
+    """PerformanceMonitor.get_stats aggregates the buffered samples."""
+    monitor = PerformanceMonitor(window_size=10)
+    now = monitor._last_time
+    for i in range(5):
+        monitor.metrics_buffer.append(now - 4 + i, _row(10 * (i + 1)))
+
+    stats = monitor.get_stats(window_seconds=60)
+    assert stats.avg_cpu == pytest.approx(30.0)
+    assert stats.max_cpu == 50.0
+    assert stats.process_threads == 50
+    assert len(monitor.metrics_history) == 5
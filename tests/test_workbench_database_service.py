@@ -0,0 +1,335 @@
+"""
+Tests for the AI Workbench database service against an in-memory SQLite database.
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ai_workbench.models.workbench_models import (
+    FailurePrediction, OptimizationRule, SystemAction, SystemMetric, SystemMetricRollup
+)
+from ai_workbench.services.database_service import WorkbenchDatabaseService, keyset_cursor
+
+
+class _Manager:
+    """Minimal DatabaseManager serving one engine for reads and writes."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.session_factory = sessionmaker(bind=engine)
+
+    def get_engine(self, readonly=False):
+        return self.engine
+
+    def get_session_factory(self, readonly=False):
+        return self.session_factory
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    tables = [model.__table__ for model in (
+        SystemMetric, SystemMetricRollup, SystemAction, FailurePrediction, OptimizationRule
+    )]
+    SystemMetric.metadata.create_all(engine, tables=tables)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def service(engine):
+    service = WorkbenchDatabaseService(_Manager(engine))
+    yield service
+    service.close()
+
+
+def _count(engine, table, *where):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table).where(*where)).scalar()
+
+
+# Hour-aligned reference time for rollup tests
+BASE = datetime(2026, 1, 1)
+
+
+class TestRollups:
+    """Test downsampling tiers, tier selection and retention."""
+
+    @pytest.fixture
+    def raw_metrics(self, service):
+        # Two hours of samples every 10 seconds
+        service.save_system_metrics_many(
+            {'timestamp': BASE + timedelta(seconds=i), 'cpu_usage': float(i % 60), 'health_score': 100.0}
+            for i in range(0, 2 * 3600, 10)
+        )
+
+    def test_rollup_builds_minute_and_hour_tiers(self, service, engine, raw_metrics):
+        """Closed buckets are aggregated once, each tier from the previous one."""
+        now = BASE + timedelta(hours=2, seconds=30)
+        assert service.rollup_metrics(now) == {60: 120, 3600: 2}
+        # A second pass resumes after the newest bucket
+        assert service.rollup_metrics(now) == {60: 0, 3600: 0}
+
+        table = SystemMetricRollup.__table__
+        with engine.connect() as conn:
+            hour = conn.execute(
+                select(table).where(table.c.resolution == 3600, table.c.bucket_start == BASE)
+            ).one()._mapping
+        assert hour['sample_count'] == 360
+        assert hour['cpu_usage_min'] == 0.0
+        assert hour['cpu_usage_max'] == 50.0
+        assert hour['cpu_usage_avg'] == pytest.approx(25.0)
+
+    def test_open_buckets_are_not_rolled_up(self, service, raw_metrics):
+        """Buckets that end after ``now`` wait for a later pass."""
+        assert service.rollup_metrics(BASE + timedelta(minutes=90)) == {60: 90, 3600: 1}
+        assert service.rollup_metrics(BASE + timedelta(hours=3)) == {60: 30, 3600: 1}
+
+    def test_select_tier(self, service):
+        """The coarsest retained tier no coarser than the resolution is used."""
+        now = BASE + timedelta(days=400)
+        assert service.select_tier(now - timedelta(hours=1), now=now) == 0
+        assert service.select_tier(now - timedelta(hours=1), resolution=600, now=now) == 60
+        assert service.select_tier(now - timedelta(hours=1), resolution=7200, now=now) == 3600
+        # Raw rows are only kept for a week, minute buckets for 90 days
+        assert service.select_tier(now - timedelta(days=30), now=now) == 60
+        assert service.select_tier(now - timedelta(days=30), resolution=1, now=now) == 60
+        assert service.select_tier(now - timedelta(days=365), now=now) == 3600
+        # Older than every tier: the longest-lived one is the best available
+        assert service.select_tier(now - timedelta(days=1000), now=now) == 3600
+
+    def test_retention_keeps_referenced_metrics(self, service, engine, raw_metrics):
+        """Expired raw rows are deleted unless actions or predictions use them."""
+        service.maintain_metrics(BASE + timedelta(hours=2))
+        referenced = service.get_recent_metrics(limit=1)[0]['id']
+        assert service.record_action(referenced, 'clean_temp_files', 'Clean up') is not None
+
+        result = service.maintain_metrics(BASE + timedelta(days=8))
+        assert result['deleted'] == {0: 719, 60: 0, 3600: 0}
+        assert _count(engine, SystemMetric.__table__) == 1
+        assert _count(engine, SystemMetricRollup.__table__) == 122
+
+        result = service.maintain_metrics(BASE + timedelta(days=91))
+        assert result['deleted'] == {0: 0, 60: 120, 3600: 0}
+        assert _count(engine, SystemMetricRollup.__table__) == 2
+
+
+class TestBulkWrites:
+    """Test the bulk insert API and the buffered writer."""
+
+    def _cpu_by_id(self, engine):
+        table = SystemMetric.__table__
+        with engine.connect() as conn:
+            return dict(conn.execute(select(table.c.id, table.c.cpu_usage)).all())
+
+    def test_bulk_insert_returns_ids_in_input_order(self, service, engine):
+        """Each returned id belongs to the row at the same position, across pages."""
+        service.BULK_CHUNK_ROWS = 7
+        # Descending values so any reordering would be visible
+        values = [float(100 - i) for i in range(50)]
+        ids = service.save_system_metrics_many({'cpu_usage': value, 'health_score': 1.0} for value in values)
+
+        assert len(ids) == 50
+        cpu = self._cpu_by_id(engine)
+        assert [cpu[row_id] for row_id in ids] == values
+
+    def test_writer_callbacks_receive_their_own_ids(self, service, engine):
+        """Callbacks of one flush get the id of the row they added."""
+        writer = service.create_buffered_writer(flush_size=10000, flush_interval=60)
+        received = {}
+        for i in range(30):
+            writer.add_metric({'cpu_usage': float(i), 'health_score': 1.0},
+                              callback=lambda row_id, i=i: received.__setitem__(i, row_id))
+
+        assert writer.flush() == 30
+        cpu = self._cpu_by_id(engine)
+        assert {i: cpu[row_id] for i, row_id in received.items()} == {i: float(i) for i in range(30)}
+
+    def test_failed_flush_is_retried(self, service, engine, monkeypatch):
+        """A batch that fails to insert stays pending and is written by the next flush."""
+        writer = service.create_buffered_writer(flush_size=10000, flush_interval=60)
+        received = []
+        writer.add_metric({'cpu_usage': 1.0, 'health_score': 1.0}, callback=received.append)
+
+        insert_metrics = service._insert_metrics
+        monkeypatch.setattr(service, '_insert_metrics', lambda rows: 1 / 0)
+        assert writer.flush() == 0
+        assert writer.pending == 1
+        assert received == []
+
+        monkeypatch.setattr(service, '_insert_metrics', insert_metrics)
+        assert writer.flush() == 1
+        assert writer.pending == 0
+        assert received == list(self._cpu_by_id(engine))
+        assert writer.stats['errors'] == 1
+        assert writer.stats['retries'] == 1
+
+    def test_rows_are_dropped_after_max_attempts(self, service, monkeypatch):
+        """Rows that keep failing are dropped and their callbacks get None."""
+        writer = service.create_buffered_writer(flush_size=10000, flush_interval=60, max_attempts=2)
+        received = []
+        writer.add_metric({'cpu_usage': 1.0, 'health_score': 1.0}, callback=received.append)
+        monkeypatch.setattr(service, '_insert_metrics', lambda rows: 1 / 0)
+
+        writer.flush()
+        assert received == []
+        writer.flush()
+        assert received == [None]
+        assert writer.pending == 0
+        assert writer.stats['dropped'] == 1
+
+    def test_close_flushes_and_rejects_new_rows(self, service, engine):
+        """close() writes pending rows; later adds are refused instead of lost silently."""
+        writer = service.create_buffered_writer(flush_size=10000, flush_interval=60)
+        assert writer.add_metric({'cpu_usage': 1.0, 'health_score': 1.0})
+        writer.close()
+        assert _count(engine, SystemMetric.__table__) == 1
+
+        received = []
+        assert not writer.add_metric({'cpu_usage': 2.0, 'health_score': 1.0}, callback=received.append)
+        assert not writer.add_action({'metric_id': 1, 'action_type': 'x', 'description': 'y'})
+        assert writer.pending == 0
+        assert writer.stats['dropped'] == 2
+
+
+    def test_stats_consistent_under_concurrent_adds(self, service, engine):
+        """Counters updated by flushes and adds on different threads add up."""
+        writer = service.create_buffered_writer(flush_size=50, flush_interval=0.01, max_pending=100)
+        writer.start()
+
+        def produce():
+            for i in range(500):
+                writer.add_metric({'cpu_usage': float(i), 'health_score': 1.0})
+
+        threads = [threading.Thread(target=produce) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        stats = writer.get_stats()
+        assert stats['pending'] == 0
+        assert stats['metrics'] == _count(engine, SystemMetric.__table__)
+        assert stats['metrics'] + stats['dropped'] == 2000
+
+class TestReadPaths:
+    """Test keyset pagination, streaming and columnar results."""
+
+    @pytest.fixture
+    def metrics(self, service):
+        # Groups of four rows share a timestamp, so pages end inside ties
+        return service.save_system_metrics_many(
+            {
+                'timestamp': BASE + timedelta(seconds=i // 4),
+                'cpu_usage': None if i % 5 == 0 else float(i),
+                'network_status': i % 2 == 0,
+                'os_version': f'os-{i}',
+                'health_score': 1.0,
+            }
+            for i in range(25)
+        )
+
+    def _iter_ids(self, service, **kwargs):
+        table = SystemMetric.__table__
+        return [row['id'] for row in service.iter_rows(
+            [table.c.id], table.c.timestamp, table.c.id, **kwargs
+        )]
+
+    @pytest.mark.parametrize('page_size', [1, 3, 4, 5, 25, 100])
+    def test_keyset_pages_cover_every_row_once(self, service, metrics, page_size):
+        """Paging through duplicate timestamps neither skips nor repeats rows."""
+        assert self._iter_ids(service, page_size=page_size) == metrics
+        assert self._iter_ids(service, page_size=page_size, descending=True) == metrics[::-1]
+
+    def test_keyset_cursor_and_limit(self, service, metrics):
+        """A cursor taken mid-tie continues right after that row."""
+        table = SystemMetric.__table__
+        first = list(service.iter_rows(
+            list(table.columns), table.c.timestamp, table.c.id, page_size=3, limit=6
+        ))
+        assert [row['id'] for row in first] == metrics[:6]
+
+        cursor = keyset_cursor({'timestamp': first[-1]['timestamp'].isoformat(), 'id': first[-1]['id']})
+        assert self._iter_ids(service, page_size=3, after=cursor) == metrics[6:]
+        assert self._iter_ids(service, page_size=3, after=cursor, limit=4) == metrics[6:10]
+
+    def test_stream_rows_matches_keyset_order(self, service, metrics):
+        """The server-side cursor path yields the same rows in the same order."""
+        table = SystemMetric.__table__
+        rows = service.stream_rows([table.c.id], order_by=[table.c.timestamp, table.c.id], yield_per=4)
+        assert [row['id'] for row in rows] == metrics
+
+    def test_to_columns_dtypes(self, service, metrics):
+        """Columns convert page by page into typed arrays."""
+        np = pytest.importorskip('numpy')
+        table = SystemMetric.__table__
+        columns = [table.c.id, table.c.timestamp, table.c.cpu_usage, table.c.network_status, table.c.os_version]
+        result = service.to_columns(
+            service.iter_rows(columns, table.c.timestamp, table.c.id, page_size=4), columns, page_size=6
+        )
+
+        assert result['id'].dtype == np.int64
+        assert result['timestamp'].dtype == np.dtype('datetime64[us]')
+        assert result['cpu_usage'].dtype == np.float64
+        assert result['network_status'].dtype == np.float64
+        assert result['os_version'].dtype == object
+        assert result['id'].tolist() == metrics
+        assert np.isnan(result['cpu_usage'][0]) and result['cpu_usage'][1] == 1.0
+        assert result['network_status'][:2].tolist() == [1.0, 0.0]
+        assert result['timestamp'][4] == np.datetime64(BASE + timedelta(seconds=1))
+
+        empty = service.to_columns(iter(()), columns)
+        assert {name: array.dtype for name, array in empty.items()} == {
+            name: array.dtype for name, array in result.items()
+        }
+
+    def test_metrics_history_as_columns(self, service):
+        """History reads return raw or rollup columns keyed by ``timestamp``."""
+        np = pytest.importorskip('numpy')
+        now = datetime.utcnow()
+        service.save_system_metrics_many(
+            {'timestamp': now - timedelta(seconds=i), 'cpu_usage': 50.0, 'health_score': 1.0}
+            for i in range(0, 7200, 30)
+        )
+        service.rollup_metrics(now)
+
+        raw = service.get_metrics_history(hours=1, max_points=None, as_columns=True)
+        assert raw['timestamp'].dtype == np.dtype('datetime64[us]')
+        assert len(raw['id']) == 120
+        assert 'resolution' not in raw
+
+        rollups = service.get_metrics_history(hours=48, as_columns=True)
+        assert 'bucket_start' not in rollups
+        # Samples in the still open minute follow the buckets as raw rows
+        assert set(rollups['resolution'].tolist()) == {0, 60}
+        assert rollups['sample_count'].dtype == np.int64
+        assert rollups['sample_count'].sum() == 240
+        assert np.all(np.diff(rollups['timestamp']) > np.timedelta64(0))
+        assert np.all(rollups['cpu_usage'] == 50.0)
+
+    def test_metrics_history_before_first_rollup(self, service):
+        """History reads fall back to raw rows the rollup tiers do not cover yet."""
+        now = datetime.utcnow()
+        service.save_system_metrics_many(
+            {'timestamp': now - timedelta(seconds=i), 'cpu_usage': float(i), 'health_score': 1.0}
+            for i in range(0, 600, 10)
+        )
+
+        history = service.get_metrics_history()
+        assert len(history) == 60
+        assert [row['resolution'] for row in history] == [0] * 60
+        assert [row['cpu_usage'] for row in history] == [float(i) for i in range(590, -1, -10)]
+        assert history[0]['cpu_usage_min'] == history[0]['cpu_usage_max'] == 590.0
+
+        # Once rolled up, closed minutes come from the tier and the rest stays raw
+        service.rollup_metrics(now)
+        history = service.get_metrics_history()
+        assert sum(row['sample_count'] for row in history) == 60
+        assert history[0]['resolution'] == 60 and history[-1]['resolution'] == 0
+        timestamps = [row['timestamp'] for row in history]
+        assert timestamps == sorted(timestamps)
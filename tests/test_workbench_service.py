@@ -0,0 +1,153 @@
+"""
+Tests for the AI Workbench monitoring pipeline.
+"""
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from ai_workbench.config import config
+from ai_workbench.services import workbench_service
+from ai_workbench.services.rule_engine import RuleEngine
+from ai_workbench.services.workbench_service import AIWorkbenchService, PipelineStage
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(config.optimization, 'auto_optimize', False)
+    monkeypatch.setattr(config.predictive_analysis, 'enabled', False)
+    service = AIWorkbenchService(monitoring_interval=1)
+    # Keep the tests off the configured database
+    service._db_service = MagicMock()
+    service._rule_engine = RuleEngine(lambda: [])
+    yield service
+    service.stop_monitoring()
+
+
+def test_metric_maintenance_runs_on_its_own_schedule(service, monkeypatch):
+    """Rollup/retention passes are queued once per maintenance interval."""
+    clock = _Clock()
+    monkeypatch.setattr(workbench_service.time, 'monotonic', clock)
+    monkeypatch.setattr(config.monitoring, 'maintenance_interval', 600)
+    monkeypatch.setattr(service, '_collect_metrics', lambda: {'cpu_usage': 1.0})
+    service._stages = {name: MagicMock() for name in service._create_stages()}
+    service._next_maintenance = clock.now
+
+    for _ in range(5):
+        service._run_cycle()
+        clock.now += 300
+
+    assert service._stages['persist'].submit.call_count == 5
+    assert service._stages['maintain'].submit.call_count == 3
+
+    service._maintain_metrics({})
+    service._db_service.maintain_metrics.assert_called_once_with()
+
+
+@pytest.fixture
+def recorded_ticks(service, monkeypatch):
+    """Record the monotonic time of every collection."""
+    ticks = []
+
+    def collect():
+        ticks.append(time.monotonic())
+        # Variable collection cost must not shift later ticks
+        time.sleep(0.02 if len(ticks) % 2 else 0.0)
+        return {'cpu': {'percent': 10.0}, 'memory': {'percent': 20.0}}
+
+    monkeypatch.setattr(service, '_collect_metrics', collect)
+    return ticks
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_monitor_loop_ticks_at_a_fixed_rate(service, recorded_ticks):
+    """Ticks stay on the interval grid instead of drifting by the work time."""
+    service.monitoring_interval = 0.1
+    service.start_monitoring()
+    assert _wait_for(lambda: len(recorded_ticks) >= 10)
+    service.stop_monitoring()
+
+    start = recorded_ticks[0]
+    for index, tick in enumerate(recorded_ticks[:10]):
+        assert tick - start == pytest.approx(index * 0.1, abs=0.05)
+
+
+def test_slow_stage_does_not_delay_sampling(service, recorded_ticks, monkeypatch):
+    """A stage stuck in its handler only backs up (and drops) its own samples."""
+    release = threading.Event()
+    monkeypatch.setattr(service, '_run_health_stage', lambda metrics: release.wait(5))
+    service.monitoring_interval = 0.05
+    service.start_monitoring()
+    try:
+        # 20 ticks take about 1s; the stuck stage holds its sample for 5s
+        assert _wait_for(lambda: len(recorded_ticks) >= 20, timeout=2.0)
+        stats = service.get_pipeline_stats()
+        assert stats['stages']['health']['dropped'] > 0
+        assert stats['stages']['persist']['dropped'] == 0
+    finally:
+        release.set()
+        service.stop_monitoring()
+    assert service._db_service.save_system_metric.call_count >= 20
+
+
+def test_persist_stage_saves_mapped_sample(service):
+    """Collected samples are mapped onto system_metrics columns and saved."""
+    service._db_service.save_system_metric.return_value.to_dict.return_value = {'id': 7}
+    saved = []
+    service.register_callback('on_metric', saved.append)
+
+    service._persist_metrics({
+        'timestamp': '2026-01-01T00:00:00',
+        'cpu': {'percent': 30.0},
+        'memory': {'percent': 60.0},
+        'disk': {'percent': 50.0, 'free': 8 * 1024 ** 3},
+        'network': {'bytes_sent': 1},
+    })
+
+    record = service._db_service.save_system_metric.call_args[0][0]
+    assert record['timestamp'] == datetime(2026, 1, 1)
+    assert record['cpu_usage'] == 30.0
+    assert record['memory_usage'] == 60.0
+    assert record['disk_space'] == 8.0
+    assert record['health_score'] == 40.0
+    assert 'network' not in record
+    assert saved == [{'id': 7}]
+
+
+def test_dropped_samples_are_reported():
+    """Samples displaced from a full stage are passed to on_drop."""
+    release = threading.Event()
+    drops = []
+    stage = PipelineStage('persist', lambda metrics: release.wait(5), maxsize=1,
+                          on_drop=lambda metrics, dropped: drops.append((metrics['n'], dropped)))
+    stage.start()
+    try:
+        assert stage.submit({'n': 0})
+        assert _wait_for(lambda: stage.get_stats()['backlog'] == 0)
+        assert stage.submit({'n': 1})
+        assert not stage.submit({'n': 2})
+        assert not stage.submit({'n': 3})
+    finally:
+        release.set()
+        stage.stop()
+        stage.join(timeout=5)
+    assert drops == [(1, 1), (2, 2)]
+    assert stage.get_stats()['dropped'] == 2
@@ -6,12 +6,13 @@ import asyncio
 import functools
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Any, Callable, Dict, Optional, TypeVar, Union
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar, Union
 from pathlib import Path
 import aiofiles
-from cryptography.fernet import Fernet
-from hashlib import sha256
 import logging
 
 T = TypeVar('T')
@@ -19,66 +20,362 @@ T = TypeVar('T')
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Global cache dictionary
-_cache: Dict[str, Any] = {}
-_cache_expiry: Dict[str, datetime] = {}
-
 # Encryption key management
+KEY_PATH = Path("c:/CATHEDRAL/OPRYXX_LOGS/config/encryption.key")
+
+# Environment variable overriding the key location
+KEY_PATH_ENV = "OPRYXX_ENCRYPTION_KEY_PATH"
+
 def generate_encryption_key() -> bytes:
     """Generate a new encryption key."""
+    from cryptography.fernet import Fernet
     return Fernet.generate_key()
 
 def load_or_generate_key(key_path: Union[str, Path]) -> bytes:
     """Load encryption key from file or generate a new one if not exists."""
     key_path = Path(key_path)
     if key_path.exists():
-        return key_path.read_bytes()
+        return key_path.read_bytes().strip()
     
     key = generate_encryption_key()
     key_path.parent.mkdir(parents=True, exist_ok=True)
-    key_path.write_bytes(key)
+    # Exclusive create: if another process won the race, use its key
+    try:
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return key_path.read_bytes().strip()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
     return key
 
-# Initialize encryption
-KEY_PATH = Path("c:/CATHEDRAL/OPRYXX_LOGS/config/encryption.key")
-ENCRYPTION_KEY = load_or_generate_key(KEY_PATH)
-cipher_suite = Fernet(ENCRYPTION_KEY)
+
+class KeyProvider:
+    """
+    Lazily loaded encryption key and cipher.
+    
+    Nothing is read, generated or imported until the first encrypt or
+    decrypt; the key and the Fernet cipher are then cached.
+    """
+    
+    def __init__(self, key_path: Optional[Union[str, Path]] = None, key: Optional[bytes] = None):
+        """
+        Args:
+            key_path: Key file location; defaults to $OPRYXX_ENCRYPTION_KEY_PATH or KEY_PATH
+            key: Key bytes to use instead of a key file
+        """
+        self._key_path = key_path
+        self._key = key
+        self._cipher = None
+        self._lock = threading.Lock()
+    
+    @property
+    def key_path(self) -> Path:
+        """Location of the key file."""
+        return Path(self._key_path or os.environ.get(KEY_PATH_ENV) or KEY_PATH)
+    
+    @property
+    def key(self) -> bytes:
+        """The encryption key, loaded or generated on first use."""
+        if self._key is None:
+            with self._lock:
+                if self._key is None:
+                    self._key = load_or_generate_key(self.key_path)
+        return self._key
+    
+    @property
+    def cipher(self):
+        """The Fernet cipher for the key."""
+        if self._cipher is None:
+            from cryptography.fernet import Fernet
+            cipher = Fernet(self.key)
+            with self._lock:
+                if self._cipher is None:
+                    self._cipher = cipher
+        return self._cipher
+    
+    def encrypt(self, data: str) -> bytes:
+        """Encrypt string data."""
+        return self.cipher.encrypt(data.encode('utf-8'))
+    
+    def decrypt(self, encrypted_data: bytes) -> str:
+        """Decrypt data to string."""
+        return self.cipher.decrypt(encrypted_data).decode('utf-8')
+
+
+_key_provider = KeyProvider()
+
+def get_key_provider() -> KeyProvider:
+    """Get the default key provider."""
+    return _key_provider
+
+def set_key_provider(provider: KeyProvider) -> None:
+    """Replace the default key provider, e.g. to use another key location."""
+    global _key_provider
+    _key_provider = provider
+
+def __getattr__(name: str) -> Any:
+    # ENCRYPTION_KEY and cipher_suite used to be built at import time
+    if name == 'ENCRYPTION_KEY':
+        return _key_provider.key
+    if name == 'cipher_suite':
+        return _key_provider.cipher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def encrypt_data(data: str) -> bytes:
     """Encrypt string data."""
-    return cipher_suite.encrypt(data.encode('utf-8'))
+    return _key_provider.encrypt(data)
 
 def decrypt_data(encrypted_data: bytes) -> str:
     """Decrypt data to string."""
-    return cipher_suite.decrypt(encrypted_data).decode('utf-8')
+    return _key_provider.decrypt(encrypted_data)
+
+_SENTINEL = object()
+
+
+class _HashedKey(list):
+    """Key that caches its hash, so dict lookups hash the arguments once."""
+
+    __slots__ = ('hashvalue',)
+
+    def __init__(self, items: tuple):
+        self[:] = items
+        self.hashvalue = hash(items)
+
+    def __hash__(self) -> int:
+        return self.hashvalue
+
+
+def _freeze(value: Any) -> Any:
+    """Convert unhashable containers to hashable equivalents."""
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_freeze(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return (frozenset, frozenset(_freeze(v) for v in value))
+    return value
+
+
+def make_cache_key(args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    """
+    Build a structural cache key from call arguments.
+
+    Hashable arguments are used as they are; lists, dicts and sets are
+    converted to hashable equivalents. Nothing is stringified.
+    """
+    items = args
+    if kwargs:
+        items = args + (_SENTINEL,) + tuple(sorted(kwargs.items()))
+    try:
+        return _HashedKey(items)
+    except TypeError:
+        return _HashedKey(_freeze(items))
+
+
+class AsyncTTLCache:
+    """
+    Bounded LRU cache with per-entry TTL for coroutine results.
+
+    Concurrent misses for one key share a single task, so the coroutine runs
+    once however many callers await it. Expired entries are removed on
+    access and by a background sweep task that runs while the cache holds
+    entries.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, sweep_interval: float = 60, name: str = ''):
+        """
+        Args:
+            maxsize: Maximum number of entries before LRU eviction
+            ttl: Default time-to-live in seconds
+            sweep_interval: Seconds between background expiry sweeps
+            name: Namespace name, used in statistics
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.name = name
+        self._data: 'OrderedDict[Hashable, Tuple[Any, float]]' = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or ``default`` if missing or expired."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        if item[1] <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            return default
+        self._data.move_to_end(key)
+        return item[0]
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        data = self._data
+        data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        data.move_to_end(key)
+        while len(data) > self.maxsize:
+            data.popitem(last=False)
+            self.evictions += 1
+        self._ensure_sweeper()
+    
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove one entry; returns whether it was present."""
+        return self._data.pop(key, None) is not None
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+    
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[T]],
+        ttl: Optional[float] = None
+    ) -> T:
+        """
+        Get a cached value, or compute it once for all concurrent callers.
+        
+        Args:
+            key: Cache key
+            factory: Zero-argument callable returning the awaitable to run on a miss
+            ttl: Time-to-live override in seconds
+            
+        Returns:
+            The cached or computed value
+        """
+        value = self.get(key, _SENTINEL)
+        if value is not _SENTINEL:
+            self.hits += 1
+            return value
+        
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._on_done, key, ttl))
+        else:
+            self.coalesced += 1
+        # Shield so a cancelled caller does not cancel the shared computation
+        return await asyncio.shield(task)
+    
+    def _on_done(self, key: Hashable, ttl: Optional[float], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is None:
+            self.set(key, task.result(), ttl)
+    
+    def sweep(self) -> int:
+        """Remove expired entries; returns how many were removed."""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        self.expirations += len(expired)
+        return len(expired)
+    
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._sweeper = loop.create_task(self._sweep_loop())
+    
+    async def _sweep_loop(self) -> None:
+        # Exits once the cache is empty; the next set() restarts it
+        while self._data:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+    
+    async def close(self) -> None:
+        """Stop the background sweep task."""
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None and not sweeper.done():
+            sweeper.cancel()
+            try:
+                await sweeper
+            except asyncio.CancelledError:
+                pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'inflight': len(self._inflight),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+# Caches created by async_cache, keyed by namespace
+_caches: Dict[str, AsyncTTLCache] = {}
 
-def async_cache(ttl: int = 300):
+
+def get_async_cache(namespace: str) -> Optional[AsyncTTLCache]:
+    """Get the cache of a decorated function by namespace."""
+    return _caches.get(namespace)
+
+
+def invalidate_async_cache(namespace: Optional[str] = None) -> None:
+    """
+    Clear the cache of one decorated function, or of all of them.
+    
+    Args:
+        namespace: Namespace to clear; all namespaces if omitted
+    """
+    if namespace is None:
+        for cache in _caches.values():
+            cache.clear()
+    elif namespace in _caches:
+        _caches[namespace].clear()
+
+
+def async_cache(ttl: int = 300, maxsize: int = 1024, namespace: Optional[str] = None):
     """
     Async cache decorator with TTL (time-to-live) in seconds.
     
+    Each decorated function gets its own bounded cache. The wrapper exposes
+    ``cache``, ``invalidate(*args, **kwargs)`` and ``cache_clear()``.
+    
     Args:
         ttl: Time in seconds to keep the cache entry
+        maxsize: Maximum number of cached results for the function
+        namespace: Cache namespace; defaults to the function's qualified name
     """
     def decorator(func):
+        name = namespace or f"{func.__module__}.{func.__qualname__}"
+        cache = _caches[name] = AsyncTTLCache(maxsize=maxsize, ttl=ttl, name=name)
+        
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # Create a cache key based on function name and arguments
-            cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            cache_key = sha256(cache_key.encode()).hexdigest()
-            
-            # Check if cache is valid
-            current_time = datetime.now()
-            if (cache_key in _cache and 
-                cache_key in _cache_expiry and 
-                _cache_expiry[cache_key] > current_time):
-                return _cache[cache_key]
-                
-            # Call the function and cache the result
-            result = await func(*args, **kwargs)
-            _cache[cache_key] = result
-            _cache_expiry[cache_key] = current_time + timedelta(seconds=ttl)
-            
-            return result
+            key = make_cache_key(args, kwargs)
+            return await cache.get_or_compute(key, lambda: func(*args, **kwargs))
+        
+        def invalidate(*args, **kwargs) -> bool:
+            return cache.invalidate(make_cache_key(args, kwargs))
+        
+        wrapper.cache = cache
+        wrapper.invalidate = invalidate
+        wrapper.cache_clear = cache.clear
         return wrapper
     return decorator
 
@@ -123,35 +420,128 @@ class AsyncFileIO:
         await AsyncFileIO.write_file(file_path, content)
 
 class SecureConfig:
-    """Secure configuration manager with encryption."""
+    """
+    Secure configuration manager with encryption.
+    
+    ``save()`` is debounced: calls within ``save_delay`` seconds are folded
+    into one write. Writes go to a temporary file that is atomically renamed
+    over the config, and are skipped when the data has not changed since
+    the last load or write. Use ``flush()`` or ``close()`` to write now.
+    """
     
-    def __init__(self, config_path: Union[str, Path]):
+    def __init__(
+        self,
+        config_path: Union[str, Path],
+        key_provider: Optional[KeyProvider] = None,
+        save_delay: float = 0.5
+    ):
+        """
+        Args:
+            config_path: Path of the encrypted config file
+            key_provider: Key provider; the module default if omitted
+            save_delay: Debounce window for save() in seconds; 0 writes immediately
+        """
         self.config_path = Path(config_path)
-        self.config_path.parent.mkdir(parents=True, exist_ok=True)
+        self.key_provider = key_provider
+        self.save_delay = save_delay
         self._config: Dict[str, Any] = {}
+        self._saved_digest: Optional[bytes] = None
+        self._pending: Optional[asyncio.Task] = None
+        self._save_requested = False
+        self._write_lock: Optional[asyncio.Lock] = None
+        self.writes = 0
+        self.skipped_writes = 0
+    
+    @property
+    def _keys(self) -> KeyProvider:
+        return self.key_provider or _key_provider
+    
+    def _serialize(self) -> str:
+        return json.dumps(self._config, indent=4, sort_keys=True)
     
     async def load(self) -> None:
         """Load configuration from encrypted file."""
         try:
             if self.config_path.exists():
                 encrypted_data = await AsyncFileIO.read_file(self.config_path, binary=True)
-                decrypted_data = decrypt_data(encrypted_data)
+                decrypted_data = self._keys.decrypt(encrypted_data)
                 self._config = json.loads(decrypted_data)
+                self._saved_digest = sha256(self._serialize().encode('utf-8')).digest()
             else:
                 self._config = {}
+                self._saved_digest = None
         except Exception as e:
             logger.error(f"Error loading config: {e}")
             self._config = {}
+            self._saved_digest = None
     
-    async def save(self) -> None:
-        """Save configuration to encrypted file."""
-        try:
-            config_str = json.dumps(self._config, indent=4)
-            encrypted_data = encrypt_data(config_str)
-            await AsyncFileIO.write_file(self.config_path, encrypted_data, binary=True)
-        except Exception as e:
-            logger.error(f"Error saving config: {e}")
-            raise
+    async def save(self, wait: bool = False) -> None:
+        """
+        Save configuration to encrypted file.
+        
+        Args:
+            wait: Write now and wait for it instead of debouncing
+        """
+        if wait or self.save_delay <= 0:
+            await self.flush()
+            return
+        self._save_requested = True
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.get_running_loop().create_task(self._delayed_flush())
+    
+    async def _delayed_flush(self) -> None:
+        # A save() made while flush() was writing found this task still
+        # pending; go round again so its changes are not left unwritten
+        while self._save_requested:
+            await asyncio.sleep(self.save_delay)
+            self._save_requested = False
+            try:
+                await self.flush()
+            except Exception:
+                # flush() has logged the error; the data stays unsaved for the next save
+                return
+    
+    async def flush(self) -> bool:
+        """
+        Write the configuration now if it changed.
+        
+        Returns:
+            bool: True if the file was written, False if it was unchanged
+        """
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            try:
+                config_str = self._serialize()
+                digest = sha256(config_str.encode('utf-8')).digest()
+                if digest == self._saved_digest:
+                    self.skipped_writes += 1
+                    return False
+                
+                encrypted_data = self._keys.encrypt(config_str)
+                self.config_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.config_path.with_name(self.config_path.name + '.tmp')
+                await AsyncFileIO.write_file(temp_path, encrypted_data, binary=True)
+                os.replace(temp_path, self.config_path)
+                
+                self._saved_digest = digest
+                self.writes += 1
+                return True
+            except Exception as e:
+                logger.error(f"Error saving config: {e}")
+                raise
+    
+    async def close(self) -> None:
+        """Cancel any pending debounced save and write outstanding changes."""
+        pending, self._pending = self._pending, None
+        self._save_requested = False
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value by key."""
@@ -1,9 +1,13 @@
 import grpc
 import time
 import os
+import re
+import struct
 import threading
 import logging
+import zlib
 from concurrent import futures
+from google.protobuf.field_mask_pb2 import FieldMask
 from google.protobuf.timestamp_pb2 import Timestamp
 from google.protobuf.json_format import MessageToDict, ParseDict
 import json # For potentially loading initial state from JSON
@@ -18,6 +22,8 @@ MEMORY_FILE = "cognitive_core_state.pb"
 LISTEN_ADDRESS = "[::]:50051" # Listen on all interfaces, port 50051
 LOG_FILE = "cognitive_core_service.log"
 SCHEMA_VERSION = 2 # Increment schema version on breaking changes
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024 # Snapshot once the journal grows past this
+JOURNAL_COMPACT_RECORDS = 10000
 
 # --- Set up logging ---
 logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
@@ -54,6 +60,15 @@ def initialize_cognitive_core():
     core.awareness_matrix.awareness_level = 0
     return core
 
+def write_file_atomic(filepath, data):
+    """Writes data to a temporary file, fsyncs it and renames it over filepath."""
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
 def save_cognitive_core(core, filepath):
     """Saves the CognitiveCore state to a binary file."""
     try:
@@ -65,8 +80,7 @@ def save_cognitive_core(core, filepath):
             logging.error("Data integrity check failed. CognitiveCore not saved.")
             return
 
-        with open(filepath, 'wb') as f:
-            f.write(core.SerializeToString())
+        write_file_atomic(filepath, core.SerializeToString())
         logging.debug(f"Saved CognitiveCore state to {filepath}")
     except Exception as e:
         logging.error(f"Error saving CognitiveCore state: {e}")
@@ -80,13 +94,278 @@ def is_core_valid(core):
     # Add more checks as needed
     return True
 
+# --- Write-Ahead Journal ---
+# Record framing: body length (uint32) | crc32 of body (uint32) | body
+# Body: op (uint8) | last_accessed_timestamp (int64) | op payload
+RECORD_HEADER = struct.Struct('<II')
+RECORD_PREFIX = struct.Struct('<Bq')
+OP_REPLACE = 1       # payload: full CognitiveCore
+OP_MERGE = 2         # payload: mask length (uint32) | comma-joined field paths | partial CognitiveCore
+OP_CONVERSATION = 3  # payload: key_moments offset (uint32) | Conversation with key_moments[offset:]
+OFFSET = struct.Struct('<I')
+
+# Every Conversation field except the appended key_moments
+CONVERSATION_MASK = FieldMask(paths=[
+    field.name for field in cognitive_core_pb2.Conversation.DESCRIPTOR.fields if field.name != 'key_moments'
+])
+
+class CognitiveCoreJournal:
+    """
+    Snapshot file plus an append-only journal of per-RPC deltas.
+
+    Each RPC appends one length-prefixed, checksummed record holding only
+    what it changed. Once the journal passes ``compact_bytes`` or
+    ``compact_records`` the core is serialized, writes move to a new
+    journal generation and the snapshot is written atomically on a
+    background thread, after which the folded journals are deleted. A
+    compaction requested while a snapshot is being written is queued
+    behind it.
+
+    Records carry absolute values (a replaced field, a conversation's
+    key_moments from a given offset), so replaying a journal that is
+    already folded into the snapshot is harmless. A record torn by a crash
+    fails its length or checksum and is truncated on load.
+    """
+
+    def __init__(self, snapshot_path, compact_bytes=JOURNAL_COMPACT_BYTES,
+                 compact_records=JOURNAL_COMPACT_RECORDS, fsync=False):
+        self.snapshot_path = snapshot_path
+        self.compact_bytes = compact_bytes
+        self.compact_records = compact_records
+        self.fsync = fsync  # flush always survives a process crash; fsync also survives power loss
+        self.directory = os.path.dirname(os.path.abspath(snapshot_path))
+        self._pattern = re.compile(re.escape(os.path.basename(snapshot_path)) + r'\.(\d+)\.journal$')
+        self.generation = 0
+        self.journal_bytes = 0
+        self.journal_records = 0
+        self.replayed_records = 0
+        self.snapshots = 0
+        self._file = None
+        self._stats_lock = threading.Lock()
+        self._executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='journal-snapshot')
+        self._compaction = None
+
+    def journal_path(self, generation):
+        return f"{self.snapshot_path}.{generation:08d}.journal"
+
+    def _journals(self):
+        """Existing journal files as (generation, path), oldest first."""
+        journals = []
+        for name in os.listdir(self.directory):
+            match = self._pattern.match(name)
+            if match:
+                journals.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(journals)
+
+    # --- Loading ---
+    def load(self):
+        """Loads the snapshot, replays the journals and opens a new journal generation."""
+        core = load_cognitive_core(self.snapshot_path)
+        journals = self._journals()
+        for index, (generation, path) in enumerate(journals):
+            # Damage at the end of the newest journal is a torn write; anywhere
+            # else the journals after it cannot be applied consistently
+            if not self._replay(path, core):
+                for _, later in journals[index + 1:]:
+                    logging.error(f"Journal {later} follows a damaged journal; moving it aside.")
+                    os.replace(later, f"{later}.corrupt")
+                break
+
+        if core.schema_version != SCHEMA_VERSION:
+            logging.warning(f"Journal replay produced schema version {core.schema_version}; using default state.")
+            core = initialize_cognitive_core()
+
+        self._open_generation(journals[-1][0] + 1 if journals else 1)
+        if self.replayed_records:
+            logging.info(f"Replayed {self.replayed_records} journal records onto {self.snapshot_path}")
+            self.compact(core)
+        return core
+
+    def _replay(self, path, core):
+        """Applies the records of one journal; returns False if it was damaged."""
+        conversations = {conv.conversation_id: conv for conv in core.conversational_memory.conversations}
+        size = os.path.getsize(path)
+        valid_end = 0
+        damaged = False
+        with open(path, 'rb') as f:
+            while valid_end < size:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    damaged = True
+                    break
+                length, crc = RECORD_HEADER.unpack(header)
+                if length > size - valid_end - RECORD_HEADER.size:
+                    damaged = True
+                    break
+                body = f.read(length)
+                if zlib.crc32(body) != crc:
+                    damaged = True
+                    break
+                try:
+                    self._apply(body, core, conversations)
+                except Exception as e:
+                    logging.error(f"Error replaying journal record in {path} at offset {valid_end}: {e}")
+                    damaged = True
+                    break
+                valid_end = f.tell()
+                self.replayed_records += 1
+
+        if damaged:
+            logging.warning(f"Truncating damaged journal {path} at offset {valid_end} of {size}")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+        return not damaged
+
+    def _apply(self, body, core, conversations):
+        op, timestamp = RECORD_PREFIX.unpack_from(body)
+        payload = memoryview(body)[RECORD_PREFIX.size:]
+        if op == OP_REPLACE:
+            core.ParseFromString(payload.tobytes())
+            conversations.clear()
+            conversations.update((conv.conversation_id, conv) for conv in core.conversational_memory.conversations)
+        elif op == OP_MERGE:
+            (mask_length,) = OFFSET.unpack_from(payload)
+            paths = bytes(payload[OFFSET.size:OFFSET.size + mask_length]).decode('utf-8').split(',')
+            partial = cognitive_core_pb2.CognitiveCore()
+            partial.ParseFromString(payload[OFFSET.size + mask_length:].tobytes())
+            FieldMask(paths=paths).MergeMessage(partial, core, True, True)
+            if any(path.split('.')[0] == 'conversational_memory' for path in paths):
+                conversations.clear()
+                conversations.update((conv.conversation_id, conv) for conv in core.conversational_memory.conversations)
+        elif op == OP_CONVERSATION:
+            (offset,) = OFFSET.unpack_from(payload)
+            delta = cognitive_core_pb2.Conversation()
+            delta.ParseFromString(payload[OFFSET.size:].tobytes())
+            conversation = conversations.get(delta.conversation_id)
+            if conversation is None:
+                conversation = core.conversational_memory.conversations.add()
+                conversations[delta.conversation_id] = conversation
+            CONVERSATION_MASK.MergeMessage(delta, conversation, True, True)
+            del conversation.key_moments[offset:]
+            conversation.key_moments.extend(delta.key_moments)
+        else:
+            raise ValueError(f"Unknown journal op {op}")
+        core.last_accessed_timestamp = timestamp
+
+    # --- Recording ---
+    def _open_generation(self, generation):
+        if self._file:
+            self._file.close()
+        self.generation = generation
+        self._file = open(self.journal_path(generation), 'ab')
+        self.journal_bytes = self._file.tell()
+        self.journal_records = 0
+
+    def _append(self, op, timestamp, payload):
+        body = RECORD_PREFIX.pack(op, timestamp) + payload
+        self._file.write(RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.journal_bytes += RECORD_HEADER.size + len(body)
+        self.journal_records += 1
+
+    def record_replace(self, core):
+        """Journals the whole core (used when a client overwrites it)."""
+        self._append(OP_REPLACE, core.last_accessed_timestamp, core.SerializeToString())
+
+    def record_merge(self, core, paths):
+        """Journals the current values of the given field paths."""
+        paths = list(paths)
+        partial = cognitive_core_pb2.CognitiveCore()
+        FieldMask(paths=paths).MergeMessage(core, partial, True, True)
+        mask = ','.join(paths).encode('utf-8')
+        self._append(OP_MERGE, core.last_accessed_timestamp,
+                     OFFSET.pack(len(mask)) + mask + partial.SerializeToString())
+
+    def record_conversation(self, core, conversation, appended_from=0):
+        """Journals a conversation's fields and its key_moments from ``appended_from`` on."""
+        delta = cognitive_core_pb2.Conversation()
+        CONVERSATION_MASK.MergeMessage(conversation, delta, True, True)
+        delta.key_moments.extend(conversation.key_moments[appended_from:])
+        self._append(OP_CONVERSATION, core.last_accessed_timestamp,
+                     OFFSET.pack(appended_from) + delta.SerializeToString())
+
+    # --- Compaction ---
+    def needs_compaction(self):
+        return self.journal_bytes >= self.compact_bytes or self.journal_records >= self.compact_records
+
+    def compact(self, core):
+        """Queues a background snapshot of ``core``; returns False if one is already waiting to start."""
+        # One snapshot may run and one wait behind it; records journaled
+        # after the waiting one are folded in by the next compaction
+        if self._compaction is not None and not (self._compaction.running() or self._compaction.done()):
+            return False
+        data = core.SerializeToString()
+        sealed = self.generation
+        self._open_generation(sealed + 1)
+        self._compaction = self._executor.submit(self._write_snapshot, data, sealed)
+        return True
+
+    def _write_snapshot(self, data, sealed):
+        try:
+            write_file_atomic(self.snapshot_path, data)
+            for generation, path in self._journals():
+                if generation <= sealed:
+                    os.remove(path)
+            with self._stats_lock:
+                self.snapshots += 1
+            logging.info(f"Wrote CognitiveCore snapshot to {self.snapshot_path} ({len(data)} bytes)")
+        except Exception as e:
+            logging.error(f"Error writing CognitiveCore snapshot: {e}")
+
+    def flush(self):
+        """Waits for the running and queued background snapshots."""
+        if self._compaction is not None:
+            self._compaction.result()
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self):
+        with self._stats_lock:
+            snapshots = self.snapshots
+        return {
+            'generation': self.generation,
+            'journal_bytes': self.journal_bytes,
+            'journal_records': self.journal_records,
+            'replayed_records': self.replayed_records,
+            'snapshots': snapshots
+        }
+
 # --- gRPC Service Implementation ---
 class PersistentCognitionServicer(cognitive_core_pb2_grpc.PersistentCognitionServiceServicer):
-    def __init__(self):
-        self.cognitive_core = load_cognitive_core(MEMORY_FILE)
+    def __init__(self, journal=None):
+        self.journal = journal or CognitiveCoreJournal(MEMORY_FILE)
+        self.cognitive_core = self.journal.load()
         self._lock = threading.Lock() # Use a lock for thread-safe access
         self.update_subscriptions = {} # client_id: [update_types]
 
+    def _persist(self, record, *args):
+        """Journals a change to the in-memory core. Caller holds _lock."""
+        try:
+            self.cognitive_core.last_accessed_timestamp = int(time.time())
+            if not is_core_valid(self.cognitive_core):
+                logging.error("Data integrity check failed. CognitiveCore change not persisted.")
+                return
+            record(self.cognitive_core, *args)
+            if self.journal.needs_compaction():
+                self.journal.compact(self.cognitive_core)
+        except Exception as e:
+            logging.error(f"Error persisting CognitiveCore change: {e}")
+
+    def close(self):
+        """Writes a final snapshot and closes the journal."""
+        with self._lock:
+            if self.journal.journal_records:
+                self.journal.flush()
+                self.journal.compact(self.cognitive_core)
+            self.journal.close()
+
     def GetCognitiveCore(self, request, context):
         logging.info(f"Received GetCognitiveCore request from {request.client_id}")
         with self._lock:
@@ -115,7 +394,10 @@ class PersistentCognitionServicer(cognitive_core_pb2_grpc.PersistentCognitionSer
                  # Overwrite with the provided core
                  self.cognitive_core.CopyFrom(request.core)
 
-            save_cognitive_core(self.cognitive_core, MEMORY_FILE)
+            if request.partial_update and request.fields_to_update:
+                self._persist(self.journal.record_merge, request.fields_to_update)
+            else:
+                self._persist(self.journal.record_replace)
 
             # Notify subscribers of updates
             self._notify_subscribers("CognitiveCore", "FULL_UPDATE", self.cognitive_core)
@@ -144,10 +426,10 @@ class PersistentCognitionServicer(cognitive_core_pb2_grpc.PersistentCognitionSer
                 logging.info(f"Created new conversation with ID: {request.conversation_id}")
 
             # Append messages (simplified - a real system might process messages more deeply)
+            appended_from = len(conversation.key_moments)
             for msg in request.messages:
-                 new_msg = conversation.key_moments.add() # Using key_moments for messages for now
-                 new_msg.timestamp = msg.timestamp
-                 new_msg.description = f"{msg.sender}: {msg.content}" # Store as description for simplicity
+                 # Using key_moments (repeated string) for messages for now
+                 conversation.key_moments.append(f"{msg.sender}: {msg.content}")
                  # You would add logic here to analyze content for significance, concepts, etc.
                  logging.debug(f"Added message to conversation {request.conversation_id}: {msg.sender}: {msg.content}")
 
@@ -157,7 +439,8 @@ class PersistentCognitionServicer(cognitive_core_pb2_grpc.PersistentCognitionSer
 
             # TODO: Implement logic to detect key moments, growth events, etc. from messages
 
-            save_cognitive_core(self.cognitive_core, MEMORY_FILE)
+            # Only this conversation's fields and new messages are journaled
+            self._persist(self.journal.record_conversation, conversation, appended_from)
 
             # Notify subscribers of conversation update
             self._notify_subscribers("Conversation", f"CONVERSATION_RECORDED:{request.conversation_id}", conversation)
@@ -182,7 +465,7 @@ class PersistentCognitionServicer(cognitive_core_pb2_grpc.PersistentCognitionSer
 
             # TODO: Implement logic based on activation_trigger and context_parameters
 
-            save_cognitive_core(self.cognitive_core, MEMORY_FILE)
+            self._persist(self.journal.record_merge, ['system_state', 'awareness_matrix'])
 
             # Notify subscribers of awareness activation
             self._notify_subscribers("Awareness", "AWARENESS_ACTIVATED", self.cognitive_core.awareness_matrix)
@@ -279,8 +562,9 @@ class PersistentCognitionServicer(cognitive_core_pb2_grpc.PersistentCognitionSer
 def serve():
     """Starts the gRPC server for the PersistentCognitionService."""
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = PersistentCognitionServicer()
     cognitive_core_pb2_grpc.add_PersistentCognitionServiceServicer_to_server(
-        PersistentCognitionServicer(), server)
+        servicer, server)
     server.add_insecure_port(LISTEN_ADDRESS)
     print(f"Memory Service listening on {LISTEN_ADDRESS}")
     logging.info(f"Memory Service listening on {LISTEN_ADDRESS}")
@@ -290,6 +574,8 @@ def serve():
         print("Memory Service shutting down.")
         logging.info("Memory Service shutting down.")
         server.stop(0)
+    finally:
+        servicer.close()
 
 if __name__ == '__main__':
     # Ensure the directory for the memory file exists if needed
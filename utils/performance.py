@@ -11,14 +11,14 @@ import logging
 from typing import Dict, List, Optional, Tuple, Callable, Any, Union
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from collections import deque
-import statistics
 import functools
 import threading
 import tracemalloc
 from pathlib import Path
 import json
 
+import numpy as np
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -59,6 +59,153 @@ class PerformanceStats:
     process_threads: int = 0
     process_handles: int = 0
 
+# Column order of the numeric fields of SystemMetrics inside MetricsRingBuffer
+METRIC_FIELDS: Tuple[str, ...] = (
+    "cpu_percent",
+    "memory_percent",
+    "disk_io_read",
+    "disk_io_write",
+    "network_sent",
+    "network_recv",
+    "process_cpu",
+    "process_memory",
+    "process_threads",
+    "process_handles",
+)
+
+_INTEGER_FIELDS = frozenset({"process_threads", "process_handles"})
+
+
+class MetricsRingBuffer:
+    """
+    Fixed-capacity, column-oriented ring buffer of metric samples.
+
+    Every sample is written twice, at slot ``i`` and ``i + capacity`` of
+    arrays that are twice the capacity long.  The most recent ``n`` samples
+    are therefore always a contiguous slice, so window queries return
+    NumPy views instead of copies and appends stay O(1).
+
+    Views returned by :meth:`view` and :meth:`column` alias the internal
+    storage and are invalidated by later appends; copy them if they must
+    outlive the caller's lock.
+    """
+
+    def __init__(self, capacity: int, fields: Tuple[str, ...] = METRIC_FIELDS):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            capacity: Maximum number of samples retained
+            fields: Names of the value columns, in storage order
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._field_index = {name: i for i, name in enumerate(self.fields)}
+        self._timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self._values = np.zeros((2 * capacity, len(self.fields)), dtype=np.float64)
+        self._head = 0  # Next slot to write, in [0, capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        """Drop all samples without releasing the storage."""
+        self._head = 0
+        self._size = 0
+
+    def append(self, timestamp: float, values: Union[List[float], Tuple[float, ...], np.ndarray]) -> None:
+        """Append one sample; ``values`` must follow the order of ``fields``."""
+        head = self._head
+        mirror = head + self.capacity
+        self._timestamps[head] = self._timestamps[mirror] = timestamp
+        self._values[head] = values
+        self._values[mirror] = self._values[head]
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def append_metrics(self, metrics: SystemMetrics) -> None:
+        """Append a SystemMetrics sample."""
+        self.append(metrics.timestamp, [getattr(metrics, name) for name in self.fields])
+
+    def _bounds(self, window_seconds: Optional[float], now: Optional[float]) -> Tuple[int, int]:
+        """Return the [start, stop) slice of the doubled arrays covering the window."""
+        stop = self._head + self.capacity
+        start = stop - self._size
+        if window_seconds is not None and self._size:
+            cutoff = (time.time() if now is None else now) - window_seconds
+            start += int(np.searchsorted(self._timestamps[start:stop], cutoff, side="left"))
+        return start, stop
+
+    @staticmethod
+    def _readonly(array: np.ndarray) -> np.ndarray:
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def view(self, window_seconds: Optional[float] = None,
+             now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get read-only views of the samples inside a time window.
+
+        Args:
+            window_seconds: Only include samples newer than ``now - window_seconds``;
+                ``None`` returns every retained sample
+            now: Reference time, defaults to ``time.time()``
+
+        Returns:
+            Tuple of (timestamps, values) where ``values`` has one column per field
+        """
+        start, stop = self._bounds(window_seconds, now)
+        return (self._readonly(self._timestamps[start:stop]),
+                self._readonly(self._values[start:stop]))
+
+    def column(self, name: str, window_seconds: Optional[float] = None,
+               now: Optional[float] = None) -> np.ndarray:
+        """Get a read-only view of a single metric column inside a time window."""
+        start, stop = self._bounds(window_seconds, now)
+        return self._readonly(self._values[start:stop, self._field_index[name]])
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        """Get the most recent (timestamp, values) pair, or None when empty."""
+        if not self._size:
+            return None
+        last = self._head - 1 + self.capacity
+        return float(self._timestamps[last]), self._readonly(self._values[last])
+
+    def _reduce(self, func: Callable[..., np.ndarray], window_seconds: Optional[float],
+                now: Optional[float], **kwargs: Any) -> Dict[str, float]:
+        _, values = self.view(window_seconds, now)
+        if not len(values):
+            return {}
+        return dict(zip(self.fields, func(values, axis=0, **kwargs).tolist()))
+
+    def mean(self, window_seconds: Optional[float] = None,
+             now: Optional[float] = None) -> Dict[str, float]:
+        """Per-field mean over the window."""
+        return self._reduce(np.mean, window_seconds, now)
+
+    def max(self, window_seconds: Optional[float] = None,
+            now: Optional[float] = None) -> Dict[str, float]:
+        """Per-field maximum over the window."""
+        return self._reduce(np.max, window_seconds, now)
+
+    def percentile(self, q: float, window_seconds: Optional[float] = None,
+                   now: Optional[float] = None) -> Dict[str, float]:
+        """Per-field ``q``-th percentile (0-100) over the window."""
+        return self._reduce(np.percentile, window_seconds, now, q=q)
+
+    def to_metrics(self, timestamp: float, values: np.ndarray) -> SystemMetrics:
+        """Build a SystemMetrics object from one stored row."""
+        row = dict(zip(self.fields, values.tolist()))
+        for name in _INTEGER_FIELDS.intersection(row):
+            row[name] = int(row[name])
+        return SystemMetrics(timestamp=timestamp, **row)
+
+
 class PerformanceMonitor:
     """Monitors system and application performance metrics."""
     
@@ -72,7 +219,7 @@ class PerformanceMonitor:
         """
         self.window_size = window_size
         self.interval = interval
-        self.metrics_history = deque(maxlen=window_size)
+        self.metrics_buffer = MetricsRingBuffer(window_size)
         self._stop_event = threading.Event()
         self._monitor_thread = None
         self._last_io = psutil.disk_io_counters()
@@ -163,7 +310,7 @@ class PerformanceMonitor:
             try:
                 metrics = self._collect_metrics()
                 with self._lock:
-                    self.metrics_history.append(metrics)
+                    self.metrics_buffer.append_metrics(metrics)
                 
                 # Notify callbacks
                 for callback in self._callbacks:
@@ -228,56 +375,82 @@ class PerformanceMonitor:
             process_handles=process_handles
         )
     
+    @property
+    def metrics_history(self) -> List[SystemMetrics]:
+        """
+        Retained samples as SystemMetrics objects, oldest first.
+
+        This materializes one object per sample; prefer :meth:`get_metrics_view`
+        or :meth:`get_metric_series` on hot paths.
+        """
+        with self._lock:
+            timestamps, values = self.metrics_buffer.view()
+            return [
+                self.metrics_buffer.to_metrics(float(ts), row)
+                for ts, row in zip(timestamps, values)
+            ]
+    
     def get_current_metrics(self) -> Optional[SystemMetrics]:
         """Get the most recent system metrics."""
-        if not self.metrics_history:
-            return None
-        return self.metrics_history[-1]
+        with self._lock:
+            latest = self.metrics_buffer.latest()
+            if latest is None:
+                return None
+            return self.metrics_buffer.to_metrics(*latest)
+    
+    def get_metrics_view(self, window_seconds: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get a snapshot of (timestamps, values) arrays for a time window.
+
+        The arrays are copied once under the lock so they stay valid while the
+        monitor keeps sampling; columns follow ``METRIC_FIELDS``.
+        """
+        with self._lock:
+            timestamps, values = self.metrics_buffer.view(window_seconds)
+            return timestamps.copy(), values.copy()
+    
+    def get_metric_series(self, name: str, window_seconds: Optional[float] = None) -> np.ndarray:
+        """Get a snapshot of a single metric column for a time window."""
+        with self._lock:
+            return self.metrics_buffer.column(name, window_seconds).copy()
+    
+    def get_percentiles(self, q: float = 95.0, window_seconds: int = 60) -> Dict[str, float]:
+        """Get the ``q``-th percentile of every metric over a time window."""
+        with self._lock:
+            return self.metrics_buffer.percentile(q, window_seconds)
     
     def get_stats(self, window_seconds: int = 60) -> PerformanceStats:
         """Get performance statistics over a time window."""
         with self._lock:
-            if not self.metrics_history:
-                return PerformanceStats()
-                
-            now = time.time()
-            recent_metrics = [
-                m for m in self.metrics_history
-                if now - m.timestamp <= window_seconds
-            ]
-            
-            if not recent_metrics:
+            _, values = self.metrics_buffer.view(window_seconds)
+            if not len(values):
                 return PerformanceStats()
             
-            stats = PerformanceStats()
-            
-            # Calculate averages and maximums
-            stats.avg_cpu = statistics.mean(m.cpu_percent for m in recent_metrics)
-            stats.max_cpu = max(m.cpu_percent for m in recent_metrics)
-            
-            stats.avg_memory = statistics.mean(m.memory_percent for m in recent_metrics)
-            stats.max_memory = max(m.memory_percent for m in recent_metrics)
-            
-            stats.avg_disk_read = statistics.mean(m.disk_io_read for m in recent_metrics)
-            stats.avg_disk_write = statistics.mean(m.disk_io_write for m in recent_metrics)
-            stats.max_disk_read = max(m.disk_io_read for m in recent_metrics)
-            stats.max_disk_write = max(m.disk_io_write for m in recent_metrics)
-            
-            stats.avg_network_sent = statistics.mean(m.network_sent for m in recent_metrics)
-            stats.avg_network_recv = statistics.mean(m.network_recv for m in recent_metrics)
-            stats.max_network_sent = max(m.network_sent for m in recent_metrics)
-            stats.max_network_recv = max(m.network_recv for m in recent_metrics)
-            
-            stats.process_avg_cpu = statistics.mean(m.process_cpu for m in recent_metrics)
-            stats.process_max_cpu = max(m.process_cpu for m in recent_metrics)
-            
-            stats.process_avg_memory = statistics.mean(m.process_memory for m in recent_metrics)
-            stats.process_max_memory = max(m.process_memory for m in recent_metrics)
-            
-            stats.process_threads = recent_metrics[-1].process_threads
-            stats.process_handles = recent_metrics[-1].process_handles
-            
-            return stats
+            # One vectorized pass per aggregate over all columns
+            avg = dict(zip(METRIC_FIELDS, values.mean(axis=0).tolist()))
+            peak = dict(zip(METRIC_FIELDS, values.max(axis=0).tolist()))
+            last = dict(zip(METRIC_FIELDS, values[-1].tolist()))
+        
+        return PerformanceStats(
+            avg_cpu=avg["cpu_percent"],
+            max_cpu=peak["cpu_percent"],
+            avg_memory=avg["memory_percent"],
+            max_memory=peak["memory_percent"],
+            avg_disk_read=avg["disk_io_read"],
+            avg_disk_write=avg["disk_io_write"],
+            max_disk_read=peak["disk_io_read"],
+            max_disk_write=peak["disk_io_write"],
+            avg_network_sent=avg["network_sent"],
+            avg_network_recv=avg["network_recv"],
+            max_network_sent=peak["network_sent"],
+            max_network_recv=peak["network_recv"],
+            process_avg_cpu=avg["process_cpu"],
+            process_max_cpu=peak["process_cpu"],
+            process_avg_memory=avg["process_memory"],
+            process_max_memory=peak["process_memory"],
+            process_threads=int(last["process_threads"]),
+            process_handles=int(last["process_handles"]),
+        )
     
     def add_callback(self, callback: Callable[[SystemMetrics], None]) -> None:
         """Add a callback to be called with new metrics."""